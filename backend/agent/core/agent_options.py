@@ -25,6 +25,7 @@ from agent.core.hook import create_ask_user_question_hook, create_expanded_hook,
 logger = logging.getLogger(__name__)
 
 __all__ = [
+    "build_tools_env",
     "create_agent_sdk_options",
     "get_project_root",
     "resolve_path",
@@ -77,6 +78,34 @@ def _ensure_data_dir_env() -> None:
         os.environ["DATA_DIR"] = str(PROJECT_ROOT / "data")
 
 
+def build_tools_env(username: str, session_id: str | None = None) -> dict[str, str]:
+    """Build the per-client environment for plugin MCP subprocesses.
+
+    Passed through ClaudeAgentOptions.env so each SDK subprocess (and the MCP
+    servers it spawns) sees its own user instead of whatever was last written
+    to the process-wide os.environ by another connection.
+    """
+    env = {
+        "DATA_DIR": os.environ.get("DATA_DIR") or str(PROJECT_ROOT / "data"),
+        "EMAIL_USERNAME": username,
+        "MEDIA_USERNAME": username,
+    }
+    if session_id:
+        env["EMAIL_SESSION_ID"] = session_id
+        env["MEDIA_SESSION_ID"] = session_id
+    return env
+
+
+def _with_mcp_env(mcp_servers: dict[str, Any], env: dict[str, str]) -> dict[str, Any]:
+    """Add per-client env to stdio MCP server configs, leaving others untouched."""
+    result: dict[str, Any] = {}
+    for name, server in mcp_servers.items():
+        if isinstance(server, dict) and server.get("type", "stdio") == "stdio" and "command" in server:
+            server = {**server, "env": {**(server.get("env") or {}), **env}}
+        result[name] = server
+    return result
+
+
 def set_email_tools_username(username: str) -> None:
     """Set EMAIL_USERNAME env var for MCP subprocess inheritance."""
     _ensure_data_dir_env()
@@ -209,6 +238,7 @@ def create_agent_sdk_options(
     session_cwd: str | None = None,
     permission_folders: list[str] | None = None,
     client_type: str | None = None,
+    env: dict[str, str] | None = None,
 ) -> ClaudeAgentOptions:
     """Create SDK options from agents.yaml configuration.
 
@@ -222,6 +252,8 @@ def create_agent_sdk_options(
         session_cwd: Override working directory (e.g. session file storage dir).
         permission_folders: Override allowed write directories for permission hooks.
         client_type: Client platform type (e.g. "web", "telegram").
+        env: Per-client environment for the SDK subprocess and stdio MCP
+            servers (see build_tools_env).
     """
     config = load_agent_config(agent_id)
     project_root = get_project_root()
@@ -229,6 +261,8 @@ def create_agent_sdk_options(
     effective_cwd = session_cwd or resolve_path(config.get("cwd")) or project_root
     base_dirs = list(permission_folders) if permission_folders is not None else list(config.get("allowed_directories") or [])
     mcp_servers = config.get("mcp_servers") or {}
+    if env and mcp_servers:
+        mcp_servers = _with_mcp_env(mcp_servers, env)
     plugins = _resolve_plugins(config.get("plugins") or [])
 
     options = {
@@ -241,6 +275,7 @@ def create_agent_sdk_options(
         "add_dirs": base_dirs if base_dirs else None,
         "mcp_servers": mcp_servers or None,
         "plugins": plugins or None,
+        "env": dict(env) if env else None,
     }
 
     all_subagents = load_subagents()
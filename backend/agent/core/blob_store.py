@@ -0,0 +1,105 @@
+"""Content-addressed blob storage: data/{username}/blobs/{hash[:2]}/{hash}.
+
+Blobs are keyed by the SHA-256 of their bytes, so identical payloads are
+stored once no matter how many history entries reference them. Writes go
+through a temporary file and os.replace, so readers never see a partial blob.
+
+The store holds both UTF-8 text (elided tool results) and raw image bytes
+(images moved out of history); blob_media_type() tells them apart.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from agent.core.storage_utils import get_data_dir, get_user_data_dir
+from core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+BLOBS_DIRNAME = get_settings().storage.blobs_dirname
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+TEXT_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+# Leading bytes of the image formats clients send inline.
+_IMAGE_SIGNATURES: tuple[tuple[bytes, str], ...] = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def is_valid_blob_hash(blob_hash: str) -> bool:
+    """Check that a string is a lowercase hex SHA-256 digest."""
+    return bool(_HASH_PATTERN.match(blob_hash))
+
+
+def blob_media_type(data: bytes) -> str:
+    """Media type of a blob: an image type, UTF-8 text, or octet-stream."""
+    for signature, media_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return media_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError:
+        return "application/octet-stream"
+    return TEXT_MEDIA_TYPE
+
+
+class BlobStore:
+    """SHA-256 addressed blob store under {data_dir}/blobs/."""
+
+    def __init__(self, data_dir: Path | None = None):
+        self._blobs_dir = (data_dir or get_data_dir()) / BLOBS_DIRNAME
+
+    def _path(self, blob_hash: str) -> Path:
+        return self._blobs_dir / blob_hash[:2] / blob_hash
+
+    def put(self, data: bytes) -> str:
+        """Store bytes and return their hash. Existing blobs are not rewritten."""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        path = self._path(blob_hash)
+        if path.exists():
+            return blob_hash
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+        except OSError as e:
+            logger.error(f"Error writing blob {blob_hash}: {e}")
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        logger.debug(f"Stored blob {blob_hash} ({len(data)} bytes)")
+        return blob_hash
+
+    def put_text(self, text: str) -> str:
+        """Store UTF-8 text and return its hash."""
+        return self.put(text.encode("utf-8"))
+
+    def get(self, blob_hash: str) -> bytes | None:
+        """Return blob bytes, or None if the hash is unknown or malformed."""
+        if not is_valid_blob_hash(blob_hash):
+            return None
+        try:
+            return self._path(blob_hash).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, blob_hash: str) -> bool:
+        """Check whether a blob is stored."""
+        return is_valid_blob_hash(blob_hash) and self._path(blob_hash).exists()
+
+
+def get_user_blob_store(username: str) -> BlobStore:
+    """Get BlobStore for user: data/{username}/blobs/."""
+    return BlobStore(data_dir=get_user_data_dir(username))
@@ -1,6 +1,8 @@
 """Per-session file storage: data/{username}/files/{session_id}/input|output."""
 import asyncio
 import logging
+import os
+import uuid
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 from datetime import datetime
@@ -19,6 +21,26 @@ def _write_file_atomic(path: Path, content: bytes) -> None:
     with open(path, "wb") as f:
         f.write(content)
 
+
+def _link_unique(source: Path, target_dir: Path, safe_name: str) -> str:
+    """Move source into target_dir as safe_name, adding a counter suffix if taken.
+
+    ``os.link`` fails when the name exists, so checking and claiming a name
+    is one atomic step even when several saves of the same name race.
+    Blocking -- meant for executor use.
+    """
+    stem, ext = Path(safe_name).stem, Path(safe_name).suffix
+    unique_name, counter = safe_name, 0
+    while True:
+        try:
+            os.link(source, target_dir / unique_name)
+            break
+        except FileExistsError:
+            counter += 1
+            unique_name = f"{stem}_{counter}{ext}"
+    source.unlink()
+    return unique_name
+
 MAX_FILE_SIZE_BYTES = 50 * 1024 * 1024
 MAX_SESSION_SIZE_BYTES = 500 * 1024 * 1024
 MAX_FILES_PER_SESSION = 100
@@ -234,24 +256,6 @@ class FileStorage:
         ext = Path(filename).suffix.lstrip(".").lower()
         return MIME_TYPES.get(ext, "application/octet-stream")
 
-    async def _make_safe_name_unique(self, safe_name: str, file_type: Literal["input", "output"]) -> str:
-        """Append counter suffix if filename already exists in target directory."""
-        target_dir = self._get_dir(file_type)
-        counter = 0
-        unique_name = safe_name
-        loop = asyncio.get_running_loop()
-
-        def check_exists():
-            return (target_dir / unique_name).exists()
-
-        while await loop.run_in_executor(_executor, check_exists):
-            stem = Path(safe_name).stem
-            ext = Path(safe_name).suffix
-            counter += 1
-            unique_name = f"{stem}_{counter}{ext}"
-
-        return unique_name
-
     async def _save_file(
         self,
         content: bytes,
@@ -271,16 +275,13 @@ class FileStorage:
             await self.validate_file(original_name, size)
 
         safe_name = self.sanitize_filename(original_name)
-        safe_name = await self._make_safe_name_unique(safe_name, file_type)
-
         target_dir = self._get_dir(file_type)
-        target_path = target_dir / safe_name
-        temp_path = target_path.with_suffix(".tmp")
+        temp_path = target_dir / f".{uuid.uuid4().hex}.tmp"
 
         try:
             loop = asyncio.get_running_loop()
             await loop.run_in_executor(_executor, _write_file_atomic, temp_path, content)
-            temp_path.replace(target_path)
+            safe_name = await loop.run_in_executor(_executor, _link_unique, temp_path, target_dir, safe_name)
 
             metadata = FileMetadata(
                 safe_name=safe_name,
@@ -312,6 +313,43 @@ class FileStorage:
 
         return await self._save_file(content, filename, "input", content_type, validate)
 
+    async def move_input_file(
+        self, source: Path, filename: str, content_type: str = "", validate: bool = True
+    ) -> FileMetadata:
+        """Move an already-written file (e.g. a streamed download) into the input directory.
+
+        ``source`` must live on the same filesystem as the session directory,
+        since it is hard-linked into place; it is left in place on failure.
+        """
+        if not filename:
+            raise FileStorageError("Upload file has no filename")
+        self._ensure_directories()
+
+        size = source.stat().st_size
+        if validate:
+            await self.validate_file(filename, size)
+
+        safe_name = self.sanitize_filename(filename)
+        try:
+            loop = asyncio.get_running_loop()
+            safe_name = await loop.run_in_executor(_executor, _link_unique, source, self._input_dir, safe_name)
+        except OSError as e:
+            raise FileStorageError(f"Failed to save file: {e}") from e
+
+        logger.info(
+            f"Saved input file: {filename} -> {safe_name} "
+            f"({size} bytes) for session {self._session_id}"
+        )
+        return FileMetadata(
+            safe_name=safe_name,
+            original_name=filename,
+            file_type="input",
+            size_bytes=size,
+            content_type=content_type or self._guess_content_type(filename),
+            created_at=datetime.now().isoformat(),
+            session_id=self._session_id,
+        )
+
     async def save_output_file(
         self, filename: str, content: bytes, validate: bool = True
     ) -> FileMetadata:
@@ -1,5 +1,6 @@
 """Conversation session management with Skills and Subagents support."""
 import asyncio
+import time
 from collections.abc import AsyncIterator
 
 from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
@@ -32,6 +33,7 @@ class ConversationSession:
         self._storage: SessionStorage | None = storage
         self._include_partial_messages: bool = include_partial_messages
         self._connected: bool = False
+        self.connect_seconds: float | None = None  # duration of the last connect()
         self._agent_id: str | None = agent_id
 
     @property
@@ -64,7 +66,9 @@ class ConversationSession:
         if self._connected:
             raise RuntimeError("Session is already connected")
 
+        start = time.perf_counter()
         await self.client.connect()
+        self.connect_seconds = time.perf_counter() - start
         self._connected = True
 
     def _on_session_id(self, session_id: str) -> None:
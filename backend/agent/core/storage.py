@@ -2,18 +2,36 @@
 
 Sessions stored in {DATA_DIR}/sessions.json, history in {DATA_DIR}/history/{session_id}.jsonl.
 Per-user isolation via get_user_session_storage(username) / get_user_history_storage(username).
+Inline base64 images in history are stored once in the user's BlobStore and
+referenced from the JSONL; resolve_image_blobs() restores them when served.
+History appends and migrations hold an advisory lock on the JSONL file so a
+migration running alongside the server never drops a concurrent append.
+Appends never wait for that lock on the caller's thread (the event loop):
+an append that finds the file locked is finished by a background writer.
 """
+import base64
+import binascii
 import json
 import logging
 import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass, asdict, field
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from agent import PROJECT_ROOT
+from agent.core.blob_store import BlobStore
 from core.settings import get_settings
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, appends are unguarded
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 _settings = get_settings()
@@ -334,12 +352,125 @@ class MessageData:
             self.timestamp = datetime.now().isoformat()
 
 
+BLOB_SOURCE_TYPE = "blob"
+
+
+def _externalize_images(content: Any, blobs: BlobStore) -> tuple[Any, int]:
+    """Replace inline base64 image sources with blob references.
+
+    Returns the (possibly new) content and the number of images replaced.
+    Blocks whose data is not valid base64 are left inline.
+    """
+    if not isinstance(content, list):
+        return content, 0
+
+    replaced = 0
+    result: list = []
+    for block in content:
+        source = block.get("source") if isinstance(block, dict) else None
+        if (
+            not isinstance(source, dict)
+            or block.get("type") != "image"
+            or source.get("type") != "base64"
+        ):
+            result.append(block)
+            continue
+        try:
+            raw = base64.b64decode(source.get("data", ""), validate=True)
+        except (binascii.Error, ValueError):
+            result.append(block)
+            continue
+        blob_source = {
+            "type": BLOB_SOURCE_TYPE,
+            "media_type": source.get("media_type"),
+            "hash": blobs.put(raw),
+            "size": len(raw),
+        }
+        result.append({**block, "source": blob_source})
+        replaced += 1
+    return result, replaced
+
+
+@contextmanager
+def _locked_history_file(path: Path, mode: str, blocking: bool = True) -> Iterator[Any]:
+    """Open a history file holding an exclusive advisory lock on it.
+
+    migrate_inline_images() swaps in a new file with os.replace, so a writer
+    that opened the old file while waiting for the lock reopens the path
+    once it gets the lock instead of appending to the replaced file.
+    Without ``blocking``, raises BlockingIOError if the lock is held.
+    """
+    while True:
+        f = open(path, mode)
+        if fcntl is None:
+            break
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            raise
+        try:
+            if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+                break
+        except FileNotFoundError:
+            if "r" in mode:
+                f.close()
+                raise
+        f.close()
+    try:
+        yield f
+    finally:
+        # Closing the file releases the lock.
+        f.close()
+
+
+# Appends that find their history file locked (e.g. by a running migration)
+# are written by this single thread, in submission order.
+_deferred_appends = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-append")
+_deferred_lock = threading.Lock()
+# History file -> appends queued on the writer thread and not yet written.
+_deferred_pending: dict[Path, int] = {}
+
+
+def _has_deferred_appends(path: Path) -> bool:
+    with _deferred_lock:
+        return path in _deferred_pending
+
+
+def _write_deferred_append(path: Path, line: str) -> None:
+    try:
+        with _locked_history_file(path, 'a') as f:
+            f.write(line)
+    except IOError as e:
+        logger.error(f"Error writing to history file: {e}")
+    finally:
+        with _deferred_lock:
+            remaining = _deferred_pending[path] - 1
+            if remaining:
+                _deferred_pending[path] = remaining
+            else:
+                del _deferred_pending[path]
+
+
+def _defer_append(path: Path, line: str) -> None:
+    with _deferred_lock:
+        _deferred_pending[path] = _deferred_pending.get(path, 0) + 1
+    _deferred_appends.submit(_write_deferred_append, path, line)
+    logger.debug(f"History file {path.name} is locked; append handed to the background writer")
+
+
+def flush_deferred_history_appends(timeout: float | None = None) -> None:
+    """Block until appends queued behind a locked history file are written."""
+    _deferred_appends.submit(lambda: None).result(timeout)
+
+
 class HistoryStorage:
     """JSONL-based message history storage: {data_dir}/history/{session_id}.jsonl."""
 
     def __init__(self, data_dir: Path | None = None):
         self._data_dir = data_dir or get_data_dir()
         self._history_dir = self._data_dir / HISTORY_DIRNAME
+        self._blobs = BlobStore(self._data_dir)
         self._ensure_history_dir()
 
     def _ensure_history_dir(self) -> None:
@@ -363,7 +494,18 @@ class HistoryStorage:
         is_error: bool = False,
         metadata: dict | None = None
     ) -> None:
-        """Append a message to the session history JSONL file."""
+        """Append a message to the session history JSONL file.
+
+        Inline base64 images are moved to the blob store; the entry keeps a
+        ``{"type": "blob", "hash": ...}`` source in their place. If another
+        writer holds the file's lock, the append is finished in the
+        background instead of blocking the caller.
+        """
+        try:
+            content, _ = _externalize_images(content, self._blobs)
+        except OSError as e:
+            logger.error(f"Error storing image blobs, keeping images inline: {e}")
+
         message = MessageData(
             role=role,
             content=content,
@@ -375,10 +517,17 @@ class HistoryStorage:
         )
 
         history_file = self._get_history_file(session_id)
+        line = json.dumps(asdict(message)) + '\n'
+        # Queue behind earlier deferred appends so the file keeps message order.
+        if _has_deferred_appends(history_file):
+            _defer_append(history_file, line)
+            return
         try:
-            with open(history_file, 'a') as f:
-                f.write(json.dumps(asdict(message)) + '\n')
+            with _locked_history_file(history_file, 'a', blocking=False) as f:
+                f.write(line)
             logger.debug(f"Appended {role} message to {session_id}")
+        except BlockingIOError:
+            _defer_append(history_file, line)
         except IOError as e:
             logger.error(f"Error writing to history file: {e}")
 
@@ -420,6 +569,68 @@ class HistoryStorage:
         """
         return [asdict(msg) for msg in self.get_messages(session_id)]
 
+    def resolve_image_blobs(self, messages: list[dict]) -> None:
+        """Restore blob-referenced image sources to inline base64, in place.
+
+        Used when serving history to clients; references whose blob is
+        missing are left as-is.
+        """
+        for message in messages:
+            content = message.get("content")
+            if not isinstance(content, list):
+                continue
+            for block in content:
+                source = block.get("source") if isinstance(block, dict) else None
+                if not isinstance(source, dict) or source.get("type") != BLOB_SOURCE_TYPE:
+                    continue
+                data = self._blobs.get(source.get("hash", ""))
+                if data is None:
+                    logger.warning(f"Missing image blob {source.get('hash')}")
+                    continue
+                block["source"] = {
+                    "type": "base64",
+                    "media_type": source.get("media_type"),
+                    "data": base64.b64encode(data).decode("ascii"),
+                }
+
+    def migrate_inline_images(self, session_id: str) -> int:
+        """Rewrite a history file so inline base64 images reference blobs.
+
+        The file is replaced atomically while holding the same lock as
+        append_message(), so it is safe to run against a live server.
+        Returns the number of images moved.
+        """
+        history_file = self._get_history_file(session_id)
+        try:
+            with _locked_history_file(history_file, 'r') as f:
+                lines: list[str] = []
+                moved = 0
+                for line in f:
+                    stripped = line.strip()
+                    if not stripped:
+                        continue
+                    try:
+                        data = json.loads(stripped)
+                    except json.JSONDecodeError:
+                        lines.append(stripped)
+                        continue
+                    data["content"], count = _externalize_images(data.get("content"), self._blobs)
+                    moved += count
+                    lines.append(json.dumps(data) if count else stripped)
+
+                if moved:
+                    tmp_file = history_file.with_suffix(".jsonl.tmp")
+                    tmp_file.write_text("".join(f"{line}\n" for line in lines))
+                    os.replace(tmp_file, history_file)
+                    logger.info(f"Moved {moved} inline images to blobs for session: {session_id}")
+        except FileNotFoundError:
+            return 0
+        return moved
+
+    def list_session_ids(self) -> list[str]:
+        """List session IDs that have a history file."""
+        return sorted(p.stem for p in self._history_dir.glob("*.jsonl"))
+
     def delete_history(self, session_id: str) -> bool:
         """Delete the history file for a session.
 
@@ -22,6 +22,11 @@ class EventType(StrEnum):
     COMPACT_COMPLETED = "compact_completed"
     THINKING = "thinking"
     ASSISTANT_TEXT = "assistant_text"
+    REPLAY_GAP = "replay_gap"
+    CHANNEL_OPEN = "channel_open"
+    CHANNEL_CLOSE = "channel_close"
+    CHANNEL_CLOSED = "channel_closed"
+    CHANNEL_ACK = "channel_ack"
 
 
 class MessageRole(StrEnum):
@@ -48,6 +53,28 @@ class WSCloseCode(IntEnum):
 ASK_USER_QUESTION_TIMEOUT = 60  # seconds
 FIRST_MESSAGE_TRUNCATE_LENGTH = 100
 
+# Resumable WebSocket streams: outbound events kept for replay, and how long a
+# disconnected session (and its SDK client) is kept alive awaiting a reconnect.
+WS_REPLAY_BUFFER_SIZE = 2000  # events
+WS_RESUME_GRACE_SECONDS = 60
+
+# Multiplexed WebSocket (/ws/mux): session channels per socket, and how many
+# events a channel may have unacknowledged before it pauses.
+WS_MUX_MAX_CHANNELS = 32
+WS_MUX_WINDOW = 256  # events
+
+# Resumable SSE turns: events kept per turn for Last-Event-ID reconnects, and
+# how long a finished turn stays available for a late reconnect.
+SSE_REPLAY_BUFFER_SIZE = 2000  # events
+SSE_RESUME_GRACE_SECONDS = 60
+
+# SessionManager: lock shards, idle eviction and size caps for cached state.
+SESSION_LOCK_SHARDS = 64
+SESSION_IDLE_TTL_SECONDS = 3600
+SESSION_METADATA_MAX_ENTRIES = 10_000
+SESSION_MAX_LIVE = 256
+SESSION_REAPER_INTERVAL_SECONDS = 60
+
 # Pattern to strip agentId metadata from SDK subagent results.
 # Example: "agentId: a0814b5 (for resuming to continue this agent's work if needed)"
 AGENT_ID_PATTERN = re.compile(
@@ -50,12 +50,31 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to log email credentials: {e}")
 
-    yield
-    # Shutdown - cleanup all background workers
+    from api.services.question_manager import get_question_manager
     from api.services.session_manager import get_session_manager
     manager = get_session_manager()
-    for session in manager._sessions.values():
-        await session.shutdown()
+    manager.start_reaper()
+
+    # Resume platform webhooks left in the inbox by a previous run
+    from platforms.inbox import get_inbox_dispatcher
+    inbox_dispatcher = get_inbox_dispatcher()
+    inbox_dispatcher.start()
+
+    yield
+    # Shutdown - hand in-flight webhooks back to the inbox, write pending chat
+    # mappings, stop the reapers, disconnect all live sessions and finish
+    # deferred history writes
+    await inbox_dispatcher.stop()
+    from platforms.session_bridge import get_session_mapping_store
+    get_session_mapping_store().flush()
+    from platforms.http_clients import close_platform_http_client
+    await close_platform_http_client()
+    await manager.shutdown()
+    await get_question_manager().shutdown()
+    # Write history appends that were waiting on a locked file
+    import asyncio
+    from agent.core.storage import flush_deferred_history_appends
+    await asyncio.to_thread(flush_deferred_history_appends)
 
 
 def create_app() -> FastAPI:
@@ -132,4 +151,5 @@ if __name__ == "__main__":
         port=API_CONFIG["port"],
         reload=API_CONFIG["reload"],
         log_level=API_CONFIG["log_level"],
+        ws_per_message_deflate=API_CONFIG["ws_per_message_deflate"],
     )
@@ -14,8 +14,13 @@ from api.db.user_database import (
 )
 from api.dependencies.auth import require_admin
 from api.models.user_auth import UserTokenPayload
+from api.services.question_manager import get_question_manager
+from api.services.session_manager import get_session_manager
 from api.services.settings_service import get_settings_service
+from api.services.turn_scheduler import get_turn_scheduler
 from api.services.whitelist_service import get_whitelist_service
+from core.metrics import get_metrics
+from platforms.session_bridge import get_session_mapping_store
 
 logger = logging.getLogger(__name__)
 
@@ -121,6 +126,22 @@ async def get_settings(admin: UserTokenPayload = Depends(require_admin)):
     return {"platform": service.get_all()}
 
 
+@router.get("/sessions/stats")
+async def get_session_stats(admin: UserTokenPayload = Depends(require_admin)):
+    """Get in-memory session gauges (live entries, eviction counters, pending questions, turn slots)."""
+    return {
+        **get_session_manager().stats(),
+        **get_turn_scheduler().stats(),
+        "pending_questions": get_question_manager().get_pending_count(),
+    }
+
+
+@router.get("/metrics")
+async def get_metrics_snapshot(admin: UserTokenPayload = Depends(require_admin)):
+    """Get latency histograms (e.g. turn queue wait per priority class)."""
+    return {"histograms": get_metrics().snapshot()}
+
+
 @router.put("/settings/platform")
 async def update_platform_settings(
     body: SettingsUpdate,
@@ -129,6 +150,7 @@ async def update_platform_settings(
     """Update platform settings."""
     service = get_settings_service()
     service.update_all(body.settings)
+    get_session_mapping_store().invalidate_settings()
     logger.info(f"Admin {admin.username} updated platform settings: {list(body.settings.keys())}")
     return {"platform": service.get_all()}
 
@@ -1,13 +1,16 @@
-"""Conversation management endpoints with SSE streaming."""
-import json
+"""Conversation management endpoints with SSE streaming.
+
+Each turn streams from a background SseTurn, so events carry ``id`` fields and
+a client that reconnects with ``Last-Event-ID`` resumes the same turn instead
+of sending the message again.
+"""
 import logging
 import uuid
-from typing import AsyncIterator
+from collections.abc import AsyncIterator, Callable
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sse_starlette.sse import EventSourceResponse
 
-from agent.core.agent_options import set_email_tools_username, set_media_tools_username
 from agent.core.storage import get_user_history_storage
 from api.constants import EventType
 from api.dependencies import SessionManagerDep
@@ -15,8 +18,12 @@ from api.dependencies.auth import get_current_user
 from api.models.requests import SendMessageRequest, CreateConversationRequest
 from api.models.user_auth import UserTokenPayload
 from api.services.history_tracker import HistoryTracker
+from api.services.tool_result_elision import get_tool_result_elider
 from api.services.message_utils import convert_messages_to_sse
-from api.utils.sensitive_data_filter import sanitize_paths
+from api.services.sse_turns import get_sse_turn_registry
+from api.services.turn_timing import TurnTimer
+from api.utils.sensitive_data_filter import sanitize_event_paths
+from core.json_codec import dumps_json
 
 logger = logging.getLogger(__name__)
 
@@ -27,17 +34,33 @@ router = APIRouter(prefix="/conversations", tags=["conversations"])
 async def create_conversation(
     request: CreateConversationRequest,
     manager: SessionManagerDep,
-    user: UserTokenPayload = Depends(get_current_user)
+    user: UserTokenPayload = Depends(get_current_user),
+    last_event_id: str | None = Header(default=None),
 ):
     """Create a new conversation and stream the response via SSE."""
     session_id = request.session_id or str(uuid.uuid4())
 
-    return EventSourceResponse(
-        _stream_conversation_events(session_id, request.content, manager, request.agent_id, user.username),
-        media_type="text/event-stream"
+    return _turn_response(
+        last_event_id,
+        user.username,
+        lambda: _stream_conversation_events(session_id, request.content, manager, request.agent_id, user.username),
     )
 
 
+def _turn_response(
+    last_event_id: str | None,
+    username: str,
+    start_turn: Callable[[], AsyncIterator[dict]],
+) -> EventSourceResponse:
+    """Resume the turn named by Last-Event-ID, or start a new one."""
+    registry = get_sse_turn_registry()
+    events = registry.resume(last_event_id, username)
+    if events is None:
+        events = registry.start(username, start_turn()).subscribe()
+
+    return EventSourceResponse(events, media_type="text/event-stream")
+
+
 async def _stream_conversation_events(
     session_id: str,
     content: str,
@@ -46,22 +69,35 @@ async def _stream_conversation_events(
     username: str | None = None
 ) -> AsyncIterator[dict]:
     """Async generator that streams conversation events as SSE."""
-    if username:
-        set_email_tools_username(username)
-        set_media_tools_username(username)
+    timer = TurnTimer("api")
+    with timer.active():
+        async for event in _stream_turn(timer, session_id, content, manager, agent_id, username):
+            yield event
 
-    session, resolved_id, found_in_cache = await manager.get_or_create_conversation_session(
-        session_id, agent_id
+
+async def _stream_turn(
+    timer: TurnTimer,
+    session_id: str,
+    content: str,
+    manager,
+    agent_id: str | None,
+    username: str | None,
+) -> AsyncIterator[dict]:
+    conversation, resolved_id, found_in_cache = await manager.get_or_create_conversation_session(
+        session_id, agent_id, username=username
     )
+    # A fresh session connects lazily inside its first turn.
+    cold_start = conversation.turn_count == 0
 
     tracker = HistoryTracker(
         session_id=resolved_id,
-        history=get_user_history_storage(username) if username else None
+        history=get_user_history_storage(username) if username else None,
+        elider=get_tool_result_elider(username),
     )
 
     yield {
         "event": EventType.SESSION_ID,
-        "data": json.dumps({
+        "data": dumps_json({
             "session_id": resolved_id,
             "found_in_cache": found_in_cache
         })
@@ -71,32 +107,35 @@ async def _stream_conversation_events(
     tracker.save_user_message(content)
 
     try:
-        async for msg in session.send_query(content):
-            sse_events = convert_messages_to_sse(msg)
-
-            for sse_event in sse_events:
-                event_type = sse_event.get("event")
-
-                try:
-                    data = json.loads(sse_event.get("data", "{}"))
-                except json.JSONDecodeError:
-                    data = {}
+        async for msg in conversation.send_query(content):
+            timer.on_message()
+            for sse_event in convert_messages_to_sse(msg):
+                event_type = sse_event["event"]
+                data = sse_event["data"]
 
                 if event_type == EventType.SESSION_ID and "session_id" in data:
                     sdk_sid = data["session_id"]
-                    session.sdk_session_id = sdk_sid  # Store for multi-turn context
+                    conversation.sdk_session_id = sdk_sid  # Store for multi-turn context
                     manager.register_sdk_session_id(pending_id, sdk_sid)
                     yield {
                         "event": "sdk_session_id",
-                        "data": json.dumps({"sdk_session_id": sdk_sid})
+                        "data": dumps_json({"sdk_session_id": sdk_sid})
                     }
                     continue
 
-                tracker.process_event(event_type, data)
+                timer.on_event(event_type, data)
+                if event_type == EventType.DONE:
+                    if cold_start:
+                        _add_connect_time(timer, conversation)
+                    # Stored with the result in history metadata.
+                    data["timings"] = timer.finish()
 
-                raw_data = sse_event.get("data", "")
-                if isinstance(raw_data, str):
-                    sse_event["data"] = sanitize_paths(raw_data)
+                # History sees the unsanitized event; the client gets sanitized
+                # data serialized exactly once.
+                tracker.process_event(event_type, data)
+                with timer.span("sanitize"):
+                    sanitize_event_paths(data)
+                sse_event["data"] = dumps_json(data)
 
                 yield sse_event
 
@@ -107,19 +146,31 @@ async def _stream_conversation_events(
 
         yield {
             "event": EventType.ERROR,
-            "data": json.dumps({"error": str(e), "type": type(e).__name__})
+            "data": dumps_json({"error": str(e), "type": type(e).__name__})
         }
 
 
+def _add_connect_time(timer: TurnTimer, conversation) -> None:
+    seconds = getattr(getattr(conversation, "session", None), "connect_seconds", None)
+    if seconds is not None:
+        timer.add("sdk_connect", seconds)
+
+
 @router.post("/{session_id}/stream")
 async def stream_conversation(
     session_id: str,
     request: SendMessageRequest,
     manager: SessionManagerDep,
-    user: UserTokenPayload = Depends(get_current_user)
+    user: UserTokenPayload = Depends(get_current_user),
+    last_event_id: str | None = Header(default=None),
 ):
-    """Send a message and stream the response via SSE."""
-    return EventSourceResponse(
-        _stream_conversation_events(session_id, request.content, manager, username=user.username),
-        media_type="text/event-stream"
+    """Send a message and stream the response via SSE.
+
+    With a ``Last-Event-ID`` header the request resumes that turn's stream
+    and the message body is not sent again.
+    """
+    return _turn_response(
+        last_event_id,
+        user.username,
+        lambda: _stream_conversation_events(session_id, request.content, manager, username=user.username),
     )
@@ -1,9 +1,10 @@
 """Session management endpoints for CRUD operations and search."""
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 
+from agent.core.blob_store import TEXT_MEDIA_TYPE, blob_media_type, get_user_blob_store, is_valid_blob_hash
 from agent.core.file_storage import delete_session_files
 from agent.core.storage import get_user_history_storage, get_user_session_storage
-from api.core.errors import InvalidRequestError
+from api.core.errors import APIError, InvalidRequestError, SessionNotFoundError
 from api.dependencies import SessionManagerDep
 from api.dependencies.auth import get_current_user
 from api.models.requests import (
@@ -23,7 +24,7 @@ from api.models.responses import (
 )
 from api.models.user_auth import UserTokenPayload
 from api.services.search_service import SearchOptions, SessionSearchService
-from api.utils.sensitive_data_filter import sanitize_event_paths, sanitize_paths
+from api.utils.sensitive_data_filter import redact_sensitive_data, sanitize_event_paths, sanitize_paths
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
@@ -250,6 +251,8 @@ async def get_session_history(
     messages = history_storage.get_messages_dict(id)
     for m in messages:
         sanitize_event_paths(m)
+    # Resolve after sanitizing so the walk doesn't scan inlined image data.
+    history_storage.resolve_image_blobs(messages)
 
     sessions = storage.load_sessions()
     session_data = next((s for s in sessions if s.session_id == id), None)
@@ -273,6 +276,47 @@ async def get_session_history(
     )
 
 
+@router.get(
+    "/{id}/blobs/{blob_hash}",
+    summary="Get a stored blob",
+    description="Fetch the full body of an elided tool result, or a stored image, by its content hash"
+)
+async def get_session_blob(
+    id: str,
+    blob_hash: str,
+    user: UserTokenPayload = Depends(get_current_user)
+) -> Response:
+    """Return a blob from the user's content-addressed store."""
+    if not is_valid_blob_hash(blob_hash):
+        raise InvalidRequestError(message="Invalid blob hash")
+
+    session_storage = get_user_session_storage(user.username)
+    history_storage = get_user_history_storage(user.username)
+    if session_storage.get_session(id) is None and history_storage.get_message_count(id) == 0:
+        raise SessionNotFoundError(id)
+
+    data = get_user_blob_store(user.username).get(blob_hash)
+    if data is None:
+        raise APIError(status_code=404, message=f"Blob '{blob_hash}' not found")
+
+    media_type = blob_media_type(data)
+    body: str | bytes = data
+    if media_type == TEXT_MEDIA_TYPE:
+        # Tool-result bodies are sanitized when stored; sanitize again so nothing
+        # written by an older build reaches the client unredacted.
+        body = sanitize_paths(redact_sensitive_data(data.decode("utf-8")))
+
+    # Content-addressed, so the body for a given hash never changes.
+    return Response(
+        content=body,
+        media_type=media_type,
+        headers={
+            "Cache-Control": "private, max-age=31536000, immutable",
+            "X-Content-Type-Options": "nosniff",
+        },
+    )
+
+
 @router.post(
     "/{id}/resume",
     response_model=SessionResponse,
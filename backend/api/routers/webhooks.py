@@ -4,13 +4,13 @@ Provides a single entry point for all platform webhooks:
 - POST /api/v1/webhooks/{platform_name} — receive inbound messages
 - GET  /api/v1/webhooks/{platform_name} — handle platform verification handshakes
 
-Webhooks ACK immediately (200) and process messages in background tasks.
+Accepted messages are written to the durable webhook inbox before the 200
+ACK and processed by the inbox dispatcher, so a restart never drops them.
 """
 
-import asyncio
 import json
 import logging
-import time
+import sqlite3
 
 from fastapi import APIRouter, BackgroundTasks, Request, Response
 from fastapi.responses import JSONResponse, PlainTextResponse
@@ -18,39 +18,13 @@ from fastapi.responses import JSONResponse, PlainTextResponse
 from core.settings import get_settings
 from platforms.adapters import get_adapter
 from platforms.base import NormalizedResponse
-from platforms.worker import process_platform_message
+from platforms.dedup import get_webhook_dedup
+from platforms.inbox import get_inbox_dispatcher, get_webhook_inbox
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["webhooks"])
 
-# Thread-safe in-memory deduplication (message_id → timestamp).
-# Prevents duplicate processing from webhook retries.
-_dedup_lock = asyncio.Lock()
-_processed_messages: dict[str, float] = {}
-_MAX_DEDUP_ENTRIES = 10000
-_DEDUP_TTL_SECONDS = 3600  # 1 hour
-
-
-async def _is_duplicate(platform: str, message_id: str) -> bool:
-    """Check if a message has already been processed (thread-safe)."""
-    key = f"{platform}:{message_id}"
-
-    async with _dedup_lock:
-        if key in _processed_messages:
-            return True
-
-        # Evict stale entries when dict grows too large
-        if len(_processed_messages) > _MAX_DEDUP_ENTRIES:
-            cutoff = time.time() - _DEDUP_TTL_SECONDS
-            stale_keys = [k for k, ts in _processed_messages.items() if ts < cutoff]
-            for k in stale_keys:
-                del _processed_messages[k]
-
-        _processed_messages[key] = time.time()
-        return False
-
-
 @router.get("/webhooks/{platform_name}")
 async def webhook_verify(platform_name: str, request: Request) -> Response:
     """Handle platform webhook verification (GET).
@@ -90,8 +64,8 @@ async def webhook_receive(
 
     1. Verify signature (per-platform HMAC)
     2. Parse payload into NormalizedMessage
-    3. ACK 200 immediately
-    4. Process message in background task
+    3. Persist it in the webhook inbox
+    4. ACK 200; the inbox dispatcher processes it
     """
     platform_key = platform_name.lower()
     adapter = get_adapter(platform_key)
@@ -136,18 +110,35 @@ async def webhook_receive(
         )
         return JSONResponse(content={"status": "blocked"})
 
-    # Deduplication
+    # Deduplication: in memory first, then (optionally) in the inbox database,
+    # which still remembers message IDs seen before a restart.
     message_id = normalized.metadata.get("message_id", "")
-    if message_id and await _is_duplicate(platform_key, str(message_id)):
-        logger.debug(f"Duplicate message ignored: {platform_key}:{message_id}")
+    message_key = str(message_id) if message_id else None
+    dedup_key = f"{platform_key}:{message_key}"
+    dedup = get_webhook_dedup()
+    if message_key and dedup.check_and_add(dedup_key):
+        logger.debug(f"Duplicate message ignored: {dedup_key}")
+        return JSONResponse(content={"status": "duplicate"})
+
+    # Persist before the ACK; if this fails the platform's retry delivers it again.
+    platform_settings = get_settings().platform
+    dedup_ttl = platform_settings.dedup_ttl_seconds if platform_settings.dedup_persistent else None
+    try:
+        inbox_id = get_webhook_inbox().enqueue(normalized, message_key=message_key, dedup_ttl=dedup_ttl)
+    except sqlite3.Error as e:
+        if message_key:
+            dedup.discard(dedup_key)
+        logger.error(f"Failed to persist webhook for {platform_key}: {e}")
+        return JSONResponse(status_code=503, content={"error": "Temporarily unavailable"})
+    if inbox_id is None:
+        logger.debug(f"Duplicate message ignored (seen before restart): {dedup_key}")
         return JSONResponse(content={"status": "duplicate"})
+    get_inbox_dispatcher().notify()
 
-    # Process in background — ACK immediately
     logger.info(
         f"Webhook received: platform={platform_key}, "
         f"user={normalized.platform_user_id}, "
-        f"text_len={len(normalized.text)}"
+        f"text_len={len(normalized.text)}, inbox_id={inbox_id}"
     )
-    background_tasks.add_task(process_platform_message, normalized, adapter)
 
     return JSONResponse(content={"status": "ok"})
@@ -1,9 +1,14 @@
-"""WebSocket endpoint for persistent multi-turn conversations."""
+"""WebSocket endpoints for persistent multi-turn conversations.
+
+``/ws/chat`` serves one session per socket. ``/ws/mux`` carries several
+session channels over one authenticated socket; each channel is an ordinary
+chat runtime whose frames are tagged with the client-chosen channel ID.
+"""
 import asyncio
 import json as json_module
 import logging
-import os
 import uuid
+from contextlib import AbstractAsyncContextManager, nullcontext
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -19,26 +24,37 @@ from claude_agent_sdk.types import (
     UserMessage,
 )
 
-from agent.core.agent_options import create_agent_sdk_options, set_email_tools_session_id
+from agent.core.agent_options import create_agent_sdk_options
 from agent.core.storage import get_user_history_storage, get_user_session_storage
 from api.constants import (
     ASK_USER_QUESTION_TIMEOUT,
     FIRST_MESSAGE_TRUNCATE_LENGTH,
     TOOL_REF_PATTERN,
+    WS_MUX_MAX_CHANNELS,
+    WS_MUX_WINDOW,
+    WS_REPLAY_BUFFER_SIZE,
+    WS_RESUME_GRACE_SECONDS,
     EventType,
     WSCloseCode,
 )
 from api.middleware.jwt_auth import validate_websocket_token, WebSocketAuthError
 from api.services.content_normalizer import extract_text_content, normalize_content
 from api.services.history_tracker import HistoryTracker
+from api.services.image_preprocessor import get_image_preprocessor, image_limits_for_agent
+from api.services.tool_result_elision import ToolResultElider, get_tool_result_elider
 from api.services.session_setup import resolve_session_ids, create_session_resources
 from api.services.text_extractor import extract_clean_text_blocks
 from api.services.message_utils import message_to_dicts
 from api.services.question_manager import QuestionManager, get_question_manager
+from api.services.stream_replay import DetachedStreamRegistry, EventReplayBuffer
 from api.services.streaming_input import create_message_generator
+from api.services.turn_scheduler import TurnPriority, TurnSlot, get_turn_scheduler
+from api.services.turn_state import TurnState
+from api.services.turn_timing import TurnTimer, current_turn_timer, timed
 from api.utils.questions import normalize_questions_field
 from api.utils.sensitive_data_filter import sanitize_event_paths, sanitize_event_content
 from api.utils.websocket import close_with_error
+from core.ws_codec import JSON_ENCODING, decode_frame, encode_frame, negotiate_encoding
 
 logger = logging.getLogger(__name__)
 
@@ -51,30 +67,206 @@ class SanitizedWebSocket:
     def __init__(self, ws: WebSocket) -> None:
         self._ws = ws
 
-    async def send_json(self, data: dict, **kwargs) -> None:  # type: ignore[override]
+    @staticmethod
+    def _sanitize(data: dict) -> None:
+        # Blob references point at already-sanitized bodies, and their hex
+        # hashes would otherwise be redacted as if they were secrets.
+        content_ref = data.pop("content_ref", None)
         sanitize_event_paths(data)
 
         snapshot = str(data) if logger.isEnabledFor(logging.WARNING) else None
         sanitize_event_content(data)
         if snapshot is not None and str(data) != snapshot:
             logger.warning(f"WebSocket: Sanitized event '{data.get('type', 'unknown')}' - sensitive data redacted")
+        if content_ref is not None:
+            data["content_ref"] = content_ref
 
+    async def send_json(self, data: dict, **kwargs) -> None:  # type: ignore[override]
+        with timed("sanitize"):
+            self._sanitize(data)
         await self._ws.send_json(data, **kwargs)
 
     def __getattr__(self, name: str):
         return getattr(self._ws, name)
 
+
+class ResumableWebSocket(SanitizedWebSocket):
+    """Sanitizing wrapper that numbers outbound events and survives reconnects.
+
+    Every event is stamped with a ``seq`` and kept in a replay buffer. While
+    no client is attached events are only buffered, and a failed send detaches
+    the client instead of aborting the agent turn. Frames are written in the
+    encoding negotiated by the attached client (JSON text or MessagePack).
+
+    On a multiplexed socket the channel tags every frame with its ``channel``
+    ID and may have a flow-control window: at most ``window`` events are sent
+    beyond the last one the client acknowledged, and the rest wait in the
+    replay buffer until ack() opens the window again.
+    """
+
+    __slots__ = ("_buffer", "_encoding", "_channel", "_window", "_sent_seq", "_acked_seq", "_flush_lock")
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        buffer: EventReplayBuffer,
+        encoding: str = JSON_ENCODING,
+        channel: str | None = None,
+        window: int | None = None,
+    ) -> None:
+        super().__init__(ws)
+        self._buffer = buffer
+        self._encoding = encoding
+        self._channel = channel
+        self._window = window
+        self._sent_seq = 0
+        self._acked_seq = 0
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+
+    @staticmethod
+    async def _write(ws: WebSocket, frame: str | bytes) -> None:
+        if isinstance(frame, bytes):
+            await ws.send_bytes(frame)
+        else:
+            await ws.send_text(frame)
+
+    def _frame(self, event: dict) -> str | bytes:
+        if self._channel is not None:
+            event = {**event, "channel": self._channel}
+        return encode_frame(event, self._encoding)
+
+    async def _send_frame(self, ws: WebSocket, frame: str | bytes) -> bool:
+        """Write a frame; on failure detach the client and return False."""
+        try:
+            await self._write(ws, frame)
+            return True
+        except Exception as e:
+            if self._ws is ws:
+                logger.info(f"WebSocket send failed, detaching client: {e}")
+                self._ws = None
+            return False
+
+    @property
+    def is_attached(self) -> bool:
+        return self._ws is not None
+
+    async def send_json(self, data: dict, **kwargs) -> None:  # type: ignore[override]
+        with timed("sanitize"):
+            self._sanitize(data)
+        data["seq"] = self._buffer.append(data)
+
+        ws = self._ws
+        if ws is None:
+            return
+        if self._window is not None:
+            await self._flush()
+            return
+        # Encode outside the try: a serialization bug must not detach the client.
+        await self._send_frame(ws, self._frame(data))
+
+    async def ack(self, seq: int) -> None:
+        """Record that the client has processed events up to seq and send more."""
+        if self._window is None or seq <= self._acked_seq:
+            return
+        self._acked_seq = min(seq, self._sent_seq)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        """Send buffered events, in order, as far as the window allows."""
+        async with self._flush_lock:
+            while (ws := self._ws) is not None:
+                limit = min(self._buffer.last_seq, self._acked_seq + self._window)
+                if self._sent_seq >= limit:
+                    return
+                events = self._buffer.since(self._sent_seq)
+                if events is None:
+                    # Paused for longer than the buffer holds; the client
+                    # reloads history and continues from the oldest kept event.
+                    self._sent_seq = self._acked_seq = self._buffer.first_seq - 1
+                    gap = {"type": EventType.REPLAY_GAP, "first_seq": self._buffer.first_seq}
+                    if not await self._send_frame(ws, self._frame(gap)):
+                        return
+                    continue
+                for seq, event in events:
+                    if seq > limit:
+                        break
+                    if not await self._send_frame(ws, self._frame(event)):
+                        return
+                    self._sent_seq = seq
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        if self._ws is not None:
+            await self._ws.close(code=code, reason=reason)
+
+    def detach(self) -> None:
+        """Stop forwarding events; they keep accumulating in the buffer."""
+        self._ws = None
+
+    async def attach(
+        self,
+        ws: WebSocket,
+        ready: dict[str, Any],
+        last_seq: int | None,
+        encoding: str = JSON_ENCODING,
+        channel: str | None = None,
+        window: int | None = None,
+    ) -> None:
+        """Send ready, replay events after last_seq, then resume live forwarding.
+
+        If the requested events were already evicted, ready carries
+        ``replay_gap`` and the client must fall back to the history endpoint.
+        """
+        self._encoding = encoding
+        self._channel = channel
+        self._window = window
+        ready["encoding"] = encoding
+        replay_from = last_seq
+        if last_seq is not None and self._buffer.since(last_seq) is None:
+            ready["replay_gap"] = True
+            replay_from = None
+        ready["last_seq"] = self._buffer.last_seq
+        await self._write(ws, self._frame(ready))
+
+        if window is not None:
+            start = replay_from if replay_from is not None else self._buffer.last_seq
+            self._sent_seq = self._acked_seq = start
+            self._ws = ws
+            await self._flush()
+            return
+
+        # Events emitted while replaying are buffered and picked up by the next
+        # pass; there is no await between the final empty check and attaching.
+        while replay_from is not None:
+            pending = self._buffer.since(replay_from)
+            if not pending:
+                break
+            for seq, event in pending:
+                await self._write(ws, self._frame(event))
+                replay_from = seq
+        self._ws = ws
+
+
 router = APIRouter(tags=["websocket"])
 
 
-@dataclass
+@dataclass(slots=True)
 class WebSocketState:
-    """Mutable state for a WebSocket chat session."""
+    """Mutable state for a WebSocket chat session.
+
+    Per-turn tool and question bookkeeping lives in ``turn``.
+    """
 
     session_id: str | None = None
+    # Owner key for this chat's pending questions, released when it ends.
+    connection_id: str = field(default_factory=lambda: uuid.uuid4().hex)
     turn_count: int = 0
     first_message: str | None = None
     tracker: HistoryTracker | None = None
+    elider: ToolResultElider | None = None
     username: str | None = None
     cwd_id: str | None = None
     file_storage: object | None = None
@@ -85,12 +277,10 @@ class WebSocketState:
 
     pending_user_message: str | list | None = None
     is_processing: bool = False
+    # Scheduler slot of the running turn; handed back while it waits on the user.
+    turn_slot: TurnSlot | None = None
     cancel_requested: bool = False
-    pending_tool_use_ids: list[str] = field(default_factory=list)
-
-    last_ask_user_question_tool_use_id: str | None = None
-    ask_user_question_sent_from_stream: bool = False
-    ask_user_question_handled_by_callback: bool = False
+    turn: TurnState = field(default_factory=TurnState)
 
     last_usage: dict[str, Any] | None = None
     last_total_cost_usd: float | None = None
@@ -99,6 +289,25 @@ class WebSocketState:
     last_is_error: bool = False
 
 
+@dataclass(slots=True)
+class _ChatRuntime:
+    """The connection-independent half of a chat, kept alive across reconnects."""
+
+    state: WebSocketState
+    channel: ResumableWebSocket
+    message_queue: asyncio.Queue
+    task: asyncio.Task | None = None
+
+
+# Runtimes whose client disconnected, keyed by (username, session_id).
+_detached_runtimes: DetachedStreamRegistry[_ChatRuntime] = DetachedStreamRegistry()
+
+
+def _awaiting_user(state: WebSocketState) -> AbstractAsyncContextManager[None]:
+    """Release the turn's scheduler slot while it waits for the user's answer."""
+    return state.turn_slot.idle() if state.turn_slot is not None else nullcontext()
+
+
 class AskUserQuestionHandler:
     """Handles AskUserQuestion tool callbacks for WebSocket sessions."""
 
@@ -126,14 +335,15 @@ class AskUserQuestionHandler:
         if tool_name != "AskUserQuestion":
             return PermissionResultAllow(updated_input=tool_input)
 
-        self._state.ask_user_question_handled_by_callback = True
+        turn = self._state.turn
+        turn.question_handled_by_callback = True
 
-        question_id = self._state.last_ask_user_question_tool_use_id or str(uuid.uuid4())
+        question_id = turn.last_question_id or str(uuid.uuid4())
         questions = tool_input.get("questions", [])
         questions = normalize_questions_field(questions, context="can_use_tool")
         logger.info(f"AskUserQuestion invoked: question_id={question_id}, questions={len(questions)}")
 
-        if self._state.ask_user_question_sent_from_stream:
+        if turn.question_sent_from_stream:
             logger.info(f"AskUserQuestion already sent from stream, skipping duplicate send: question_id={question_id}")
         elif not await self._send_question(question_id, questions):
             return PermissionResultDeny(message="Failed to send question to client")
@@ -162,10 +372,14 @@ class AskUserQuestionHandler:
         questions: list
     ) -> PermissionResultAllow | PermissionResultDeny:
         """Wait for user answer with timeout handling."""
-        self._question_manager.create_question(question_id, questions)
+        self._question_manager.create_question(
+            question_id, questions, owner=self._state.connection_id, timeout=self._timeout
+        )
+        self._state.turn.add_question(question_id)
 
         try:
-            answers = await self._question_manager.wait_for_answer(question_id, timeout=self._timeout)
+            async with _awaiting_user(self._state):
+                answers = await self._question_manager.wait_for_answer(question_id, timeout=self._timeout)
             logger.info(f"Received answers for question_id={question_id}")
             return PermissionResultAllow(updated_input={"questions": questions, "answers": answers})
         except asyncio.TimeoutError:
@@ -177,6 +391,8 @@ class AskUserQuestionHandler:
         except Exception as e:
             logger.error(f"Error waiting for answer: {e}")
             return PermissionResultDeny(message=f"Error: {e}")
+        finally:
+            self._state.turn.discard_question(question_id)
 
 
 async def _validate_websocket_auth(
@@ -254,45 +470,63 @@ async def _create_message_receiver(
     question_manager: QuestionManager,
     state: WebSocketState
 ) -> None:
-    """Background task to receive and route WebSocket messages."""
+    """Receive and route messages from one client connection until it disconnects."""
     try:
         while True:
-            data = await websocket.receive_json()
-            msg_type = data.get("type")
-
-            if msg_type == EventType.USER_ANSWER:
-                question_id = data.get("question_id")
-                if question_id:
-                    logger.info(f"Received user_answer for question_id={question_id}")
-                    if state.tracker:
-                        state.tracker.process_event(EventType.USER_ANSWER, data)
-                    question_manager.submit_answer(question_id, data.get("answers", {}))
-                else:
-                    logger.warning("Received user_answer without question_id")
-                continue
-
-            if msg_type == EventType.CANCEL_REQUEST:
-                logger.info("Cancel request received")
-                state.cancel_requested = True
-                question_manager.cancel_question(state.last_ask_user_question_tool_use_id or "")
-                await message_queue.put({"type": EventType.CANCEL_REQUEST})
-                continue
-
-            if msg_type == EventType.COMPACT_REQUEST:
-                logger.info("Compact request received")
-                await message_queue.put({"type": EventType.COMPACT_REQUEST})
-                continue
-
-            await message_queue.put(data)
+            data = await _receive_client_frame(websocket)
+            await _route_client_message(data, message_queue, question_manager, state)
     except WebSocketDisconnect:
-        await message_queue.put(None)
         raise
     except Exception as e:
         logger.error(f"Error in receive_messages: {e}")
-        await message_queue.put(None)
         raise
 
 
+async def _route_client_message(
+    data: dict[str, Any],
+    message_queue: asyncio.Queue,
+    question_manager: QuestionManager,
+    state: WebSocketState,
+) -> None:
+    """Answer questions and flag cancels directly; queue everything else for the loop."""
+    msg_type = data.get("type")
+
+    if msg_type == EventType.USER_ANSWER:
+        question_id = data.get("question_id")
+        if question_id:
+            logger.info(f"Received user_answer for question_id={question_id}")
+            if state.tracker:
+                state.tracker.process_event(EventType.USER_ANSWER, data)
+            question_manager.submit_answer(question_id, data.get("answers", {}))
+        else:
+            logger.warning("Received user_answer without question_id")
+        return
+
+    if msg_type == EventType.CANCEL_REQUEST:
+        logger.info("Cancel request received")
+        state.cancel_requested = True
+        for question_id in state.turn.pending_question_ids:
+            question_manager.cancel_question(question_id)
+        await message_queue.put({"type": EventType.CANCEL_REQUEST})
+        return
+
+    if msg_type == EventType.COMPACT_REQUEST:
+        logger.info("Compact request received")
+        await message_queue.put({"type": EventType.COMPACT_REQUEST})
+        return
+
+    await message_queue.put(data)
+
+
+async def _receive_client_frame(websocket: WebSocket) -> dict[str, Any]:
+    """Receive one client message; text frames are JSON, binary frames MessagePack."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(code=message.get("code", 1000), reason=message.get("reason"))
+    frame = message.get("bytes")
+    return decode_frame(frame if frame is not None else message.get("text") or "")
+
+
 async def _handle_ask_user_question_in_stream(
     event_data: dict[str, Any],
     tool_use_id: str | None,
@@ -302,7 +536,7 @@ async def _handle_ask_user_question_in_stream(
 ) -> None:
     """Handle AskUserQuestion tool_use events detected in the response stream."""
     logger.info(f"AskUserQuestion tool_use detected in response stream: tool_use_id={tool_use_id}")
-    state.last_ask_user_question_tool_use_id = tool_use_id
+    state.turn.last_question_id = tool_use_id
 
     tool_input = event_data.get("input", {})
     if tool_input and isinstance(tool_input, dict):
@@ -334,8 +568,12 @@ async def _handle_ask_user_question_in_stream(
                 "questions": normalized_questions,
                 "timeout": ASK_USER_QUESTION_TIMEOUT,
             })
-            question_manager.create_question(question_id, normalized_questions)
-            state.ask_user_question_sent_from_stream = True
+            question_manager.create_question(
+                question_id, normalized_questions,
+                owner=state.connection_id, timeout=ASK_USER_QUESTION_TIMEOUT,
+            )
+            state.turn.add_question(question_id)
+            state.turn.question_sent_from_stream = True
             logger.info(
                 f"[Stream Fallback] ask_user_question event sent and question created: "
                 f"question_id={question_id}"
@@ -354,10 +592,13 @@ async def _process_response_stream(
     question_manager: QuestionManager | None = None,
 ) -> None:
     """Process the response stream from the SDK client."""
-    state.ask_user_question_sent_from_stream = False
-    state.ask_user_question_handled_by_callback = False
+    turn = state.turn
+    turn.reset_question_flags()
+    timer = current_turn_timer()
 
     async for msg in client.receive_response():
+        if timer is not None:
+            timer.on_message()
         if logger.isEnabledFor(logging.DEBUG):
             msg_type_name = type(msg).__name__
             logger.debug(f"[SDK RAW] Message type: {msg_type_name}")
@@ -397,7 +638,7 @@ async def _process_response_stream(
             if event_type == EventType.TOOL_USE:
                 tool_use_id = event_data.get("id")
                 if tool_use_id:
-                    state.pending_tool_use_ids.append(tool_use_id)
+                    turn.start_tool(tool_use_id, event_data.get("name", ""), event_data.get("input"))
                 if event_data.get("name") == "AskUserQuestion":
                     await _handle_ask_user_question_in_stream(
                         event_data, tool_use_id, websocket, state, question_manager
@@ -405,16 +646,25 @@ async def _process_response_stream(
 
             if event_type == EventType.TOOL_RESULT:
                 tool_use_id = event_data.get("tool_use_id")
-                if tool_use_id and tool_use_id in state.pending_tool_use_ids:
-                    state.pending_tool_use_ids.remove(tool_use_id)
+                if tool_use_id:
+                    turn.finish_tool(tool_use_id)
 
             typed_history = isinstance(msg, (AssistantMessage, UserMessage))
 
+            if timer is not None:
+                timer.on_event(event_type, event_data)
+                if event_type == EventType.DONE and not timer.finished:
+                    # Stored with the result in history metadata.
+                    event_data["timings"] = timer.finish()
+
             if event_type == EventType.SESSION_ID:
                 _handle_session_id_event(event_data, state, session_storage, history, agent_id=agent_id)
             elif event_type and state.tracker and not typed_history:
                 state.tracker.process_event(event_type, event_data)
 
+            if event_type == EventType.TOOL_RESULT and state.elider:
+                state.elider.apply(event_data)
+
             await websocket.send_json(event_data)
 
         if isinstance(msg, AssistantMessage) and state.tracker:
@@ -451,7 +701,9 @@ def _handle_session_id_event(
     state.session_id = event_data["session_id"]
 
     if state.tracker is None:
-        state.tracker = HistoryTracker(session_id=state.session_id or "", history=history)
+        state.tracker = HistoryTracker(
+            session_id=state.session_id or "", history=history, elider=state.elider
+        )
         session_storage.save_session(
             session_id=state.session_id,
             first_message=state.first_message,
@@ -471,58 +723,188 @@ async def websocket_chat(
     websocket: WebSocket,
     agent_id: str | None = None,
     session_id: str | None = None,
-    token: str | None = None
+    token: str | None = None,
+    last_seq: int | None = None,
+    encoding: str | None = None,
 ) -> None:
-    """WebSocket endpoint for persistent multi-turn conversations."""
+    """WebSocket endpoint for persistent multi-turn conversations.
+
+    Reconnecting with the same session_id within the grace period reattaches
+    to the still-running session; events after last_seq are replayed.
+    ``encoding=msgpack`` switches frames to binary MessagePack when available;
+    the negotiated encoding is reported in the ready event.
+    """
     user_id, jti, username = await _validate_websocket_auth(websocket, token)
 
     await websocket.accept()
-    websocket = SanitizedWebSocket(websocket)  # type: ignore[assignment]
+    question_manager = get_question_manager()
+    frame_encoding = negotiate_encoding(encoding)
+
+    runtime = _detached_runtimes.claim((username, session_id)) if session_id else None
+    if runtime is not None:
+        logger.info(f"WebSocket reattached, session_id={session_id}, last_seq={last_seq}, user={username}")
+        ready_data = _build_ready_event(runtime.state)
+        ready_data["reattached"] = True
+        ready_data["is_processing"] = runtime.state.is_processing
+        try:
+            await runtime.channel.attach(websocket, ready_data, last_seq, frame_encoding)
+        except Exception as e:
+            logger.info(f"WebSocket dropped during replay: {e}")
+            _detach_runtime(runtime, username, close_code=None)
+            return
+    else:
+        runtime = await _start_runtime(
+            websocket, username, agent_id, session_id, question_manager, frame_encoding
+        )
+        if runtime is None:
+            return
+
+    await _serve_connection(websocket, runtime, username, question_manager)
+
+
+def _build_ready_event(state: WebSocketState) -> dict[str, Any]:
+    """Build the ready event announcing the connection's session state."""
+    ready_data: dict[str, Any] = {"type": EventType.READY, "cwd_id": state.cwd_id}
+    if state.session_id:
+        ready_data["session_id"] = state.session_id
+        ready_data["resumed"] = True
+        ready_data["turn_count"] = state.turn_count
+    return ready_data
+
+
+async def _start_runtime(
+    websocket: WebSocket,
+    username: str,
+    agent_id: str | None,
+    session_id: str | None,
+    question_manager: QuestionManager,
+    frame_encoding: str = JSON_ENCODING,
+    channel_id: str | None = None,
+    window: int | None = None,
+) -> _ChatRuntime | None:
+    """Resolve the session, send ready and start the message loop task."""
+    channel = ResumableWebSocket(
+        websocket, EventReplayBuffer(WS_REPLAY_BUFFER_SIZE), encoding=frame_encoding,
+        channel=channel_id, window=window,
+    )
     logger.info(f"WebSocket connected, agent_id={agent_id}, session_id={session_id}, user={username}")
 
     session_storage = get_user_session_storage(username)
     history = get_user_history_storage(username)
 
     try:
-        existing_session, resume_session_id = await _resolve_session(websocket, session_id, session_storage)
+        existing_session, resume_session_id = await _resolve_session(channel, session_id, session_storage)
     except SessionResolutionError:
-        return
+        return None
 
     ids = resolve_session_ids(username, existing_session, resume_session_id)
     logger.info(f"Session IDs resolved: cwd_id={ids.cwd_id}, cwd={ids.session_cwd}, new={not resume_session_id}, user={username}")
 
-    question_manager = get_question_manager()
-
+    elider = get_tool_result_elider(username)
     state = WebSocketState(
         session_id=resume_session_id,
         turn_count=existing_session.turn_count if existing_session else 0,
         first_message=existing_session.first_message if existing_session else None,
-        tracker=HistoryTracker(session_id=resume_session_id, history=history) if resume_session_id else None,
+        tracker=(
+            HistoryTracker(session_id=resume_session_id, history=history, elider=elider)
+            if resume_session_id else None
+        ),
+        elider=elider,
         username=username,
         cwd_id=ids.cwd_id,
         session_cwd=ids.session_cwd,
         permission_folders=ids.permission_folders,
     )
 
+    ready_data = _build_ready_event(state)
+    ready_data["encoding"] = frame_encoding
+    await channel.send_json(ready_data)
+
+    runtime = _ChatRuntime(state=state, channel=channel, message_queue=asyncio.Queue())
+    runtime.task = asyncio.create_task(
+        _run_chat_runtime(runtime, session_storage, history, question_manager, agent_id=agent_id)
+    )
+    return runtime
+
+
+async def _serve_connection(
+    websocket: WebSocket,
+    runtime: _ChatRuntime,
+    username: str,
+    question_manager: QuestionManager,
+) -> None:
+    """Pump client messages into the runtime until either side finishes."""
+    receiver_task = asyncio.create_task(
+        _create_message_receiver(websocket, runtime.message_queue, question_manager, runtime.state)
+    )
+    close_code: int | None = None
     try:
-        ready_data: dict[str, Any] = {"type": EventType.READY, "cwd_id": state.cwd_id}
-        if resume_session_id:
-            ready_data["session_id"] = resume_session_id
-            ready_data["resumed"] = True
-            ready_data["turn_count"] = state.turn_count
-        await websocket.send_json(ready_data)
-
-        await _run_message_loop(websocket, state, session_storage, history, question_manager, agent_id=agent_id)
-    except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected, session={state.session_id}, turns={state.turn_count}")
+        await asyncio.wait({receiver_task, runtime.task}, return_when=asyncio.FIRST_COMPLETED)  # type: ignore[arg-type]
+        if receiver_task.done() and not receiver_task.cancelled():
+            exc = receiver_task.exception()
+            if isinstance(exc, WebSocketDisconnect):
+                close_code = exc.code
+                logger.info(f"WebSocket disconnected, session={runtime.state.session_id}, turns={runtime.state.turn_count}")
+            elif exc is not None:
+                logger.error(f"WebSocket error: {exc}", exc_info=exc)
+    finally:
+        receiver_task.cancel()
+        try:
+            await receiver_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _detach_runtime(runtime, username, close_code)
+
+
+def _detach_runtime(runtime: _ChatRuntime, username: str, close_code: int | None) -> None:
+    """Detach the client; park the runtime for a reconnect or stop it.
+
+    Runtimes are parked when a turn is in flight or the socket dropped
+    abnormally. A clean client close (1000) between turns stops immediately.
+    """
+    runtime.channel.detach()
+    if runtime.task is None or runtime.task.done():
+        return
+
+    state = runtime.state
+    resumable = state.is_processing or close_code != 1000
+    if state.session_id and resumable and WS_RESUME_GRACE_SECONDS > 0:
+        _detached_runtimes.park(
+            (username, state.session_id), runtime, WS_RESUME_GRACE_SECONDS, _stop_runtime
+        )
+    else:
+        _stop_runtime(runtime)
+
+
+def _stop_runtime(runtime: _ChatRuntime) -> None:
+    """Ask the message loop to exit once the current turn completes."""
+    runtime.message_queue.put_nowait(None)
+
+
+async def _run_chat_runtime(
+    runtime: _ChatRuntime,
+    session_storage: Any,
+    history: Any,
+    question_manager: QuestionManager,
+    agent_id: str | None = None,
+) -> None:
+    """Run the message loop and release the SDK client when it ends."""
+    state = runtime.state
+    try:
+        await _run_message_loop(
+            runtime.channel, state, session_storage, history, question_manager,
+            runtime.message_queue, agent_id=agent_id,
+        )
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
     finally:
+        question_manager.release_owner(state.connection_id)
         if state.sdk_client:
             try:
                 await state.sdk_client.disconnect()
             except Exception as e:
                 logger.error(f"Error disconnecting SDK client: {e}")
+        logger.info(f"WebSocket session closed, session={state.session_id}, turns={state.turn_count}")
 
 
 async def _ensure_sdk_client(
@@ -544,9 +926,6 @@ async def _ensure_sdk_client(
     state.session_cwd = setup.session_cwd
     logger.info(f"Session resources created: cwd_id={state.cwd_id}, cwd={setup.session_cwd}, user={state.username}")
 
-    os.environ["EMAIL_USERNAME"] = state.username or ""
-    set_email_tools_session_id(state.cwd_id or "")
-
     question_handler = AskUserQuestionHandler(websocket, question_manager, state)
 
     options = create_agent_sdk_options(
@@ -556,9 +935,11 @@ async def _ensure_sdk_client(
         session_cwd=setup.session_cwd,
         permission_folders=setup.permission_folders,
         client_type="web",
+        env=setup.tools_env,
     )
     client = ClaudeSDKClient(options)
-    await _connect_sdk_client(websocket, client)
+    with timed("sdk_connect"):
+        await _connect_sdk_client(websocket, client)
 
     state.sdk_client = client
     return client
@@ -601,7 +982,7 @@ async def _send_cancelled_tool_results(
     state: WebSocketState,
 ) -> None:
     """Send interrupted tool_result events for all pending tool uses."""
-    for tool_use_id in state.pending_tool_use_ids:
+    for tool_use_id in state.turn.drain_pending_tools():
         tool_result_event = {
             "type": EventType.TOOL_RESULT,
             "tool_use_id": tool_use_id,
@@ -612,7 +993,6 @@ async def _send_cancelled_tool_results(
         # Also save to history
         if state.tracker:
             state.tracker.process_event(EventType.TOOL_RESULT, tool_result_event)
-    state.pending_tool_use_ids.clear()
 
 
 async def _run_message_loop(
@@ -621,74 +1001,70 @@ async def _run_message_loop(
     session_storage: Any,
     history: Any,
     question_manager: QuestionManager,
+    message_queue: asyncio.Queue,
     agent_id: str | None = None
 ) -> None:
-    """Run the main message processing loop."""
-    message_queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
-    receiver_task = asyncio.create_task(
-        _create_message_receiver(websocket, message_queue, question_manager, state)
-    )
+    """Run the main message processing loop until a None sentinel is queued."""
+    while True:
+        data = await message_queue.get()
+        if data is None:
+            break
 
-    try:
-        while True:
-            data = await message_queue.get()
-            if data is None:
-                break
+        if data.get("type") == EventType.COMPACT_REQUEST:
+            await _handle_compact_request(websocket, state)
+            continue
 
-            if data.get("type") == EventType.COMPACT_REQUEST:
-                await _handle_compact_request(websocket, state)
-                continue
+        if data.get("type") == EventType.CANCEL_REQUEST:
+            if not state.is_processing:
+                logger.info("Cancel request received but not processing, sending cancelled")
+                state.cancel_requested = False
+                await _send_cancelled_tool_results(websocket, state)
 
-            if data.get("type") == EventType.CANCEL_REQUEST:
-                if not state.is_processing:
-                    logger.info("Cancel request received but not processing, sending cancelled")
-                    state.cancel_requested = False
-                    await _send_cancelled_tool_results(websocket, state)
+                if state.tracker:
+                    state.tracker.process_event(EventType.CANCELLED, {"cancelled": True})
+                await websocket.send_json({"type": EventType.CANCELLED})
+            continue
 
-                    if state.tracker:
-                        state.tracker.process_event(EventType.CANCELLED, {"cancelled": True})
-                    await websocket.send_json({"type": EventType.CANCELLED})
-                continue
+        content = data.get("content", "")
+        if not content:
+            await websocket.send_json({"type": EventType.ERROR, "error": "Empty content"})
+            continue
 
-            content = data.get("content", "")
-            if not content:
-                await websocket.send_json({"type": EventType.ERROR, "error": "Empty content"})
-                continue
-
-            try:
-                normalized_blocks = normalize_content(content)
-            except (ValueError, TypeError) as e:
-                await websocket.send_json({
-                    "type": EventType.ERROR,
-                    "error": f"Invalid content format: {e}"
-                })
-                continue
+        try:
+            normalized_blocks = normalize_content(content)
+        except (ValueError, TypeError) as e:
+            await websocket.send_json({
+                "type": EventType.ERROR,
+                "error": f"Invalid content format: {e}"
+            })
+            continue
 
-            text_content = extract_text_content(content)
-            if state.first_message is None:
-                state.first_message = text_content[:FIRST_MESSAGE_TRUNCATE_LENGTH]
+        # Downscale uploaded images once, before they reach history and the model.
+        content = await get_image_preprocessor().process_content(content, image_limits_for_agent(agent_id))
 
-            if state.tracker:
-                state.tracker.save_user_message(content)
-            else:
-                state.pending_user_message = content
+        text_content = extract_text_content(content)
+        if state.first_message is None:
+            state.first_message = text_content[:FIRST_MESSAGE_TRUNCATE_LENGTH]
 
-            try:
-                client = await _ensure_sdk_client(websocket, state, question_manager, agent_id=agent_id)
-            except SDKConnectionError:
-                return
+        if state.tracker:
+            state.tracker.save_user_message(content)
+        else:
+            state.pending_user_message = content
 
-            state.is_processing = True
-            try:
-                await _process_user_message(websocket, client, content, state, session_storage, history, agent_id=agent_id, question_manager=question_manager)
-            finally:
-                state.is_processing = False
-    finally:
-        receiver_task.cancel()
+        state.is_processing = True
         try:
-            await receiver_task
-        except asyncio.CancelledError:
-            pass
+            # Interactive turns are admitted ahead of API and platform work.
+            with TurnTimer("web").active():
+                async with get_turn_scheduler().slot(TurnPriority.INTERACTIVE, state.username) as turn_slot:
+                    state.turn_slot = turn_slot
+                    try:
+                        client = await _ensure_sdk_client(websocket, state, question_manager, agent_id=agent_id)
+                    except SDKConnectionError:
+                        return
+                    await _process_user_message(websocket, client, content, state, session_storage, history, agent_id=agent_id, question_manager=question_manager)
+        finally:
+            state.turn_slot = None
+            state.is_processing = False
 
 
 async def _process_user_message(
@@ -711,21 +1087,26 @@ async def _process_user_message(
 
         _complete_turn(state, session_storage)
 
+        turn = state.turn
         if (
-            state.ask_user_question_sent_from_stream
-            and not state.ask_user_question_handled_by_callback
+            turn.question_sent_from_stream
+            and not turn.question_handled_by_callback
             and question_manager is not None
         ):
-            question_id = state.last_ask_user_question_tool_use_id
+            question_id = turn.last_question_id
             if question_id:
                 logger.info(
                     f"[Stream Fallback] can_use_tool was NOT called for AskUserQuestion. "
                     f"Waiting for user answer to auto-inject: question_id={question_id}"
                 )
                 try:
-                    answers: Any = await question_manager.wait_for_answer(
-                        question_id, timeout=ASK_USER_QUESTION_TIMEOUT
-                    )
+                    try:
+                        async with _awaiting_user(state):
+                            answers: Any = await question_manager.wait_for_answer(
+                                question_id, timeout=ASK_USER_QUESTION_TIMEOUT
+                            )
+                    finally:
+                        turn.discard_question(question_id)
                     logger.info(f"[Stream Fallback] Received user answer: question_id={question_id}")
 
                     answer_parts = []
@@ -786,3 +1167,167 @@ async def _process_user_message(
             state.tracker.finalize_assistant_response(metadata={"error": str(e)})
 
         await websocket.send_json({"type": EventType.ERROR, "error": str(e)})
+
+
+class _MuxLink:
+    """A channel's view of a multiplexed socket.
+
+    Writes go through the connection's lock; closing ends only this channel.
+    """
+
+    __slots__ = ("_conn", "channel_id")
+
+    def __init__(self, conn: "_MuxConnection", channel_id: str) -> None:
+        self._conn = conn
+        self.channel_id = channel_id
+
+    async def send_text(self, data: str) -> None:
+        await self._conn.write(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._conn.write(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        await self._conn.close_channel(self.channel_id, code, reason)
+
+
+class _MuxConnection:
+    """One authenticated socket carrying several session channels.
+
+    Client frames carry a ``channel`` field. ``channel_open`` starts (or
+    reattaches to) a session, ``channel_ack`` acknowledges events up to a
+    seq, ``channel_close`` ends a channel, and anything else is routed to
+    the channel's runtime exactly as on ``/ws/chat``.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        username: str,
+        encoding: str,
+        question_manager: QuestionManager,
+    ) -> None:
+        self._ws = websocket
+        self._username = username
+        self._encoding = encoding
+        self._question_manager = question_manager
+        self._write_lock = asyncio.Lock()
+        self._channels: dict[str, _ChatRuntime] = {}
+
+    async def write(self, frame: str | bytes) -> None:
+        async with self._write_lock:
+            await ResumableWebSocket._write(self._ws, frame)
+
+    async def _send_control(self, event: dict[str, Any]) -> None:
+        """Send a frame that is not part of any channel's numbered stream."""
+        await self.write(encode_frame(event, self._encoding))
+
+    async def close_channel(self, channel_id: str, code: int = 1000, reason: str | None = None) -> None:
+        """Tell the client a channel ended, and stop routing to it."""
+        self._channels.pop(channel_id, None)
+        await self._send_control({
+            "type": EventType.CHANNEL_CLOSED, "channel": channel_id, "code": code, "reason": reason,
+        })
+
+    async def serve(self) -> None:
+        """Route client frames until the socket closes, then detach every channel."""
+        close_code: int | None = None
+        try:
+            while True:
+                data = await _receive_client_frame(self._ws)
+                await self._dispatch(data)
+        except WebSocketDisconnect as e:
+            close_code = e.code
+            logger.info(f"Multiplexed WebSocket disconnected, channels={len(self._channels)}, user={self._username}")
+        except Exception as e:
+            logger.error(f"Multiplexed WebSocket error: {e}", exc_info=True)
+        finally:
+            channels, self._channels = self._channels, {}
+            for runtime in channels.values():
+                _detach_runtime(runtime, self._username, close_code)
+
+    async def _dispatch(self, data: dict[str, Any]) -> None:
+        channel_id = data.get("channel")
+        if not isinstance(channel_id, str) or not channel_id:
+            await self._send_control({"type": EventType.ERROR, "error": "Missing channel"})
+            return
+
+        msg_type = data.get("type")
+        if msg_type == EventType.CHANNEL_OPEN:
+            await self._open_channel(channel_id, data)
+            return
+
+        runtime = self._channels.get(channel_id)
+        if runtime is None or runtime.task is None or runtime.task.done():
+            await self.close_channel(channel_id, reason="Channel is not open")
+            return
+
+        if msg_type == EventType.CHANNEL_ACK:
+            seq = data.get("seq")
+            if isinstance(seq, int):
+                await runtime.channel.ack(seq)
+        elif msg_type == EventType.CHANNEL_CLOSE:
+            del self._channels[channel_id]
+            _detach_runtime(runtime, self._username, close_code=1000)
+            await self.close_channel(channel_id)
+        else:
+            await _route_client_message(data, runtime.message_queue, self._question_manager, runtime.state)
+
+    async def _open_channel(self, channel_id: str, data: dict[str, Any]) -> None:
+        if channel_id in self._channels:
+            await self._send_control({"type": EventType.ERROR, "channel": channel_id, "error": "Channel already open"})
+            return
+        if len(self._channels) >= WS_MUX_MAX_CHANNELS:
+            await self.close_channel(channel_id, reason=f"At most {WS_MUX_MAX_CHANNELS} channels per connection")
+            return
+
+        session_id = data.get("session_id") or None
+        last_seq = data.get("last_seq")
+        window = data.get("window")
+        window = min(window, WS_REPLAY_BUFFER_SIZE) if isinstance(window, int) and window > 0 else WS_MUX_WINDOW
+        link = _MuxLink(self, channel_id)
+
+        runtime = _detached_runtimes.claim((self._username, session_id)) if session_id else None
+        if runtime is not None:
+            logger.info(f"Mux channel {channel_id} reattached, session_id={session_id}, user={self._username}")
+            ready_data = _build_ready_event(runtime.state)
+            ready_data["reattached"] = True
+            ready_data["is_processing"] = runtime.state.is_processing
+            await runtime.channel.attach(
+                link, ready_data, last_seq if isinstance(last_seq, int) else None,  # type: ignore[arg-type]
+                self._encoding, channel=channel_id, window=window,
+            )
+        else:
+            runtime = await _start_runtime(
+                link, self._username, data.get("agent_id") or None, session_id,  # type: ignore[arg-type]
+                self._question_manager, self._encoding, channel_id=channel_id, window=window,
+            )
+            if runtime is None:
+                return
+        self._channels[channel_id] = runtime
+
+
+@router.websocket("/ws/mux")
+async def websocket_mux(
+    websocket: WebSocket,
+    token: str | None = None,
+    encoding: str | None = None,
+) -> None:
+    """Multiplexed WebSocket carrying several session channels.
+
+    One socket and one authentication serve every channel. SDK clients are
+    still per session but are only started when a channel sends a message,
+    so watching many sessions holds no extra sockets or subprocesses.
+    """
+    _, _, username = await _validate_websocket_auth(websocket, token)
+
+    await websocket.accept()
+    frame_encoding = negotiate_encoding(encoding)
+    connection = _MuxConnection(websocket, username, frame_encoding, get_question_manager())
+    await connection.write(encode_frame({
+        "type": EventType.READY,
+        "encoding": frame_encoding,
+        "max_channels": WS_MUX_MAX_CHANNELS,
+        "window": WS_MUX_WINDOW,
+    }, frame_encoding))
+    await connection.serve()
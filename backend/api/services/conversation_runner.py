@@ -0,0 +1,145 @@
+"""Long-lived owner task for a ConversationSession reused across SSE requests.
+
+The SDK client's connection is bound to the task that connected it, so a
+session cannot simply be handed from one HTTP request to the next. Instead a
+runner task owns the session for its whole life: requests enqueue their
+prompt and read the response messages back through a per-request queue.
+Queued prompts are processed one at a time, which also serializes concurrent
+follow-ups in the same conversation. Each turn takes an API-priority slot
+from the global TurnScheduler before it starts. Closing the runner
+interrupts the active turn and fails any prompts still queued.
+"""
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+from claude_agent_sdk.types import Message
+
+from agent.core.session import ConversationSession
+from api.services.turn_scheduler import TurnPriority, TurnScheduler, get_turn_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of one request's response stream.
+_END = object()
+
+
+class ConversationRunner:
+    """Owns a ConversationSession in a dedicated task until idle or closed."""
+
+    def __init__(
+        self,
+        session: ConversationSession,
+        idle_timeout: float,
+        on_exit: Callable[["ConversationRunner"], None] | None = None,
+        owner: str | None = None,
+        scheduler: TurnScheduler | None = None,
+    ) -> None:
+        self._session = session
+        self._idle_timeout = idle_timeout
+        self._on_exit = on_exit
+        self._owner = owner
+        self._scheduler = scheduler or get_turn_scheduler()
+        self._requests: asyncio.Queue[tuple[Any, asyncio.Queue] | None] = asyncio.Queue()
+        # Checked and updated without awaiting, so a prompt is either queued
+        # before the runner stops accepting or rejected outright.
+        self._accepting = True
+        self._released = False
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def session(self) -> ConversationSession:
+        return self._session
+
+    @property
+    def sdk_session_id(self) -> str | None:
+        return self._session.sdk_session_id
+
+    @sdk_session_id.setter
+    def sdk_session_id(self, value: str | None) -> None:
+        self._session.sdk_session_id = value
+
+    @property
+    def turn_count(self) -> int:
+        return self._session.turn_count
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether new prompts are still accepted."""
+        return self._accepting
+
+    async def send_query(self, content: Any) -> AsyncIterator[Message]:
+        """Queue a prompt and yield its response messages once its turn comes."""
+        if not self._accepting:
+            raise RuntimeError("Conversation runner has stopped")
+        responses: asyncio.Queue = asyncio.Queue()
+        self._requests.put_nowait((content, responses))
+        while True:
+            item = await responses.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def close(self) -> None:
+        """Interrupt the active turn, fail queued prompts and disconnect the session."""
+        self._accepting = False
+        self._fail_pending()
+        self._task.cancel()
+        await asyncio.wait({self._task})
+        # A task cancelled before it first ran never reaches its own cleanup.
+        await self._release()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._requests.get(), self._idle_timeout)
+                except asyncio.TimeoutError:
+                    self._accepting = False
+                    logger.info("Conversation runner idle, releasing SDK session")
+                    return
+                if request is None:
+                    return
+                content, responses = request
+                try:
+                    async with self._scheduler.slot(TurnPriority.API, self._owner):
+                        async for msg in self._session.send_query(content):
+                            # Unbounded queue: a requester that went away never stalls the turn.
+                            responses.put_nowait(msg)
+                except asyncio.CancelledError:
+                    responses.put_nowait(RuntimeError("Conversation session was closed"))
+                    raise
+                except Exception as e:
+                    # The client may be unusable now; stop so the next request
+                    # starts a fresh session resumed from the SDK session ID.
+                    logger.error(f"Conversation runner query failed: {e}", exc_info=True)
+                    responses.put_nowait(e)
+                    return
+                finally:
+                    responses.put_nowait(_END)
+        finally:
+            await self._release()
+
+    async def _release(self) -> None:
+        """Fail leftover prompts, disconnect and notify the owner, exactly once."""
+        if self._released:
+            return
+        self._released = True
+        self._accepting = False
+        self._fail_pending()
+        try:
+            await self._session.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting conversation session: {e}")
+        if self._on_exit is not None:
+            self._on_exit(self)
+
+    def _fail_pending(self) -> None:
+        """End the streams of prompts that were queued but never run."""
+        while not self._requests.empty():
+            request = self._requests.get_nowait()
+            if request is not None:
+                request[1].put_nowait(RuntimeError("Conversation session was closed"))
@@ -19,6 +19,8 @@ from claude_agent_sdk.types import (
 from agent.core.storage import HistoryStorage
 from api.constants import TOOL_REF_PATTERN, EventType, MessageRole
 from api.services.content_normalizer import ContentBlock, normalize_content, normalize_tool_result_content
+from api.services.tool_result_elision import ToolResultElider
+from api.services.turn_timing import timed
 
 from api.utils.sensitive_data_filter import redact_sensitive_data
 
@@ -44,12 +46,21 @@ def _parent_metadata(data: dict) -> dict | None:
 
 @dataclass
 class HistoryTracker:
-    """Tracks and persists conversation history during streaming."""
+    """Tracks and persists conversation history during streaming.
+
+    With an ``elider``, oversized tool results are stored as a preview whose
+    ``content_ref`` metadata points at the full body in the blob store.
+    """
     session_id: str
     history: HistoryStorage
+    elider: ToolResultElider | None = None
     _text_parts: list[str] = field(default_factory=list)
     _canonical_text_parts: list[str] = field(default_factory=list)
 
+    def _append(self, **kwargs: Any) -> None:
+        with timed("history_write"):
+            self.history.append_message(**kwargs)
+
     def save_user_message(self, content: str | list[ContentBlock | dict[str, Any]]) -> None:
         """Save a user message to history.
 
@@ -62,7 +73,7 @@ class HistoryTracker:
         else:
             serialized_content = [block.model_dump() for block in normalize_content(content)]
 
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.USER,
             content=serialized_content
@@ -92,7 +103,7 @@ class HistoryTracker:
     def save_tool_use(self, data: dict) -> None:
         """Save a tool use event to history."""
         metadata = _parent_metadata(data)
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.TOOL_USE,
             content=json.dumps(data.get("input", {})),
@@ -104,9 +115,11 @@ class HistoryTracker:
     def save_tool_result(self, data: dict) -> None:
         """Save a tool result event to history, redacting sensitive data."""
         metadata = _parent_metadata(data)
-        content = redact_sensitive_data(str(data.get("content", "")))
+        content, metadata = self._elide_tool_result(
+            redact_sensitive_data(str(data.get("content", ""))), metadata
+        )
 
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.TOOL_RESULT,
             content=content,
@@ -117,7 +130,7 @@ class HistoryTracker:
 
     def save_user_answer(self, data: dict) -> None:
         """Save a user_answer event to history as a tool_result."""
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.TOOL_RESULT,
             content=json.dumps(data.get("answers", {})),
@@ -129,7 +142,7 @@ class HistoryTracker:
         """Save SDK result metadata (usage, costs, turns) as a system message."""
         metadata = {"event_type": "result"}
         metadata.update(data)
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.SYSTEM,
             content=json.dumps(data),
@@ -139,7 +152,7 @@ class HistoryTracker:
     def save_generic_event(self, event_type: str, data: dict) -> None:
         """Save an unrecognized SDK event for future analysis."""
         metadata = {"event_type": event_type}
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.EVENT,
             content=json.dumps(data),
@@ -175,7 +188,7 @@ class HistoryTracker:
             if model:
                 save_metadata = {"model": model}
 
-            self.history.append_message(
+            self._append(
                 session_id=self.session_id,
                 role=MessageRole.ASSISTANT,
                 content=content,
@@ -201,7 +214,7 @@ class HistoryTracker:
             if not content:
                 return
 
-            self.history.append_message(
+            self._append(
                 session_id=self.session_id,
                 role=MessageRole.ASSISTANT,
                 content=content,
@@ -246,7 +259,7 @@ class HistoryTracker:
 
         # Capture AssistantMessage.error as a system message
         if msg.error:
-            self.history.append_message(
+            self._append(
                 session_id=self.session_id,
                 role=MessageRole.SYSTEM,
                 content=str(msg.error),
@@ -267,7 +280,7 @@ class HistoryTracker:
                 self._save_tool_result_block(block, parent_tool_use_id=msg.parent_tool_use_id)
             elif isinstance(block, TextBlock):
                 if block.text and block.text.strip():
-                    self.history.append_message(
+                    self._append(
                         session_id=self.session_id,
                         role=MessageRole.USER,
                         content=block.text.strip(),
@@ -285,7 +298,7 @@ class HistoryTracker:
             metadata["parent_tool_use_id"] = parent_tool_use_id
         if model:
             metadata["model"] = model
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.TOOL_USE,
             content=json.dumps(block.input or {}),
@@ -303,7 +316,7 @@ class HistoryTracker:
         metadata: dict = {"block_type": "thinking"}
         if model:
             metadata["model"] = model
-        self.history.append_message(
+        self._append(
             session_id=self.session_id,
             role=MessageRole.ASSISTANT,
             content=block.thinking,
@@ -320,15 +333,27 @@ class HistoryTracker:
         Strips agentId metadata from content before storing.
         """
         metadata = {"parent_tool_use_id": parent_tool_use_id} if parent_tool_use_id else None
-        self.history.append_message(
+        content, metadata = self._elide_tool_result(
+            normalize_tool_result_content(block.content), metadata
+        )
+        self._append(
             session_id=self.session_id,
             role=MessageRole.TOOL_RESULT,
-            content=normalize_tool_result_content(block.content),
+            content=content,
             tool_use_id=block.tool_use_id,
             is_error=bool(block.is_error),
             metadata=metadata,
         )
 
+    def _elide_tool_result(self, content: str, metadata: dict | None) -> tuple[str, dict | None]:
+        """Swap an oversized tool result for its preview and record the blob ref."""
+        if self.elider is None:
+            return content, metadata
+        content, ref = self.elider.elide(content)
+        if ref is not None:
+            metadata = {**(metadata or {}), "content_ref": ref}
+        return content, metadata
+
     def process_event(self, event_type: str, data: dict) -> None:
         """Process an event and update history accordingly.
 
@@ -362,7 +387,7 @@ class HistoryTracker:
             # Finalize any partial response with cancelled metadata
             self.finalize_assistant_response(metadata={"cancelled": True})
         elif event_type == EventType.ERROR:
-            self.history.append_message(
+            self._append(
                 session_id=self.session_id,
                 role=MessageRole.SYSTEM,
                 content=str(data.get("error", data.get("message", json.dumps(data)))),
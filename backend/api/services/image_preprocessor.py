@@ -0,0 +1,233 @@
+"""Downscaling and re-encoding of images before they reach the model.
+
+Phone photos arrive as multi-megabyte JPEGs with EXIF, and every byte is
+carried through memory, history, WebSocket payloads and model input tokens.
+Images are preprocessed before they enter a prompt:
+
+- EXIF orientation is applied and then all metadata is dropped
+- the long edge is capped at ``max_edge`` (1568 px by default, the size
+  past which the model downsamples anyway)
+- the image is re-encoded to WebP or JPEG
+
+The original is kept when re-encoding would not make it smaller and no
+resize or metadata stripping was needed. Animated images pass through
+untouched. Results are cached by content hash and limits, so forwarded or
+re-sent images are only processed once.
+
+Limits come from ``API_IMAGE_*`` settings and can be overridden per agent
+with an ``image_limits`` mapping in agents.yaml (``max_edge``, ``format``,
+``quality``). Pillow is optional (``images`` extra); without it images
+pass through unchanged.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from agent.core.agents import load_agent_config
+from core.settings import get_settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Re-encoding targets: format name -> (Pillow format, MIME type).
+IMAGE_OUTPUT_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+
+@dataclass(frozen=True, slots=True)
+class ImageLimits:
+    """How images are preprocessed for one agent."""
+
+    max_edge: int
+    format: str = "webp"
+    quality: int = 80
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_edge > 0 and Image is not None
+
+
+def default_image_limits() -> ImageLimits:
+    """Server-wide limits from settings."""
+    api_settings = get_settings().api
+    return ImageLimits(api_settings.image_max_edge, api_settings.image_format.lower(), api_settings.image_quality)
+
+
+def _int_override(overrides: dict, key: str, default: int, agent_id: str | None, low: int, high: int | None = None) -> int:
+    """Read one integer override, falling back to the default when it is invalid."""
+    if key not in overrides:
+        return default
+    try:
+        value = int(overrides[key])
+    except (TypeError, ValueError):
+        value = None
+    if value is None or value < low or (high is not None and value > high):
+        logger.warning(f"Invalid image {key} {overrides[key]!r} for agent {agent_id}, using {default}")
+        return default
+    return value
+
+
+def image_limits_for_agent(agent_id: str | None) -> ImageLimits:
+    """Resolve limits for an agent: its ``image_limits`` over the server defaults.
+
+    Invalid override values are logged and replaced by the defaults, so a
+    typo in agents.yaml never fails a turn.
+    """
+    limits = default_image_limits()
+    try:
+        overrides = load_agent_config(agent_id).get("image_limits") or {}
+    except ValueError:
+        return limits
+    if not isinstance(overrides, dict):
+        logger.warning(f"Invalid image_limits {overrides!r} for agent {agent_id}, using defaults")
+        return limits
+    image_format = str(overrides.get("format", limits.format)).lower()
+    if image_format not in IMAGE_OUTPUT_FORMATS:
+        logger.warning(f"Unknown image format {image_format!r} for agent {agent_id}, using webp")
+        image_format = "webp"
+    return ImageLimits(
+        max_edge=_int_override(overrides, "max_edge", limits.max_edge, agent_id, low=0),
+        format=image_format,
+        quality=_int_override(overrides, "quality", limits.quality, agent_id, low=1, high=100),
+    )
+
+
+def _flatten_alpha(img: Any) -> Any:
+    background = Image.new("RGB", img.size, (255, 255, 255))
+    background.paste(img, mask=img.getchannel("A"))
+    return background
+
+
+def _transcode(data: bytes, mime_type: str, limits: ImageLimits) -> tuple[bytes, str]:
+    """Downscale and re-encode one image. Blocking -- meant for a worker thread."""
+    with Image.open(io.BytesIO(data)) as opened:
+        if getattr(opened, "is_animated", False):
+            return data, mime_type  # re-encoding would keep only the first frame
+        has_metadata = bool(opened.info.get("exif") or opened.info.get("xmp"))
+        img = ImageOps.exif_transpose(opened)
+
+        resized = max(img.size) > limits.max_edge
+        if resized:
+            img.thumbnail((limits.max_edge, limits.max_edge), Image.Resampling.LANCZOS)
+
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            img = img.convert("RGBA")
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        pil_format, out_mime = IMAGE_OUTPUT_FORMATS[limits.format]
+        if pil_format == "JPEG" and has_alpha:
+            img = _flatten_alpha(img)
+
+        out = io.BytesIO()
+        img.save(out, pil_format, quality=limits.quality)
+        encoded = out.getvalue()
+
+    if len(encoded) >= len(data) and not resized and not has_metadata:
+        return data, mime_type
+    return encoded, out_mime
+
+
+class ImagePreprocessor:
+    """Preprocesses images under ``ImageLimits`` with a byte-bounded LRU cache."""
+
+    __slots__ = ("_cache", "_cache_bytes", "_max_cache_bytes", "_lock")
+
+    def __init__(self, max_cache_bytes: int) -> None:
+        # Guards the cache: images are processed in worker threads.
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, ImageLimits], tuple[bytes, str]] = OrderedDict()
+        self._cache_bytes = 0
+        self._max_cache_bytes = max_cache_bytes
+
+    def process(self, data: bytes, mime_type: str, limits: ImageLimits) -> tuple[bytes, str]:
+        """Return (data, mime_type) for the model. Blocking -- meant for a worker thread.
+
+        Undecodable images are returned unchanged.
+        """
+        if not limits.enabled:
+            return data, mime_type
+        key = (hashlib.sha256(data).hexdigest(), limits)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        try:
+            result = _transcode(data, mime_type, limits)
+        except Exception as e:
+            logger.warning(f"Image preprocessing failed ({mime_type}, {len(data)} bytes): {e}")
+            return data, mime_type
+        if result[0] is not data:
+            logger.info(f"Preprocessed image: {mime_type} {len(data)} bytes -> {result[1]} {len(result[0])} bytes")
+
+        with self._lock:
+            self._remember(key, result)
+        return result
+
+    def _remember(self, key: tuple[str, ImageLimits], result: tuple[bytes, str]) -> None:
+        size = len(result[0])
+        if size > self._max_cache_bytes or key in self._cache:
+            return
+        self._cache[key] = result
+        self._cache_bytes += size
+        while self._cache_bytes > self._max_cache_bytes:
+            _, (evicted, _) = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    def process_block(self, block: dict[str, Any], limits: ImageLimits) -> dict[str, Any]:
+        """Preprocess a base64 image content block; other blocks are returned as is."""
+        source = block.get("source")
+        if block.get("type") != "image" or not isinstance(source, dict) or source.get("type") != "base64":
+            return block
+        try:
+            data = base64.b64decode(source.get("data", ""), validate=True)
+        except (binascii.Error, ValueError, TypeError):
+            return block  # left for content validation to reject
+        processed, mime_type = self.process(data, source.get("media_type", ""), limits)
+        if processed == data:
+            return block
+        return {
+            **block,
+            "source": {
+                **source,
+                "media_type": mime_type,
+                "data": base64.standard_b64encode(processed).decode("ascii"),
+            },
+        }
+
+    async def process_content(self, content: Any, limits: ImageLimits) -> Any:
+        """Preprocess every base64 image block in user message content off the event loop."""
+        if not limits.enabled:
+            return content
+        if isinstance(content, dict):
+            return await asyncio.to_thread(self.process_block, content, limits)
+        if isinstance(content, list) and any(isinstance(b, dict) and b.get("type") == "image" for b in content):
+            return await asyncio.to_thread(
+                lambda: [self.process_block(b, limits) if isinstance(b, dict) else b for b in content]
+            )
+        return content
+
+
+_image_preprocessor: ImagePreprocessor | None = None
+
+
+def get_image_preprocessor() -> ImagePreprocessor:
+    """Get the global ImagePreprocessor singleton instance."""
+    global _image_preprocessor
+    if _image_preprocessor is None:
+        _image_preprocessor = ImagePreprocessor(get_settings().api.image_cache_bytes)
+    return _image_preprocessor
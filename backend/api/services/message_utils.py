@@ -1,5 +1,4 @@
 """Message conversion utilities for SSE and WebSocket streaming."""
-import json
 import logging
 from collections.abc import Iterator
 from typing import Any
@@ -29,9 +28,13 @@ def _format_event(
     data: dict[str, Any],
     output_format: OutputFormat
 ) -> dict[str, Any]:
-    """Format event data for SSE or WebSocket output."""
+    """Format event data for SSE or WebSocket output.
+
+    SSE events keep ``data`` as a dict; callers sanitize it and serialize it
+    once when the event is sent.
+    """
     if output_format == "sse":
-        return {"event": event_type, "data": json.dumps(data)}
+        return {"event": event_type, "data": data}
     return {"type": event_type, **data}
 
 
@@ -313,6 +316,6 @@ def message_to_dicts(msg: Message) -> list[dict[str, Any]]:
     return list(convert_messages(msg, output_format="ws"))
 
 
-def convert_messages_to_sse(msg: Message) -> list[dict[str, str]]:
-    """Convert SDK message to list of SSE events."""
+def convert_messages_to_sse(msg: Message) -> list[dict[str, Any]]:
+    """Convert SDK message to list of SSE events with unserialized ``data`` dicts."""
     return list(convert_messages(msg, output_format="sse"))
@@ -2,9 +2,17 @@
 
 Manages pending questions that require user input during tool execution,
 with async waiting and timeout support.
+
+Deadlines are kept in a single heap served by one loop timer armed for the
+earliest deadline, so waiting questions cost no timer or task of their own.
+Questions are also indexed by owner (a connection) so everything a closed
+connection left behind can be released at once.
 """
 import asyncio
+import heapq
 import logging
+import time
+from collections.abc import Callable, Hashable
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -18,6 +26,10 @@ class PendingQuestion:
     questions: list[dict[str, Any]]
     answer_event: asyncio.Event = field(default_factory=asyncio.Event)
     answers: dict[str, Any] = field(default_factory=dict)
+    owner: Hashable | None = None
+    deadline: float = 0.0
+    expired: bool = False
+    resolved: bool = False
 
 
 class QuestionManager:
@@ -27,22 +39,47 @@ class QuestionManager:
     answer is received or timeout occurs.
     """
 
-    def __init__(self, default_timeout: float = 60.0):
+    def __init__(
+        self,
+        default_timeout: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         self._pending_questions: dict[str, PendingQuestion] = {}
+        self._by_owner: dict[Hashable, set[str]] = {}
         self._lock = asyncio.Lock()
         self.default_timeout = default_timeout
+        self._clock = clock
+        # (deadline, seq, question_id); entries whose question is gone,
+        # answered, or whose deadline moved are skipped when popped.
+        self._deadlines: list[tuple[float, int, str]] = []
+        self._seq = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_deadline: float | None = None
 
     def create_question(
         self,
         question_id: str,
         questions: list[dict[str, Any]],
+        owner: Hashable | None = None,
+        timeout: float | None = None,
     ) -> PendingQuestion:
-        """Create and register a pending question entry."""
+        """Create and register a pending question entry.
+
+        The question expires after timeout (default_timeout by default) even
+        if nobody waits for it, so abandoned questions never linger.
+        """
+        previous = self._pending_questions.get(question_id)
+        if previous is not None:
+            self._unindex_owner(previous)
         pending = PendingQuestion(
             question_id=question_id,
-            questions=questions
+            questions=questions,
+            owner=owner,
         )
         self._pending_questions[question_id] = pending
+        if owner is not None:
+            self._by_owner.setdefault(owner, set()).add(question_id)
+        self._schedule(pending, timeout if timeout is not None else self.default_timeout)
         logger.info(f"Created pending question: {question_id} with {len(questions)} questions")
         return pending
 
@@ -51,22 +88,27 @@ class QuestionManager:
         question_id: str,
         timeout: float | None = None,
     ) -> dict[str, Any]:
-        """Block until the user submits an answer or timeout expires."""
+        """Block until the user submits an answer or timeout expires.
+
+        Raises asyncio.TimeoutError when the deadline passes or the owning
+        connection is closed before an answer arrives.
+        """
         if question_id not in self._pending_questions:
             raise KeyError(f"Question not found: {question_id}")
 
         pending = self._pending_questions[question_id]
-        effective_timeout = timeout if timeout is not None else self.default_timeout
+        if not pending.resolved:
+            effective_timeout = timeout if timeout is not None else self.default_timeout
+            self._schedule(pending, effective_timeout)
 
         try:
-            await asyncio.wait_for(
-                pending.answer_event.wait(),
-                timeout=effective_timeout
-            )
+            await pending.answer_event.wait()
+            if pending.expired:
+                raise asyncio.TimeoutError(f"No answer for question {question_id}")
             logger.info(f"Received answer for question: {question_id}")
             return pending.answers
         finally:
-            self._cleanup_question(question_id)
+            self._cleanup_question(question_id, pending)
 
     def submit_answer(
         self,
@@ -78,9 +120,7 @@ class QuestionManager:
             logger.warning(f"Answer submitted for unknown question: {question_id}")
             return False
 
-        pending = self._pending_questions[question_id]
-        pending.answers = answers
-        pending.answer_event.set()
+        self._resolve(self._pending_questions[question_id], answers)
         logger.info(f"Submitted answer for question: {question_id}")
         return True
 
@@ -89,17 +129,128 @@ class QuestionManager:
         if question_id not in self._pending_questions:
             return False
 
-        pending = self._pending_questions[question_id]
-        pending.answers = {}
-        pending.answer_event.set()
+        self._resolve(self._pending_questions[question_id], {})
         logger.info(f"Cancelled question: {question_id}")
         return True
 
-    def _cleanup_question(self, question_id: str) -> None:
-        """Remove a question from the pending map."""
-        if question_id in self._pending_questions:
-            del self._pending_questions[question_id]
-            logger.debug(f"Cleaned up question: {question_id}")
+    def release_owner(self, owner: Hashable) -> int:
+        """Expire every question of a closed connection. Returns how many."""
+        question_ids = self._by_owner.pop(owner, None)
+        if not question_ids:
+            return 0
+        for question_id in question_ids:
+            pending = self._pending_questions.get(question_id)
+            if pending is not None:
+                pending.owner = None
+                self._expire(pending)
+        logger.info(f"Released {len(question_ids)} pending question(s) for closed connection")
+        return len(question_ids)
+
+    def _resolve(self, pending: PendingQuestion, answers: dict[str, Any]) -> None:
+        """Record the answers and take the question off the deadline heap.
+
+        The question stays registered until wait_for_answer collects it (or
+        its owner is released), so an answer that arrives before anyone
+        waits is not lost when the original deadline passes.
+        """
+        pending.answers = answers
+        pending.resolved = True
+        pending.answer_event.set()
+        self._arm()
+
+    def _expire(self, pending: PendingQuestion) -> None:
+        """Wake any waiter with a timeout and drop the question."""
+        pending.expired = True
+        pending.answer_event.set()
+        self._cleanup_question(pending.question_id, pending)
+
+    def _schedule(self, pending: PendingQuestion, timeout: float) -> None:
+        """Set a question's deadline and re-arm the timer if it is now the earliest."""
+        pending.deadline = self._clock() + timeout
+        self._seq += 1
+        heapq.heappush(self._deadlines, (pending.deadline, self._seq, pending.question_id))
+        if len(self._deadlines) > 2 * len(self._pending_questions) + 64:
+            self._compact_deadlines()
+        self._arm()
+
+    def _is_live(self, entry: tuple[float, int, str]) -> bool:
+        pending = self._pending_questions.get(entry[2])
+        return pending is not None and not pending.resolved and pending.deadline == entry[0]
+
+    def _compact_deadlines(self) -> None:
+        """Drop heap entries for questions that are gone or were rescheduled."""
+        self._deadlines = [entry for entry in self._deadlines if self._is_live(entry)]
+        heapq.heapify(self._deadlines)
+
+    def _arm(self) -> None:
+        """Point the single timer at the earliest live deadline (or disarm it)."""
+        while self._deadlines and not self._is_live(self._deadlines[0]):
+            heapq.heappop(self._deadlines)
+        deadline = self._deadlines[0][0] if self._deadlines else None
+        if deadline == self._timer_deadline:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._timer_deadline = None
+        if deadline is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop yet; the next schedule inside one arms the timer.
+            return
+        self._timer = loop.call_later(max(deadline - self._clock(), 0), self._on_timer)
+        self._timer_deadline = deadline
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._timer_deadline = None
+        self.reap_expired()
+        self._arm()
+
+    def reap_expired(self) -> int:
+        """Expire every question whose deadline has passed. Returns how many."""
+        now = self._clock()
+        expired = 0
+        while self._deadlines and self._deadlines[0][0] <= now:
+            entry = heapq.heappop(self._deadlines)
+            if not self._is_live(entry):
+                continue
+            pending = self._pending_questions[entry[2]]
+            logger.info(f"Question timed out: {pending.question_id}")
+            self._expire(pending)
+            expired += 1
+        return expired
+
+    async def shutdown(self) -> None:
+        """Disarm the deadline timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._timer_deadline = None
+
+    def _cleanup_question(self, question_id: str, pending: PendingQuestion | None = None) -> None:
+        """Remove a question from the pending map (only if it is still the given entry)."""
+        current = self._pending_questions.get(question_id)
+        if current is None or (pending is not None and current is not pending):
+            return
+        del self._pending_questions[question_id]
+        self._unindex_owner(current)
+        # Answered questions leave dead heap entries; keep the timer off them.
+        if not self._pending_questions:
+            self._deadlines.clear()
+        self._arm()
+        logger.debug(f"Cleaned up question: {question_id}")
+
+    def _unindex_owner(self, pending: PendingQuestion) -> None:
+        if pending.owner is None:
+            return
+        ids = self._by_owner.get(pending.owner)
+        if ids is not None:
+            ids.discard(pending.question_id)
+            if not ids:
+                del self._by_owner[pending.owner]
 
     def get_pending_count(self) -> int:
         """Get the number of pending questions."""
@@ -1,12 +1,34 @@
-"""Session management service for API mode."""
+"""Session management service for API mode.
+
+SSE conversations keep their connected ConversationSession between requests:
+each one is owned by a ConversationRunner task that is released after an idle
+timeout, on close/delete, or at shutdown.
+
+State is split across hashed lock shards so operations on unrelated sessions
+never wait on each other. Metadata and connected sessions are kept in LRU
+order; entries idle longer than the TTL, or beyond the size caps, are evicted
+by a background reaper so memory stays bounded over long uptimes.
+"""
 import asyncio
 import logging
+import time
 import uuid
-from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
 
-from agent.core.agent_options import create_agent_sdk_options
+from agent.core.agent_options import build_tools_env, create_agent_sdk_options
 from agent.core.session import ConversationSession
+from api.services.conversation_runner import ConversationRunner
+from api.constants import (
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_LOCK_SHARDS,
+    SESSION_MAX_LIVE,
+    SESSION_METADATA_MAX_ENTRIES,
+    SESSION_REAPER_INTERVAL_SECONDS,
+)
 from api.core.errors import SessionNotFoundError
+from core.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -18,40 +40,100 @@ class SessionMetadata:
     agent_id: str | None = None
     sdk_session_id: str | None = None
     turn_count: int = 0
+    last_used: float = 0.0
+
+
+@dataclass(slots=True)
+class _LiveSession:
+    """A connected ConversationSession and when it was last used."""
+    session: ConversationSession
+    last_used: float
+
+
+@dataclass(slots=True)
+class _Shard:
+    """One lock shard: its lock and the entries whose key hashes to it."""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    metadata: OrderedDict[str, SessionMetadata] = field(default_factory=OrderedDict)
+    sessions: OrderedDict[str, _LiveSession] = field(default_factory=OrderedDict)
+    # Keyed by (pending_id, username) so a conversation is never shared across users.
+    runners: dict[tuple[str, str | None], ConversationRunner] = field(default_factory=dict)
 
 
 class SessionManager:
     """Manages conversation sessions with metadata caching.
 
-    SDK clients cannot be reused across HTTP requests due to async context
-    isolation, so fresh ConversationSession objects are created per request.
+    SDK clients cannot be handed between HTTP requests due to async context
+    isolation, so SSE conversations are served through a ConversationRunner
+    that owns the session in its own task and serializes follow-ups.
     """
 
     PENDING_PREFIX = "pending-"
 
-    def __init__(self):
-        self._metadata: dict[str, SessionMetadata] = {}
+    def __init__(
+        self,
+        shard_count: int = SESSION_LOCK_SHARDS,
+        idle_ttl: float = SESSION_IDLE_TTL_SECONDS,
+        max_metadata: int = SESSION_METADATA_MAX_ENTRIES,
+        max_live_sessions: int = SESSION_MAX_LIVE,
+        conversation_idle_timeout: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._shards = [_Shard() for _ in range(shard_count)]
         self._sdk_to_pending: dict[str, str] = {}
-        self._lock = asyncio.Lock()
-        self._sessions: dict[str, ConversationSession] = {}
+        self._idle_ttl = idle_ttl
+        # Caps are split evenly so each shard can enforce its share locally.
+        self._max_metadata_per_shard = max(1, max_metadata // shard_count)
+        self._max_live_per_shard = max(1, max_live_sessions // shard_count)
+        if conversation_idle_timeout is None:
+            conversation_idle_timeout = get_settings().api.sse_session_idle_timeout
+        self._conversation_idle_timeout = conversation_idle_timeout
+        self._clock = clock
+        self._reaper_task: asyncio.Task | None = None
+        self._evicted_metadata = 0
+        self._evicted_sessions = 0
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
 
     def _resolve_session_id(self, session_id: str) -> str | None:
         """Resolve a session ID to the pending ID in metadata cache."""
-        if session_id in self._metadata:
+        if session_id in self._shard(session_id).metadata:
             return session_id
 
-        if session_id in self._sdk_to_pending:
-            pending_id = self._sdk_to_pending[session_id]
-            if pending_id in self._metadata:
-                return pending_id
+        pending_id = self._sdk_to_pending.get(session_id)
+        if pending_id is not None and pending_id in self._shard(pending_id).metadata:
+            return pending_id
 
         return None
 
+    def _touch_metadata(self, shard: _Shard, pending_id: str) -> SessionMetadata:
+        metadata = shard.metadata[pending_id]
+        metadata.last_used = self._clock()
+        shard.metadata.move_to_end(pending_id)
+        return metadata
+
+    def _drop_metadata(self, shard: _Shard, pending_id: str) -> None:
+        metadata = shard.metadata.pop(pending_id, None)
+        if metadata is not None and metadata.sdk_session_id:
+            self._sdk_to_pending.pop(metadata.sdk_session_id, None)
+
+    def _add_metadata(self, shard: _Shard, metadata: SessionMetadata) -> None:
+        metadata.last_used = self._clock()
+        shard.metadata[metadata.pending_id] = metadata
+        while len(shard.metadata) > self._max_metadata_per_shard:
+            oldest = next(iter(shard.metadata))
+            self._drop_metadata(shard, oldest)
+            self._evicted_metadata += 1
+
     def register_sdk_session_id(self, pending_id: str, sdk_session_id: str) -> None:
         """Register mapping from SDK session ID to pending ID."""
+        shard = self._shard(pending_id)
+        if pending_id not in shard.metadata:
+            # Already evicted; a mapping now would never be cleaned up.
+            return
         self._sdk_to_pending[sdk_session_id] = pending_id
-        if pending_id in self._metadata:
-            self._metadata[pending_id].sdk_session_id = sdk_session_id
+        self._touch_metadata(shard, pending_id).sdk_session_id = sdk_session_id
         logger.info(f"Registered SDK session mapping: {sdk_session_id} -> {pending_id}")
 
     def is_session_cached(self, session_id: str) -> bool:
@@ -75,40 +157,68 @@ class SessionManager:
         session = ConversationSession(options)
         await session.connect()
 
-        async with self._lock:
-            temp_id = str(uuid.uuid4())
-            self._sessions[temp_id] = session
-            logger.info(f"Created session: {temp_id}")
-            return temp_id
+        temp_id = str(uuid.uuid4())
+        shard = self._shard(temp_id)
+        async with shard.lock:
+            shard.sessions[temp_id] = _LiveSession(session, self._clock())
+            overflow = self._pop_overflow_sessions(shard)
+        logger.info(f"Created session: {temp_id}")
+        await self._disconnect_all(overflow)
+        return temp_id
 
     async def get_session(self, session_id: str) -> ConversationSession:
         """Get a session by ID. Raises SessionNotFoundError if not found."""
-        async with self._lock:
-            session = self._sessions.get(session_id)
-            if session is None:
+        shard = self._shard(session_id)
+        async with shard.lock:
+            live = shard.sessions.get(session_id)
+            if live is None:
                 raise SessionNotFoundError(session_id)
-            return session
+            live.last_used = self._clock()
+            shard.sessions.move_to_end(session_id)
+            return live.session
 
     async def close_session(self, session_id: str) -> None:
-        """Close and remove a session from in-memory cache."""
-        async with self._lock:
-            session = self._sessions.get(session_id)
-            if session is None:
+        """Close and remove a session (or SSE conversation) from in-memory cache."""
+        released = await self.release_conversation(session_id)
+
+        shard = self._shard(session_id)
+        async with shard.lock:
+            live = shard.sessions.get(session_id)
+            if live is None:
+                if released:
+                    return
                 raise SessionNotFoundError(session_id)
 
-            await session.disconnect()
-            del self._sessions[session_id]
+            await live.session.disconnect()
+            del shard.sessions[session_id]
             logger.info(f"Closed session: {session_id}")
 
+    async def release_conversation(self, session_id: str) -> bool:
+        """Stop the SSE conversation runners for a session. Returns True if any ran."""
+        resolved_id = self._resolve_session_id(session_id)
+        if resolved_id is None:
+            return False
+        shard = self._shard(resolved_id)
+        async with shard.lock:
+            keys = [key for key in shard.runners if key[0] == resolved_id]
+            runners = [shard.runners.pop(key) for key in keys]
+        for runner in runners:
+            await runner.close()
+        if runners:
+            logger.info(f"Released conversation: {resolved_id}")
+        return bool(runners)
+
     def _create_conversation_session(
         self,
         agent_id: str | None,
-        resume_session_id: str | None = None
+        resume_session_id: str | None = None,
+        env: dict[str, str] | None = None,
     ) -> ConversationSession:
         """Create a ConversationSession with the given parameters."""
         options = create_agent_sdk_options(
             agent_id=agent_id,
-            resume_session_id=resume_session_id
+            resume_session_id=resume_session_id,
+            env=env,
         )
         return ConversationSession(
             options=options,
@@ -119,29 +229,163 @@ class SessionManager:
     async def get_or_create_conversation_session(
         self,
         session_id: str,
-        agent_id: str | None = None
-    ) -> tuple[ConversationSession, str, bool]:
-        """Create a ConversationSession, returning (session, resolved_id, found_in_cache)."""
-        async with self._lock:
-            resolved_id = self._resolve_session_id(session_id)
-
-            if resolved_id is not None:
-                metadata = self._metadata[resolved_id]
-                session = self._create_conversation_session(
-                    agent_id=metadata.agent_id,
-                    resume_session_id=metadata.sdk_session_id
-                )
-                session.sdk_session_id = metadata.sdk_session_id
-                session.turn_count = metadata.turn_count
-                return session, resolved_id, True
-
-            pending_id = self.generate_pending_id()
-            self._metadata[pending_id] = SessionMetadata(
-                pending_id=pending_id,
-                agent_id=agent_id
-            )
-            session = self._create_conversation_session(agent_id=agent_id)
-            return session, pending_id, False
+        agent_id: str | None = None,
+        username: str | None = None,
+    ) -> tuple[ConversationRunner, str, bool]:
+        """Get the conversation's runner, returning (runner, resolved_id, found_in_cache).
+
+        A live runner for the same session and user is reused, so its SDK
+        client stays connected between requests; otherwise a new session is
+        started (resuming from the SDK session ID when one is known).
+
+        With a username, plugin MCP servers get that user's identity via the
+        session's own environment rather than the process-wide one.
+        """
+        resolved_id = self._resolve_session_id(session_id)
+
+        if resolved_id is not None:
+            shard = self._shard(resolved_id)
+            async with shard.lock:
+                # The reaper may have evicted the entry while we waited for
+                # the lock; if so, start a new conversation below instead.
+                if resolved_id in shard.metadata:
+                    metadata = self._touch_metadata(shard, resolved_id)
+                    runner = shard.runners.get((resolved_id, username))
+                    if runner is None or not runner.is_alive:
+                        runner = self._start_runner(shard, metadata, username)
+                    return runner, resolved_id, True
+
+        pending_id = self.generate_pending_id()
+        shard = self._shard(pending_id)
+        async with shard.lock:
+            metadata = SessionMetadata(pending_id=pending_id, agent_id=agent_id)
+            self._add_metadata(shard, metadata)
+            runner = self._start_runner(shard, metadata, username)
+        return runner, pending_id, False
+
+    def _start_runner(
+        self,
+        shard: _Shard,
+        metadata: SessionMetadata,
+        username: str | None,
+    ) -> ConversationRunner:
+        """Create a session for the conversation and a runner that owns it."""
+        pending_id = metadata.pending_id
+        session = self._create_conversation_session(
+            agent_id=metadata.agent_id,
+            resume_session_id=metadata.sdk_session_id,
+            env=build_tools_env(username, pending_id) if username else None,
+        )
+        session.sdk_session_id = metadata.sdk_session_id
+        session.turn_count = metadata.turn_count
+
+        key = (pending_id, username)
+
+        def _forget(runner: ConversationRunner) -> None:
+            if shard.runners.get(key) is runner:
+                del shard.runners[key]
+
+        runner = ConversationRunner(
+            session, self._conversation_idle_timeout, on_exit=_forget, owner=username
+        )
+        shard.runners[key] = runner
+        return runner
+
+    def _pop_overflow_sessions(self, shard: _Shard) -> list[tuple[str, ConversationSession]]:
+        """Remove least recently used sessions beyond the shard's cap."""
+        evicted = []
+        while len(shard.sessions) > self._max_live_per_shard:
+            session_id, live = shard.sessions.popitem(last=False)
+            evicted.append((session_id, live.session))
+        return evicted
+
+    def _pop_idle(self, shard: _Shard, now: float) -> list[tuple[str, ConversationSession]]:
+        """Remove metadata and sessions idle longer than the TTL from a shard."""
+        cutoff = now - self._idle_ttl
+        # Both maps are in LRU order, so scanning stops at the first fresh entry.
+        while shard.metadata:
+            pending_id, metadata = next(iter(shard.metadata.items()))
+            if metadata.last_used > cutoff:
+                break
+            self._drop_metadata(shard, pending_id)
+            self._evicted_metadata += 1
+
+        idle = []
+        while shard.sessions:
+            session_id, live = next(iter(shard.sessions.items()))
+            if live.last_used > cutoff:
+                break
+            del shard.sessions[session_id]
+            idle.append((session_id, live.session))
+        return idle
+
+    async def _disconnect_all(self, sessions: list[tuple[str, ConversationSession]]) -> None:
+        for session_id, session in sessions:
+            self._evicted_sessions += 1
+            try:
+                await session.disconnect()
+            except Exception as e:
+                logger.warning(f"Error disconnecting evicted session {session_id}: {e}")
+            logger.info(f"Evicted idle session: {session_id}")
+
+    async def reap_idle(self) -> int:
+        """Evict idle metadata and disconnect idle sessions. Returns sessions evicted."""
+        now = self._clock()
+        evicted: list[tuple[str, ConversationSession]] = []
+        for shard in self._shards:
+            async with shard.lock:
+                evicted.extend(self._pop_idle(shard, now))
+        await self._disconnect_all(evicted)
+        return len(evicted)
+
+    async def _reaper_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.reap_idle():
+                    logger.info(f"Session reaper: {self.stats()}")
+            except Exception as e:
+                logger.error(f"Session reaper error: {e}", exc_info=True)
+
+    def start_reaper(self, interval: float = SESSION_REAPER_INTERVAL_SECONDS) -> None:
+        """Start the background idle reaper (no-op if already running)."""
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reaper_loop(interval))
+
+    async def shutdown(self) -> None:
+        """Stop the reaper and disconnect every live session and conversation."""
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
+        for shard in self._shards:
+            async with shard.lock:
+                sessions = [(sid, live.session) for sid, live in shard.sessions.items()]
+                shard.sessions.clear()
+                runners = list(shard.runners.values())
+                shard.runners.clear()
+            for runner in runners:
+                await runner.close()
+            for session_id, session in sessions:
+                try:
+                    await session.shutdown()
+                except Exception as e:
+                    logger.warning(f"Error shutting down session {session_id}: {e}")
+
+    def stats(self) -> dict[str, int]:
+        """Gauges for live entries and eviction counters."""
+        return {
+            "live_sessions": sum(len(s.sessions) for s in self._shards),
+            "live_conversations": sum(len(s.runners) for s in self._shards),
+            "cached_metadata": sum(len(s.metadata) for s in self._shards),
+            "sdk_session_mappings": len(self._sdk_to_pending),
+            "evicted_sessions_total": self._evicted_sessions,
+            "evicted_metadata_total": self._evicted_metadata,
+        }
 
 
 # Global singleton instance
@@ -1,11 +1,11 @@
 """Shared session setup logic for WebSocket and platform workers."""
 import logging
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from agent import PROJECT_ROOT
-from agent.core.agent_options import set_email_tools_username, set_media_tools_username, set_media_tools_session_id
+from agent.core.agent_options import build_tools_env
 from agent.core.file_storage import FileStorage
 from agent.core.storage import SessionData
 
@@ -27,6 +27,7 @@ class SessionSetupResult:
     permission_folders: list[str]
     file_storage: FileStorage
     session_cwd: str
+    tools_env: dict[str, str] = field(default_factory=dict)  # Pass to create_agent_sdk_options(env=...)
 
 
 def _compute_session_cwd(username: str, cwd_id: str, base_path: str = "data") -> str:
@@ -64,7 +65,7 @@ def create_session_resources(
     cwd_id: str,
     permission_folders: list[str] | None = None,
 ) -> SessionSetupResult:
-    """Create session resources: FileStorage and set context vars."""
+    """Create session resources: FileStorage and the per-client tools env."""
     if permission_folders is None:
         permission_folders = ["/tmp"]
 
@@ -72,15 +73,12 @@ def create_session_resources(
     session_cwd = str(file_storage.get_session_dir())
     file_storage._ensure_directories()
 
-    set_email_tools_username(username)
-    set_media_tools_username(username)
-    set_media_tools_session_id(cwd_id)
-
     return SessionSetupResult(
         cwd_id=cwd_id,
         permission_folders=permission_folders,
         file_storage=file_storage,
         session_cwd=session_cwd,
+        tools_env=build_tools_env(username, cwd_id),
     )
 
 
@@ -0,0 +1,170 @@
+"""Resumable SSE conversation turns.
+
+Each turn runs in its own task, independent of the HTTP response that started
+it. Events are numbered into an EventReplayBuffer and sent with an SSE ``id``
+of ``{turn_id}:{seq}``, so a client whose connection dropped can send that ID
+back as ``Last-Event-ID`` and continue from where it left off. Finished turns
+stay reachable for a grace period before they are dropped.
+"""
+import asyncio
+import logging
+import uuid
+from collections.abc import AsyncIterator, Callable
+
+from api.constants import EventType, SSE_REPLAY_BUFFER_SIZE, SSE_RESUME_GRACE_SECONDS
+from api.services.stream_replay import DetachedStreamRegistry, EventReplayBuffer
+from core.json_codec import dumps_json
+
+logger = logging.getLogger(__name__)
+
+
+def format_event_id(turn_id: str, seq: int) -> str:
+    """Build the SSE event ID for an event of a turn."""
+    return f"{turn_id}:{seq}"
+
+
+def parse_event_id(event_id: str | None) -> tuple[str, int] | None:
+    """Split a Last-Event-ID header into (turn_id, seq), or None if malformed."""
+    if not event_id:
+        return None
+    turn_id, sep, seq = event_id.strip().rpartition(":")
+    if not sep or not turn_id or not seq.isdigit():
+        return None
+    return turn_id, int(seq)
+
+
+class SseTurn:
+    """A turn's event stream, buffered for replay and fanned out to subscribers."""
+
+    __slots__ = ("turn_id", "owner", "_buffer", "_done", "_wakeup", "_on_done", "_task")
+
+    def __init__(
+        self,
+        turn_id: str,
+        owner: str | None,
+        events: AsyncIterator[dict],
+        buffer_size: int = SSE_REPLAY_BUFFER_SIZE,
+        on_done: Callable[["SseTurn"], None] | None = None,
+    ) -> None:
+        self.turn_id = turn_id
+        self.owner = owner
+        self._buffer = EventReplayBuffer(buffer_size)
+        self._done = False
+        self._wakeup = asyncio.Event()
+        self._on_done = on_done
+        self._task = asyncio.create_task(self._pump(events))
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def last_seq(self) -> int:
+        return self._buffer.last_seq
+
+    async def wait_done(self) -> None:
+        await asyncio.shield(self._task)
+
+    async def _pump(self, events: AsyncIterator[dict]) -> None:
+        """Drain the turn's events into the buffer, whether or not anyone listens."""
+        try:
+            async for event in events:
+                self._buffer.append(event)
+                self._notify()
+        except Exception as e:
+            logger.error(f"SSE turn {self.turn_id} failed: {e}", exc_info=True)
+        finally:
+            self._done = True
+            self._notify()
+            if self._on_done is not None:
+                self._on_done(self)
+
+    def _notify(self) -> None:
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def subscribe(self, last_seq: int = 0) -> AsyncIterator[dict]:
+        """Yield SSE events after last_seq until the turn finishes."""
+        while True:
+            events = self._buffer.since(last_seq)
+            if events is None:
+                # The client fell further behind than the buffer holds.
+                yield {
+                    "event": EventType.REPLAY_GAP,
+                    "data": dumps_json({"turn_id": self.turn_id, "first_seq": self._buffer.first_seq}),
+                }
+                last_seq = self._buffer.first_seq - 1
+                continue
+            if events:
+                for seq, event in events:
+                    yield {**event, "id": format_event_id(self.turn_id, seq)}
+                last_seq = events[-1][0]
+                continue
+            if self._done:
+                return
+            # No await between the buffer check and here, so no event is missed.
+            await self._wakeup.wait()
+
+
+class SseTurnRegistry:
+    """Running turns by ID, plus finished ones kept for a reconnect grace period."""
+
+    def __init__(self, grace_seconds: float = SSE_RESUME_GRACE_SECONDS) -> None:
+        self._grace_seconds = grace_seconds
+        self._running: dict[str, SseTurn] = {}
+        self._finished: DetachedStreamRegistry[SseTurn] = DetachedStreamRegistry()
+
+    def start(self, owner: str | None, events: AsyncIterator[dict]) -> SseTurn:
+        """Start streaming a turn in the background and register it."""
+        turn = SseTurn(uuid.uuid4().hex, owner, events, on_done=self._retire)
+        self._running[turn.turn_id] = turn
+        return turn
+
+    def _retire(self, turn: SseTurn) -> None:
+        self._running.pop(turn.turn_id, None)
+        if self._grace_seconds > 0:
+            self._finished.park(turn.turn_id, turn, self._grace_seconds, lambda _: None)
+
+    def get(self, turn_id: str, owner: str | None) -> SseTurn | None:
+        """Look up a running or recently finished turn belonging to owner."""
+        turn = self._running.get(turn_id) or self._finished.get(turn_id)
+        if turn is None or turn.owner != owner:
+            return None
+        return turn
+
+    def resume(self, last_event_id: str | None, owner: str | None) -> AsyncIterator[dict] | None:
+        """Stream for a Last-Event-ID reconnect, or None if the header is absent/invalid.
+
+        A turn that has already been dropped yields a single replay_gap event
+        telling the client to refetch history instead.
+        """
+        parsed = parse_event_id(last_event_id)
+        if parsed is None:
+            return None
+        turn_id, last_seq = parsed
+        turn = self.get(turn_id, owner)
+        if turn is not None:
+            logger.info(f"Resuming SSE turn {turn_id} after seq {last_seq}")
+            return turn.subscribe(last_seq)
+        return _expired_turn(turn_id)
+
+    def __len__(self) -> int:
+        return len(self._running) + len(self._finished)
+
+
+async def _expired_turn(turn_id: str) -> AsyncIterator[dict]:
+    yield {
+        "event": EventType.REPLAY_GAP,
+        "data": dumps_json({"turn_id": turn_id, "expired": True}),
+    }
+
+
+_sse_turn_registry: SseTurnRegistry | None = None
+
+
+def get_sse_turn_registry() -> SseTurnRegistry:
+    """Get the global SseTurnRegistry singleton instance."""
+    global _sse_turn_registry
+    if _sse_turn_registry is None:
+        _sse_turn_registry = SseTurnRegistry()
+    return _sse_turn_registry
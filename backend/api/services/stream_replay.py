@@ -0,0 +1,122 @@
+"""Sequence-numbered replay buffers for resumable event streams.
+
+Outbound events are numbered and kept in a bounded ring buffer so a client
+that reconnects mid-turn can ask for everything after the last sequence
+number it saw instead of refetching the whole history. Streams whose client
+has gone away are parked in a registry for a grace period, after which an
+expiry callback tears them down.
+"""
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class EventReplayBuffer:
+    """Bounded ring buffer of (seq, event) pairs with monotonically increasing seq.
+
+    Sequence numbers start at 1; 0 means "nothing received yet".
+    """
+
+    __slots__ = ("_events", "_next_seq")
+
+    def __init__(self, maxlen: int) -> None:
+        self._events: deque[tuple[int, Any]] = deque(maxlen=maxlen)
+        self._next_seq = 1
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the most recently appended event (0 if none)."""
+        return self._next_seq - 1
+
+    @property
+    def first_seq(self) -> int:
+        """Oldest sequence number still held (last_seq + 1 when empty)."""
+        return self._events[0][0] if self._events else self._next_seq
+
+    def append(self, event: Any) -> int:
+        """Store an event and return its sequence number."""
+        seq = self._next_seq
+        self._next_seq += 1
+        self._events.append((seq, event))
+        return seq
+
+    def since(self, last_seq: int) -> list[tuple[int, Any]] | None:
+        """Return events after last_seq, or None if some were already evicted."""
+        if last_seq >= self.last_seq:
+            return []
+        if last_seq + 1 < self.first_seq:
+            return None
+        # Sequence numbers are contiguous, so the offset is direct.
+        start = last_seq + 1 - self.first_seq
+        return [self._events[i] for i in range(start, len(self._events))]
+
+
+class DetachedStreamRegistry(Generic[T]):
+    """Holds streams whose client disconnected, until reclaimed or expired.
+
+    Each parked entry schedules its own expiry on the event loop, so the
+    registry never scans for stale entries.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[
+            Hashable, tuple[T, asyncio.TimerHandle, Callable[[T], None]]
+        ] = {}
+
+    def park(
+        self,
+        key: Hashable,
+        item: T,
+        grace_seconds: float,
+        on_expire: Callable[[T], None],
+    ) -> None:
+        """Park an item; on_expire(item) runs if it is not claimed in time.
+
+        Parking over an existing key expires the previous item immediately.
+        """
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            previous[1].cancel()
+            previous[2](previous[0])
+
+        def _expire() -> None:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                logger.info(f"Detached stream expired: {key}")
+                on_expire(entry[0])
+
+        handle = asyncio.get_running_loop().call_later(grace_seconds, _expire)
+        self._entries[key] = (item, handle, on_expire)
+        logger.info(f"Parked detached stream {key} for {grace_seconds}s")
+
+    def claim(self, key: Hashable) -> T | None:
+        """Remove and return a parked item, cancelling its expiry."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        entry[1].cancel()
+        logger.info(f"Reclaimed detached stream: {key}")
+        return entry[0]
+
+    def get(self, key: Hashable) -> T | None:
+        """Return a parked item without claiming it or touching its expiry."""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def discard(self, key: Hashable) -> None:
+        """Drop a parked item without running its expiry callback."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[1].cancel()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
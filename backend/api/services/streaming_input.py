@@ -6,6 +6,7 @@ and multi-part content (text, images).
 """
 import asyncio
 import logging
+from collections import deque
 from collections.abc import AsyncGenerator
 from typing import Any
 
@@ -48,13 +49,19 @@ class StreamingInputHandler:
 
     Messages added via add_message() are normalized and queued, then yielded
     sequentially by generate_messages(). Call complete() to signal the end
-    of the stream.
+    of the stream. Consumers sleep on events and wake only when a message
+    arrives or the stream completes, so idle handlers cost nothing.
     """
 
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self._message_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._messages: deque[dict[str, Any]] = deque()
         self._is_complete = False
+        # Set whenever a message is queued or the stream completes.
+        self._wakeup = asyncio.Event()
+        # Set while nothing is queued.
+        self._drained = asyncio.Event()
+        self._drained.set()
 
     async def add_message(
         self,
@@ -66,7 +73,7 @@ class StreamingInputHandler:
             message = await _normalize_to_sdk_message(
                 content, self.session_id, parent_tool_use_id
             )
-            await self._message_queue.put(message)
+            self._enqueue(message)
             logger.debug(f"Added message to queue for session {self.session_id}")
         except Exception as e:
             logger.error(f"Error adding message to queue: {e}", exc_info=True)
@@ -74,37 +81,45 @@ class StreamingInputHandler:
 
     async def add_raw_message(self, message: dict[str, Any]) -> None:
         """Add a pre-formatted SDK message to the queue, bypassing normalization."""
-        await self._message_queue.put(message)
+        self._enqueue(message)
         logger.debug(f"Added raw message to queue for session {self.session_id}")
 
+    def _enqueue(self, message: dict[str, Any]) -> None:
+        self._messages.append(message)
+        self._drained.clear()
+        self._wakeup.set()
+
     def complete(self) -> None:
         """Signal that no more messages will be added."""
         self._is_complete = True
+        self._wakeup.set()
         logger.debug(f"Marked stream as complete for session {self.session_id}")
 
     async def generate_messages(self) -> AsyncGenerator[dict[str, Any], None]:
         """Yield messages from the queue until complete() is called and queue is empty."""
         try:
             while True:
-                try:
-                    message = await asyncio.wait_for(
-                        self._message_queue.get(), timeout=0.1
-                    )
+                if self._messages:
+                    message = self._messages.popleft()
+                    if not self._messages:
+                        self._drained.set()
                     yield message
-                except asyncio.TimeoutError:
-                    if self._is_complete and self._message_queue.empty():
-                        logger.debug(f"Generator completed for session {self.session_id}")
-                        return
                     continue
+                if self._is_complete:
+                    logger.debug(f"Generator completed for session {self.session_id}")
+                    return
+                # Nothing awaits between the checks above and clear(), so a
+                # message or complete() cannot slip in unnoticed.
+                self._wakeup.clear()
+                await self._wakeup.wait()
         except Exception as e:
             logger.error(f"Error in message generator: {e}", exc_info=True)
             raise
 
     def has_pending_messages(self) -> bool:
         """Check if there are messages waiting in the queue."""
-        return not self._message_queue.empty()
+        return bool(self._messages)
 
     async def wait_until_empty(self) -> None:
         """Wait until all queued messages have been processed."""
-        while not self._message_queue.empty():
-            await asyncio.sleep(0.01)
+        await self._drained.wait()
@@ -0,0 +1,64 @@
+"""Elision of large tool results into content-addressed blobs.
+
+Oversized tool results are replaced by a short preview plus a ``content_ref``
+pointing at the full body in the user's BlobStore. The streamed event and the
+history entry reference the same blob, and the client fetches the full body
+on demand from ``GET /sessions/{id}/blobs/{hash}``.
+
+Blobs hold the sanitized body (secrets redacted, server paths stripped), i.e.
+exactly what the client would have received had the result not been elided.
+"""
+import logging
+from typing import Any
+
+from agent.core.blob_store import BlobStore, get_user_blob_store
+from api.utils.sensitive_data_filter import redact_sensitive_data, sanitize_paths
+from core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ToolResultElider:
+    """Replaces tool result bodies above a size threshold with blob references."""
+
+    __slots__ = ("_blobs", "_threshold", "_preview_chars")
+
+    def __init__(self, blobs: BlobStore, threshold: int, preview_chars: int) -> None:
+        self._blobs = blobs
+        self._threshold = threshold
+        self._preview_chars = min(preview_chars, threshold)
+
+    def elide(self, content: str) -> tuple[str, dict[str, Any] | None]:
+        """Return (content, None) if small enough, else (preview, content_ref)."""
+        if len(content) <= self._threshold:
+            return content, None
+        body = sanitize_paths(redact_sensitive_data(content))
+        try:
+            blob_hash = self._blobs.put_text(body)
+        except OSError:
+            # Fall back to the full body rather than losing the result.
+            return content, None
+        ref = {"hash": blob_hash, "size": len(body), "truncated": True}
+        return body[:self._preview_chars], ref
+
+    def apply(self, event: dict[str, Any]) -> None:
+        """Elide a tool_result event's content in place."""
+        content = event.get("content")
+        if not isinstance(content, str):
+            return
+        preview, ref = self.elide(content)
+        if ref is not None:
+            event["content"] = preview
+            event["content_ref"] = ref
+
+
+def get_tool_result_elider(username: str | None) -> ToolResultElider | None:
+    """Build an elider for the user, or None when elision is disabled."""
+    api_settings = get_settings().api
+    if not username or api_settings.tool_result_preview_threshold <= 0:
+        return None
+    return ToolResultElider(
+        get_user_blob_store(username),
+        threshold=api_settings.tool_result_preview_threshold,
+        preview_chars=api_settings.tool_result_preview_chars,
+    )
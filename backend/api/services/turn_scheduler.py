@@ -0,0 +1,223 @@
+"""Admission control for agent turns across web, API and platform traffic.
+
+Every SDK turn takes a slot from one global budget before it starts. When
+the budget is exhausted, waiting turns are admitted by priority class
+(interactive web before API before platform webhooks) and, within a class,
+round-robin across users so one chatty user cannot starve the rest. A turn
+that has waited ``aging_seconds`` is treated as one class more urgent, so
+background traffic still progresses under sustained interactive load.
+Queue wait times are recorded in the ``turn_queue_wait_seconds`` histogram.
+
+A turn that blocks on a person (an AskUserQuestion answer) hands its slot
+back for the wait through ``TurnSlot.idle()`` and queues for it again
+before it continues, so open questions never hold the budget hostage.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+
+from core.metrics import MetricsRegistry, get_metrics
+from core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class TurnPriority(IntEnum):
+    """Priority classes; lower values are admitted first."""
+    INTERACTIVE = 0  # web UI over WebSocket
+    API = 1          # SSE / REST conversations
+    PLATFORM = 2     # platform webhooks (Telegram, WhatsApp, ...)
+
+
+@dataclass(slots=True)
+class _Waiter:
+    priority: TurnPriority
+    user: str
+    enqueued: float
+    future: asyncio.Future
+
+
+class TurnScheduler:
+    """Global concurrency budget for agent turns with priority and fairness."""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        aging_seconds: float = 0.0,
+        metrics: MetricsRegistry | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_concurrent = max(1, max_concurrent)
+        self._aging_seconds = aging_seconds
+        self._metrics = metrics or get_metrics()
+        self._clock = clock
+        self._running = 0
+        self._waiting = 0
+        # Per class: user -> that user's waiters in arrival order. The dict
+        # order is the round-robin order of users within the class.
+        self._queues: list[OrderedDict[str, deque[_Waiter]]] = [OrderedDict() for _ in TurnPriority]
+        self._admitted = [0] * len(TurnPriority)
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def queued(self, priority: TurnPriority | None = None) -> int:
+        if priority is None:
+            return self._waiting
+        return sum(len(waiters) for waiters in self._queues[priority].values())
+
+    @asynccontextmanager
+    async def slot(self, priority: TurnPriority, user: str | None) -> AsyncIterator["TurnSlot"]:
+        """Hold a turn slot for the duration of the block."""
+        await self.acquire(priority, user)
+        turn_slot = TurnSlot(self, priority, user)
+        try:
+            yield turn_slot
+        finally:
+            if turn_slot.held:
+                self.release()
+
+    async def acquire(self, priority: TurnPriority, user: str | None) -> float:
+        """Wait for a turn slot. Returns the seconds spent queued."""
+        start = self._clock()
+        if self._running < self._max_concurrent and not self._waiting:
+            self._running += 1
+            self._record(priority, 0.0)
+            return 0.0
+
+        waiter = _Waiter(priority, user or "", start, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(waiter.user, deque()).append(waiter)
+        self._waiting += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as we were cancelled: hand the slot on.
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+        waited = self._clock() - start
+        self._record(priority, waited)
+        if waited >= 1.0:
+            logger.info(f"Turn for {waiter.user or 'anonymous'} ({priority.name.lower()}) waited {waited:.2f}s for a slot")
+        return waited
+
+    def release(self) -> None:
+        """Return a slot and admit the next waiter, if any."""
+        self._running -= 1
+        while self._running < self._max_concurrent:
+            waiter = self._pop_next()
+            if waiter is None:
+                return
+            if not waiter.future.done():
+                self._running += 1
+                waiter.future.set_result(None)
+
+    def _pop_next(self) -> _Waiter | None:
+        """Take the next waiter: best (aged) class, then round-robin by user.
+
+        Classes that age to the same urgency are served oldest head first.
+        """
+        now = self._clock()
+        best: tuple[float, float, int] | None = None
+        for priority, users in enumerate(self._queues):
+            if not users:
+                continue
+            head = users[next(iter(users))][0]
+            effective = float(priority)
+            if self._aging_seconds > 0:
+                effective -= (now - head.enqueued) // self._aging_seconds
+            candidate = (effective, head.enqueued, priority)
+            if best is None or candidate < best:
+                best = candidate
+        if best is None:
+            return None
+
+        users = self._queues[best[2]]
+        user, waiters = users.popitem(last=False)
+        waiter = waiters.popleft()
+        self._waiting -= 1
+        if waiters:
+            users[user] = waiters  # back of the round-robin order
+        return waiter
+
+    def _discard(self, waiter: _Waiter) -> None:
+        users = self._queues[waiter.priority]
+        waiters = users.get(waiter.user)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        self._waiting -= 1
+        if not waiters:
+            del users[waiter.user]
+
+    def _record(self, priority: TurnPriority, waited: float) -> None:
+        self._admitted[priority] += 1
+        self._metrics.observe("turn_queue_wait_seconds", waited, priority=priority.name.lower())
+
+    def stats(self) -> dict[str, int]:
+        stats = {"turn_slots": self._max_concurrent, "turns_running": self._running}
+        for priority in TurnPriority:
+            name = priority.name.lower()
+            stats[f"turns_queued_{name}"] = self.queued(priority)
+            stats[f"turns_admitted_{name}_total"] = self._admitted[priority]
+        return stats
+
+
+class TurnSlot:
+    """A slot held by one turn, which it can hand back while waiting on a person."""
+
+    def __init__(self, scheduler: TurnScheduler, priority: TurnPriority, user: str | None) -> None:
+        self._scheduler = scheduler
+        self._priority = priority
+        self._user = user
+        self._idle = 0
+        self._lock = asyncio.Lock()
+        self.held = True
+
+    @asynccontextmanager
+    async def idle(self) -> AsyncIterator[None]:
+        """Release the slot for the block and re-acquire it afterwards.
+
+        Overlapping idle blocks (parallel questions in one turn) release
+        once and re-acquire when the last one ends.
+        """
+        async with self._lock:
+            self._idle += 1
+            if self._idle == 1 and self.held:
+                self._scheduler.release()
+                self.held = False
+        try:
+            yield
+        finally:
+            async with self._lock:
+                self._idle -= 1
+                if self._idle == 0 and not self.held:
+                    await self._scheduler.acquire(self._priority, self._user)
+                    self.held = True
+
+
+_turn_scheduler: TurnScheduler | None = None
+
+
+def get_turn_scheduler() -> TurnScheduler:
+    """Get the global TurnScheduler singleton instance."""
+    global _turn_scheduler
+    if _turn_scheduler is None:
+        settings = get_settings().api
+        _turn_scheduler = TurnScheduler(
+            settings.turn_max_concurrent,
+            aging_seconds=settings.turn_priority_aging_seconds,
+        )
+    return _turn_scheduler
@@ -0,0 +1,103 @@
+"""Per-turn bookkeeping for in-flight tool calls and AskUserQuestion prompts.
+
+Shared by the WebSocket router and the platform worker. Pending tool calls
+live in an insertion-ordered dict keyed by tool_use_id, so registering and
+resolving a call is O(1) and the entry is dropped as soon as its result
+arrives instead of accumulating for the rest of the turn.
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(slots=True)
+class PendingToolCall:
+    """A tool_use that has not yet received its tool_result."""
+    name: str
+    input: dict[str, Any] = field(default_factory=dict)
+
+
+class TurnState:
+    """Tracks pending tool calls and questions for the current agent turn.
+
+    Pending tools act as an ordered set: iteration order matches the order
+    in which tool_use events were seen, which keeps interrupted tool_result
+    events in the same order as the original calls.
+    """
+
+    __slots__ = (
+        "_pending_tools",
+        "_pending_questions",
+        "last_question_id",
+        "question_sent_from_stream",
+        "question_handled_by_callback",
+    )
+
+    def __init__(self) -> None:
+        self._pending_tools: dict[str, PendingToolCall] = {}
+        self._pending_questions: dict[str, None] = {}
+        self.last_question_id: str | None = None
+        self.question_sent_from_stream: bool = False
+        self.question_handled_by_callback: bool = False
+
+    # --- Tool calls ---
+
+    def start_tool(
+        self,
+        tool_use_id: str,
+        name: str,
+        tool_input: Any = None,
+    ) -> None:
+        """Register a tool_use. Re-registering the same ID updates it in place."""
+        self._pending_tools[tool_use_id] = PendingToolCall(
+            name=name,
+            input=tool_input if isinstance(tool_input, dict) else {},
+        )
+
+    def finish_tool(self, tool_use_id: str) -> PendingToolCall | None:
+        """Resolve a tool_use by its tool_result, returning the call if it was pending."""
+        return self._pending_tools.pop(tool_use_id, None)
+
+    def get_tool(self, tool_use_id: str) -> PendingToolCall | None:
+        """Look up a pending tool call without resolving it."""
+        return self._pending_tools.get(tool_use_id)
+
+    def has_pending_tool(self, tool_use_id: str) -> bool:
+        """Check whether a tool_use is still waiting for its result."""
+        return tool_use_id in self._pending_tools
+
+    @property
+    def pending_tool_ids(self) -> list[str]:
+        """IDs of pending tool calls in the order they were started."""
+        return list(self._pending_tools)
+
+    @property
+    def pending_tool_count(self) -> int:
+        """Number of tool calls still waiting for a result."""
+        return len(self._pending_tools)
+
+    def drain_pending_tools(self) -> list[str]:
+        """Return all pending tool IDs in start order and clear them."""
+        ids = list(self._pending_tools)
+        self._pending_tools.clear()
+        return ids
+
+    # --- Questions ---
+
+    def add_question(self, question_id: str) -> None:
+        """Record an AskUserQuestion prompt sent to the client."""
+        self._pending_questions[question_id] = None
+        self.last_question_id = question_id
+
+    def discard_question(self, question_id: str) -> None:
+        """Forget a question once it has been answered, cancelled or timed out."""
+        self._pending_questions.pop(question_id, None)
+
+    @property
+    def pending_question_ids(self) -> list[str]:
+        """IDs of questions awaiting an answer, oldest first."""
+        return list(self._pending_questions)
+
+    def reset_question_flags(self) -> None:
+        """Reset the per-response AskUserQuestion delivery flags."""
+        self.question_sent_from_stream = False
+        self.question_handled_by_callback = False
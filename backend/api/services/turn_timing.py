@@ -0,0 +1,154 @@
+"""Per-turn latency breakdown for agent turns.
+
+A TurnTimer records when a turn first hears from the SDK and sees its first
+text token, how long the SDK connect, each tool call, history writes and
+sanitization took, and the turn's total. The summary is attached to the
+turn's result (``done``) event, which the history tracker persists, and fed
+into ``turn_stage_seconds`` / ``turn_tool_seconds`` histograms.
+
+The active timer lives in a context variable, so code deep in the pipeline
+(history writes, outbound sanitization) can report time with ``timed()``
+without the timer being threaded through every call.
+"""
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any
+
+from api.constants import EventType
+from core.metrics import MetricsRegistry, get_metrics
+
+_current_timer: ContextVar["TurnTimer | None"] = ContextVar("turn_timer", default=None)
+
+
+def current_turn_timer() -> "TurnTimer | None":
+    """The timer of the turn running in this context, if any."""
+    return _current_timer.get()
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Add the block's duration to a stage of the current turn (no-op outside a turn)."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = timer.clock()
+    try:
+        yield
+    finally:
+        timer.add(stage, timer.clock() - start)
+
+
+class TurnTimer:
+    """Collects stage timings for one agent turn."""
+
+    __slots__ = (
+        "channel", "clock", "_metrics", "_start", "_marks", "_totals",
+        "_open_tools", "_tools", "_summary",
+    )
+
+    def __init__(
+        self,
+        channel: str,
+        metrics: MetricsRegistry | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.channel = channel
+        self.clock = clock
+        self._metrics = metrics or get_metrics()
+        self._start = clock()
+        self._marks: dict[str, float] = {}
+        self._totals: dict[str, float] = {}
+        self._open_tools: dict[str, tuple[str, float]] = {}
+        self._tools: list[tuple[str, float]] = []
+        self._summary: dict[str, Any] | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self._summary is not None
+
+    def activate(self) -> Token:
+        """Make this the current turn's timer; pass the token to deactivate()."""
+        return _current_timer.set(self)
+
+    @staticmethod
+    def deactivate(token: Token) -> None:
+        try:
+            _current_timer.reset(token)
+        except ValueError:
+            # A generator finalized from another task's context.
+            pass
+
+    @contextmanager
+    def active(self) -> Iterator["TurnTimer"]:
+        """Make this the current turn's timer for the block."""
+        token = self.activate()
+        try:
+            yield self
+        finally:
+            self.deactivate(token)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add(stage, self.clock() - start)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+
+    def mark(self, stage: str) -> None:
+        """Record the time since turn start at the first occurrence of stage."""
+        if stage not in self._marks:
+            self._marks[stage] = self.clock() - self._start
+
+    def tool_started(self, tool_use_id: str, name: str) -> None:
+        # Stream events and the typed message can both announce one call.
+        self._open_tools.setdefault(tool_use_id, (name, self.clock()))
+
+    def tool_finished(self, tool_use_id: str) -> None:
+        entry = self._open_tools.pop(tool_use_id, None)
+        if entry is not None:
+            self._tools.append((entry[0], self.clock() - entry[1]))
+
+    def on_message(self) -> None:
+        """Call for every SDK message."""
+        self.mark("first_event")
+
+    def on_event(self, event_type: str | None, event_data: dict[str, Any]) -> None:
+        """Track first token and tool spans from converted stream events."""
+        if event_type == EventType.TEXT_DELTA:
+            self.mark("first_token")
+        elif event_type == EventType.TOOL_USE and event_data.get("id"):
+            self.tool_started(event_data["id"], event_data.get("name", ""))
+        elif event_type == EventType.TOOL_RESULT and event_data.get("tool_use_id"):
+            self.tool_finished(event_data["tool_use_id"])
+
+    def finish(self) -> dict[str, Any]:
+        """Close the turn, record histograms once and return the summary in ms."""
+        if self._summary is not None:
+            return self._summary
+        now = self.clock()
+        for tool_use_id in list(self._open_tools):
+            self.tool_finished(tool_use_id)
+        total = now - self._start
+
+        stages = {"total": total, **self._marks, **self._totals}
+        for stage, seconds in stages.items():
+            self._metrics.observe("turn_stage_seconds", seconds, channel=self.channel, stage=stage)
+        for name, seconds in self._tools:
+            self._metrics.observe("turn_tool_seconds", seconds, tool=name or "unknown")
+
+        summary: dict[str, Any] = {f"{stage}_ms": _ms(seconds) for stage, seconds in stages.items()}
+        if self._tools:
+            summary["tools"] = [{"name": name, "ms": _ms(seconds)} for name, seconds in self._tools]
+        self._summary = summary
+        return summary
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
@@ -1,4 +1,5 @@
 """HTTP/SSE client for API mode."""
+import asyncio
 import json
 from collections.abc import AsyncIterator
 
@@ -12,6 +13,7 @@ from cli.clients.event_normalizer import (
     to_compact_completed_event,
     to_compact_started_event,
     to_error_event,
+    to_info_event,
     to_init_event,
     to_stream_event,
     to_success_event,
@@ -101,18 +103,35 @@ class APIClient:
         if sid:
             payload["session_id"] = sid
 
-        async with aconnect_sse(
-            self.client,
-            "POST",
-            endpoint,
-            json=payload,
-        ) as event_source:
-            async for sse_event in event_source.aiter_sse():
-                event = self._convert_sse_event(sse_event)
-                if event:
-                    if event.get("type") == "init" and "session_id" in event:
-                        self.session_id = event["session_id"]
-                    yield event
+        # A dropped connection is retried with Last-Event-ID, which resumes
+        # the same turn on the server instead of sending the message again.
+        last_event_id: str | None = None
+        attempts = 0
+        while True:
+            headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+            try:
+                async with aconnect_sse(
+                    self.client,
+                    "POST",
+                    endpoint,
+                    json=payload,
+                    headers=headers,
+                ) as event_source:
+                    async for sse_event in event_source.aiter_sse():
+                        if sse_event.id:
+                            last_event_id = sse_event.id
+                            attempts = 0
+                        event = self._convert_sse_event(sse_event)
+                        if event:
+                            if event.get("type") == "init" and "session_id" in event:
+                                self.session_id = event["session_id"]
+                            yield event
+                return
+            except httpx.TransportError:
+                if last_event_id is None or attempts >= self._config.sse_max_reconnects:
+                    raise
+                attempts += 1
+                await asyncio.sleep(self._config.sse_reconnect_delay * attempts)
 
     def _convert_sse_event(self, sse_event) -> dict | None:
         """Convert SSE event to CLI format."""
@@ -179,6 +198,11 @@ class APIClient:
                 return to_thinking_event(text)
             return None
 
+        if sse_event.event == "replay_gap":
+            if event_data.get("expired"):
+                return to_info_event("Stream could not be resumed; reload the session to see the full reply")
+            return to_info_event("Part of the streamed reply was skipped after reconnecting")
+
         if sse_event.event == "assistant_text":
             text = event_data.get("text", "")
             if text:
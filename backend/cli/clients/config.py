@@ -23,7 +23,16 @@ class ClientConfig:
     ws_ping_interval: int = 300
     ws_ping_timeout: int | None = None
     ws_close_timeout: int = 10
+    # Frame encoding: "json" (text) or "msgpack" (binary, needs the msgpack package)
+    ws_encoding: str = field(default_factory=lambda: os.getenv("CLI_WS_ENCODING", "json"))
+    # permessage-deflate compression; set CLI_WS_COMPRESSION=none to disable
+    ws_compression: str | None = field(
+        default_factory=lambda: None if os.getenv("CLI_WS_COMPRESSION", "deflate") == "none" else "deflate"
+    )
     http_timeout: float = 300.0
+    # SSE reconnects (with Last-Event-ID) after a dropped connection mid-turn
+    sse_max_reconnects: int = field(default_factory=lambda: int(os.getenv("CLI_SSE_MAX_RECONNECTS", "5")))
+    sse_reconnect_delay: float = 1.0
 
     @property
     def ws_url(self) -> str:
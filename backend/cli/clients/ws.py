@@ -1,5 +1,4 @@
 """WebSocket client for CLI chat."""
-import json
 from collections.abc import AsyncIterator
 
 import websockets
@@ -9,6 +8,7 @@ from cli.clients import find_previous_session
 from cli.clients.api import APIClient
 from cli.clients.auth import perform_login
 from cli.clients.config import ClientConfig, get_default_config
+from core.ws_codec import JSON_ENCODING, decode_frame, encode_frame, negotiate_encoding
 from cli.clients.event_normalizer import (
     to_ask_user_event,
     to_cancelled_event,
@@ -51,6 +51,9 @@ class WSClient:
         self._connected = False
         self._api_client: APIClient | None = None
         self._jwt_token: str | None = None
+        self._last_seq: int | None = None
+        self._reattached = False
+        self._encoding = JSON_ENCODING
 
     def _get_api_client(self) -> APIClient:
         """Get or create the internal API client for read operations."""
@@ -75,7 +78,11 @@ class WSClient:
         )
         return self._jwt_token
 
-    def _build_ws_url(self, resume_session_id: str | None = None) -> str:
+    def _build_ws_url(
+        self,
+        resume_session_id: str | None = None,
+        last_seq: int | None = None,
+    ) -> str:
         """Build WebSocket URL with query parameters."""
         url = f"{self._config.ws_url}{self._config.ws_chat_endpoint}"
         params = []
@@ -83,14 +90,27 @@ class WSClient:
             params.append(f"agent_id={self.agent_id}")
         if resume_session_id:
             params.append(f"session_id={resume_session_id}")
+            if last_seq is not None:
+                params.append(f"last_seq={last_seq}")
         if self._jwt_token:
             params.append(f"token={self._jwt_token}")
+        requested_encoding = negotiate_encoding(self._config.ws_encoding)
+        if requested_encoding != JSON_ENCODING:
+            params.append(f"encoding={requested_encoding}")
         if params:
             url += "?" + "&".join(params)
         return url
 
-    async def create_session(self, resume_session_id: str | None = None) -> dict:
-        """Create a new WebSocket session or resume an existing one."""
+    async def create_session(
+        self,
+        resume_session_id: str | None = None,
+        last_seq: int | None = None,
+    ) -> dict:
+        """Create a new WebSocket session or resume an existing one.
+
+        Passing last_seq asks the server to replay events missed since then
+        if the session is still running server-side.
+        """
         if self._ws:
             try:
                 await self._ws.close()
@@ -100,7 +120,7 @@ class WSClient:
             self._connected = False
 
         await self._get_jwt_token()
-        url = self._build_ws_url(resume_session_id)
+        url = self._build_ws_url(resume_session_id, last_seq)
 
         try:
             self._ws = await websockets.connect(
@@ -108,12 +128,13 @@ class WSClient:
                 ping_interval=self._config.ws_ping_interval,
                 ping_timeout=self._config.ws_ping_timeout,
                 close_timeout=self._config.ws_close_timeout,
+                compression=self._config.ws_compression,
             )
             self._connected = True
 
             # Wait for ready signal
             ready_msg = await self._ws.recv()
-            data = json.loads(ready_msg)
+            data = decode_frame(ready_msg)
 
             if data.get("type") == "error":
                 self._connected = False
@@ -126,6 +147,10 @@ class WSClient:
             resumed = data.get("resumed", False)
             session_id = data.get("session_id") if resumed else None
             turn_count = data.get("turn_count", 0) if resumed else 0
+            self._reattached = bool(data.get("reattached")) and not data.get("replay_gap")
+            self._encoding = data.get("encoding", JSON_ENCODING)
+            if "seq" in data:
+                self._last_seq = data["seq"]
 
             if resumed and session_id:
                 self.session_id = session_id
@@ -144,13 +169,17 @@ class WSClient:
         """Send a message and stream response events via WebSocket."""
         max_retries = 1
         retry_count = 0
+        sent = False
 
         while retry_count <= max_retries:
-            # Auto-reconnect if disconnected
+            # Auto-reconnect if disconnected; a mid-turn drop resumes the stream
             if (not self._ws or not self._connected) and self.session_id:
                 try:
                     yield to_info_event(f"Reconnecting to session {self.session_id}...")
-                    await self.create_session(resume_session_id=self.session_id)
+                    await self.create_session(
+                        resume_session_id=self.session_id,
+                        last_seq=self._last_seq if sent else None,
+                    )
                     yield to_info_event("Reconnected successfully")
                 except Exception as e:
                     yield to_error_event(f"Failed to reconnect: {e}")
@@ -159,15 +188,17 @@ class WSClient:
             if not self._ws or not self._connected:
                 raise RuntimeError("WebSocket not connected. Call create_session() first.")
 
-            try:
-                await self._ws.send(json.dumps({"content": content}))
-            except ConnectionClosed:
-                self._connected = False
-                retry_count += 1
-                if retry_count <= max_retries and self.session_id:
-                    continue
-                yield to_error_event("WebSocket connection closed while sending")
-                return
+            if not (sent and self._reattached):
+                try:
+                    await self._send({"content": content})
+                    sent = True
+                except ConnectionClosed:
+                    self._connected = False
+                    retry_count += 1
+                    if retry_count <= max_retries and self.session_id:
+                        continue
+                    yield to_error_event("WebSocket connection closed while sending")
+                    return
 
             try:
                 async for event in self._receive_events():
@@ -187,8 +218,10 @@ class WSClient:
         """Receive and convert WebSocket events to CLI format."""
         while True:
             msg = await self._ws.recv()
-            data = json.loads(msg)
+            data = decode_frame(msg)
             msg_type = data.get("type")
+            if "seq" in data:
+                self._last_seq = data["seq"]
 
             if msg_type == "session_id":
                 self.session_id = data["session_id"]
@@ -247,13 +280,17 @@ class WSClient:
                 if text:
                     yield to_assistant_text_event(text)
 
+    async def _send(self, data: dict) -> None:
+        """Send a client message in the encoding negotiated with the server."""
+        await self._ws.send(encode_frame(data, self._encoding))
+
     async def send_compact(self) -> bool:
         """Send a compact request to compress conversation context."""
         if not self._ws or not self._connected:
             return False
 
         try:
-            await self._ws.send(json.dumps({"type": "compact_request"}))
+            await self._send({"type": "compact_request"})
             return True
         except Exception:
             return False
@@ -263,11 +300,11 @@ class WSClient:
         if not self._ws or not self._connected:
             raise RuntimeError("WebSocket not connected")
 
-        await self._ws.send(json.dumps({
+        await self._send({
             "type": "user_answer",
             "question_id": question_id,
             "answers": answers,
-        }))
+        })
 
     async def interrupt(self, session_id: str | None = None) -> bool:
         """Interrupt the current task by sending cancel request."""
@@ -275,7 +312,7 @@ class WSClient:
             return False
 
         try:
-            await self._ws.send(json.dumps({"type": "cancel_request"}))
+            await self._send({"type": "cancel_request"})
             return True
         except Exception:
             return False
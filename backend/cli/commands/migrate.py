@@ -0,0 +1,36 @@
+"""Data migration commands for Claude Agent SDK CLI."""
+from pathlib import Path
+
+from agent.core.storage import HISTORY_DIRNAME, HistoryStorage, get_data_dir
+from agent.display import console, print_error, print_info, print_success
+
+
+def _user_data_dirs(username: str | None) -> list[Path]:
+    """Return data directories that hold a history folder."""
+    data_dir = get_data_dir()
+    if username:
+        return [data_dir / username]
+    return sorted(p for p in data_dir.iterdir() if (p / HISTORY_DIRNAME).is_dir())
+
+
+def migrate_history_images_command(username: str | None = None) -> None:
+    """Move inline base64 images in history JSONL files into the blob store."""
+    data_dir = get_data_dir()
+    if not data_dir.exists():
+        print_error(f"Data directory not found: {data_dir}")
+        return
+
+    total = 0
+    for user_dir in _user_data_dirs(username):
+        history = HistoryStorage(data_dir=user_dir)
+        user_total = 0
+        for session_id in history.list_session_ids():
+            user_total += history.migrate_inline_images(session_id)
+        if user_total:
+            console.print(f"  {user_dir.name}: {user_total} image(s) moved")
+        total += user_total
+
+    if total:
+        print_success(f"Moved {total} inline image(s) to blob storage")
+    else:
+        print_info("No inline images found")
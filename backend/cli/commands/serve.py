@@ -9,6 +9,7 @@ except ImportError:
     _SERVER_DEPS_AVAILABLE = False
 
 from agent.display import print_success, print_info, print_error
+from core.settings import get_settings
 
 
 def serve_command(host: str = '0.0.0.0', port: int = 7001, reload: bool = False):
@@ -29,7 +30,8 @@ def serve_command(host: str = '0.0.0.0', port: int = 7001, reload: bool = False)
             host=host,
             port=port,
             reload=reload,
-            log_level="info"
+            log_level="info",
+            ws_per_message_deflate=get_settings().api.ws_per_message_deflate,
         )
     except Exception as e:
         print_error(f"Server error: {e}")
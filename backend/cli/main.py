@@ -8,6 +8,7 @@ load_dotenv(Path(__file__).parent.parent / ".env")
 from cli.commands.list import skills_command, agents_command, subagents_command, sessions_command
 from cli.commands.chat import chat_command
 from cli.commands.serve import serve_command
+from cli.commands.migrate import migrate_history_images_command
 from core.settings import get_settings
 
 _settings = get_settings()
@@ -90,6 +91,22 @@ def setup_telegram(webhook_url):
     run_setup(webhook_url)
 
 
+@cli.command("migrate-history-images")
+@click.option('--username', default=None, help='Only migrate this user (default: all users)')
+def migrate_history_images(username):
+    """Move inline base64 images in history into the blob store.
+
+    Rewrites each history JSONL file so images reference content-addressed
+    blobs under data/{username}/blobs/. Safe to run more than once, and
+    while the server is running: each file is locked while it is rewritten.
+
+    Examples:
+        python main.py migrate-history-images
+        python main.py migrate-history-images --username alice
+    """
+    migrate_history_images_command(username=username)
+
+
 @cli.command()
 @click.option('--host', default=_settings.api.host, help='Host to bind to')
 @click.option('--port', default=_settings.api.port, type=int, help='Port to bind to')
@@ -0,0 +1,26 @@
+"""Compact JSON encoding for streamed events.
+
+Uses ``orjson`` when it is installed (optional ``speedups`` extra) and falls
+back to the standard library otherwise. Both produce compact UTF-8 JSON and
+stringify values they cannot serialize natively.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def dumps_json(data: Any) -> str:
+    """Serialize data to a compact JSON string."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=str, option=_ORJSON_OPTIONS).decode()
+        except TypeError:
+            # orjson rejects a few inputs json accepts (e.g. integers over 64 bits).
+            pass
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
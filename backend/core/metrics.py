@@ -0,0 +1,110 @@
+"""In-process metrics for admin diagnostics.
+
+Histograms use fixed bucket boundaries, so observing a value is O(buckets)
+with no allocation and snapshots can estimate percentiles without keeping
+samples. Metrics are keyed by name plus labels, e.g.
+``turn_queue_wait_seconds{priority=platform}``.
+"""
+import bisect
+import threading
+
+# Upper bounds in seconds, suited to everything from sanitization passes to
+# cold SDK starts; values above the last bound land in the overflow bucket.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+class Histogram:
+    """Counts observations into fixed buckets."""
+
+    __slots__ = ("buckets", "_counts", "count", "sum", "max")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th observation (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self._counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets: dict[str, int] = {}
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            buckets[f"{bound:g}"] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+def _metric_key(name: str, labels: dict[str, str]) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{inner}}}"
+
+
+class MetricsRegistry:
+    """Named histograms, created on first use."""
+
+    def __init__(self) -> None:
+        self._histograms: dict[str, Histogram] = {}
+        # Platform workers may observe from threads (e.g. to_thread helpers).
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = _metric_key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self.histogram(name, **labels).observe(value)
+
+    def snapshot(self) -> dict[str, dict]:
+        return {key: h.snapshot() for key, h in sorted(self._histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+_metrics: MetricsRegistry | None = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the global MetricsRegistry singleton instance."""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
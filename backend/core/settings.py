@@ -83,6 +83,49 @@ class APISettings(BaseSettings):
         default="info",
         description="Logging level for the API server"
     )
+    ws_per_message_deflate: bool = Field(
+        default=True,
+        description="Negotiate permessage-deflate compression for WebSocket connections"
+    )
+    sse_session_idle_timeout: float = Field(
+        default=300.0,
+        description="Seconds an SSE conversation keeps its SDK session connected between requests"
+    )
+    turn_max_concurrent: int = Field(
+        default=8,
+        description="Agent turns (SDK queries) allowed to run at once across web, API and platforms"
+    )
+    turn_priority_aging_seconds: float = Field(
+        default=30.0,
+        description="Seconds a queued turn waits before it is treated as one priority class "
+                    "more urgent (0 disables aging)"
+    )
+    tool_result_preview_threshold: int = Field(
+        default=0,
+        description="Tool results longer than this many characters are sent as a "
+                    "preview plus blob reference (0 disables elision)"
+    )
+    tool_result_preview_chars: int = Field(
+        default=2000,
+        description="Number of leading characters kept in an elided tool result preview"
+    )
+    image_max_edge: int = Field(
+        default=1568,
+        description="Longest edge in pixels of images sent to the model; larger images are "
+                    "downscaled (0 disables image preprocessing). Agents may override via image_limits"
+    )
+    image_format: str = Field(
+        default="webp",
+        description="Format preprocessed images are re-encoded to (webp or jpeg)"
+    )
+    image_quality: int = Field(
+        default=80,
+        description="Encoder quality (1-100) for preprocessed images"
+    )
+    image_cache_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Memory budget for cached preprocessed images, keyed by content hash"
+    )
 
 
 class StorageSettings(BaseSettings):
@@ -102,10 +145,22 @@ class StorageSettings(BaseSettings):
         default="history",
         description="Directory name for message history storage"
     )
+    blobs_dirname: str = Field(
+        default="blobs",
+        description="Directory name for the content-addressed blob store"
+    )
     database_filename: str = Field(
         default="users.db",
         description="Filename for the SQLite user database"
     )
+    webhook_inbox_filename: str = Field(
+        default="webhook_inbox.db",
+        description="Filename for the SQLite inbox of accepted platform webhooks"
+    )
+    platform_file_cache_filename: str = Field(
+        default="platform_files.db",
+        description="Filename for the SQLite cache of media already uploaded to platforms"
+    )
 
 
 class EmailSettings(BaseSettings):
@@ -160,6 +215,58 @@ class PlatformSettings(BaseSettings):
         default="You don't have access to this service. Please contact the administrator for access.",
         description="Message shown to users who are not whitelisted"
     )
+    dedup_ttl_seconds: float = Field(
+        default=3600.0,
+        description="Seconds a webhook message ID is remembered to drop re-deliveries"
+    )
+    dedup_persistent: bool = Field(
+        default=True,
+        description="Also record webhook message IDs in the inbox database so duplicates are caught across restarts"
+    )
+    inbox_concurrency: int = Field(
+        default=8,
+        description="Webhook inbox messages processed at the same time"
+    )
+    inbox_lease_seconds: float = Field(
+        default=60.0,
+        description="Seconds a claimed inbox message stays leased; renewed while its turn runs"
+    )
+    inbox_max_attempts: int = Field(
+        default=5,
+        description="Attempts before an inbox message is moved to the dead-letter table"
+    )
+    inbox_retry_base_seconds: float = Field(
+        default=5.0,
+        description="Backoff before the first retry of a failed inbox message; doubles per attempt"
+    )
+    http_timeout_seconds: float = Field(
+        default=30.0,
+        description="Read/write/pool timeout for platform API requests (uploads pass their own)"
+    )
+    http_connect_timeout_seconds: float = Field(
+        default=10.0,
+        description="Timeout for opening a connection to a platform API"
+    )
+    http_max_connections: int = Field(
+        default=16,
+        description="Connection pool size for hosts without a platform-specific pool size"
+    )
+    http_max_keepalive: int = Field(
+        default=16,
+        description="Idle keep-alive connections kept per host pool"
+    )
+    http_keepalive_seconds: float = Field(
+        default=60.0,
+        description="Seconds an idle platform connection is kept open for reuse"
+    )
+    http_connect_retries: int = Field(
+        default=2,
+        description="Retries of failed connection attempts (requests that reached the server are not retried)"
+    )
+    http2: bool = Field(
+        default=False,
+        description="Use HTTP/2 for platform APIs (requires the h2 package)"
+    )
 
 
 class Settings(BaseSettings):
@@ -218,6 +325,7 @@ def get_api_config() -> dict:
         "port": int(os.getenv("API_PORT", str(settings.api.port))),
         "reload": os.getenv("API_RELOAD", "false").lower() == "true",
         "log_level": os.getenv("API_LOG_LEVEL", settings.api.log_level),
+        "ws_per_message_deflate": settings.api.ws_per_message_deflate,
         "cors_origins": cors_origins,
         "api_key": api_key,
     }
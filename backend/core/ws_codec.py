@@ -0,0 +1,58 @@
+"""Wire encoding for WebSocket chat frames.
+
+Shared by the API server and the CLI WebSocket client. JSON frames are sent
+as text; MessagePack frames (optional ``msgpack`` dependency) are sent as
+binary. Decoding is driven by the frame type, so either side can always read
+a JSON text frame regardless of the negotiated encoding.
+"""
+import json
+from typing import Any
+
+from core.json_codec import dumps_json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_ENCODING = "json"
+MSGPACK_ENCODING = "msgpack"
+SUPPORTED_ENCODINGS = (JSON_ENCODING, MSGPACK_ENCODING)
+
+
+def is_encoding_available(encoding: str) -> bool:
+    """Whether the given encoding can be used in this environment."""
+    if encoding == JSON_ENCODING:
+        return True
+    if encoding == MSGPACK_ENCODING:
+        return msgpack is not None
+    return False
+
+
+def negotiate_encoding(requested: str | None) -> str:
+    """Return the requested encoding if usable, otherwise JSON."""
+    if requested and is_encoding_available(requested):
+        return requested
+    return JSON_ENCODING
+
+
+def encode_frame(data: dict[str, Any], encoding: str = JSON_ENCODING) -> str | bytes:
+    """Encode an event dict as a text (JSON) or binary (MessagePack) frame."""
+    if encoding == MSGPACK_ENCODING:
+        if msgpack is None:
+            raise ValueError("msgpack encoding requested but msgpack is not installed")
+        return msgpack.packb(data, use_bin_type=True, default=str)
+    return dumps_json(data)
+
+
+def decode_frame(frame: str | bytes) -> dict[str, Any]:
+    """Decode a frame: text frames are JSON, binary frames are MessagePack."""
+    if isinstance(frame, (bytes, bytearray)):
+        if msgpack is None:
+            raise ValueError("Received a binary frame but msgpack is not installed")
+        data = msgpack.unpackb(frame, raw=False)
+    else:
+        data = json.loads(frame)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected an object frame, got {type(data).__name__}")
+    return data
@@ -34,7 +34,6 @@ class IMessageAdapter(PlatformAdapter):
         self._server_url = os.environ["BLUEBUBBLES_SERVER_URL"].rstrip("/")
         self._password = os.environ["BLUEBUBBLES_PASSWORD"]
         self._webhook_secret = os.getenv("BLUEBUBBLES_WEBHOOK_SECRET", "")
-        self._client = httpx.AsyncClient(timeout=30.0)
         if not self._webhook_secret:
             logger.warning(
                 "BLUEBUBBLES_WEBHOOK_SECRET not set — webhook signature verification disabled. "
@@ -175,7 +174,8 @@ class IMessageAdapter(PlatformAdapter):
                 "method": "private-api",
             }
 
-            resp = await self._client.post(
+            resp = await self._post_limited(
+                chat_id,
                 f"{self._server_url}/api/v1/message/text",
                 json=payload,
                 params={"password": self._password},
@@ -188,7 +188,8 @@ class IMessageAdapter(PlatformAdapter):
                     f"retrying with apple-script method"
                 )
                 payload["method"] = "apple-script"
-                resp = await self._client.post(
+                resp = await self._post_limited(
+                    chat_id,
                     f"{self._server_url}/api/v1/message/text",
                     json=payload,
                     params={"password": self._password},
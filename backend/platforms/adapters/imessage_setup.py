@@ -21,6 +21,7 @@ async def setup_imessage_webhook(webhook_url: str) -> dict:
         BlueBubbles API response dict.
     """
     from platforms.adapters.imessage import IMessageAdapter
+    from platforms.http_clients import close_platform_http_client
 
     adapter = IMessageAdapter()
 
@@ -35,7 +36,7 @@ async def setup_imessage_webhook(webhook_url: str) -> dict:
     # Register webhook
     result = await adapter.register_webhook(webhook_url)
 
-    await adapter.aclose()
+    await close_platform_http_client()
     return result
 
 
@@ -12,6 +12,8 @@ from typing import Any
 import httpx
 
 from platforms.base import NormalizedMessage, NormalizedResponse, Platform, PlatformAdapter, split_message
+from platforms.file_cache import file_sha256, get_platform_file_cache
+from platforms.rate_limit import get_platform_rate_limiter, retry_after_header
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,14 @@ TELEGRAM_MAX_MESSAGE_LENGTH = 4096
 TELEGRAM_API_BASE = "https://api.telegram.org"
 
 
+def _uploaded_file_id(message: dict, kind: str) -> str | None:
+    """The reusable file_id of a sent photo (largest size) or document."""
+    media = message.get(kind)
+    if isinstance(media, list):
+        media = media[-1] if media else None
+    return media.get("file_id") if isinstance(media, dict) else None
+
+
 def _convert_markdown(text: str) -> str:
     """Convert Claude's markdown to Telegram MarkdownV2 format.
 
@@ -44,12 +54,12 @@ class TelegramAdapter(PlatformAdapter):
     """Adapter for the Telegram Bot API."""
 
     platform = Platform.TELEGRAM
+    supports_message_edit = True
 
     def __init__(self) -> None:
         self._bot_token = os.environ["TELEGRAM_BOT_TOKEN"]
         self._webhook_secret = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
         self._api_base = f"{TELEGRAM_API_BASE}/bot{self._bot_token}"
-        self._client = httpx.AsyncClient(timeout=30.0)
         if not self._webhook_secret:
             logger.warning(
                 "TELEGRAM_WEBHOOK_SECRET not set — webhook signature verification disabled. "
@@ -138,32 +148,63 @@ class TelegramAdapter(PlatformAdapter):
         chunks = split_message(response.text, TELEGRAM_MAX_MESSAGE_LENGTH)
 
         for chunk in chunks:
-            # Try sending with MarkdownV2 first, fall back to plain text
-            converted = _convert_markdown(chunk)
-            payload: dict = {
-                "chat_id": chat_id,
-                "text": converted,
-                "parse_mode": "MarkdownV2",
-            }
-
-            resp = await self._client.post(
-                f"{self._api_base}/sendMessage", json=payload
-            )
-
+            resp = await self._post_text(chat_id, "sendMessage", {"chat_id": chat_id}, chunk)
             if resp.status_code != 200:
-                # Retry without parse_mode if MarkdownV2 fails
-                logger.warning(
-                    f"Telegram sendMessage with MarkdownV2 failed ({resp.status_code}), "
-                    f"retrying plain text"
+                logger.error(
+                    f"Telegram sendMessage failed: {resp.status_code} {resp.text}"
                 )
-                payload = {"chat_id": chat_id, "text": chunk}
-                resp = await self._client.post(
-                    f"{self._api_base}/sendMessage", json=payload
-                )
-                if resp.status_code != 200:
-                    logger.error(
-                        f"Telegram sendMessage failed: {resp.status_code} {resp.text}"
-                    )
+
+    async def send_status(self, chat_id: str, text: str) -> str | None:
+        """Send a status message and return its message_id for later edits."""
+        text = text[:TELEGRAM_MAX_MESSAGE_LENGTH]
+        resp = await self._post_text(chat_id, "sendMessage", {"chat_id": chat_id}, text)
+        if resp.status_code != 200:
+            logger.error(f"Telegram status message failed: {resp.status_code} {resp.text}")
+            return None
+        try:
+            return str(resp.json()["result"]["message_id"])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    async def edit_status(self, chat_id: str, message_id: str, text: str) -> bool:
+        """Edit a status message in place via editMessageText."""
+        text = text[:TELEGRAM_MAX_MESSAGE_LENGTH]
+        payload = {"chat_id": chat_id, "message_id": int(message_id)}
+        resp = await self._post_text(chat_id, "editMessageText", payload, text)
+        if resp.status_code == 200:
+            return True
+        # Telegram rejects edits that leave the text unchanged.
+        if resp.status_code == 400 and "message is not modified" in resp.text:
+            return True
+        logger.warning(f"Telegram editMessageText failed: {resp.status_code} {resp.text}")
+        return False
+
+    async def _post_text(self, chat_id: str, method: str, payload: dict, text: str) -> httpx.Response:
+        """Post text with MarkdownV2, falling back to plain text if Telegram rejects it."""
+        resp = await self._post_limited(
+            chat_id,
+            f"{self._api_base}/{method}",
+            json={**payload, "text": _convert_markdown(text), "parse_mode": "MarkdownV2"},
+        )
+        if resp.status_code == 200 or "message is not modified" in resp.text:
+            return resp
+
+        logger.warning(
+            f"Telegram {method} with MarkdownV2 failed ({resp.status_code}), "
+            f"retrying plain text"
+        )
+        return await self._post_limited(
+            chat_id, f"{self._api_base}/{method}", json={**payload, "text": text}
+        )
+
+    def rate_limit_delay(self, resp: httpx.Response) -> float | None:
+        """Telegram reports the wait in the body's ``parameters.retry_after``."""
+        if resp.status_code != 429:
+            return None
+        try:
+            return float(resp.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            return retry_after_header(resp)
 
     def get_media_download_kwargs(self) -> dict[str, Any]:
         """Return kwargs for ``process_media_items()``."""
@@ -193,37 +234,54 @@ class TelegramAdapter(PlatformAdapter):
         filename: str,
         mime_type: str = "application/octet-stream",
     ) -> bool:
-        """Send a file to Telegram chat via sendDocument or sendPhoto."""
+        """Send a file to Telegram chat via sendDocument or sendPhoto.
+
+        Files sent before are re-sent by their cached ``file_id`` instead of
+        being uploaded again.
+        """
         try:
             file_size = os.path.getsize(file_path)
         except OSError:
             logger.warning(f"Cannot stat file for Telegram upload: {file_path}")
             return False
 
+        if mime_type.startswith("image/") and file_size <= 10 * 1024 * 1024:
+            # Images under 10MB → sendPhoto
+            kind, method = "photo", "sendPhoto"
+        elif file_size <= 50 * 1024 * 1024:
+            # Everything else under 50MB → sendDocument
+            kind, method = "document", "sendDocument"
+        else:
+            logger.info(f"File too large for Telegram ({file_size} bytes): {filename}")
+            return False
+
         try:
+            cache = get_platform_file_cache()
+            digest = await file_sha256(file_path)
+            if file_id := cache.get(self.platform, digest, kind):
+                resp = await self._post_limited(
+                    chat_id, f"{self._api_base}/{method}", json={"chat_id": chat_id, kind: file_id},
+                )
+                if resp.status_code == 200:
+                    logger.info(f"Sent cached file to Telegram: {filename}")
+                    return True
+                logger.info(f"Cached Telegram file_id rejected ({resp.status_code}), uploading {filename}")
+                cache.discard(self.platform, digest, kind)
+
+            # Uploads stream an open file, so they are paced but not retried.
+            await get_platform_rate_limiter().acquire(self.platform, chat_id)
             with open(file_path, "rb") as f:
-                if mime_type.startswith("image/") and file_size <= 10 * 1024 * 1024:
-                    # Images under 10MB → sendPhoto
-                    resp = await self._client.post(
-                        f"{self._api_base}/sendPhoto",
-                        data={"chat_id": chat_id},
-                        files={"photo": (filename, f, mime_type)},
-                        timeout=120.0,
-                    )
-                elif file_size <= 50 * 1024 * 1024:
-                    # Everything else under 50MB → sendDocument
-                    resp = await self._client.post(
-                        f"{self._api_base}/sendDocument",
-                        data={"chat_id": chat_id},
-                        files={"document": (filename, f, mime_type)},
-                        timeout=120.0,
-                    )
-                else:
-                    logger.info(f"File too large for Telegram ({file_size} bytes): {filename}")
-                    return False
+                resp = await self._client.post(
+                    f"{self._api_base}/{method}",
+                    data={"chat_id": chat_id},
+                    files={kind: (filename, f, mime_type)},
+                    timeout=120.0,
+                )
 
             if resp.status_code == 200:
                 logger.info(f"Sent file to Telegram: {filename}")
+                if file_id := _uploaded_file_id(resp.json().get("result", {}), kind):
+                    cache.put(self.platform, digest, kind, file_id)
                 return True
             else:
                 logger.error(f"Telegram file upload failed: {resp.status_code} {resp.text}")
@@ -14,7 +14,9 @@ from typing import Any
 
 import httpx
 
-from platforms.base import NormalizedMessage, NormalizedResponse, Platform, PlatformAdapter
+from platforms.base import NormalizedMessage, NormalizedResponse, Platform, PlatformAdapter, split_message
+from platforms.file_cache import file_sha256, get_platform_file_cache
+from platforms.rate_limit import DEFAULT_RETRY_AFTER, retry_after_header
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,13 @@ WHATSAPP_MAX_MESSAGE_LENGTH = 4096
 GRAPH_API_VERSION = "v20.0"
 GRAPH_API_BASE = f"https://graph.facebook.com/{GRAPH_API_VERSION}"
 
+# Graph API error codes that mean "slow down", with the wait to apply.
+_WA_RATE_LIMIT_ERRORS: dict[int, float] = {
+    130429: DEFAULT_RETRY_AFTER,  # cloud API throughput reached
+    131056: 6.0,                  # business/user pair rate limit
+    80007: DEFAULT_RETRY_AFTER,   # WABA rate limit
+}
+
 # MIME types WhatsApp accepts for media upload.
 # Unsupported types are uploaded as application/octet-stream (generic document).
 _WA_SUPPORTED_MIMES = {
@@ -48,10 +57,7 @@ class WhatsAppAdapter(PlatformAdapter):
         self._access_token = os.environ["WHATSAPP_ACCESS_TOKEN"]
         self._verify_token = os.getenv("WHATSAPP_VERIFY_TOKEN", "")
         self._app_secret = os.getenv("WHATSAPP_APP_SECRET", "")
-        self._client = httpx.AsyncClient(
-            timeout=30.0,
-            headers={"Authorization": f"Bearer {self._access_token}"},
-        )
+        self._auth_headers = {"Authorization": f"Bearer {self._access_token}"}
         # Track last message timestamp per chat for 24h window
         self._last_message_ts: dict[str, float] = {}
         # Track last inbound message_id per chat for read receipts
@@ -218,31 +224,31 @@ class WhatsAppAdapter(PlatformAdapter):
         return text
 
     async def send_response(self, chat_id: str, response: NormalizedResponse) -> None:
-        """Send a text message via WhatsApp Cloud API."""
+        """Send a text message via WhatsApp Cloud API, splitting if needed."""
         # Mark the last inbound message as read
         last_msg_id = self._last_message_id.get(chat_id)
         if last_msg_id:
             await self._mark_as_read(last_msg_id)
 
         text = self._format_text(response.text)
-        if len(text) > WHATSAPP_MAX_MESSAGE_LENGTH:
-            text = text[:WHATSAPP_MAX_MESSAGE_LENGTH - 3] + "..."
-
-        payload = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": chat_id,
-            "type": "text",
-            "text": {"preview_url": False, "body": text},
-        }
+        for chunk in split_message(text, WHATSAPP_MAX_MESSAGE_LENGTH):
+            payload = {
+                "messaging_product": "whatsapp",
+                "recipient_type": "individual",
+                "to": chat_id,
+                "type": "text",
+                "text": {"preview_url": False, "body": chunk},
+            }
 
-        resp = await self._client.post(
-            f"{GRAPH_API_BASE}/{self._phone_number_id}/messages",
-            json=payload,
-        )
+            resp = await self._post_limited(
+                chat_id,
+                f"{GRAPH_API_BASE}/{self._phone_number_id}/messages",
+                json=payload,
+                headers=self._auth_headers,
+            )
 
-        if resp.status_code != 200:
-            logger.error(f"WhatsApp sendMessage failed: {resp.status_code} {resp.text}")
+            if resp.status_code != 200:
+                logger.error(f"WhatsApp sendMessage failed: {resp.status_code} {resp.text}")
 
     async def send_file(
         self,
@@ -251,7 +257,11 @@ class WhatsAppAdapter(PlatformAdapter):
         filename: str,
         mime_type: str = "application/octet-stream",
     ) -> bool:
-        """Send a file to WhatsApp via media upload + message send."""
+        """Send a file to WhatsApp via media upload + message send.
+
+        Media uploaded before (same content) is re-sent by its cached media
+        ID, skipping the upload.
+        """
         try:
             file_size = os.path.getsize(file_path)
         except OSError:
@@ -265,12 +275,32 @@ class WhatsAppAdapter(PlatformAdapter):
 
         upload_mime = mime_type if mime_type in _WA_SUPPORTED_MIMES else "application/octet-stream"
 
+        if upload_mime.startswith("image/"):
+            msg_type = "image"
+        elif upload_mime.startswith("video/"):
+            msg_type = "video"
+        elif upload_mime.startswith("audio/"):
+            msg_type = "audio"
+        else:
+            msg_type = "document"
+
         try:
+            cache = get_platform_file_cache()
+            digest = await file_sha256(file_path)
+            if media_id := cache.get(self.platform, digest, msg_type):
+                send_resp = await self._send_media_message(chat_id, msg_type, media_id, filename)
+                if send_resp.status_code == 200:
+                    logger.info(f"Sent cached file to WhatsApp: {filename}")
+                    return True
+                logger.info(f"Cached WhatsApp media ID rejected ({send_resp.status_code}), uploading {filename}")
+                cache.discard(self.platform, digest, msg_type)
+
             with open(file_path, "rb") as f:
                 upload_resp = await self._client.post(
                     f"{GRAPH_API_BASE}/{self._phone_number_id}/media",
                     data={"messaging_product": "whatsapp"},
                     files={"file": (filename, f, upload_mime)},
+                    headers=self._auth_headers,
                     timeout=120.0,
                 )
 
@@ -282,32 +312,9 @@ class WhatsAppAdapter(PlatformAdapter):
             if not media_id:
                 logger.error("WhatsApp media upload returned no media ID")
                 return False
+            cache.put(self.platform, digest, msg_type, media_id)
 
-            if upload_mime.startswith("image/"):
-                msg_type = "image"
-            elif upload_mime.startswith("video/"):
-                msg_type = "video"
-            elif upload_mime.startswith("audio/"):
-                msg_type = "audio"
-            else:
-                msg_type = "document"
-
-            media_payload: dict[str, Any] = {"id": media_id}
-            if msg_type == "document":
-                media_payload["filename"] = filename
-
-            payload = {
-                "messaging_product": "whatsapp",
-                "recipient_type": "individual",
-                "to": chat_id,
-                "type": msg_type,
-                msg_type: media_payload,
-            }
-
-            send_resp = await self._client.post(
-                f"{GRAPH_API_BASE}/{self._phone_number_id}/messages",
-                json=payload,
-            )
+            send_resp = await self._send_media_message(chat_id, msg_type, media_id, filename)
 
             if send_resp.status_code == 200:
                 logger.info(f"Sent file to WhatsApp: {filename}")
@@ -320,6 +327,38 @@ class WhatsAppAdapter(PlatformAdapter):
             logger.error(f"WhatsApp file send error: {e}")
             return False
 
+    async def _send_media_message(self, chat_id: str, msg_type: str, media_id: str, filename: str) -> httpx.Response:
+        """Send a message referencing uploaded media."""
+        media_payload: dict[str, Any] = {"id": media_id}
+        if msg_type == "document":
+            media_payload["filename"] = filename
+
+        payload = {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": chat_id,
+            "type": msg_type,
+            msg_type: media_payload,
+        }
+
+        return await self._post_limited(
+            chat_id,
+            f"{GRAPH_API_BASE}/{self._phone_number_id}/messages",
+            json=payload,
+            headers=self._auth_headers,
+        )
+
+    def rate_limit_delay(self, resp: httpx.Response) -> float | None:
+        """Graph API rate limits arrive as 429 or as error codes on a 400."""
+        delay = retry_after_header(resp)
+        if delay is not None or resp.status_code != 400:
+            return delay
+        try:
+            code = resp.json()["error"]["code"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        return _WA_RATE_LIMIT_ERRORS.get(code)
+
     def get_media_download_kwargs(self) -> dict[str, Any]:
         """Return kwargs for ``process_media_items()``."""
         return {
@@ -342,6 +381,7 @@ class WhatsAppAdapter(PlatformAdapter):
                     "status": "read",
                     "message_id": message_id,
                 },
+                headers=self._auth_headers,
             )
         except Exception as e:
             logger.debug(f"Failed to mark message as read: {e}")
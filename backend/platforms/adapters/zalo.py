@@ -8,8 +8,6 @@ import logging
 import os
 import re
 
-import httpx
-
 from platforms.base import NormalizedMessage, NormalizedResponse, Platform, PlatformAdapter
 
 logger = logging.getLogger(__name__)
@@ -25,7 +23,6 @@ class ZaloAdapter(PlatformAdapter):
     def __init__(self) -> None:
         self._access_token = os.environ["ZALO_OA_ACCESS_TOKEN"]
         self._app_secret = os.getenv("ZALO_APP_SECRET", "")
-        self._client = httpx.AsyncClient(timeout=30.0)
 
     def _auth_headers(self) -> dict[str, str]:
         """Build authorization headers with the current access token."""
@@ -110,7 +107,8 @@ class ZaloAdapter(PlatformAdapter):
             "message": {"text": self._format_text(response.text)},
         }
 
-        resp = await self._client.post(
+        resp = await self._post_limited(
+            chat_id,
             f"{ZALO_OA_API_BASE}/message/cs",
             json=payload,
             headers=self._auth_headers(),
@@ -4,13 +4,18 @@ Defines the interface that all platform adapters must implement, plus
 shared data types and utilities for normalized inbound/outbound messages.
 """
 
+import re
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
 from enum import StrEnum
 from typing import Any
 
 import httpx
 
+from platforms.http_clients import get_platform_http_client, is_platform_http_client
+from platforms.rate_limit import get_platform_rate_limiter, retry_after_header
+
 
 class Platform(StrEnum):
     """Supported messaging platforms."""
@@ -51,34 +56,163 @@ class NormalizedResponse:
     media: list[dict] = field(default_factory=list)
 
 
+# Fenced code block delimiter lines (``` or ~~~, up to three spaces of indent).
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})([^\n]*)$", re.MULTILINE)
+# Inline entities a word-boundary split must not cut: code spans, bold,
+# underline, strikethrough and links. They never span lines.
+_INLINE_ENTITY_RE = re.compile(
+    r"`[^`\n]+`|\*\*[^*\n]+\*\*|__[^_\n]+__|~~[^~\n]+~~|\[[^\]\n]*\]\([^)\n]*\)"
+)
+# Split separators in order of preference, with the characters they consume.
+_SPLIT_SEPARATORS = (("\n\n", 2), ("\n", 1), (" ", 1))
+
+
+@dataclass(slots=True)
+class _Fence:
+    """A fenced code block: its opening line and where its closing line sits."""
+
+    open_start: int
+    body_start: int
+    close_start: int
+    close_end: int
+    opener: str
+    marker: str
+
+
+def _find_fences(text: str) -> list[_Fence]:
+    """Pair fence lines into code blocks in one pass; an unclosed block runs to the end."""
+    fences: list[_Fence] = []
+    current: tuple[int, int, str, str] | None = None
+    for match in _FENCE_RE.finditer(text):
+        marker, info = match.group(1), match.group(2)
+        if current is None:
+            body_start = min(match.end() + 1, len(text))
+            current = (match.start(), body_start, match.group(0), marker)
+        elif marker[0] == current[3][0] and len(marker) >= len(current[3]) and not info.strip():
+            fences.append(_Fence(current[0], current[1], match.start(), match.end(), current[2], current[3]))
+            current = None
+    if current is not None:
+        fences.append(_Fence(current[0], current[1], len(text), len(text), current[2], current[3]))
+    return fences
+
+
+def _last_space_outside_entities(text: str, scan_start: int, lo: int, hi: int, scan_end: int) -> int:
+    """Last space in (lo, hi) that does not fall inside an inline entity, or -1.
+
+    Entities are matched from scan_start, which must not lie inside one.
+    """
+    pos = text.rfind(" ", lo + 1, hi)
+    if pos < 0:
+        return pos
+    line_start = max(scan_start, text.rfind("\n", scan_start, pos) + 1)
+    line_end = text.find("\n", pos, scan_end)
+    spans = [m.span() for m in _INLINE_ENTITY_RE.finditer(text, line_start, scan_end if line_end < 0 else line_end)]
+    for span_start, span_end in reversed(spans):
+        if pos < 0:
+            break
+        if span_start < pos < span_end:
+            pos = text.rfind(" ", lo + 1, span_start)
+    return pos
+
+
+def _find_break(
+    text: str, start: int, lo: int, hi: int, fences: list[_Fence], scan_end: int
+) -> tuple[int, int]:
+    """Best split point in (lo, hi) outside code blocks, as (position, consumed), or (-1, 0).
+
+    ``start`` is where the chunk begins; inline entities are matched from there.
+    """
+    # Gaps between the code blocks overlapping the window, right to left.
+    gaps: list[tuple[int, int]] = []
+    gap_end = hi
+    index = bisect_left(fences, hi, key=lambda f: f.open_start) - 1
+    while index >= 0 and fences[index].close_end > lo:
+        fence = fences[index]
+        if fence.close_end < gap_end:
+            gaps.append((fence.close_end, gap_end))
+        gap_end = min(gap_end, fence.open_start)
+        index -= 1
+    if gap_end > lo:
+        gaps.append((start, gap_end))
+
+    for separator, consumed in _SPLIT_SEPARATORS:
+        for gap_lo, gap_hi in gaps:
+            if separator == " ":
+                pos = _last_space_outside_entities(text, gap_lo, max(lo, gap_lo - 1), gap_hi, scan_end)
+            else:
+                pos = text.rfind(separator, max(lo + 1, gap_lo), gap_hi)
+            if pos > lo:
+                return pos, consumed
+    return -1, 0
+
+
+def _fence_at(fences: list[_Fence], pos: int) -> _Fence | None:
+    """The code block whose body contains pos, if any."""
+    index = bisect_right(fences, pos, key=lambda f: f.open_start) - 1
+    if index >= 0 and fences[index].body_start <= pos < fences[index].close_start:
+        return fences[index]
+    return None
+
+
 def split_message(text: str, max_length: int) -> list[str]:
     """Split a long message into chunks respecting a character limit.
 
     Tries to split on paragraph boundaries first, then line boundaries,
-    then word boundaries, and falls back to hard wrapping.
+    then word boundaries, and falls back to hard wrapping. Split points
+    are only accepted in the second half of a chunk.
+
+    The text is scanned by index without re-slicing the remainder, so
+    very long outputs split in linear time. Splits are markdown-aware:
+    word boundaries inside inline code, bold or links are skipped, and
+    code blocks are kept whole when they fit in a chunk. A code block
+    longer than a chunk is closed at the end of one chunk and reopened
+    with the same fence and language at the start of the next.
     """
     if len(text) <= max_length:
         return [text]
 
+    fences = _find_fences(text)
     chunks: list[str] = []
-    remaining = text
+    start = 0
+    reopen = ""
 
-    while remaining:
-        if len(remaining) <= max_length:
-            chunks.append(remaining)
+    while start < len(text):
+        budget = max_length - len(reopen)
+        if len(text) - start <= budget:
+            chunks.append(reopen + text[start:])
             break
 
-        # Try progressively less-ideal split points
-        for separator, skip_len in [("\n\n", 2), ("\n", 1), (" ", 1)]:
-            split_pos = remaining.rfind(separator, 0, max_length)
-            if split_pos > max_length // 2:
-                chunks.append(remaining[:split_pos])
-                remaining = remaining[split_pos + skip_len:]
-                break
+        lo, hi = start + budget // 2, start + budget
+        fence = None
+        pos, consumed = _find_break(text, start, lo, hi, fences, hi + max_length)
+        if pos < 0:
+            # No break outside a code block: split inside the block under the window end.
+            fence = _fence_at(fences, hi - 1)
+            if fence is not None and len(fence.opener) + len(fence.marker) + 2 > max_length // 2:
+                fence = None  # Fence lines too long to repeat in every chunk.
+            fence_hi = min(hi - len(fence.marker) - 1, fence.close_start) if fence is not None else hi
+            if fence is not None and fence_hi > max(start, fence.body_start):
+                fence_lo = max(lo, fence.body_start)
+                pos, consumed = _find_break(text, max(start, fence.body_start), fence_lo, fence_hi, [], fence_hi)
+                if pos < 0:
+                    pos, consumed = fence_hi, 0
+            else:
+                fence = None
+                pos, consumed = hi, 0
+
+        if fence is None:
+            chunk = reopen + text[start:pos]
+            reopen = ""
         else:
-            # Hard split as last resort
-            chunks.append(remaining[:max_length])
-            remaining = remaining[max_length:]
+            chunk = reopen + text[start:pos] + "\n" + fence.marker
+            reopen = fence.opener + "\n"
+        start = pos + consumed
+        if fence is not None and start >= fence.close_start:
+            # The rest of the block is just its closing line, which this chunk replaced.
+            reopen = ""
+            start = fence.close_end + 1
+        if chunk:
+            chunks.append(chunk)
 
     return chunks
 
@@ -89,11 +223,28 @@ class PlatformAdapter(ABC):
     Each adapter handles parsing inbound webhooks, verifying signatures,
     and sending responses back through the platform's API.
 
-    Subclasses that hold an httpx.AsyncClient should store it as
-    ``self._client`` so the default ``aclose()`` can clean it up.
+    Adapters reach the API through ``self._client``, which resolves the
+    shared client from ``get_platform_http_client()`` on every use, so a
+    cached adapter picks up the new client after the shared one was closed
+    and rebuilt. Assigning ``self._client`` gives the adapter its own
+    client instead; the default ``aclose()`` closes only that one.
     """
 
     platform: Platform
+    # Whether send_status/edit_status can keep one message updated in place.
+    supports_message_edit: bool = False
+    # Adapter-specific client assigned through ``_client``; None uses the shared client.
+    _own_client: httpx.AsyncClient | None = None
+
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        if self._own_client is not None:
+            return self._own_client
+        return get_platform_http_client()
+
+    @_client.setter
+    def _client(self, client: httpx.AsyncClient | None) -> None:
+        self._own_client = client
 
     @abstractmethod
     def parse_inbound(self, raw_payload: dict) -> NormalizedMessage | None:
@@ -110,6 +261,21 @@ class PlatformAdapter(ABC):
     async def send_response(self, chat_id: str, response: NormalizedResponse) -> None:
         """Send a response message back to the platform chat."""
 
+    async def send_status(self, chat_id: str, text: str) -> str | None:
+        """Send a message that will later be edited; returns its message ID.
+
+        Override together with ``edit_status`` in adapters that support
+        editing sent messages. Returns None when unsupported or on failure.
+        """
+        return None
+
+    async def edit_status(self, chat_id: str, message_id: str, text: str) -> bool:
+        """Replace the text of a message sent with ``send_status``.
+
+        Returns True if the message now shows text.
+        """
+        return False
+
     async def send_typing_indicator(self, chat_id: str) -> None:
         """Send a typing/composing indicator to the platform chat.
 
@@ -138,8 +304,22 @@ class PlatformAdapter(ABC):
         """
         return False
 
+    def rate_limit_delay(self, resp: httpx.Response) -> float | None:
+        """Seconds to wait if resp is a rate-limit rejection, else None.
+
+        Default honors HTTP 429 with Retry-After. Override for platforms that
+        signal rate limits differently.
+        """
+        return retry_after_header(resp)
+
+    async def _post_limited(self, chat_id: str | None, url: str, **kwargs) -> httpx.Response:
+        """POST a chat-bound request under the platform's outbound rate limits."""
+        return await get_platform_rate_limiter().post(
+            self._client, self.platform, chat_id, url, self.rate_limit_delay, **kwargs
+        )
+
     async def aclose(self) -> None:
-        """Close underlying HTTP client if present."""
-        client: httpx.AsyncClient | None = getattr(self, "_client", None)
-        if client is not None:
+        """Close the adapter's own HTTP client, if it has one besides the shared client."""
+        client = self._own_client
+        if client is not None and not is_platform_http_client(client):
             await client.aclose()
@@ -0,0 +1,79 @@
+"""Time-bucketed TTL set for webhook deduplication.
+
+Platforms re-deliver webhooks aggressively when we answer slowly, so the
+duplicate check sits on the hot path. Keys are remembered for ``ttl``
+seconds. Instead of scanning the whole map to purge, each key is filed in
+the time bucket in which it expires; expiry pops whole buckets off the
+front of a deque, so inserts, lookups and expiry are O(1) amortized. Keys
+may outlive their TTL by up to one bucket width.
+"""
+import time
+from collections import deque
+from collections.abc import Callable
+
+from core.settings import get_settings
+
+# Width of one expiry bucket in seconds.
+DEDUP_BUCKET_SECONDS = 60.0
+
+
+class TTLDedup:
+    """Remembers keys for a TTL; ``check_and_add`` is the duplicate test."""
+
+    __slots__ = ("_ttl", "_bucket_seconds", "_clock", "_expiry", "_buckets")
+
+    def __init__(
+        self,
+        ttl: float,
+        bucket_seconds: float = DEDUP_BUCKET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl = ttl
+        self._bucket_seconds = bucket_seconds
+        self._clock = clock
+        self._expiry: dict[str, int] = {}  # key -> expiry bucket
+        self._buckets: deque[tuple[int, list[str]]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def __contains__(self, key: str) -> bool:
+        self._expire(self._clock())
+        return key in self._expiry
+
+    def check_and_add(self, key: str) -> bool:
+        """Return True if key was seen within the TTL; otherwise remember it."""
+        now = self._clock()
+        self._expire(now)
+        if key in self._expiry:
+            return True
+        bucket = int((now + self._ttl) // self._bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != bucket:
+            self._buckets.append((bucket, []))
+        self._buckets[-1][1].append(key)
+        self._expiry[key] = bucket
+        return False
+
+    def discard(self, key: str) -> None:
+        """Forget key, e.g. when the message it guards could not be accepted."""
+        self._expiry.pop(key, None)
+
+    def _expire(self, now: float) -> None:
+        current = int(now // self._bucket_seconds)
+        while self._buckets and self._buckets[0][0] < current:
+            bucket, keys = self._buckets.popleft()
+            for key in keys:
+                # A discarded and re-added key lives in a later bucket.
+                if self._expiry.get(key) == bucket:
+                    del self._expiry[key]
+
+
+_webhook_dedup: TTLDedup | None = None
+
+
+def get_webhook_dedup() -> TTLDedup:
+    """Get the global webhook TTLDedup singleton instance."""
+    global _webhook_dedup
+    if _webhook_dedup is None:
+        _webhook_dedup = TTLDedup(get_settings().platform.dedup_ttl_seconds)
+    return _webhook_dedup
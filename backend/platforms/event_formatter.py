@@ -9,9 +9,6 @@ import re
 
 from core.settings import get_settings
 
-# Delay between message sends to avoid platform rate limits (seconds)
-MESSAGE_SEND_DELAY = 0.3
-
 # Max chars for previews
 _MAX_PREVIEW = 300
 _MAX_RESULT_PREVIEW = 500
@@ -0,0 +1,136 @@
+"""Cache of files already uploaded to a platform.
+
+Agents often send the same report or image more than once. Telegram and
+WhatsApp hand back a reusable reference for every upload: a Telegram
+``file_id`` or a WhatsApp media ID. This cache maps (platform, file
+SHA-256, kind) to that reference, so repeated deliveries send the
+reference instead of uploading the bytes again. ``kind`` is the send
+method, e.g. ``photo`` or ``document``, because Telegram photo and
+document IDs are not interchangeable.
+
+Entries expire with the platform's retention for uploaded media. A
+reference that the platform rejects early is discarded, and the file is
+uploaded again. Entries are stored in a small SQLite database, so they
+survive restarts.
+"""
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from agent.core.storage import get_data_dir
+from core.settings import get_settings
+from platforms.base import Platform
+
+logger = logging.getLogger(__name__)
+
+# Seconds an uploaded media reference stays reusable, per platform.
+# WhatsApp deletes uploaded media after 30 days; Telegram file_ids do not expire.
+PLATFORM_MEDIA_RETENTION: dict[Platform, float] = {
+    Platform.WHATSAPP: 29 * 24 * 3600.0,
+    Platform.TELEGRAM: 365 * 24 * 3600.0,
+}
+
+# Bytes read per chunk when hashing a file.
+HASH_CHUNK_BYTES = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS platform_files (
+    platform TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    media_ref TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (platform, sha256, kind)
+);
+"""
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file, hashed off the event loop."""
+    return await asyncio.to_thread(_sha256_file, path)
+
+
+class PlatformFileCache:
+    """SQLite-backed (platform, sha256, kind) → media reference map with expiry."""
+
+    def __init__(self, db_path: Path | str, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, platform: Platform, sha256: str, kind: str) -> str | None:
+        """Return the cached reference, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT media_ref, expires_at FROM platform_files WHERE platform = ? AND sha256 = ? AND kind = ?",
+                (platform.value, sha256, kind),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= self._clock():
+                self._conn.execute(
+                    "DELETE FROM platform_files WHERE platform = ? AND sha256 = ? AND kind = ?",
+                    (platform.value, sha256, kind),
+                )
+                return None
+            return row[0]
+
+    def put(self, platform: Platform, sha256: str, kind: str, media_ref: str) -> None:
+        """Remember an upload's reference for the platform's retention period."""
+        retention = PLATFORM_MEDIA_RETENTION.get(platform)
+        if not retention:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO platform_files (platform, sha256, kind, media_ref, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (platform.value, sha256, kind, media_ref, self._clock() + retention),
+            )
+
+    def discard(self, platform: Platform, sha256: str, kind: str) -> None:
+        """Forget a reference the platform no longer accepts."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM platform_files WHERE platform = ? AND sha256 = ? AND kind = ?",
+                (platform.value, sha256, kind),
+            )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries. Returns the number removed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM platform_files WHERE expires_at <= ?", (self._clock(),))
+            return cursor.rowcount
+
+
+_platform_file_cache: PlatformFileCache | None = None
+
+
+def get_platform_file_cache() -> PlatformFileCache:
+    """Get the global PlatformFileCache singleton instance."""
+    global _platform_file_cache
+    if _platform_file_cache is None:
+        data_dir = get_data_dir()
+        data_dir.mkdir(parents=True, exist_ok=True)
+        _platform_file_cache = PlatformFileCache(data_dir / get_settings().storage.platform_file_cache_filename)
+        _platform_file_cache.purge_expired()
+    return _platform_file_cache
@@ -0,0 +1,93 @@
+"""Shared HTTP client for platform adapters.
+
+Each adapter used to open its own ``httpx.AsyncClient`` with default
+limits. Media downloads and file uploads then opened more connections
+next to it, and webhook bursts churned through TLS handshakes. Every
+adapter now uses one shared client, and media downloads and file
+deliveries reuse it through the adapter. That gives:
+
+- a connection pool per platform host, sized for its traffic, with tuned
+  keep-alive
+- the same timeouts everywhere (a short connect timeout and a longer
+  read timeout)
+- automatic retries of failed connection attempts; requests that reached
+  the server are never retried here, and 429s are left to the rate limiter
+- HTTP/2 when enabled and the ``h2`` package is installed
+
+The client is created on first use and closed at shutdown through
+``close_platform_http_client()``. Adapters do not close it themselves.
+"""
+import importlib.util
+import logging
+
+import httpx
+
+from core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Connection pool size per platform API host; other hosts (media CDNs,
+# BlueBubbles servers) use PlatformSettings.http_max_connections.
+PLATFORM_HOST_POOL_SIZES: dict[str, int] = {
+    "api.telegram.org": 32,
+    "graph.facebook.com": 32,
+    "openapi.zalo.me": 16,
+}
+
+
+def _http2_enabled(requested: bool) -> bool:
+    if requested and importlib.util.find_spec("h2") is None:
+        logger.warning("PLATFORM_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return requested
+
+
+def _transport(max_connections: int, http2: bool) -> httpx.AsyncHTTPTransport:
+    settings = get_settings().platform
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_connections, settings.http_max_keepalive),
+            keepalive_expiry=settings.http_keepalive_seconds,
+        ),
+        http2=http2,
+        retries=settings.http_connect_retries,
+    )
+
+
+def build_platform_http_client() -> httpx.AsyncClient:
+    """Build a client with per-host pools and the platform timeout policy."""
+    settings = get_settings().platform
+    http2 = _http2_enabled(settings.http2)
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.http_timeout_seconds, connect=settings.http_connect_timeout_seconds),
+        transport=_transport(settings.http_max_connections, http2),
+        mounts={
+            f"all://{host}": _transport(pool_size, http2)
+            for host, pool_size in PLATFORM_HOST_POOL_SIZES.items()
+        },
+    )
+
+
+_platform_http_client: httpx.AsyncClient | None = None
+
+
+def get_platform_http_client() -> httpx.AsyncClient:
+    """Get the shared platform HTTP client, creating it on first use."""
+    global _platform_http_client
+    if _platform_http_client is None or _platform_http_client.is_closed:
+        _platform_http_client = build_platform_http_client()
+    return _platform_http_client
+
+
+def is_platform_http_client(client: httpx.AsyncClient) -> bool:
+    """Whether ``client`` is the shared client (which adapters must not close)."""
+    return client is _platform_http_client
+
+
+async def close_platform_http_client() -> None:
+    """Close the shared client and its connection pools."""
+    global _platform_http_client
+    client, _platform_http_client = _platform_http_client, None
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,383 @@
+"""Durable inbox for accepted platform webhooks.
+
+The webhook router writes each accepted message to a local SQLite inbox
+before it answers 200, so a restart or crash mid-turn no longer loses it.
+An InboxDispatcher claims messages with a lease, runs them through the
+platform worker, and deletes them when the turn completes. The lease is
+renewed while the turn runs; if the process dies, the lease lapses and the
+message is claimed again after restart.
+
+Messages that fail before their agent turn starts (setup, media download,
+SDK connect) are retried with exponential backoff. A message that fails
+``max_attempts`` times is moved to the ``dead_letter`` table for
+inspection instead of being retried forever. A turn that fails once it
+has started is dead-lettered straight away: retrying it would append the
+user message again, repeat replies and re-run tools.
+
+Enqueueing with a ``dedup_ttl`` also records the platform message ID in
+``seen_messages``, so re-deliveries are dropped even across restarts.
+"""
+import asyncio
+import dataclasses
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from agent.core.storage import get_data_dir
+from core.settings import get_settings
+from platforms.adapters import get_adapter
+from platforms.base import NormalizedMessage, Platform
+from platforms.worker import TurnFailedError, process_platform_message
+
+logger = logging.getLogger(__name__)
+
+# Idle dispatcher re-checks for retries that became due this often.
+INBOX_POLL_INTERVAL = 1.0
+# Retry backoff never exceeds this many seconds.
+INBOX_MAX_BACKOFF = 900.0
+# Expired seen-message keys are purged once per this many enqueues.
+SEEN_PURGE_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    platform TEXT NOT NULL,
+    message_key TEXT,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inbox_available ON inbox (available_at);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    message_key TEXT,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seen_messages (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_messages_expiry ON seen_messages (expires_at);
+"""
+
+
+@dataclass(slots=True)
+class InboxItem:
+    """A claimed inbox message."""
+    id: int
+    message: NormalizedMessage
+    attempts: int
+
+
+def _dump_message(msg: NormalizedMessage) -> str:
+    return json.dumps(dataclasses.asdict(msg))
+
+
+def _load_message(raw: str) -> NormalizedMessage:
+    data = json.loads(raw)
+    data["platform"] = Platform(data["platform"])
+    return NormalizedMessage(**data)
+
+
+class WebhookInbox:
+    """SQLite-backed queue of webhook messages with leases and a dead-letter table.
+
+    Calls are short synchronous transactions on one connection (WAL mode),
+    cheap enough to run on the event loop before a webhook is acknowledged.
+    """
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._max_attempts = max_attempts
+        self._retry_base = retry_base_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._enqueued = 0
+        self._conn = sqlite3.connect(str(db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def max_attempts(self) -> int:
+        return self._max_attempts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(
+        self,
+        msg: NormalizedMessage,
+        message_key: str | None = None,
+        dedup_ttl: float | None = None,
+    ) -> int | None:
+        """Persist an accepted message. Returns its inbox ID.
+
+        With a message_key and dedup_ttl, returns None instead if the same
+        platform message was enqueued within the TTL.
+        """
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if message_key and dedup_ttl:
+                    self._enqueued += 1
+                    if self._enqueued % SEEN_PURGE_EVERY == 0:
+                        self._conn.execute("DELETE FROM seen_messages WHERE expires_at < ?", (now,))
+                    # Inserts a new key or revives an expired one; a live key changes nothing.
+                    cursor = self._conn.execute(
+                        "INSERT INTO seen_messages (key, expires_at) VALUES (?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at "
+                        "WHERE seen_messages.expires_at < ?",
+                        (f"{msg.platform}:{message_key}", now + dedup_ttl, now),
+                    )
+                    if cursor.rowcount == 0:
+                        self._conn.execute("COMMIT")
+                        return None
+                cursor = self._conn.execute(
+                    "INSERT INTO inbox (platform, message_key, payload, available_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (str(msg.platform), message_key, _dump_message(msg), now, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.lastrowid
+
+    def claim(self, lease_seconds: float) -> InboxItem | None:
+        """Lease the oldest message that is due and not leased by anyone else."""
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, payload, attempts FROM inbox "
+                    "WHERE available_at <= ? AND (lease_until IS NULL OR lease_until < ?) "
+                    "ORDER BY available_at, id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE inbox SET lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                        (now + lease_seconds, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        try:
+            message = _load_message(row[1])
+        except (ValueError, TypeError, KeyError) as e:
+            self.fail(row[0], f"Unreadable payload: {e}", dead=True)
+            return None
+        return InboxItem(id=row[0], message=message, attempts=row[2] + 1)
+
+    def renew(self, item_id: int, lease_seconds: float) -> None:
+        """Extend the lease of a message that is still being processed."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE inbox SET lease_until = ? WHERE id = ?",
+                (self._clock() + lease_seconds, item_id),
+            )
+
+    def complete(self, item_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM inbox WHERE id = ?", (item_id,))
+
+    def release(self, item_id: int) -> None:
+        """Give a message back without counting the attempt (e.g. on shutdown)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE inbox SET lease_until = NULL, attempts = MAX(attempts - 1, 0) WHERE id = ?",
+                (item_id,),
+            )
+
+    def fail(self, item_id: int, error: str, dead: bool = False) -> None:
+        """Schedule a retry with backoff, or dead-letter after the last attempt."""
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT attempts FROM inbox WHERE id = ?", (item_id,)).fetchone()
+                if row is None:
+                    # Already completed or dead-lettered elsewhere.
+                    logger.debug(f"Webhook inbox message {item_id} no longer queued")
+                elif dead or row[0] >= self._max_attempts:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dead_letter "
+                        "(id, platform, message_key, payload, attempts, last_error, created_at, failed_at) "
+                        "SELECT id, platform, message_key, payload, attempts, ?, created_at, ? "
+                        "FROM inbox WHERE id = ?",
+                        (error, now, item_id),
+                    )
+                    self._conn.execute("DELETE FROM inbox WHERE id = ?", (item_id,))
+                    logger.error(f"Webhook inbox message {item_id} dead-lettered after {row[0]} attempt(s): {error}")
+                else:
+                    delay = min(self._retry_base * 2 ** (row[0] - 1), INBOX_MAX_BACKOFF)
+                    self._conn.execute(
+                        "UPDATE inbox SET lease_until = NULL, available_at = ?, last_error = ? WHERE id = ?",
+                        (now + delay, error, item_id),
+                    )
+                    logger.warning(f"Webhook inbox message {item_id} failed (attempt {row[0]}), retrying in {delay:.0f}s: {error}")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> dict[str, int]:
+        now = self._clock()
+        with self._lock:
+            pending, leased = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(lease_until >= ?), 0) FROM inbox", (now,)
+            ).fetchone()
+            dead = self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        return {"inbox_pending": pending, "inbox_leased": leased, "inbox_dead_letter": dead}
+
+
+class InboxDispatcher:
+    """Claims inbox messages and runs them, up to ``concurrency`` at a time."""
+
+    def __init__(
+        self,
+        inbox: WebhookInbox,
+        handler: Callable[[InboxItem], Awaitable[None]],
+        concurrency: int = 8,
+        lease_seconds: float = 60.0,
+        poll_interval: float = INBOX_POLL_INTERVAL,
+    ) -> None:
+        self._inbox = inbox
+        self._handler = handler
+        self._concurrency = max(1, concurrency)
+        self._lease_seconds = lease_seconds
+        self._poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._active: dict[int, asyncio.Task] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def inbox(self) -> WebhookInbox:
+        return self._inbox
+
+    def start(self) -> None:
+        """Start dispatching, including messages left over from a previous run."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def notify(self) -> None:
+        """Wake the dispatcher after a message was enqueued."""
+        self._wake.set()
+
+    async def stop(self) -> None:
+        """Stop claiming and hand in-flight messages back to the inbox."""
+        tasks = list(self._active.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            while len(self._active) < self._concurrency:
+                try:
+                    item = self._inbox.claim(self._lease_seconds)
+                except sqlite3.Error as e:
+                    logger.error(f"Webhook inbox claim failed: {e}")
+                    break
+                if item is None:
+                    break
+                self._active[item.id] = asyncio.create_task(self._process(item))
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process(self, item: InboxItem) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(item.id))
+        try:
+            await self._handler(item)
+        except asyncio.CancelledError:
+            self._inbox.release(item.id)
+            raise
+        except TurnFailedError as e:
+            self._inbox.fail(item.id, str(e), dead=True)
+        except Exception as e:
+            self._inbox.fail(item.id, f"{type(e).__name__}: {e}")
+        else:
+            self._inbox.complete(item.id)
+        finally:
+            heartbeat.cancel()
+            self._active.pop(item.id, None)
+            self._wake.set()
+
+    async def _heartbeat(self, item_id: int) -> None:
+        while True:
+            await asyncio.sleep(self._lease_seconds / 3)
+            self._inbox.renew(item_id, self._lease_seconds)
+
+
+async def _process_inbox_item(item: InboxItem) -> None:
+    adapter = get_adapter(item.message.platform)
+    if adapter is None:
+        raise RuntimeError(f"Platform '{item.message.platform}' is not configured")
+    # Only the last attempt tells the user it failed; earlier ones are retried quietly.
+    final = item.attempts >= get_webhook_inbox().max_attempts
+    await process_platform_message(item.message, adapter, notify_errors=final)
+
+
+_webhook_inbox: WebhookInbox | None = None
+_inbox_dispatcher: InboxDispatcher | None = None
+
+
+def get_webhook_inbox() -> WebhookInbox:
+    """Get the global WebhookInbox singleton instance."""
+    global _webhook_inbox
+    if _webhook_inbox is None:
+        settings = get_settings()
+        data_dir = get_data_dir()
+        data_dir.mkdir(parents=True, exist_ok=True)
+        _webhook_inbox = WebhookInbox(
+            data_dir / settings.storage.webhook_inbox_filename,
+            max_attempts=settings.platform.inbox_max_attempts,
+            retry_base_seconds=settings.platform.inbox_retry_base_seconds,
+        )
+    return _webhook_inbox
+
+
+def get_inbox_dispatcher() -> InboxDispatcher:
+    """Get the global InboxDispatcher singleton instance."""
+    global _inbox_dispatcher
+    if _inbox_dispatcher is None:
+        settings = get_settings().platform
+        _inbox_dispatcher = InboxDispatcher(
+            get_webhook_inbox(),
+            _process_inbox_item,
+            concurrency=settings.inbox_concurrency,
+            lease_seconds=settings.inbox_lease_seconds,
+        )
+    return _inbox_dispatcher
@@ -1,18 +1,30 @@
 """Platform media download and processing.
 
-Downloads media files from Telegram and WhatsApp, then processes them into:
+Downloads media files from Telegram, WhatsApp and BlueBubbles, then processes them into:
 - Base64 content blocks for images (Claude can "see" them)
 - Filesystem files via FileStorage for documents (agent accesses via tools)
+
+The attachments of one message download concurrently, up to
+``MEDIA_DOWNLOAD_CONCURRENCY`` at a time. Images are buffered, since they
+are inlined anyway. Other files stream chunk by chunk into a staging file
+next to the session's input directory, then get renamed into place, so
+memory use stays flat whatever the file size. The size limit is checked
+against the platform metadata, against Content-Length, and while streaming.
+A download aborts as soon as it goes over the limit.
 """
 
+import asyncio
 import base64
 import logging
 import mimetypes
+import uuid
 from dataclasses import dataclass, field
+from pathlib import Path
 
 import httpx
 
 from agent.core.file_storage import FileStorage, FileStorageError
+from api.services.image_preprocessor import ImageLimits, default_image_limits, get_image_preprocessor
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +32,12 @@ logger = logging.getLogger(__name__)
 MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024  # 50MB
 DOWNLOAD_TIMEOUT = 60.0  # seconds
 
+# Attachments of one message downloaded at the same time.
+MEDIA_DOWNLOAD_CONCURRENCY = 4
+
+# Bytes read from the response per chunk when streaming to disk.
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
 # MIME types that Claude can process as vision content blocks
 VISION_MIME_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 
@@ -37,25 +55,49 @@ class ProcessedMedia:
     errors: list[str] = field(default_factory=list)
     """Per-item error descriptions (non-fatal)."""
 
+    def extend(self, other: "ProcessedMedia") -> None:
+        self.content_blocks.extend(other.content_blocks)
+        self.file_annotations.extend(other.file_annotations)
+        self.errors.extend(other.errors)
+
+
+@dataclass(slots=True)
+class MediaSource:
+    """Where to fetch one attachment from, as resolved from platform metadata."""
+
+    url: str
+    mime_type: str = ""
+    """Declared MIME type; empty to take it from the download's Content-Type."""
+
+    headers: dict[str, str] = field(default_factory=dict)
+    params: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class DownloadedMedia:
+    """A fetched attachment: buffered ``content`` or a staged file at ``path``."""
+
+    mime_type: str
+    size: int
+    content: bytes | None = None
+    path: Path | None = None
+
+
+def _check_size(size: int, what: str = "File") -> None:
+    if size > MAX_DOWNLOAD_BYTES:
+        raise ValueError(f"{what} too large: {size} bytes (max {MAX_DOWNLOAD_BYTES})")
+
 
-async def download_telegram_file(
+async def resolve_telegram_file(
     file_id: str,
     bot_token: str,
     client: httpx.AsyncClient,
-) -> tuple[bytes, str, str]:
-    """Download a file from Telegram by file_id.
-
-    Args:
-        file_id: Telegram file_id from the message.
-        bot_token: Bot token for API authentication.
-        client: httpx client to use for requests.
-
-    Returns:
-        Tuple of (file_bytes, file_path, mime_type).
+) -> MediaSource:
+    """Resolve a Telegram file_id to its download URL.
 
     Raises:
-        httpx.HTTPStatusError: If API calls fail.
-        ValueError: If file is too large.
+        httpx.HTTPStatusError: If the getFile call fails.
+        ValueError: If there is no file path or the file is too large.
     """
     api_base = f"https://api.telegram.org/bot{bot_token}"
 
@@ -67,125 +109,112 @@ async def download_telegram_file(
     resp.raise_for_status()
     result = resp.json().get("result", {})
     file_path = result.get("file_path", "")
-    file_size = result.get("file_size", 0)
 
     if not file_path:
         raise ValueError(f"Telegram getFile returned no file_path for {file_id}")
+    _check_size(result.get("file_size", 0))
 
-    if file_size > MAX_DOWNLOAD_BYTES:
-        raise ValueError(
-            f"File too large: {file_size} bytes (max {MAX_DOWNLOAD_BYTES})"
-        )
-
-    download_url = f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
-    file_resp = await client.get(download_url, timeout=DOWNLOAD_TIMEOUT)
-    file_resp.raise_for_status()
-    content = file_resp.content
-
-    if len(content) > MAX_DOWNLOAD_BYTES:
-        raise ValueError(
-            f"Downloaded file too large: {len(content)} bytes (max {MAX_DOWNLOAD_BYTES})"
-        )
-
-    mime_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
-
-    return content, file_path, mime_type
+    return MediaSource(
+        url=f"https://api.telegram.org/file/bot{bot_token}/{file_path}",
+        mime_type=mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+    )
 
 
-async def download_whatsapp_file(
+async def resolve_whatsapp_file(
     media_id: str,
     access_token: str,
     client: httpx.AsyncClient,
     api_base: str = "https://graph.facebook.com/v20.0",
-) -> tuple[bytes, str]:
-    """Download a file from WhatsApp by media_id.
-
-    Args:
-        media_id: WhatsApp media ID from the message.
-        access_token: Access token for API authentication.
-        client: httpx client to use for requests.
-        api_base: Graph API base URL.
-
-    Returns:
-        Tuple of (file_bytes, mime_type).
+) -> MediaSource:
+    """Resolve a WhatsApp media_id to its (authenticated) download URL.
 
     Raises:
-        httpx.HTTPStatusError: If API calls fail.
-        ValueError: If file is too large.
+        httpx.HTTPStatusError: If the media API call fails.
+        ValueError: If there is no URL or the file is too large.
     """
+    auth = {"Authorization": f"Bearer {access_token}"}
     resp = await client.get(
         f"{api_base}/{media_id}",
-        headers={"Authorization": f"Bearer {access_token}"},
+        headers=auth,
         timeout=DOWNLOAD_TIMEOUT,
     )
     resp.raise_for_status()
     media_info = resp.json()
     download_url = media_info.get("url", "")
-    mime_type = media_info.get("mime_type", "application/octet-stream")
-    file_size = media_info.get("file_size", 0)
 
     if not download_url:
         raise ValueError(f"WhatsApp media API returned no URL for {media_id}")
+    _check_size(media_info.get("file_size", 0))
 
-    if file_size > MAX_DOWNLOAD_BYTES:
-        raise ValueError(
-            f"File too large: {file_size} bytes (max {MAX_DOWNLOAD_BYTES})"
-        )
-
-    file_resp = await client.get(
-        download_url,
-        headers={"Authorization": f"Bearer {access_token}"},
-        timeout=DOWNLOAD_TIMEOUT,
+    return MediaSource(
+        url=download_url,
+        mime_type=media_info.get("mime_type", "application/octet-stream"),
+        headers=auth,
     )
-    file_resp.raise_for_status()
-    content = file_resp.content
 
-    if len(content) > MAX_DOWNLOAD_BYTES:
-        raise ValueError(
-            f"Downloaded file too large: {len(content)} bytes (max {MAX_DOWNLOAD_BYTES})"
-        )
 
-    return content, mime_type
-
-
-async def download_bluebubbles_file(
+def resolve_bluebubbles_file(
     attachment_guid: str,
     server_url: str,
     password: str,
-    client: httpx.AsyncClient,
-) -> tuple[bytes, str]:
-    """Download a file from BlueBubbles by attachment GUID.
-
-    Args:
-        attachment_guid: BlueBubbles attachment GUID.
-        server_url: BlueBubbles server base URL.
-        password: Server password for authentication.
-        client: httpx client to use for requests.
+) -> MediaSource:
+    """Build the BlueBubbles download URL for an attachment GUID.
 
-    Returns:
-        Tuple of (file_bytes, mime_type).
-
-    Raises:
-        httpx.HTTPStatusError: If API calls fail.
-        ValueError: If file is too large.
+    The MIME type comes from the download's Content-Type.
     """
-    resp = await client.get(
-        f"{server_url}/api/v1/attachment/{attachment_guid}/download",
+    return MediaSource(
+        url=f"{server_url}/api/v1/attachment/{attachment_guid}/download",
         params={"password": password},
-        timeout=DOWNLOAD_TIMEOUT,
     )
-    resp.raise_for_status()
 
-    content = resp.content
-    if len(content) > MAX_DOWNLOAD_BYTES:
-        raise ValueError(
-            f"Downloaded file too large: {len(content)} bytes (max {MAX_DOWNLOAD_BYTES})"
-        )
 
-    content_type = resp.headers.get("content-type", "application/octet-stream")
-    mime_type = content_type.split(";")[0].strip()
+async def download_media(
+    client: httpx.AsyncClient,
+    source: MediaSource,
+    staging_dir: Path,
+) -> DownloadedMedia:
+    """Download ``source``, buffering images and streaming other files to disk.
+
+    Files that are not images are written to a staging file in
+    ``staging_dir``, and the caller owns that file. The download aborts as
+    soon as Content-Length or the bytes received go over
+    ``MAX_DOWNLOAD_BYTES``. A partial file is removed on any failure.
 
-    return content, mime_type
+    Raises:
+        httpx.HTTPStatusError: If the download fails.
+        ValueError: If the file is too large.
+    """
+    async with client.stream(
+        "GET", source.url, headers=source.headers, params=source.params, timeout=DOWNLOAD_TIMEOUT,
+    ) as resp:
+        resp.raise_for_status()
+        declared = resp.headers.get("content-length")
+        if declared and declared.isdigit():
+            _check_size(int(declared))
+
+        content_type = resp.headers.get("content-type", "application/octet-stream")
+        mime_type = source.mime_type or content_type.split(";")[0].strip()
+
+        if mime_type in VISION_MIME_TYPES:
+            buffer = bytearray()
+            async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                buffer += chunk
+                _check_size(len(buffer), "Downloaded file")
+            return DownloadedMedia(mime_type=mime_type, size=len(buffer), content=bytes(buffer))
+
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        path = staging_dir / f".download-{uuid.uuid4().hex}.part"
+        size = 0
+        try:
+            with open(path, "wb") as f:
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    _check_size(size, "Downloaded file")
+                    await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return DownloadedMedia(mime_type=mime_type, size=size, path=path)
 
 
 _EXT_OVERRIDES = {
@@ -226,64 +255,74 @@ async def process_media_items(
     bluebubbles_server_url: str = "",
     bluebubbles_password: str = "",
     bluebubbles_client: httpx.AsyncClient | None = None,
+    image_limits: ImageLimits | None = None,
 ) -> ProcessedMedia:
     """Download and process media items from a platform message.
 
-    Images (jpeg/png/gif/webp) are converted to base64 content blocks for
-    inline vision. Other files are saved to FileStorage for agent tool access.
+    Images (jpeg/png/gif/webp) are downscaled and re-encoded under
+    ``image_limits`` (server defaults if omitted), then converted to base64
+    content blocks for inline vision. Other files are saved to FileStorage
+    for agent tool access.
+    Items download concurrently; results keep the order of ``media_list``.
 
     Returns:
         ProcessedMedia with content blocks, file annotations, and errors.
     """
-    result = ProcessedMedia()
+    semaphore = asyncio.Semaphore(MEDIA_DOWNLOAD_CONCURRENCY)
+    limits = image_limits or default_image_limits()
 
-    for item in media_list:
+    async def _process_item(item: dict) -> ProcessedMedia:
+        result = ProcessedMedia()
+        downloaded: DownloadedMedia | None = None
         try:
-            if platform == "telegram":
-                file_id = item.get("file_id", "")
-                if not file_id or not bot_token or not telegram_client:
-                    result.errors.append(
-                        f"Missing Telegram download params for {item.get('type')}"
+            async with semaphore:
+                if platform == "telegram":
+                    file_id = item.get("file_id", "")
+                    if not file_id or not bot_token or not telegram_client:
+                        result.errors.append(
+                            f"Missing Telegram download params for {item.get('type')}"
+                        )
+                        return result
+                    client = telegram_client
+                    source = await resolve_telegram_file(file_id, bot_token, client)
+
+                elif platform == "whatsapp":
+                    media_id = item.get("media_id", "")
+                    if not media_id or not access_token or not whatsapp_client:
+                        result.errors.append(
+                            f"Missing WhatsApp download params for {item.get('type')}"
+                        )
+                        return result
+                    client = whatsapp_client
+                    source = await resolve_whatsapp_file(
+                        media_id, access_token, client, whatsapp_api_base
                     )
-                    continue
 
-                content, _, detected_mime = await download_telegram_file(
-                    file_id, bot_token, telegram_client
-                )
-                mime_type = item.get("mime_type") or detected_mime
-
-            elif platform == "whatsapp":
-                media_id = item.get("media_id", "")
-                if not media_id or not access_token or not whatsapp_client:
-                    result.errors.append(
-                        f"Missing WhatsApp download params for {item.get('type')}"
+                elif platform == "imessage":
+                    attachment_guid = item.get("attachment_guid", "")
+                    if not attachment_guid or not bluebubbles_server_url or not bluebubbles_client:
+                        result.errors.append(
+                            f"Missing BlueBubbles download params for {item.get('type')}"
+                        )
+                        return result
+                    client = bluebubbles_client
+                    source = resolve_bluebubbles_file(
+                        attachment_guid, bluebubbles_server_url, bluebubbles_password
                     )
-                    continue
 
-                content, detected_mime = await download_whatsapp_file(
-                    media_id, access_token, whatsapp_client, whatsapp_api_base
-                )
-                mime_type = item.get("mime_type") or detected_mime
+                else:
+                    result.errors.append(f"Unsupported platform for media: {platform}")
+                    return result
 
-            elif platform == "imessage":
-                attachment_guid = item.get("attachment_guid", "")
-                if not attachment_guid or not bluebubbles_server_url or not bluebubbles_client:
-                    result.errors.append(
-                        f"Missing BlueBubbles download params for {item.get('type')}"
-                    )
-                    continue
+                # The item's own MIME type (from the webhook) wins over the platform's guess.
+                source.mime_type = item.get("mime_type") or source.mime_type
+                downloaded = await download_media(client, source, file_storage.get_session_dir())
 
-                content, detected_mime = await download_bluebubbles_file(
-                    attachment_guid, bluebubbles_server_url,
-                    bluebubbles_password, bluebubbles_client
+            mime_type = downloaded.mime_type
+            if downloaded.content is not None:
+                content, mime_type = await asyncio.to_thread(
+                    get_image_preprocessor().process, downloaded.content, mime_type, limits
                 )
-                mime_type = item.get("mime_type") or detected_mime
-
-            else:
-                result.errors.append(f"Unsupported platform for media: {platform}")
-                continue
-
-            if mime_type in VISION_MIME_TYPES:
                 b64_data = base64.standard_b64encode(content).decode("ascii")
                 result.content_blocks.append({
                     "type": "image",
@@ -295,13 +334,14 @@ async def process_media_items(
                 })
                 logger.info(
                     f"Processed {platform} image: {mime_type}, "
-                    f"{len(content)} bytes → base64 content block"
+                    f"{downloaded.size} bytes → {len(content)} bytes base64 content block"
                 )
             else:
+                assert downloaded.path is not None
                 file_name = _guess_filename(item, mime_type)
                 try:
-                    metadata = await file_storage.save_input_file(
-                        content=content,
+                    metadata = await file_storage.move_input_file(
+                        downloaded.path,
                         filename=file_name,
                         content_type=mime_type,
                     )
@@ -311,7 +351,7 @@ async def process_media_items(
                     )
                     logger.info(
                         f"Saved {platform} file: {file_name} → "
-                        f"input/{metadata.safe_name} ({len(content)} bytes)"
+                        f"input/{metadata.safe_name} ({downloaded.size} bytes)"
                     )
                 except FileStorageError as e:
                     result.errors.append(f"Failed to save file {file_name}: {e}")
@@ -323,4 +363,13 @@ async def process_media_items(
             result.errors.append(error_msg)
             logger.warning(error_msg, exc_info=True)
 
+        finally:
+            if downloaded is not None and downloaded.path is not None:
+                downloaded.path.unlink(missing_ok=True)  # no-op once moved into input/
+
+        return result
+
+    result = ProcessedMedia()
+    for item_result in await asyncio.gather(*(_process_item(item) for item in media_list)):
+        result.extend(item_result)
     return result
@@ -0,0 +1,136 @@
+"""Live tool-activity status for platform chats.
+
+Instead of one chat message per tool_use and tool_result, a ToolProgress
+collects the formatted lines of a turn's tool activity. On platforms whose
+adapter can edit messages, it keeps a single status message and edits it
+in place, at most once per ``edit_interval``. Elsewhere it sends batched
+summaries of several lines at a time.
+
+A status segment ends when the agent sends text (``close()``), so the next
+tool activity starts a fresh status message below that text and the chat
+reads in order.
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from platforms.base import PlatformAdapter
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between edits of a live status message.
+PROGRESS_EDIT_INTERVAL = 1.5
+# Seconds tool lines are collected before a batched summary is sent.
+PROGRESS_BATCH_INTERVAL = 3.0
+# A batched summary is sent as soon as it holds this many lines.
+PROGRESS_BATCH_SIZE = 5
+# A status message is closed and a new one started beyond this many characters.
+PROGRESS_MAX_CHARS = 3500
+
+
+class ToolProgress:
+    """One turn's tool activity, shown as a live status message or batches."""
+
+    def __init__(
+        self,
+        adapter: PlatformAdapter,
+        chat_id: str,
+        send: Callable[[str], Awaitable[None]],
+        sanitize: Callable[[str], str],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._adapter = adapter
+        self._chat_id = chat_id
+        self._send = send
+        self._sanitize = sanitize
+        self._clock = clock
+        self._editable = adapter.supports_message_edit
+        self._lines: list[str] = []
+        self._message_id: str | None = None
+        self._shown = 0  # lines already visible in the status message
+        self._last_flush = clock()
+        self._flush_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self.sent_any = False
+
+    @property
+    def _interval(self) -> float:
+        return PROGRESS_EDIT_INTERVAL if self._editable else PROGRESS_BATCH_INTERVAL
+
+    async def add(self, line: str) -> None:
+        """Record one tool line; the chat is updated now or within the interval."""
+        async with self._lock:
+            if self._lines and len(self._render()) + len(line) + 2 > PROGRESS_MAX_CHARS:
+                await self._flush()
+                self._start_segment()
+
+            self._lines.append(line)
+            # A new status message appears at once; edits and batches are throttled.
+            starting = self._editable and self._message_id is None
+            full = not self._editable and len(self._lines) >= PROGRESS_BATCH_SIZE
+            wait = self._last_flush + self._interval - self._clock()
+            if starting or full or wait <= 0:
+                await self._flush()
+            elif self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later(wait))
+
+    async def close(self) -> None:
+        """Show anything pending and end the segment."""
+        async with self._lock:
+            await self._flush()
+            self._start_segment()
+
+    def cancel(self) -> None:
+        """Drop pending updates without sending them (the turn failed)."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+    def _render(self) -> str:
+        return "\n\n".join(self._lines)
+
+    def _start_segment(self) -> None:
+        self._lines = []
+        self._message_id = None
+        self._shown = 0
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        async with self._lock:
+            self._flush_task = None
+            await self._flush()
+
+    async def _flush(self) -> None:
+        self.cancel()
+        if self._shown == len(self._lines):
+            return
+        self._last_flush = self._clock()
+        try:
+            if self._editable:
+                await self._update_status()
+            else:
+                await self._send(self._render())
+                self._lines = []
+                self._shown = 0
+        except Exception as e:
+            logger.warning(f"Failed to update tool progress for {self._chat_id}: {e}")
+
+    async def _update_status(self) -> None:
+        text = self._sanitize(self._render())
+        if self._message_id is not None:
+            if await self._adapter.edit_status(self._chat_id, self._message_id, text):
+                self._shown = len(self._lines)
+                return
+            logger.info(f"Editing status message in {self._chat_id} failed, sending a new one")
+
+        self._message_id = await self._adapter.send_status(self._chat_id, text)
+        if self._message_id is None:
+            # The platform rejected status messages; send plain batches from now on.
+            self._editable = False
+            await self._send(self._render())
+            self._lines = []
+            self._shown = 0
+            return
+        self._shown = len(self._lines)
+        self.sent_any = True
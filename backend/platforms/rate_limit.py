@@ -0,0 +1,207 @@
+"""Outbound rate limiting for platform adapters.
+
+Each platform gets a global token bucket (the bot/account-wide quota) and a
+bucket per chat (the per-recipient quota), sized from the platform's
+documented limits. A send waits for both, so short bursts go out
+immediately and sustained traffic is paced to the quota instead of a fixed
+delay after every message.
+
+When a platform still answers with a rate-limit response (HTTP 429 or a
+platform-specific error), the Retry-After it asks for is applied to the
+chat's bucket - or the platform's, for account-wide limits - and the
+request is retried.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Fallback wait when a rate-limit response carries no Retry-After.
+DEFAULT_RETRY_AFTER = 1.0
+# Retry-After values above this are capped; the turn should not stall for minutes.
+MAX_RETRY_AFTER = 30.0
+# Rate-limited requests are retried this many times before giving up.
+MAX_RATE_LIMIT_RETRIES = 3
+# Per-chat buckets kept in memory (least recently used are dropped).
+MAX_CHAT_BUCKETS = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class RateQuota:
+    """Messages per second and burst size, platform-wide and per chat."""
+    global_rate: float
+    global_burst: float
+    chat_rate: float
+    chat_burst: float
+
+
+# Documented send limits:
+# - Telegram: ~30 messages/s per bot, about 1 message/s per chat.
+# - WhatsApp Cloud API: 80 messages/s per business number; a user pair
+#   allows a short burst, then roughly one message every 6 seconds.
+# - Zalo OA: no published per-second figure; paced conservatively.
+# - iMessage (BlueBubbles): a local server, paced to avoid Messages.app drops.
+PLATFORM_RATE_LIMITS: dict[str, RateQuota] = {
+    "telegram": RateQuota(global_rate=30.0, global_burst=30.0, chat_rate=1.0, chat_burst=3.0),
+    "whatsapp": RateQuota(global_rate=80.0, global_burst=80.0, chat_rate=1 / 6, chat_burst=10.0),
+    "zalo": RateQuota(global_rate=10.0, global_burst=10.0, chat_rate=1.0, chat_burst=3.0),
+    "imessage": RateQuota(global_rate=5.0, global_burst=5.0, chat_rate=1.0, chat_burst=3.0),
+}
+DEFAULT_RATE_QUOTA = RateQuota(global_rate=10.0, global_burst=10.0, chat_rate=1.0, chat_burst=3.0)
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations.
+
+    ``reserve()`` takes a token immediately and returns how long the caller
+    must wait for it. The balance may go negative, so concurrent callers
+    queue up behind each other in arrival order.
+    """
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated", "_clock")
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self, now: float) -> None:
+        # _updated may lie in the future while a Retry-After pause is in effect.
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take cost tokens and return the seconds until they are available."""
+        now = self._clock()
+        self._refill(now)
+        self._tokens -= cost
+        wait = max(0.0, self._updated - now)
+        if self._tokens < 0:
+            wait += -self._tokens / self.rate
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out nothing for the next seconds (a Retry-After from the platform)."""
+        now = self._clock()
+        self._refill(now)
+        self._tokens = min(self._tokens, 0.0)
+        self._updated = max(self._updated, now + seconds)
+
+
+class PlatformRateLimiter:
+    """Global and per-chat token buckets for every platform."""
+
+    def __init__(
+        self,
+        quotas: dict[str, RateQuota] | None = None,
+        max_chats: int = MAX_CHAT_BUCKETS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self._quotas = PLATFORM_RATE_LIMITS if quotas is None else quotas
+        self._max_chats = max_chats
+        self._clock = clock
+        self._sleep = sleep
+        self._platform_buckets: dict[str, TokenBucket] = {}
+        self._chat_buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+
+    def _quota(self, platform: str) -> RateQuota:
+        return self._quotas.get(platform, DEFAULT_RATE_QUOTA)
+
+    def _platform_bucket(self, platform: str) -> TokenBucket:
+        bucket = self._platform_buckets.get(platform)
+        if bucket is None:
+            quota = self._quota(platform)
+            bucket = TokenBucket(quota.global_rate, quota.global_burst, self._clock)
+            self._platform_buckets[platform] = bucket
+        return bucket
+
+    def _chat_bucket(self, platform: str, chat_id: str) -> TokenBucket:
+        key = (platform, chat_id)
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            quota = self._quota(platform)
+            bucket = TokenBucket(quota.chat_rate, quota.chat_burst, self._clock)
+            self._chat_buckets[key] = bucket
+            if len(self._chat_buckets) > self._max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(key)
+        return bucket
+
+    async def acquire(self, platform: str, chat_id: str | None) -> float:
+        """Wait until one message may be sent to chat_id. Returns the seconds waited."""
+        wait = self._platform_bucket(platform).reserve()
+        if chat_id:
+            wait = max(wait, self._chat_bucket(platform, chat_id).reserve())
+        if wait > 0:
+            await self._sleep(wait)
+        return wait
+
+    def back_off(self, platform: str, chat_id: str | None, retry_after: float) -> None:
+        """Apply a platform's Retry-After to the chat, or platform-wide without one."""
+        retry_after = min(max(retry_after, 0.0), MAX_RETRY_AFTER)
+        if chat_id:
+            self._chat_bucket(platform, chat_id).pause(retry_after)
+        else:
+            self._platform_bucket(platform).pause(retry_after)
+
+    async def post(
+        self,
+        client: httpx.AsyncClient,
+        platform: str,
+        chat_id: str | None,
+        url: str,
+        retry_after: Callable[[httpx.Response], float | None],
+        **kwargs,
+    ) -> httpx.Response:
+        """POST under the platform's limits, retrying rate-limited responses.
+
+        ``retry_after`` returns the seconds to wait when a response is a
+        rate-limit rejection, or None otherwise. The last response is
+        returned once the retries are used up.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(platform, chat_id)
+            resp = await client.post(url, **kwargs)
+            delay = retry_after(resp)
+            if delay is None or attempt >= MAX_RATE_LIMIT_RETRIES:
+                return resp
+            attempt += 1
+            logger.warning(
+                f"{platform} rate limited sending to {chat_id or 'platform'}, "
+                f"retrying in {delay:.1f}s (attempt {attempt}/{MAX_RATE_LIMIT_RETRIES})"
+            )
+            self.back_off(platform, chat_id, delay)
+
+
+def retry_after_header(resp: httpx.Response) -> float | None:
+    """Seconds from an HTTP 429's Retry-After header, or None if not rate limited."""
+    if resp.status_code != 429:
+        return None
+    try:
+        return float(resp.headers.get("retry-after", DEFAULT_RETRY_AFTER))
+    except ValueError:
+        # HTTP-date form; not worth parsing for a few seconds' wait.
+        return DEFAULT_RETRY_AFTER
+
+
+_rate_limiter: PlatformRateLimiter | None = None
+
+
+def get_platform_rate_limiter() -> PlatformRateLimiter:
+    """Get the global PlatformRateLimiter singleton instance."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = PlatformRateLimiter()
+    return _rate_limiter
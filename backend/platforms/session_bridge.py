@@ -2,10 +2,20 @@
 
 Bridges platform chat IDs to internal session IDs so that multi-turn
 conversations are maintained across webhook calls.
+
+Mappings live in memory: each user's ``platform_sessions.json`` is read once
+and changes are written behind, debounced and atomically (temp file plus
+``os.replace``), so lookups and updates never touch the disk on the hot path.
+A crash inside the flush window loses at most the newest mappings, which
+only means those chats start a fresh session. The session max age is cached
+until the platform settings change.
 """
 
+import asyncio
 import json
 import logging
+import os
+import weakref
 from datetime import datetime
 from pathlib import Path
 
@@ -15,25 +25,21 @@ logger = logging.getLogger(__name__)
 
 PLATFORM_SESSIONS_FILENAME = "platform_sessions.json"
 
+# Seconds changed mappings wait before being written, coalescing bursts.
+SESSION_MAPPING_FLUSH_DELAY = 1.0
+
+# Session max age when neither the settings service nor the env var has one.
+DEFAULT_SESSION_MAX_AGE_HOURS = 24
+
 
 def _get_session_max_age_hours() -> int:
     """Get session max age from settings service with env var fallback."""
     try:
         from api.services.settings_service import get_settings_service
         val = get_settings_service().get("session_max_age_hours")
-        return int(val) if val is not None else 24
+        return int(val) if val is not None else DEFAULT_SESSION_MAX_AGE_HOURS
     except Exception:
-        import os
-        return int(os.getenv("PLATFORM_SESSION_MAX_AGE_HOURS", "24"))
-
-
-def is_session_expired(session: SessionData) -> bool:
-    """Check if a platform session is too old to resume."""
-    if not session.created_at:
-        return True
-    created = datetime.fromisoformat(session.created_at)
-    age = datetime.now() - created
-    return age.total_seconds() > _get_session_max_age_hours() * 3600
+        return int(os.getenv("PLATFORM_SESSION_MAX_AGE_HOURS", str(DEFAULT_SESSION_MAX_AGE_HOURS)))
 
 
 def _get_platform_sessions_file(username: str) -> Path:
@@ -46,18 +52,120 @@ def _read_mappings(filepath: Path) -> dict[str, str]:
     """Read chat_id → session_id mappings from file."""
     try:
         content = filepath.read_text().strip()
-        return json.loads(content) if content else {}
-    except (json.JSONDecodeError, IOError, FileNotFoundError):
+        mappings = json.loads(content) if content else {}
+    except (json.JSONDecodeError, IOError):
         return {}
+    return mappings if isinstance(mappings, dict) else {}
 
 
-def _write_mappings(filepath: Path, mappings: dict[str, str]) -> None:
-    """Write chat_id → session_id mappings to file."""
-    filepath.parent.mkdir(parents=True, exist_ok=True)
+def _write_mappings(filepath: Path, mappings: dict[str, str]) -> bool:
+    """Atomically write chat_id → session_id mappings to file."""
+    tmp_path = filepath.with_name(f"{filepath.name}.tmp")
     try:
-        filepath.write_text(json.dumps(mappings, indent=2))
-    except IOError as e:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(mappings, indent=2))
+        os.replace(tmp_path, filepath)
+        return True
+    except OSError as e:
         logger.error(f"Error writing platform sessions file: {e}")
+        return False
+
+
+class SessionMappingStore:
+    """In-memory chat mappings per user with write-behind persistence."""
+
+    def __init__(self, flush_delay: float = SESSION_MAPPING_FLUSH_DELAY) -> None:
+        self._flush_delay = flush_delay
+        self._mappings: dict[str, dict[str, str]] = {}  # username -> chat_id -> session_id
+        self._files: dict[str, Path] = {}
+        self._dirty: set[str] = set()
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # Entries disappear once no task holds or waits on the lock.
+        self._locks: weakref.WeakValueDictionary[tuple[str, str], asyncio.Lock] = weakref.WeakValueDictionary()
+        self._max_age_hours: int | None = None
+
+    def chat_lock(self, username: str, chat_id: str) -> asyncio.Lock:
+        """Lock serializing the turns of one chat so they agree on its session."""
+        key = (username, chat_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def _user_mappings(self, username: str) -> dict[str, str]:
+        mappings = self._mappings.get(username)
+        if mappings is None:
+            filepath = _get_platform_sessions_file(username)
+            mappings = _read_mappings(filepath)
+            self._files[username] = filepath
+            self._mappings[username] = mappings
+        return mappings
+
+    def get(self, username: str, chat_id: str) -> str | None:
+        return self._user_mappings(username).get(chat_id)
+
+    def set(self, username: str, chat_id: str, session_id: str) -> None:
+        mappings = self._user_mappings(username)
+        if mappings.get(chat_id) != session_id:
+            mappings[chat_id] = session_id
+            self._mark_dirty(username)
+
+    def pop(self, username: str, chat_id: str) -> str | None:
+        session_id = self._user_mappings(username).pop(chat_id, None)
+        if session_id is not None:
+            self._mark_dirty(username)
+        return session_id
+
+    def _mark_dirty(self, username: str) -> None:
+        self._dirty.add(username)
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # no loop to defer to (scripts, sync tests)
+            return
+        self._flush_handle = loop.call_later(self._flush_delay, self.flush)
+
+    def flush(self) -> None:
+        """Write every changed user's mappings now."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        dirty, self._dirty = self._dirty, set()
+        for username in dirty:
+            if not _write_mappings(self._files[username], self._mappings[username]):
+                self._dirty.add(username)  # retried on the next change or flush
+
+    def max_age_hours(self) -> int:
+        if self._max_age_hours is None:
+            self._max_age_hours = _get_session_max_age_hours()
+        return self._max_age_hours
+
+    def invalidate_settings(self) -> None:
+        """Re-read the session max age on next use (after a settings update)."""
+        self._max_age_hours = None
+
+
+_session_mapping_store: SessionMappingStore | None = None
+
+
+def get_session_mapping_store() -> SessionMappingStore:
+    """Get the global SessionMappingStore singleton instance."""
+    global _session_mapping_store
+    if _session_mapping_store is None:
+        _session_mapping_store = SessionMappingStore()
+    return _session_mapping_store
+
+
+def is_session_expired(session: SessionData) -> bool:
+    """Check if a platform session is too old to resume."""
+    if not session.created_at:
+        return True
+    created = datetime.fromisoformat(session.created_at)
+    age = datetime.now() - created
+    return age.total_seconds() > get_session_mapping_store().max_age_hours() * 3600
 
 
 def get_session_id_for_chat(username: str, chat_id: str) -> str | None:
@@ -70,9 +178,7 @@ def get_session_id_for_chat(username: str, chat_id: str) -> str | None:
     Returns:
         Session ID if a mapping exists, None otherwise.
     """
-    filepath = _get_platform_sessions_file(username)
-    mappings = _read_mappings(filepath)
-    return mappings.get(chat_id)
+    return get_session_mapping_store().get(username, chat_id)
 
 
 def save_session_mapping(username: str, chat_id: str, session_id: str) -> None:
@@ -83,10 +189,7 @@ def save_session_mapping(username: str, chat_id: str, session_id: str) -> None:
         chat_id: Platform chat identifier.
         session_id: Internal session identifier.
     """
-    filepath = _get_platform_sessions_file(username)
-    mappings = _read_mappings(filepath)
-    mappings[chat_id] = session_id
-    _write_mappings(filepath, mappings)
+    get_session_mapping_store().set(username, chat_id, session_id)
     logger.info(f"Saved platform session mapping: {chat_id} -> {session_id} for {username}")
 
 
@@ -97,8 +200,5 @@ def clear_session_mapping(username: str, chat_id: str) -> None:
         username: Internal username.
         chat_id: Platform chat identifier.
     """
-    filepath = _get_platform_sessions_file(username)
-    mappings = _read_mappings(filepath)
-    if mappings.pop(chat_id, None) is not None:
-        _write_mappings(filepath, mappings)
+    if get_session_mapping_store().pop(username, chat_id) is not None:
         logger.info(f"Cleared platform session mapping for {chat_id} (user: {username})")
@@ -7,7 +7,6 @@ Handles the full lifecycle of a platform message:
 4. Stream events incrementally back to the platform
 """
 
-import asyncio
 import json
 import logging
 import mimetypes
@@ -19,22 +18,27 @@ from claude_agent_sdk import ClaudeSDKClient
 from claude_agent_sdk.types import (
     AssistantMessage,
     ResultMessage,
+    TextBlock,
     ToolResultBlock,
     ToolUseBlock,
     UserMessage,
 )
 
-from agent.core.agent_options import create_agent_sdk_options, set_email_tools_session_id
+from agent.core.agent_options import create_agent_sdk_options
 from agent.core.storage import get_user_history_storage, get_user_session_storage
-from api.constants import FIRST_MESSAGE_TRUNCATE_LENGTH
+from api.constants import FIRST_MESSAGE_TRUNCATE_LENGTH, EventType
 from api.services.history_tracker import HistoryTracker
+from api.services.image_preprocessor import image_limits_for_agent
 from api.services.session_setup import resolve_session_setup
 from api.services.message_utils import message_to_dicts
 from api.services.streaming_input import create_message_generator
+from api.services.turn_scheduler import TurnPriority, get_turn_scheduler
+from api.services.turn_state import TurnState
+from api.services.turn_timing import TurnTimer, timed
 from platforms.base import NormalizedMessage, NormalizedResponse, PlatformAdapter
 from platforms.media import process_media_items
+from platforms.progress import ToolProgress
 from platforms.event_formatter import (
-    MESSAGE_SEND_DELAY,
     convert_tables_for_platform,
     format_file_download_message,
     format_new_session_requested,
@@ -45,7 +49,13 @@ from platforms.event_formatter import (
 from api.services.file_download_token import build_download_url, create_download_token
 from api.utils.sensitive_data_filter import sanitize_paths, redact_sensitive_data
 from platforms.identity import platform_identity_to_username
-from platforms.session_bridge import clear_session_mapping, get_session_id_for_chat, is_session_expired, save_session_mapping
+from platforms.session_bridge import (
+    clear_session_mapping,
+    get_session_id_for_chat,
+    get_session_mapping_store,
+    is_session_expired,
+    save_session_mapping,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -255,16 +265,44 @@ async def _try_deliver_tool_file(
     )
 
 
+class TurnFailedError(Exception):
+    """A platform turn failed after the agent started working on it.
+
+    By then the user message may be in history, replies may have been sent
+    and tools may have run, so the message must not be retried.
+    """
+
+
 async def process_platform_message(
     msg: NormalizedMessage,
     adapter: PlatformAdapter,
     agent_id: str | None = None,
+    notify_errors: bool = True,
 ) -> None:
     """Process an inbound platform message through the agent pipeline.
 
-    Main entry point called by the webhook router's background task.
+    Main entry point called by the webhook inbox dispatcher. Errors before
+    the agent turn starts (setup, media, connect) are re-raised so the inbox
+    can retry the message; with ``notify_errors`` the user is also told that
+    processing failed. Errors once the turn has started always send the
+    error reply and raise TurnFailedError, which is not retried. Messages
+    from one chat are processed one at a time so they agree on the chat's
+    session.
     """
+    username = platform_identity_to_username(msg.platform, msg.platform_user_id)
+    async with get_session_mapping_store().chat_lock(username, msg.platform_chat_id):
+        await _process_platform_message(msg, adapter, username, agent_id, notify_errors)
+
+
+async def _process_platform_message(
+    msg: NormalizedMessage,
+    adapter: PlatformAdapter,
+    username: str,
+    agent_id: str | None,
+    notify_errors: bool,
+) -> None:
     effective_agent_id = agent_id or _get_default_agent_id()
+    turn_started = False
 
     try:
         try:
@@ -272,7 +310,6 @@ async def process_platform_message(
         except Exception as e:
             logger.debug(f"Failed to send typing indicator: {e}")
 
-        username = platform_identity_to_username(msg.platform, msg.platform_user_id)
         logger.info(
             f"Processing {msg.platform} message: user={username}, "
             f"chat={msg.platform_chat_id}"
@@ -315,8 +352,6 @@ async def process_platform_message(
 
         setup = resolve_session_setup(username, existing, resume_session_id)
         cwd_id = setup.cwd_id
-        set_email_tools_session_id(cwd_id)
-
         sdk_content: str | list[dict[str, Any]] = msg.text
         if msg.media:
             try:
@@ -324,6 +359,7 @@ async def process_platform_message(
                     media_list=msg.media,
                     platform=msg.platform.value,
                     file_storage=setup.file_storage,
+                    image_limits=image_limits_for_agent(effective_agent_id),
                     **adapter.get_media_download_kwargs(),
                 )
 
@@ -353,10 +389,18 @@ async def process_platform_message(
             session_cwd=setup.session_cwd,
             permission_folders=setup.permission_folders,
             client_type=msg.platform.value,
+            env=setup.tools_env,
         )
         client = ClaudeSDKClient(options)
+        # Platform turns yield to interactive and API turns under load.
+        scheduler = get_turn_scheduler()
+        await scheduler.acquire(TurnPriority.PLATFORM, username)
+        timer = TurnTimer("platform")
+        timer_token = timer.activate()
+        progress: ToolProgress | None = None
 
         try:
+            connect_started = timer.clock()
             try:
                 await client.connect()
             except Exception:
@@ -379,9 +423,13 @@ async def process_platform_message(
                     session_cwd=setup.session_cwd,
                     permission_folders=setup.permission_folders,
                     client_type=msg.platform.value,
+                    env=setup.tools_env,
                 )
                 client = ClaudeSDKClient(options)
                 await client.connect()
+            timer.add("sdk_connect", timer.clock() - connect_started)
+            # From here on the turn has side effects (history, replies, tools).
+            turn_started = True
 
             # Create tracker (or defer until session_id is known)
             tracker: HistoryTracker | None = None
@@ -403,24 +451,26 @@ async def process_platform_message(
             accumulated_text = ""
             new_session_id: str | None = session_id
             has_sent_any = False
-            tool_name_map: dict[str, str] = {}  # tool_use_id → tool_name
-            tool_input_map: dict[str, dict] = {}  # tool_use_id → tool_input
+            turn = TurnState()  # pending tool_use_id → (name, input), dropped on result
 
-            async def _send_msg(text: str) -> None:
-                """Send one message to the platform with rate-limit delay."""
-                nonlocal has_sent_any
-                try:
+            def _sanitize_outbound(text: str) -> str:
+                with timed("sanitize"):
                     sanitized = sanitize_paths(text)
                     sanitized = redact_sensitive_data(sanitized)
 
-                    if text != sanitized:
-                        logger.warning(f"Sanitization redacted sensitive data in message to {msg.platform_chat_id}")
+                if text != sanitized:
+                    logger.warning(f"Sanitization redacted sensitive data in message to {msg.platform_chat_id}")
+                return sanitized
 
+            async def _send_msg(text: str) -> None:
+                """Send one message to the platform; adapters pace sends to platform quotas."""
+                nonlocal has_sent_any
+                try:
+                    sanitized = _sanitize_outbound(text)
                     await adapter.send_response(
                         msg.platform_chat_id, NormalizedResponse(text=sanitized)
                     )
                     has_sent_any = True
-                    await asyncio.sleep(MESSAGE_SEND_DELAY)
                     try:
                         await adapter.send_typing_indicator(msg.platform_chat_id)
                     except Exception:
@@ -428,12 +478,17 @@ async def process_platform_message(
                 except Exception as e:
                     logger.warning(f"Failed to send platform message: {e}")
 
+            # Tool activity goes to one live status message (or batches), not a message per event.
+            progress = ToolProgress(adapter, msg.platform_chat_id, _send_msg, _sanitize_outbound)
+
             async def _flush_text() -> None:
                 """Send accumulated text as a message, then reset buffer."""
                 nonlocal accumulated_text
                 text = accumulated_text.strip()
                 if text:
                     text = convert_tables_for_platform(text)
+                    # Later tool activity starts a new status message below this text.
+                    await progress.close()
                     await _send_msg(text)
                     accumulated_text = ""
 
@@ -441,15 +496,18 @@ async def process_platform_message(
                 await _send_msg(format_session_rotated())
 
             async for sdk_msg in client.receive_response():
+                timer.on_message()
                 if isinstance(sdk_msg, AssistantMessage):
                     if tracker:
                         tracker.save_from_assistant_message(sdk_msg)
                     for block in getattr(sdk_msg, "content", []):
-                        if isinstance(block, ToolUseBlock):
+                        if isinstance(block, TextBlock):
+                            timer.mark("first_token")
+                        elif isinstance(block, ToolUseBlock):
+                            timer.tool_started(block.id, block.name)
                             await _flush_text()
-                            tool_name_map[block.id] = block.name
-                            tool_input_map[block.id] = block.input if isinstance(block.input, dict) else {}
-                            await _send_msg(
+                            turn.start_tool(block.id, block.name, block.input)
+                            await progress.add(
                                 format_tool_use(block.name, block.input)
                             )
 
@@ -458,19 +516,19 @@ async def process_platform_message(
                         tracker.save_from_user_message(sdk_msg)
                     for block in getattr(sdk_msg, "content", []):
                         if isinstance(block, ToolResultBlock):
-                            tool_name = tool_name_map.get(
-                                block.tool_use_id, "Tool"
-                            )
+                            timer.tool_finished(block.tool_use_id)
+                            call = turn.finish_tool(block.tool_use_id)
+                            tool_name = call.name if call else "Tool"
                             content = _extract_tool_result_text(block.content)
                             is_error = block.is_error or False
                             logger.debug(f"UserMessage tool_result: tool={tool_name}, content_type={type(block.content).__name__}")
-                            await _send_msg(
+                            await progress.add(
                                 format_tool_result(tool_name, content, is_error)
                             )
                             if not is_error:
                                 await _try_deliver_written_file(
                                     tool_name,
-                                    tool_input_map.get(block.tool_use_id, {}),
+                                    call.input if call else {},
                                     setup.session_cwd,
                                     adapter, msg.platform_chat_id,
                                     username, cwd_id, _send_msg,
@@ -486,6 +544,13 @@ async def process_platform_message(
                     result_session_id = getattr(sdk_msg, "session_id", None)
                     if result_session_id and not new_session_id:
                         new_session_id = result_session_id
+                    timings = timer.finish()
+                    if tracker:
+                        # Stored with the result in history metadata.
+                        for event_data in message_to_dicts(sdk_msg):
+                            if event_data.get("type") == EventType.DONE:
+                                event_data["timings"] = timings
+                                tracker.process_event(EventType.DONE, event_data)
                     break
 
                 else:
@@ -493,6 +558,7 @@ async def process_platform_message(
                     events = message_to_dicts(sdk_msg)
                     for event_data in events:
                         event_type = event_data.get("type")
+                        timer.on_event(event_type, event_data)
                         if event_type == "session_id":
                             new_session_id = event_data.get("session_id")
                             if new_session_id and not tracker:
@@ -524,19 +590,19 @@ async def process_platform_message(
                             tool_id = event_data.get("id", "")
                             tool_name = event_data.get("name", "unknown")
                             tool_input = event_data.get("input")
-                            tool_name_map[tool_id] = tool_name
-                            tool_input_map[tool_id] = tool_input if isinstance(tool_input, dict) else {}
-                            await _send_msg(format_tool_use(tool_name, tool_input))
+                            turn.start_tool(tool_id, tool_name, tool_input)
+                            await progress.add(format_tool_use(tool_name, tool_input))
                             if tracker:
                                 tracker.process_event(event_type, event_data)
 
                         elif event_type == "tool_result":
                             tool_use_id = event_data.get("tool_use_id", "")
-                            tool_name = tool_name_map.get(tool_use_id, "Tool")
+                            call = turn.finish_tool(tool_use_id)
+                            tool_name = call.name if call else "Tool"
                             content = event_data.get("content", "")
                             logger.debug(f"StreamEvent tool_result: tool={tool_name}, content_len={len(content) if content else 0}")
                             is_error = event_data.get("is_error", False)
-                            await _send_msg(
+                            await progress.add(
                                 format_tool_result(tool_name, content, is_error)
                             )
                             if tracker:
@@ -544,7 +610,7 @@ async def process_platform_message(
                             if not is_error:
                                 await _try_deliver_written_file(
                                     tool_name,
-                                    tool_input_map.get(tool_use_id, {}),
+                                    call.input if call else {},
                                     setup.session_cwd,
                                     adapter, msg.platform_chat_id,
                                     username, cwd_id, _send_msg,
@@ -559,6 +625,7 @@ async def process_platform_message(
                         elif event_type and tracker:
                             tracker.process_event(event_type, event_data)
 
+            await progress.close()
             await _flush_text()
 
             if tracker:
@@ -574,29 +641,37 @@ async def process_platform_message(
                         username, msg.platform_chat_id, new_session_id
                     )
 
-            if not has_sent_any:
+            if not has_sent_any and not progress.sent_any:
                 await adapter.send_response(
                     msg.platform_chat_id,
                     NormalizedResponse(text="(No response generated)"),
                 )
 
         finally:
+            if progress is not None:
+                progress.cancel()
             try:
                 await client.disconnect()
             except Exception as e:
                 logger.error(f"Error disconnecting SDK client: {e}")
+            scheduler.release()
+            timer.deactivate(timer_token)
 
     except Exception as e:
         logger.error(
             f"Error processing platform message: {e}",
             exc_info=True,
         )
-        try:
-            await adapter.send_response(
-                msg.platform_chat_id,
-                NormalizedResponse(
-                    text="Sorry, I encountered an error processing your message. Please try again."
-                ),
-            )
-        except Exception:
-            logger.error("Failed to send error response to platform", exc_info=True)
+        if notify_errors or turn_started:
+            try:
+                await adapter.send_response(
+                    msg.platform_chat_id,
+                    NormalizedResponse(
+                        text="Sorry, I encountered an error processing your message. Please try again."
+                    ),
+                )
+            except Exception:
+                logger.error("Failed to send error response to platform", exc_info=True)
+        if turn_started:
+            raise TurnFailedError(f"{type(e).__name__}: {e}") from e
+        raise
@@ -1,6 +1,8 @@
 """
 Pytest configuration and fixtures for backend tests.
 """
+import asyncio
+import json
 import os
 import sys
 from pathlib import Path
@@ -88,3 +90,99 @@ def user_auth_headers(auth_headers, user_token):
     if user_token:
         headers["X-User-Token"] = user_token
     return headers
+
+
+class FakeClock:
+    """Manually advanced monotonic clock; set or bump ``now`` in tests."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeWebSocket:
+    """WebSocket stand-in that records what was sent.
+
+    ``sent`` holds every JSON event (from send_json or decoded send_text),
+    ``text`` and ``binary`` the raw frames. With ``fail_after``, sends raise
+    once that many events went out, like a dropped connection.
+    """
+
+    def __init__(self, fail_after: int | None = None):
+        self.sent: list[dict] = []
+        self.text: list[str] = []
+        self.binary: list[bytes] = []
+        self._fail_after = fail_after
+        self.closed = False
+
+    def _check_open(self) -> None:
+        if self._fail_after is not None and len(self.sent) >= self._fail_after:
+            raise RuntimeError("socket closed")
+
+    async def send_json(self, data: dict) -> None:
+        self._check_open()
+        self.sent.append(data)
+
+    async def send_text(self, data: str) -> None:
+        self._check_open()
+        self.text.append(data)
+        self.sent.append(json.loads(data))
+
+    async def send_bytes(self, data: bytes) -> None:
+        self._check_open()
+        self.binary.append(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.closed = True
+
+
+class FakeConversationSession:
+    """ConversationSession stand-in that streams two canned messages per query.
+
+    Tests patch it into api.services.session_manager; ``instances`` lists
+    every session created, ``fail_next`` makes the next query raise.
+    """
+
+    instances: list["FakeConversationSession"] = []
+
+    def __init__(self, *args, **kwargs):
+        self.connects = 0
+        self.disconnected = False
+        self.sdk_session_id = None
+        self.turn_count = 0
+        self.active = 0
+        self.max_active = 0
+        self.fail_next = False
+        self.delay = 0.0
+        self.connect_task: asyncio.Task | None = None
+        FakeConversationSession.instances.append(self)
+
+    async def connect(self):
+        self.connects += 1
+        self.connect_task = asyncio.current_task()
+
+    async def disconnect(self):
+        self.disconnected = True
+
+    async def shutdown(self):
+        await self.disconnect()
+
+    async def send_query(self, content):
+        if self.connects == 0:
+            await self.connect()
+        # The SDK client must only be used from the task that connected it.
+        assert asyncio.current_task() is self.connect_task
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.fail_next:
+                self.fail_next = False
+                raise RuntimeError("sdk exploded")
+            await asyncio.sleep(self.delay)
+            self.turn_count += 1
+            yield f"{content}:1"
+            yield f"{content}:2"
+        finally:
+            self.active -= 1
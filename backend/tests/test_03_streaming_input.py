@@ -4,10 +4,15 @@ Tests async generator message input:
 - create_message_generator with different content types
 - StreamingInputHandler message queuing
 - FIFO order preservation
+- Event-driven handoff: no polling, immediate wakeups
 - Basic error handling
 """
+import asyncio
+
 import pytest
 
+import api.services.streaming_input as streaming_input_module
+
 from api.services.streaming_input import (
     create_message_generator,
     StreamingInputHandler
@@ -211,3 +216,70 @@ class TestErrorHandling:
 
         with pytest.raises(ValueError, match="Failed to add message"):
             await handler.add_message(12345)
+
+
+class TestEventDrivenHandoff:
+    """Consumers wake on new input or completion, without polling."""
+
+    @pytest.mark.asyncio
+    async def test_waiting_consumer_gets_message_immediately(self):
+        """A message added while the consumer is idle is handed off without delay."""
+        handler = StreamingInputHandler("session-handoff")
+        generator = handler.generate_messages()
+        pending = asyncio.ensure_future(generator.__anext__())
+        await asyncio.sleep(0)
+        assert not pending.done()
+
+        await handler.add_raw_message({"type": "user", "id": 1})
+        # A single loop pass, far below the old 0.1s poll interval.
+        message = await asyncio.wait_for(pending, timeout=0.01)
+
+        assert message["id"] == 1
+        await generator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_complete_wakes_idle_consumer(self):
+        """complete() ends a generator that is waiting on an empty queue."""
+        handler = StreamingInputHandler("session-complete")
+        consumer = asyncio.create_task(_drain(handler))
+        await asyncio.sleep(0)
+
+        handler.complete()
+
+        assert await asyncio.wait_for(consumer, timeout=0.01) == []
+
+    @pytest.mark.asyncio
+    async def test_idle_consumer_does_not_poll(self, monkeypatch):
+        """An idle consumer parks on its event instead of timed waits or sleeps."""
+        def _no_polling(*args, **kwargs):
+            raise AssertionError("StreamingInputHandler should not poll")
+
+        monkeypatch.setattr(streaming_input_module.asyncio, "wait_for", _no_polling)
+        handler = StreamingInputHandler("session-idle")
+        consumer = asyncio.create_task(_drain(handler))
+        await asyncio.sleep(0.05)
+        assert not consumer.done()
+
+        await handler.add_raw_message({"id": 1})
+        handler.complete()
+        monkeypatch.undo()
+        assert await consumer == [{"id": 1}]
+
+    @pytest.mark.asyncio
+    async def test_wait_until_empty_wakes_when_drained(self):
+        """wait_until_empty returns as soon as the last message is taken."""
+        handler = StreamingInputHandler("session-drain")
+        await handler.add_raw_message({"id": 1})
+        await handler.add_raw_message({"id": 2})
+        waiter = asyncio.create_task(handler.wait_until_empty())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        handler.complete()
+        assert [m["id"] for m in await _drain(handler)] == [1, 2]
+        await asyncio.wait_for(waiter, timeout=0.01)
+        assert not handler.has_pending_messages()
+
+
+async def _drain(handler: StreamingInputHandler) -> list[dict]:
+    return [msg async for msg in handler.generate_messages()]
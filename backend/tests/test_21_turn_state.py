@@ -0,0 +1,139 @@
+"""Tests for per-turn tool/question bookkeeping (TurnState).
+
+Covers:
+- O(1) start/finish of pending tool calls in start order
+- Interrupted tool results drained in the original order
+- A synthetic 2,000-tool turn through the WebSocket response stream
+"""
+import time
+
+import pytest
+from claude_agent_sdk.types import (
+    AssistantMessage,
+    ResultMessage,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+
+from api.routers.websocket import (
+    WebSocketState,
+    _process_response_stream,
+    _send_cancelled_tool_results,
+)
+from api.services.turn_state import TurnState
+from conftest import FakeWebSocket
+
+
+class _FakeClient:
+    def __init__(self, messages: list):
+        self._messages = messages
+
+    async def receive_response(self):
+        for msg in self._messages:
+            yield msg
+
+
+def _parallel_tool_turn(n: int) -> list:
+    """Build a turn where n tool calls are issued first, then resolved in reverse."""
+    uses = [
+        ToolUseBlock(id=f"toolu_{i}", name="Task", input={"prompt": f"job {i}"})
+        for i in range(n)
+    ]
+    results = [
+        ToolResultBlock(tool_use_id=f"toolu_{i}", content=f"done {i}")
+        for i in reversed(range(n))
+    ]
+    return [
+        AssistantMessage(content=uses, model="test"),
+        UserMessage(content=results),
+        ResultMessage(
+            subtype="success", duration_ms=1, duration_api_ms=1,
+            is_error=False, num_turns=1, session_id="s",
+        ),
+    ]
+
+
+class TestTurnState:
+    """Unit tests for TurnState."""
+
+    def test_start_and_finish_tool(self):
+        """finish_tool should return the call once and then forget it."""
+        turn = TurnState()
+        turn.start_tool("a", "Write", {"file_path": "x.txt"})
+
+        call = turn.finish_tool("a")
+        assert call is not None
+        assert call.name == "Write"
+        assert call.input == {"file_path": "x.txt"}
+        assert turn.finish_tool("a") is None
+        assert turn.pending_tool_count == 0
+
+    def test_non_dict_input_normalized(self):
+        """Non-dict tool input should be stored as an empty dict."""
+        turn = TurnState()
+        turn.start_tool("a", "Bash", "not-a-dict")
+        assert turn.get_tool("a").input == {}
+
+    def test_pending_order_preserved(self):
+        """Pending IDs should keep start order after out-of-order results."""
+        turn = TurnState()
+        for tid in ("a", "b", "c", "d"):
+            turn.start_tool(tid, "Read")
+        turn.finish_tool("b")
+
+        assert turn.pending_tool_ids == ["a", "c", "d"]
+        assert turn.drain_pending_tools() == ["a", "c", "d"]
+        assert turn.pending_tool_count == 0
+
+    def test_questions(self):
+        """Questions are tracked until discarded and remember the latest ID."""
+        turn = TurnState()
+        turn.add_question("q1")
+        turn.add_question("q2")
+        turn.discard_question("q1")
+        turn.discard_question("missing")
+
+        assert turn.pending_question_ids == ["q2"]
+        assert turn.last_question_id == "q2"
+
+    def test_slots(self):
+        """TurnState and WebSocketState should not carry a per-instance __dict__."""
+        assert not hasattr(TurnState(), "__dict__")
+        assert not hasattr(WebSocketState(), "__dict__")
+
+
+class TestSyntheticTurn:
+    """Drive large synthetic turns through the WebSocket response stream."""
+
+    @pytest.mark.asyncio
+    async def test_2000_parallel_tool_calls(self):
+        """All 2,000 tool results should resolve their pending entries."""
+        state = WebSocketState()
+        websocket = FakeWebSocket()
+        client = _FakeClient(_parallel_tool_turn(2000))
+
+        start = time.perf_counter()
+        await _process_response_stream(client, websocket, state, None, None)
+        elapsed = time.perf_counter() - start
+
+        assert state.turn.pending_tool_count == 0
+        tool_results = [e for e in websocket.sent if e.get("type") == "tool_result"]
+        assert len(tool_results) == 2000
+        # Generous bound: the old list-based bookkeeping was quadratic here.
+        assert elapsed < 5.0
+
+    @pytest.mark.asyncio
+    async def test_cancel_emits_results_in_start_order(self):
+        """Cancelled tools should be reported in the order they were started."""
+        state = WebSocketState()
+        websocket = FakeWebSocket()
+        for tid in ("t1", "t2", "t3"):
+            state.turn.start_tool(tid, "Bash")
+        state.turn.finish_tool("t2")
+
+        await _send_cancelled_tool_results(websocket, state)
+
+        assert [e["tool_use_id"] for e in websocket.sent] == ["t1", "t3"]
+        assert all(e["is_error"] for e in websocket.sent)
+        assert state.turn.pending_tool_count == 0
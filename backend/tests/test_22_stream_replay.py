@@ -0,0 +1,137 @@
+"""Tests for resumable WebSocket streams.
+
+Covers:
+- EventReplayBuffer sequence numbering, eviction and gap detection
+- DetachedStreamRegistry park/claim/expiry
+- ResumableWebSocket buffering while detached and replay on reattach
+"""
+import asyncio
+
+import pytest
+
+from api.routers.websocket import ResumableWebSocket
+from api.services.stream_replay import DetachedStreamRegistry, EventReplayBuffer
+from conftest import FakeWebSocket
+
+
+class TestEventReplayBuffer:
+    """Unit tests for EventReplayBuffer."""
+
+    def test_sequence_numbers_start_at_one(self):
+        buffer = EventReplayBuffer(maxlen=10)
+        assert buffer.last_seq == 0
+        assert buffer.append("a") == 1
+        assert buffer.append("b") == 2
+        assert buffer.last_seq == 2
+
+    def test_since_returns_missed_events(self):
+        buffer = EventReplayBuffer(maxlen=10)
+        for name in "abcde":
+            buffer.append(name)
+        assert buffer.since(2) == [(3, "c"), (4, "d"), (5, "e")]
+        assert buffer.since(5) == []
+        assert buffer.since(0) == [(i + 1, n) for i, n in enumerate("abcde")]
+
+    def test_since_reports_gap_after_eviction(self):
+        buffer = EventReplayBuffer(maxlen=3)
+        for name in "abcde":
+            buffer.append(name)
+        assert buffer.first_seq == 3
+        assert buffer.since(1) is None
+        assert buffer.since(2) == [(3, "c"), (4, "d"), (5, "e")]
+
+
+class TestDetachedStreamRegistry:
+    """Unit tests for DetachedStreamRegistry."""
+
+    @pytest.mark.asyncio
+    async def test_claim_cancels_expiry(self):
+        registry: DetachedStreamRegistry[str] = DetachedStreamRegistry()
+        expired: list[str] = []
+        registry.park("k", "item", 0.01, expired.append)
+
+        assert registry.claim("k") == "item"
+        await asyncio.sleep(0.03)
+        assert expired == []
+        assert registry.claim("k") is None
+
+    @pytest.mark.asyncio
+    async def test_unclaimed_item_expires(self):
+        registry: DetachedStreamRegistry[str] = DetachedStreamRegistry()
+        expired: list[str] = []
+        registry.park("k", "item", 0.01, expired.append)
+
+        await asyncio.sleep(0.03)
+        assert expired == ["item"]
+        assert "k" not in registry
+
+    @pytest.mark.asyncio
+    async def test_repark_expires_previous(self):
+        registry: DetachedStreamRegistry[str] = DetachedStreamRegistry()
+        expired: list[str] = []
+        registry.park("k", "old", 10, expired.append)
+        registry.park("k", "new", 10, expired.append)
+
+        assert expired == ["old"]
+        assert registry.claim("k") == "new"
+
+
+class TestResumableWebSocket:
+    """ResumableWebSocket keeps the turn alive across client reconnects."""
+
+    @pytest.mark.asyncio
+    async def test_events_are_numbered(self):
+        ws = FakeWebSocket()
+        channel = ResumableWebSocket(ws, EventReplayBuffer(maxlen=10))
+        await channel.send_json({"type": "text_delta", "text": "a"})
+        await channel.send_json({"type": "text_delta", "text": "b"})
+        assert [e["seq"] for e in ws.sent] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_send_failure_detaches_without_raising(self):
+        ws = FakeWebSocket(fail_after=1)
+        channel = ResumableWebSocket(ws, EventReplayBuffer(maxlen=10))
+        await channel.send_json({"type": "text_delta", "text": "a"})
+        await channel.send_json({"type": "text_delta", "text": "b"})
+        await channel.send_json({"type": "text_delta", "text": "c"})
+
+        assert not channel.is_attached
+        assert len(ws.sent) == 1
+
+    @pytest.mark.asyncio
+    async def test_reattach_replays_missed_events(self):
+        channel = ResumableWebSocket(FakeWebSocket(), EventReplayBuffer(maxlen=10))
+        for text in "abc":
+            await channel.send_json({"type": "text_delta", "text": text})
+        channel.detach()
+        await channel.send_json({"type": "text_delta", "text": "d"})
+
+        new_ws = FakeWebSocket()
+        await channel.attach(new_ws, {"type": "ready"}, last_seq=2)
+        await channel.send_json({"type": "done"})
+
+        assert new_ws.sent[0]["type"] == "ready"
+        assert new_ws.sent[0]["last_seq"] == 4
+        assert [e.get("text") for e in new_ws.sent[1:3]] == ["c", "d"]
+        assert [e["seq"] for e in new_ws.sent[1:]] == [3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_reattach_with_evicted_events_flags_gap(self):
+        channel = ResumableWebSocket(FakeWebSocket(), EventReplayBuffer(maxlen=2))
+        for text in "abcd":
+            await channel.send_json({"type": "text_delta", "text": text})
+        channel.detach()
+
+        new_ws = FakeWebSocket()
+        await channel.attach(new_ws, {"type": "ready"}, last_seq=1)
+
+        assert new_ws.sent == [
+            {"type": "ready", "encoding": "json", "replay_gap": True, "last_seq": 4}
+        ]
+        assert channel.is_attached
+
+    @pytest.mark.asyncio
+    async def test_close_while_detached_is_noop(self):
+        channel = ResumableWebSocket(FakeWebSocket(), EventReplayBuffer(maxlen=2))
+        channel.detach()
+        await channel.close(code=4002, reason="x")
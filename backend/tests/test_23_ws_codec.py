@@ -0,0 +1,72 @@
+"""Tests for WebSocket frame encoding.
+
+Covers:
+- JSON/MessagePack round trips and encoding negotiation
+- Binary frames emitted by ResumableWebSocket in msgpack mode
+"""
+import json
+
+import pytest
+
+from api.routers.websocket import ResumableWebSocket
+from api.services.stream_replay import EventReplayBuffer
+from core.ws_codec import (
+    JSON_ENCODING,
+    MSGPACK_ENCODING,
+    decode_frame,
+    encode_frame,
+    negotiate_encoding,
+)
+from conftest import FakeWebSocket
+
+_EVENT = {"type": "tool_result", "tool_use_id": "t1", "content": "héllo", "is_error": False}
+
+
+class TestCodec:
+    """Unit tests for encode_frame/decode_frame."""
+
+    def test_json_roundtrip_is_text(self):
+        frame = encode_frame(_EVENT)
+        assert isinstance(frame, str)
+        assert decode_frame(frame) == _EVENT
+
+    def test_msgpack_roundtrip_is_binary(self):
+        pytest.importorskip("msgpack")
+        frame = encode_frame(_EVENT, MSGPACK_ENCODING)
+        assert isinstance(frame, bytes)
+        assert decode_frame(frame) == _EVENT
+
+    def test_non_object_frame_rejected(self):
+        with pytest.raises(ValueError):
+            decode_frame("[1, 2]")
+
+    def test_negotiation_falls_back_to_json(self):
+        assert negotiate_encoding(None) == JSON_ENCODING
+        assert negotiate_encoding("cbor") == JSON_ENCODING
+        assert negotiate_encoding(JSON_ENCODING) == JSON_ENCODING
+
+
+class TestResumableWebSocketEncoding:
+    """ResumableWebSocket writes frames in the negotiated encoding."""
+
+    @pytest.mark.asyncio
+    async def test_json_mode_sends_text(self):
+        ws = FakeWebSocket()
+        channel = ResumableWebSocket(ws, EventReplayBuffer(maxlen=10))
+        await channel.send_json({"type": "done"})
+        assert ws.binary == []
+        assert json.loads(ws.text[0]) == {"type": "done", "seq": 1}
+
+    @pytest.mark.asyncio
+    async def test_msgpack_mode_replays_as_bytes(self):
+        pytest.importorskip("msgpack")
+        channel = ResumableWebSocket(FakeWebSocket(), EventReplayBuffer(maxlen=10))
+        channel.detach()
+        await channel.send_json({"type": "text_delta", "text": "a"})
+
+        ws = FakeWebSocket()
+        await channel.attach(ws, {"type": "ready"}, last_seq=0, encoding=MSGPACK_ENCODING)
+
+        assert ws.text == []
+        assert decode_frame(ws.binary[0])["encoding"] == MSGPACK_ENCODING
+        assert decode_frame(ws.binary[1]) == {"type": "text_delta", "text": "a", "seq": 1}
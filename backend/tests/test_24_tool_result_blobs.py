@@ -0,0 +1,198 @@
+"""Tests for large tool-result elision into the content-addressed blob store.
+
+Covers:
+- BlobStore dedup, atomic writes and hash validation
+- ToolResultElider preview/reference shape and threshold handling
+- HistoryTracker storing the preview plus content_ref metadata
+- GET /sessions/{id}/blobs/{hash} serving the full body, and image blobs as images
+- Secrets never reach the client via the blob, and hashes survive sanitizing
+"""
+import pytest
+from claude_agent_sdk.types import ToolResultBlock, UserMessage
+
+from agent.core.blob_store import BlobStore, is_valid_blob_hash
+from agent.core.storage import HistoryStorage
+from api.core.errors import APIError, InvalidRequestError, SessionNotFoundError
+from api.services.history_tracker import HistoryTracker
+from api.services.tool_result_elision import ToolResultElider
+
+
+class TestBlobStore:
+    """Unit tests for BlobStore."""
+
+    def test_put_is_content_addressed(self, tmp_path):
+        store = BlobStore(data_dir=tmp_path)
+        first = store.put_text("same body")
+        second = store.put_text("same body")
+
+        assert first == second
+        assert is_valid_blob_hash(first)
+        assert store.get(first) == b"same body"
+        assert len(list((tmp_path / "blobs").rglob("*"))) == 2  # shard dir + blob
+
+    def test_get_rejects_malformed_hash(self, tmp_path):
+        store = BlobStore(data_dir=tmp_path)
+        assert store.get("../../etc/passwd") is None
+        assert store.get("0" * 64) is None
+        assert not store.exists("zz")
+
+
+class TestToolResultElider:
+    """Unit tests for ToolResultElider."""
+
+    def test_small_content_untouched(self, tmp_path):
+        elider = ToolResultElider(BlobStore(tmp_path), threshold=100, preview_chars=10)
+        event = {"type": "tool_result", "content": "short"}
+        elider.apply(event)
+        assert event == {"type": "tool_result", "content": "short"}
+
+    def test_large_content_elided(self, tmp_path):
+        store = BlobStore(tmp_path)
+        elider = ToolResultElider(store, threshold=100, preview_chars=10)
+        body = "row\n" * 125
+        event = {"type": "tool_result", "content": body}
+        elider.apply(event)
+
+        assert event["content"] == body[:10]
+        ref = event["content_ref"]
+        assert ref["size"] == 500 and ref["truncated"] is True
+        assert store.get(ref["hash"]).decode() == body
+
+
+class TestHistoryTrackerElision:
+    """History JSONL references the same blob as the streamed event."""
+
+    def test_typed_tool_result_references_blob(self, tmp_path):
+        store = BlobStore(tmp_path)
+        elider = ToolResultElider(store, threshold=50, preview_chars=5)
+        history = HistoryStorage(data_dir=tmp_path)
+        tracker = HistoryTracker(session_id="s1", history=history, elider=elider)
+
+        body = "line\n" * 100
+        for tool_use_id in ("t1", "t2"):
+            tracker.save_from_user_message(UserMessage(
+                content=[ToolResultBlock(tool_use_id=tool_use_id, content=body)]
+            ))
+
+        messages = history.get_messages("s1")
+        refs = [m.metadata["content_ref"] for m in messages]
+        assert [m.content for m in messages] == ["line\n", "line\n"]
+        assert refs[0]["hash"] == refs[1]["hash"]
+        assert store.get(refs[0]["hash"]).decode() == body
+
+        event = {"type": "tool_result", "content": body}
+        elider.apply(event)
+        assert event["content_ref"]["hash"] == refs[0]["hash"]
+
+    def test_without_elider_stores_full_body(self, tmp_path):
+        history = HistoryStorage(data_dir=tmp_path)
+        tracker = HistoryTracker(session_id="s1", history=history)
+        tracker.save_tool_result({"tool_use_id": "t1", "content": "row\n" * 250})
+
+        [message] = history.get_messages("s1")
+        assert message.content == "row\n" * 250
+        assert "content_ref" not in message.metadata
+
+
+class TestBlobEndpoint:
+    """GET /sessions/{id}/blobs/{hash}."""
+
+    @pytest.fixture
+    def user_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DATA_DIR", str(tmp_path))
+        return tmp_path / "alice"
+
+    @pytest.fixture
+    def user(self):
+        from api.models.user_auth import UserTokenPayload
+        return UserTokenPayload(user_id="u1", username="alice", role="user")
+
+    @pytest.mark.asyncio
+    async def test_returns_blob_for_known_session(self, user_dir, user):
+        from api.routers.sessions import get_session_blob
+
+        HistoryStorage(data_dir=user_dir).append_message("s1", "user", "hi")
+        blob_hash = BlobStore(user_dir).put_text("full output")
+
+        response = await get_session_blob("s1", blob_hash, user=user)
+        assert response.body == b"full output"
+        assert "immutable" in response.headers["cache-control"]
+
+    @pytest.mark.asyncio
+    async def test_image_blob_served_as_image(self, user_dir, user):
+        from api.routers.sessions import get_session_blob
+
+        png = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+        HistoryStorage(data_dir=user_dir).append_message("s1", "user", "hi")
+        blob_hash = BlobStore(user_dir).put(png)
+
+        response = await get_session_blob("s1", blob_hash, user=user)
+        assert response.body == png
+        assert response.headers["content-type"] == "image/png"
+
+    @pytest.mark.asyncio
+    async def test_errors(self, user_dir, user):
+        from api.routers.sessions import get_session_blob
+
+        HistoryStorage(data_dir=user_dir).append_message("s1", "user", "hi")
+        with pytest.raises(InvalidRequestError):
+            await get_session_blob("s1", "not-a-hash", user=user)
+        with pytest.raises(SessionNotFoundError):
+            await get_session_blob("missing", "0" * 64, user=user)
+        with pytest.raises(APIError) as exc:
+            await get_session_blob("s1", "0" * 64, user=user)
+        assert exc.value.status_code == 404
+
+
+class _CapturingWebSocket:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def send_json(self, data: dict, **kwargs) -> None:
+        self.sent.append(data)
+
+
+class TestSanitizedElision:
+    """Elided results go through the same redaction as streamed events."""
+
+    SECRET = "sk-ant-api03-" + "A1b2C3d4" * 6
+
+    @pytest.fixture
+    def user_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DATA_DIR", str(tmp_path))
+        return tmp_path / "alice"
+
+    @pytest.mark.asyncio
+    async def test_websocket_ref_survives_and_blob_is_redacted(self, user_dir):
+        from api.models.user_auth import UserTokenPayload
+        from api.routers.sessions import get_session_blob
+        from api.routers.websocket import SanitizedWebSocket
+
+        HistoryStorage(data_dir=user_dir).append_message("s1", "user", "hi")
+        elider = ToolResultElider(BlobStore(user_dir), threshold=100, preview_chars=10)
+        event = {"type": "tool_result", "content": f"key {self.SECRET}\n" + "row\n" * 250}
+        elider.apply(event)
+
+        ws = _CapturingWebSocket()
+        await SanitizedWebSocket(ws).send_json(event)
+        [sent] = ws.sent
+        blob_hash = sent["content_ref"]["hash"]
+        assert is_valid_blob_hash(blob_hash)
+        assert self.SECRET not in sent["content"]
+
+        user = UserTokenPayload(user_id="u1", username="alice", role="user")
+        response = await get_session_blob("s1", blob_hash, user=user)
+        assert self.SECRET not in response.body.decode()
+        assert "row\n" in response.body.decode()
+
+    @pytest.mark.asyncio
+    async def test_endpoint_redacts_legacy_blob(self, user_dir):
+        from api.models.user_auth import UserTokenPayload
+        from api.routers.sessions import get_session_blob
+
+        HistoryStorage(data_dir=user_dir).append_message("s1", "user", "hi")
+        blob_hash = BlobStore(user_dir).put_text(f"raw {self.SECRET}")
+
+        user = UserTokenPayload(user_id="u1", username="alice", role="user")
+        response = await get_session_blob("s1", blob_hash, user=user)
+        assert self.SECRET not in response.body.decode()
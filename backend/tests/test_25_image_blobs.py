@@ -0,0 +1,137 @@
+"""Tests for content-addressed storage of images in history.
+
+Covers:
+- Inline base64 images replaced by blob references on append
+- Re-sent images stored once
+- Lazy resolution back to base64 when history is served
+- Migration of existing history files
+- Appends made while a migration runs are kept, in order, without blocking the caller
+"""
+import base64
+import json
+import threading
+
+import pytest
+
+import agent.core.storage as storage_module
+from agent.core.storage import HistoryStorage
+from api.services.history_tracker import HistoryTracker
+
+_PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8
+_PNG_B64 = base64.b64encode(_PNG).decode()
+
+
+def _image_message(text: str = "look") -> list[dict]:
+    return [
+        {"type": "text", "text": text},
+        {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": _PNG_B64}},
+    ]
+
+
+def _blob_files(tmp_path) -> list:
+    return [p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]
+
+
+class TestImageExternalization:
+    """Images in user messages are stored once as raw bytes."""
+
+    def test_history_references_blob(self, tmp_path):
+        history = HistoryStorage(data_dir=tmp_path)
+        HistoryTracker(session_id="s1", history=history).save_user_message(_image_message())
+
+        raw = (tmp_path / "history" / "s1.jsonl").read_text()
+        assert _PNG_B64 not in raw
+
+        [message] = history.get_messages("s1")
+        source = message.content[1]["source"]
+        assert source["type"] == "blob"
+        assert source["media_type"] == "image/png"
+        assert source["size"] == len(_PNG)
+        assert _blob_files(tmp_path)[0].read_bytes() == _PNG
+
+    def test_resent_image_stored_once(self, tmp_path):
+        history = HistoryStorage(data_dir=tmp_path)
+        tracker = HistoryTracker(session_id="s1", history=history)
+        tracker.save_user_message(_image_message("first"))
+        tracker.save_user_message(_image_message("retry"))
+        HistoryStorage(data_dir=tmp_path).append_message("s2", "user", _image_message())
+
+        assert len(_blob_files(tmp_path)) == 1
+
+    def test_invalid_base64_kept_inline(self, tmp_path):
+        history = HistoryStorage(data_dir=tmp_path)
+        content = [{"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "!!"}}]
+        history.append_message("s1", "user", content)
+
+        [message] = history.get_messages("s1")
+        assert message.content == content
+
+    def test_resolve_restores_base64(self, tmp_path):
+        history = HistoryStorage(data_dir=tmp_path)
+        history.append_message("s1", "user", _image_message())
+
+        messages = history.get_messages_dict("s1")
+        history.resolve_image_blobs(messages)
+        assert messages[0]["content"][1]["source"] == {
+            "type": "base64", "media_type": "image/png", "data": _PNG_B64,
+        }
+
+
+class TestMigration:
+    """migrate_inline_images rewrites legacy history files."""
+
+    def test_migrates_legacy_file(self, tmp_path):
+        history = HistoryStorage(data_dir=tmp_path)
+        legacy = [
+            {"role": "user", "content": _image_message(), "timestamp": "t"},
+            {"role": "assistant", "content": "nice", "timestamp": "t"},
+            {"role": "user", "content": _image_message("again"), "timestamp": "t"},
+        ]
+        path = tmp_path / "history" / "s1.jsonl"
+        path.write_text("".join(json.dumps(m) + "\n" for m in legacy))
+
+        assert history.list_session_ids() == ["s1"]
+        assert history.migrate_inline_images("s1") == 2
+        assert _PNG_B64 not in path.read_text()
+        assert len(_blob_files(tmp_path)) == 1
+        assert history.migrate_inline_images("s1") == 0
+
+        messages = history.get_messages_dict("s1")
+        history.resolve_image_blobs(messages)
+        assert [m["content"] for m in messages] == [m["content"] for m in legacy]
+
+    @pytest.mark.skipif(storage_module.fcntl is None, reason="advisory locks need fcntl")
+    def test_append_during_migration_is_kept(self, tmp_path, monkeypatch):
+        history = HistoryStorage(data_dir=tmp_path)
+        path = tmp_path / "history" / "s1.jsonl"
+        path.write_text(json.dumps({"role": "user", "content": _image_message(), "timestamp": "t"}) + "\n")
+
+        migrating = threading.Event()
+        resume = threading.Event()
+        externalize = storage_module._externalize_images
+
+        def _slow_externalize(content, blobs):
+            if threading.current_thread().name == "migrate":
+                migrating.set()
+                resume.wait(5)
+            return externalize(content, blobs)
+
+        monkeypatch.setattr(storage_module, "_externalize_images", _slow_externalize)
+        migrator = threading.Thread(target=history.migrate_inline_images, args=("s1",), name="migrate")
+        migrator.start()
+        assert migrating.wait(5)
+
+        # The append does not wait for the migration's lock; it is queued instead.
+        appender = threading.Thread(target=history.append_message, args=("s1", "assistant", "late"))
+        appender.start()
+        appender.join(1)
+        assert not appender.is_alive()
+        history.append_message("s1", "assistant", "later")
+
+        resume.set()
+        migrator.join(5)
+        storage_module.flush_deferred_history_appends(timeout=5)
+
+        messages = history.get_messages_dict("s1")
+        assert [m["content"] for m in messages][1:] == ["late", "later"]
+        assert _PNG_B64 not in path.read_text()
@@ -0,0 +1,93 @@
+"""Tests for per-session environment isolation of plugin MCP subprocesses.
+
+Covers:
+- build_tools_env contents and stdio MCP config injection
+- 100 parallel WebSocket SDK connects, each seeing only its own user
+"""
+import asyncio
+import functools
+import os
+import random
+
+import pytest
+
+import api.routers.websocket as websocket_module
+import api.services.session_setup as session_setup_module
+from agent.core import agent_options
+from agent.core.agent_options import build_tools_env, create_agent_sdk_options
+from agent.core.file_storage import FileStorage
+from api.routers.websocket import WebSocketState, _ensure_sdk_client
+from api.services.question_manager import QuestionManager
+
+
+class _SubprocessRecordingClient:
+    """Stand-in for ClaudeSDKClient that captures the env its subprocess would get."""
+
+    def __init__(self, options):
+        self.options = options
+        self.spawn_env: dict[str, str] | None = None
+
+    async def connect(self):
+        # Yield so other connections interleave between setup and spawn.
+        await asyncio.sleep(random.random() / 100)
+        # Mirrors the SDK transport: inherited os.environ overlaid with options.env.
+        self.spawn_env = {**os.environ, **self.options.env}
+
+
+class TestBuildToolsEnv:
+    """Unit tests for build_tools_env and MCP config injection."""
+
+    def test_env_contents(self):
+        env = build_tools_env("alice", "cwd-1")
+        assert env["EMAIL_USERNAME"] == env["MEDIA_USERNAME"] == "alice"
+        assert env["EMAIL_SESSION_ID"] == env["MEDIA_SESSION_ID"] == "cwd-1"
+        assert env["DATA_DIR"]
+        assert "EMAIL_SESSION_ID" not in build_tools_env("alice")
+
+    def test_stdio_mcp_servers_receive_env(self, monkeypatch):
+        real_load = agent_options.load_agent_config
+
+        def _load(agent_id=None):
+            config = dict(real_load(agent_id))
+            config["mcp_servers"] = {
+                "local": {"command": "python", "args": ["srv.py"], "env": {"KEEP": "1", "EMAIL_USERNAME": "stale"}},
+                "remote": {"type": "http", "url": "https://example.invalid/mcp"},
+            }
+            return config
+
+        monkeypatch.setattr(agent_options, "load_agent_config", _load)
+        options = create_agent_sdk_options(env=build_tools_env("bob", "cwd-2"))
+
+        assert options.env["EMAIL_USERNAME"] == "bob"
+        local_env = options.mcp_servers["local"]["env"]
+        assert local_env["KEEP"] == "1"
+        assert local_env["EMAIL_USERNAME"] == "bob"
+        assert "env" not in options.mcp_servers["remote"]
+
+
+class TestParallelConnects:
+    """Concurrent connections must not leak identities into each other."""
+
+    @pytest.mark.asyncio
+    async def test_100_parallel_connects_no_leakage(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(websocket_module, "ClaudeSDKClient", _SubprocessRecordingClient)
+        monkeypatch.setattr(
+            session_setup_module, "FileStorage", functools.partial(FileStorage, base_path=str(tmp_path))
+        )
+        monkeypatch.setenv("EMAIL_USERNAME", "process-global")
+        question_manager = QuestionManager()
+
+        async def _connect(i: int) -> tuple[WebSocketState, _SubprocessRecordingClient]:
+            state = WebSocketState(username=f"user{i}", cwd_id=f"cwd{i}")
+            client = await _ensure_sdk_client(None, state, question_manager)
+            return state, client
+
+        results = await asyncio.gather(*(_connect(i) for i in range(100)))
+
+        for state, client in results:
+            env = client.spawn_env
+            assert env["EMAIL_USERNAME"] == state.username
+            assert env["MEDIA_USERNAME"] == state.username
+            assert env["EMAIL_SESSION_ID"] == state.cwd_id
+            assert env["MEDIA_SESSION_ID"] == state.cwd_id
+        assert os.environ["EMAIL_USERNAME"] == "process-global"
@@ -0,0 +1,154 @@
+"""Tests for SessionManager sharding and idle eviction.
+
+Covers:
+- LRU cap on cached metadata and SDK ID mappings
+- Metadata evicted during a lookup falls back to a new conversation
+- TTL reaping of idle metadata and connected sessions
+- Shard isolation: a slow operation on one shard does not block others
+- Shutdown stops the reaper and disconnects live sessions
+"""
+import asyncio
+
+import pytest
+
+import api.services.session_manager as session_manager_module
+from api.services.session_manager import SessionManager
+from conftest import FakeClock, FakeConversationSession
+
+
+@pytest.fixture(autouse=True)
+def _fake_sessions(monkeypatch):
+    monkeypatch.setattr(session_manager_module, "ConversationSession", FakeConversationSession)
+    monkeypatch.setattr(session_manager_module, "create_agent_sdk_options", lambda **kwargs: None)
+
+
+class TestMetadataEviction:
+    """Cached metadata stays bounded."""
+
+    @pytest.mark.asyncio
+    async def test_lru_cap_evicts_oldest(self):
+        manager = SessionManager(shard_count=1, max_metadata=3)
+        ids = []
+        for i in range(5):
+            _, pending_id, _ = await manager.get_or_create_conversation_session(f"new-{i}")
+            manager.register_sdk_session_id(pending_id, f"sdk-{i}")
+            ids.append(pending_id)
+
+        assert not manager.is_session_cached(ids[0])
+        assert not manager.is_session_cached("sdk-1")
+        assert manager.is_session_cached("sdk-4")
+        assert manager.stats()["cached_metadata"] == 3
+        assert manager.stats()["sdk_session_mappings"] == 3
+        assert manager.stats()["evicted_metadata_total"] == 2
+
+    @pytest.mark.asyncio
+    async def test_access_refreshes_lru_position(self):
+        manager = SessionManager(shard_count=1, max_metadata=2)
+        _, first, _ = await manager.get_or_create_conversation_session("a")
+        _, second, _ = await manager.get_or_create_conversation_session("b")
+        await manager.get_or_create_conversation_session(first)
+        await manager.get_or_create_conversation_session("c")
+
+        assert manager.is_session_cached(first)
+        assert not manager.is_session_cached(second)
+
+    @pytest.mark.asyncio
+    async def test_register_after_eviction_is_ignored(self):
+        manager = SessionManager(shard_count=1)
+        manager.register_sdk_session_id("pending-gone", "sdk-x")
+        assert manager.stats()["sdk_session_mappings"] == 0
+
+    @pytest.mark.asyncio
+    async def test_eviction_while_waiting_for_lock_starts_new(self):
+        manager = SessionManager(shard_count=1)
+        _, pending_id, _ = await manager.get_or_create_conversation_session("a")
+        shard = manager._shard(pending_id)
+
+        async with shard.lock:
+            lookup = asyncio.create_task(manager.get_or_create_conversation_session(pending_id))
+            await asyncio.sleep(0)
+            # Evicted after the ID was resolved but before the lock was taken.
+            manager._drop_metadata(shard, pending_id)
+
+        runner, resolved_id, found = await lookup
+        assert not found
+        assert resolved_id != pending_id
+        assert manager.is_session_cached(resolved_id)
+        await manager.shutdown()
+
+
+class TestIdleReaping:
+    """reap_idle evicts by TTL."""
+
+    @pytest.mark.asyncio
+    async def test_reaps_idle_sessions_and_metadata(self):
+        clock = FakeClock()
+        manager = SessionManager(shard_count=4, idle_ttl=60, clock=clock)
+        stale_id = await manager.create_session()
+        stale = await manager.get_session(stale_id)
+        _, stale_pending, _ = await manager.get_or_create_conversation_session("x")
+
+        clock.now += 50
+        fresh_id = await manager.create_session()
+        clock.now += 20
+
+        assert await manager.reap_idle() == 1
+        assert stale.disconnected
+        assert not manager.is_session_cached(stale_pending)
+        assert (await manager.get_session(fresh_id)).disconnected is False
+        stats = manager.stats()
+        assert stats["live_sessions"] == 1
+        assert stats["evicted_sessions_total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_live_session_cap(self):
+        manager = SessionManager(shard_count=1, max_live_sessions=2)
+        first = await manager.create_session()
+        first_session = await manager.get_session(first)
+        await manager.create_session()
+        await manager.create_session()
+
+        assert first_session.disconnected
+        assert manager.stats()["live_sessions"] == 2
+
+
+class TestShardIsolation:
+    """Locks are per shard."""
+
+    @pytest.mark.asyncio
+    async def test_slow_close_does_not_block_other_shards(self):
+        manager = SessionManager(shard_count=64)
+        slow_id = await manager.create_session()
+        slow = await manager.get_session(slow_id)
+        release = asyncio.Event()
+
+        async def _slow_disconnect():
+            await release.wait()
+
+        slow.disconnect = _slow_disconnect
+        other_id = await manager.create_session()
+        while manager._shard(other_id) is manager._shard(slow_id):
+            other_id = await manager.create_session()
+
+        closing = asyncio.create_task(manager.close_session(slow_id))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(manager.get_session(other_id), timeout=1)
+
+        release.set()
+        await closing
+
+
+class TestShutdown:
+    """shutdown() tears everything down."""
+
+    @pytest.mark.asyncio
+    async def test_shutdown_stops_reaper_and_disconnects(self):
+        manager = SessionManager(shard_count=2)
+        manager.start_reaper(interval=0.01)
+        session = await manager.get_session(await manager.create_session())
+
+        await manager.shutdown()
+
+        assert session.disconnected
+        assert manager.stats()["live_sessions"] == 0
+        assert manager._reaper_task is None
@@ -0,0 +1,178 @@
+"""Tests for reusing SSE conversation sessions across requests.
+
+Covers:
+- The same connected session serves consecutive requests
+- Concurrent follow-ups in one conversation are serialized
+- Idle timeout, close/delete and shutdown release the session
+- Close interrupts the running turn instead of draining queued prompts
+- A failed query stops the runner and the next request starts fresh
+"""
+import asyncio
+
+import pytest
+
+import api.services.session_manager as session_manager_module
+from api.services.conversation_runner import ConversationRunner
+from api.services.session_manager import SessionManager
+from conftest import FakeConversationSession
+
+
+@pytest.fixture(autouse=True)
+def _fake_sessions(monkeypatch):
+    FakeConversationSession.instances = []
+    monkeypatch.setattr(session_manager_module, "ConversationSession", FakeConversationSession)
+    monkeypatch.setattr(session_manager_module, "create_agent_sdk_options", lambda **kwargs: None)
+
+
+async def _collect(conversation, content) -> list:
+    return [msg async for msg in conversation.send_query(content)]
+
+
+class TestConversationReuse:
+    """Follow-up requests share one connected session."""
+
+    @pytest.mark.asyncio
+    async def test_second_request_reuses_session(self):
+        manager = SessionManager(conversation_idle_timeout=10)
+        first, pending_id, found = await manager.get_or_create_conversation_session("new")
+        assert not found
+        assert await _collect(first, "a") == ["a:1", "a:2"]
+
+        second, resolved_id, found = await manager.get_or_create_conversation_session(pending_id)
+        assert found and resolved_id == pending_id
+        assert second is first
+        assert await _collect(second, "b") == ["b:1", "b:2"]
+
+        assert len(FakeConversationSession.instances) == 1
+        assert FakeConversationSession.instances[0].connects == 1
+        assert manager.stats()["live_conversations"] == 1
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_sdk_id_resolves_to_same_runner(self):
+        manager = SessionManager(conversation_idle_timeout=10)
+        first, pending_id, _ = await manager.get_or_create_conversation_session("new")
+        first.sdk_session_id = "sdk-1"
+        manager.register_sdk_session_id(pending_id, "sdk-1")
+
+        second, _, _ = await manager.get_or_create_conversation_session("sdk-1")
+        assert second is first
+        assert second.session.sdk_session_id == "sdk-1"
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_runners_are_per_user(self):
+        manager = SessionManager(conversation_idle_timeout=10)
+        alice, pending_id, _ = await manager.get_or_create_conversation_session("new", username="alice")
+        bob, _, _ = await manager.get_or_create_conversation_session(pending_id, username="bob")
+        assert alice is not bob
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_follow_ups_are_serialized(self):
+        manager = SessionManager(conversation_idle_timeout=10)
+        conversation, _, _ = await manager.get_or_create_conversation_session("new")
+        conversation.session.delay = 0.01
+
+        results = await asyncio.gather(*(_collect(conversation, str(i)) for i in range(5)))
+
+        assert results == [[f"{i}:1", f"{i}:2"] for i in range(5)]
+        assert conversation.session.max_active == 1
+        await manager.shutdown()
+
+
+class TestConversationRelease:
+    """Idle, deleted and shut-down conversations disconnect their session."""
+
+    @pytest.mark.asyncio
+    async def test_idle_timeout_releases_session(self):
+        manager = SessionManager(conversation_idle_timeout=0.02)
+        conversation, pending_id, _ = await manager.get_or_create_conversation_session("new")
+        await _collect(conversation, "a")
+
+        await asyncio.sleep(0.06)
+        assert conversation.session.disconnected
+        assert not conversation.is_alive
+        assert manager.stats()["live_conversations"] == 0
+
+        replacement, _, found = await manager.get_or_create_conversation_session(pending_id)
+        assert found
+        assert replacement is not conversation
+        assert replacement.turn_count == 0
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_close_session_releases_conversation(self):
+        manager = SessionManager(conversation_idle_timeout=10)
+        conversation, pending_id, _ = await manager.get_or_create_conversation_session("new")
+        await _collect(conversation, "a")
+
+        await manager.close_session(pending_id)
+
+        assert conversation.session.disconnected
+        assert manager.stats()["live_conversations"] == 0
+        with pytest.raises(RuntimeError):
+            await _collect(conversation, "b")
+
+    @pytest.mark.asyncio
+    async def test_shutdown_closes_conversations(self):
+        manager = SessionManager(conversation_idle_timeout=10)
+        conversations = [
+            (await manager.get_or_create_conversation_session(f"new-{i}"))[0] for i in range(3)
+        ]
+        await manager.shutdown()
+        assert all(c.session.disconnected for c in conversations)
+
+    @pytest.mark.asyncio
+    async def test_failed_query_stops_runner(self):
+        manager = SessionManager(conversation_idle_timeout=10)
+        conversation, pending_id, _ = await manager.get_or_create_conversation_session("new")
+        conversation.session.fail_next = True
+
+        with pytest.raises(RuntimeError, match="sdk exploded"):
+            await _collect(conversation, "a")
+        await asyncio.sleep(0)
+
+        assert conversation.session.disconnected
+        replacement, _, _ = await manager.get_or_create_conversation_session(pending_id)
+        assert replacement is not conversation
+        assert await _collect(replacement, "b") == ["b:1", "b:2"]
+        await manager.shutdown()
+
+
+class TestConversationRunner:
+    """Unit tests for ConversationRunner on its own."""
+
+    @pytest.mark.asyncio
+    async def test_close_interrupts_turn_and_fails_queued(self):
+        session = FakeConversationSession()
+        session.delay = 30
+        runner = ConversationRunner(session, idle_timeout=10)
+
+        first = asyncio.create_task(_collect(runner, "a"))
+        second = asyncio.create_task(_collect(runner, "b"))
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(runner.close(), timeout=1)
+
+        for task in (first, second):
+            with pytest.raises(RuntimeError, match="closed"):
+                await task
+        assert session.turn_count == 0
+        assert session.disconnected
+
+    @pytest.mark.asyncio
+    async def test_close_before_first_run(self):
+        exited = []
+        session = FakeConversationSession()
+        runner = ConversationRunner(session, idle_timeout=10, on_exit=exited.append)
+        await runner.close()
+        assert session.disconnected
+        assert exited == [runner]
+
+    @pytest.mark.asyncio
+    async def test_on_exit_called_once(self):
+        exited = []
+        runner = ConversationRunner(FakeConversationSession(), idle_timeout=10, on_exit=exited.append)
+        await runner.close()
+        await runner.close()
+        assert exited == [runner]
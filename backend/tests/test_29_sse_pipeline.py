@@ -0,0 +1,178 @@
+"""Tests for the SSE conversation event pipeline.
+
+Covers:
+- SSE events carry data dicts until they are sent
+- Paths are sanitized on the Python object and the payload is serialized once
+- History still records the unsanitized event
+- dumps_json output matches the standard library encoding
+- A synthetic long turn streams through the pipeline quickly
+"""
+import json
+import time
+from pathlib import Path
+
+import pytest
+from claude_agent_sdk.types import (
+    AssistantMessage,
+    ResultMessage,
+    StreamEvent,
+    SystemMessage,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+
+import api.routers.conversations as conversations_module
+from api.constants import EventType
+from api.routers.conversations import _stream_conversation_events
+from api.services.message_utils import convert_messages_to_sse
+from core.json_codec import dumps_json
+
+PROJECT_ROOT = str(Path(conversations_module.__file__).resolve().parents[2]) + "/"
+
+
+def _text_delta(text: str) -> StreamEvent:
+    return StreamEvent(
+        uuid="u", session_id="s",
+        event={"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}},
+    )
+
+
+def _long_turn(deltas: int = 2000, tools: int = 100) -> list:
+    """A recorded-shape turn: init, many text deltas, tool calls with ~1 KB results."""
+    messages: list = [SystemMessage(subtype="init", data={"session_id": "sdk-1"})]
+    for i in range(tools):
+        messages.extend(_text_delta(f"token {j} ") for j in range(deltas // tools))
+        messages.append(AssistantMessage(
+            content=[ToolUseBlock(id=f"toolu_{i}", name="Read", input={"file_path": f"{PROJECT_ROOT}data/f{i}.txt"})],
+            model="test",
+        ))
+        messages.append(UserMessage(content=[
+            ToolResultBlock(tool_use_id=f"toolu_{i}", content=f"{PROJECT_ROOT}data/f{i}.txt\n" + "row\n" * 250)
+        ]))
+    messages.append(ResultMessage(
+        subtype="success", duration_ms=1, duration_api_ms=1,
+        is_error=False, num_turns=1, session_id="sdk-1", usage={"input_tokens": 10},
+    ))
+    return messages
+
+
+class _FakeConversation:
+    def __init__(self, messages: list):
+        self._messages = messages
+        self.sdk_session_id = None
+        self.turn_count = 0
+
+    async def send_query(self, content):
+        for msg in self._messages:
+            yield msg
+
+
+class _FakeManager:
+    def __init__(self, messages: list):
+        self.conversation = _FakeConversation(messages)
+        self.registered: list[tuple[str, str]] = []
+
+    async def get_or_create_conversation_session(self, session_id, agent_id=None, username=None):
+        return self.conversation, "pending-1", False
+
+    def register_sdk_session_id(self, pending_id, sdk_session_id):
+        self.registered.append((pending_id, sdk_session_id))
+
+
+class _RecordingTracker:
+    events: list[tuple[str, dict]] = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def save_user_message(self, content):
+        pass
+
+    def process_event(self, event_type, data):
+        _RecordingTracker.events.append((event_type, json.loads(json.dumps(data))))
+
+    def has_accumulated_text(self):
+        return False
+
+
+@pytest.fixture
+def recording_tracker(monkeypatch):
+    _RecordingTracker.events = []
+    monkeypatch.setattr(conversations_module, "HistoryTracker", _RecordingTracker)
+    monkeypatch.setattr(conversations_module, "get_tool_result_elider", lambda username: None)
+    return _RecordingTracker
+
+
+async def _collect(messages: list) -> tuple[list[dict], _FakeManager]:
+    manager = _FakeManager(messages)
+    events = [e async for e in _stream_conversation_events("new", "hi", manager)]
+    return events, manager
+
+
+class TestSseEventFormat:
+    """convert_messages_to_sse leaves serialization to the caller."""
+
+    def test_data_is_a_dict(self):
+        [event] = convert_messages_to_sse(_text_delta("hello"))
+        assert event == {"event": EventType.TEXT_DELTA, "data": {"text": "hello"}}
+
+    def test_dumps_json_matches_stdlib(self):
+        data = {"text": "héllo ✓", "n": 1, "nested": [{"a": None, "b": True}], "big": 2**70}
+        assert json.loads(dumps_json(data)) == data
+
+    def test_dumps_json_stringifies_unknown_values(self):
+        assert json.loads(dumps_json({"path": Path("/tmp/x")})) == {"path": "/tmp/x"}
+
+
+class TestSsePipeline:
+    """_stream_conversation_events sanitizes objects and serializes once."""
+
+    @pytest.mark.asyncio
+    async def test_paths_sanitized_in_payload_not_history(self, recording_tracker):
+        events, manager = await _collect(_long_turn(deltas=10, tools=1))
+
+        tool_use = next(e for e in events if e["event"] == EventType.TOOL_USE)
+        assert isinstance(tool_use["data"], str)
+        assert json.loads(tool_use["data"])["input"]["file_path"] == "data/f0.txt"
+
+        recorded = dict(recording_tracker.events)[EventType.TOOL_USE]
+        assert recorded["input"]["file_path"] == f"{PROJECT_ROOT}data/f0.txt"
+
+    @pytest.mark.asyncio
+    async def test_sdk_session_id_is_registered_not_recorded(self, recording_tracker):
+        events, manager = await _collect(_long_turn(deltas=10, tools=1))
+
+        assert events[0]["event"] == EventType.SESSION_ID
+        assert json.loads(events[0]["data"]) == {"session_id": "pending-1", "found_in_cache": False}
+        assert events[1] == {"event": "sdk_session_id", "data": '{"sdk_session_id":"sdk-1"}'}
+        assert manager.registered == [("pending-1", "sdk-1")]
+        assert manager.conversation.sdk_session_id == "sdk-1"
+        assert EventType.SESSION_ID not in dict(recording_tracker.events)
+
+    @pytest.mark.asyncio
+    async def test_payloads_are_never_reparsed(self, recording_tracker, monkeypatch):
+        def _fail(*args, **kwargs):
+            raise AssertionError("SSE pipeline should not decode its own JSON")
+
+        monkeypatch.setattr(recording_tracker, "process_event", lambda self, event_type, data: None)
+        monkeypatch.setattr(json, "loads", _fail)
+        events, _ = await _collect(_long_turn(deltas=10, tools=1))
+        monkeypatch.undo()
+
+        assert all(isinstance(e["data"], str) for e in events)
+
+    @pytest.mark.asyncio
+    async def test_long_turn(self, recording_tracker):
+        messages = _long_turn()
+
+        start = time.perf_counter()
+        events, _ = await _collect(messages)
+        elapsed = time.perf_counter() - start
+
+        deltas = [e for e in events if e["event"] == EventType.TEXT_DELTA]
+        assert len(deltas) == 2000
+        assert events[-1]["event"] == EventType.DONE
+        assert json.loads(events[-1]["data"])["usage"] == {"input_tokens": 10}
+        # Generous bound; the point is a single encode per event.
+        assert elapsed < 5.0
@@ -0,0 +1,199 @@
+"""Tests for resumable SSE conversation turns.
+
+Covers:
+- Last-Event-ID parsing
+- SseTurn numbering, mid-stream resume and replay gaps
+- SseTurnRegistry ownership checks and grace-period retention
+- Resuming through the router does not start a new turn
+- The CLI SSE client reconnects with Last-Event-ID after a dropped connection
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from api.constants import EventType
+from api.routers.conversations import _turn_response
+from api.services.sse_turns import SseTurn, SseTurnRegistry, parse_event_id
+from cli.clients.api import APIClient
+from cli.clients.config import ClientConfig
+
+
+async def _events(n: int, gate: asyncio.Event | None = None):
+    for i in range(n):
+        if gate is not None and i == n // 2:
+            await gate.wait()
+        yield {"event": EventType.TEXT_DELTA, "data": f'{{"text":"{i}"}}'}
+
+
+async def _drain(stream) -> list[dict]:
+    return [e async for e in stream]
+
+
+class TestParseEventId:
+    """parse_event_id accepts only turn_id:seq."""
+
+    def test_valid(self):
+        assert parse_event_id("abc:12") == ("abc", 12)
+
+    @pytest.mark.parametrize("value", [None, "", "abc", ":3", "abc:", "abc:x", "abc:-1"])
+    def test_invalid(self, value):
+        assert parse_event_id(value) is None
+
+
+class TestSseTurn:
+    """SseTurn buffers events and serves subscribers from any point."""
+
+    @pytest.mark.asyncio
+    async def test_events_carry_turn_scoped_ids(self):
+        turn = SseTurn("t1", "alice", _events(3))
+        events = await _drain(turn.subscribe())
+        assert [e["id"] for e in events] == ["t1:1", "t1:2", "t1:3"]
+        assert turn.done
+
+    @pytest.mark.asyncio
+    async def test_resume_mid_stream(self):
+        gate = asyncio.Event()
+        turn = SseTurn("t1", "alice", _events(6, gate))
+        first = turn.subscribe()
+        received = [await first.__anext__(), await first.__anext__()]
+        await first.aclose()  # connection dropped
+
+        gate.set()
+        resumed = await _drain(turn.subscribe(last_seq=2))
+
+        assert [e["id"] for e in received] == ["t1:1", "t1:2"]
+        assert [e["id"] for e in resumed] == ["t1:3", "t1:4", "t1:5", "t1:6"]
+
+    @pytest.mark.asyncio
+    async def test_turn_keeps_running_without_subscribers(self):
+        turn = SseTurn("t1", "alice", _events(50))
+        await turn.wait_done()
+        assert turn.last_seq == 50
+
+    @pytest.mark.asyncio
+    async def test_evicted_events_report_gap(self):
+        turn = SseTurn("t1", "alice", _events(10), buffer_size=4)
+        await turn.wait_done()
+
+        events = await _drain(turn.subscribe(last_seq=2))
+
+        assert events[0]["event"] == EventType.REPLAY_GAP
+        assert [e["id"] for e in events[1:]] == ["t1:7", "t1:8", "t1:9", "t1:10"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_subscribers(self):
+        gate = asyncio.Event()
+        turn = SseTurn("t1", "alice", _events(4, gate))
+        subscribers = [asyncio.create_task(_drain(turn.subscribe())) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*subscribers)
+        assert all(len(r) == 4 for r in results)
+
+
+class TestSseTurnRegistry:
+    """Registry lookups respect ownership and expire finished turns."""
+
+    @pytest.mark.asyncio
+    async def test_no_header_means_new_turn(self):
+        assert SseTurnRegistry().resume(None, "alice") is None
+
+    @pytest.mark.asyncio
+    async def test_other_users_cannot_resume(self):
+        registry = SseTurnRegistry()
+        turn = registry.start("alice", _events(2))
+        await turn.wait_done()
+
+        assert registry.get(turn.turn_id, "bob") is None
+        events = await _drain(registry.resume(f"{turn.turn_id}:1", "bob"))
+        assert events[0]["event"] == EventType.REPLAY_GAP
+        assert '"expired":true' in events[0]["data"]
+
+    @pytest.mark.asyncio
+    async def test_finished_turn_retained_for_grace_period(self):
+        registry = SseTurnRegistry(grace_seconds=0.02)
+        turn = registry.start("alice", _events(2))
+        await turn.wait_done()
+
+        events = await _drain(registry.resume(f"{turn.turn_id}:1", "alice"))
+        assert [e["id"] for e in events] == [f"{turn.turn_id}:2"]
+
+        await asyncio.sleep(0.05)
+        assert registry.get(turn.turn_id, "alice") is None
+        assert len(registry) == 0
+
+
+class TestRouterResume:
+    """_turn_response resumes instead of re-sending the message."""
+
+    @pytest.mark.asyncio
+    async def test_resume_does_not_start_turn(self, monkeypatch):
+        import api.routers.conversations as conversations_module
+
+        registry = SseTurnRegistry()
+        monkeypatch.setattr(conversations_module, "get_sse_turn_registry", lambda: registry)
+        turn = registry.start("alice", _events(3))
+        await turn.wait_done()
+
+        started = []
+        response = _turn_response(f"{turn.turn_id}:1", "alice", lambda: started.append(1) or _events(1))
+        events = await _drain(response.body_iterator)
+
+        assert started == []
+        assert [e["id"] for e in events] == [f"{turn.turn_id}:2", f"{turn.turn_id}:3"]
+
+
+class _DroppingStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: list[bytes], fail: bool):
+        self._chunks = chunks
+        self._fail = fail
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+        if self._fail:
+            raise httpx.ReadError("connection dropped")
+
+
+def _sse(seq: int, text: str) -> bytes:
+    return f'event: text_delta\nid: t1:{seq}\ndata: {{"text": "{text}"}}\n\n'.encode()
+
+
+class TestClientReconnect:
+    """APIClient.send_message resumes a dropped stream."""
+
+    @pytest.mark.asyncio
+    async def test_reconnects_with_last_event_id(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if len(requests) == 1:
+                stream = _DroppingStream([_sse(1, "a"), _sse(2, "b")], fail=True)
+            else:
+                stream = _DroppingStream([_sse(3, "c")], fail=False)
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=stream)
+
+        client = APIClient(config=ClientConfig(api_url="http://test"), jwt_token="token")
+        client._config.sse_reconnect_delay = 0
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        events = [e async for e in client.send_message("hello", session_id="s1")]
+
+        texts = [e["event"]["delta"]["text"] for e in events]
+        assert texts == ["a", "b", "c"]
+        assert "last-event-id" not in requests[0].headers
+        assert requests[1].headers["last-event-id"] == "t1:2"
+
+    @pytest.mark.asyncio
+    async def test_drop_before_first_event_is_raised(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            stream = _DroppingStream([], fail=True)
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=stream)
+
+        client = APIClient(config=ClientConfig(api_url="http://test"), jwt_token="token")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        with pytest.raises(httpx.ReadError):
+            [e async for e in client.send_message("hello", session_id="s1")]
@@ -0,0 +1,202 @@
+"""Tests for QuestionManager deadlines and cleanup.
+
+Covers:
+- Answers, cancellation and timeouts through wait_for_answer
+- One loop timer serves every deadline (no per-question tasks or timers)
+- shutdown() returns promptly and disarms the timer
+- Questions nobody waits for are reaped at their deadline
+- Answers submitted before anyone waits outlive the deadline
+- Releasing an owner expires its questions only
+- Pending count stays flat across thousands of questions
+"""
+import asyncio
+
+import pytest
+
+from api.services.question_manager import QuestionManager
+from conftest import FakeClock
+
+
+class TestAnswers:
+    """wait_for_answer resolves on answer, cancel or timeout."""
+
+    @pytest.mark.asyncio
+    async def test_answer_is_returned(self):
+        manager = QuestionManager()
+        manager.create_question("q1", [{"question": "?"}])
+        waiter = asyncio.create_task(manager.wait_for_answer("q1", timeout=5))
+        await asyncio.sleep(0)
+
+        assert manager.submit_answer("q1", {"?": "yes"})
+        assert await waiter == {"?": "yes"}
+        assert manager.get_pending_count() == 0
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancel_returns_empty_answers(self):
+        manager = QuestionManager()
+        manager.create_question("q1", [])
+        waiter = asyncio.create_task(manager.wait_for_answer("q1", timeout=5))
+        await asyncio.sleep(0)
+
+        assert manager.cancel_question("q1")
+        assert await waiter == {}
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timeout_raises(self):
+        manager = QuestionManager()
+        manager.create_question("q1", [])
+
+        with pytest.raises(asyncio.TimeoutError):
+            await manager.wait_for_answer("q1", timeout=0.02)
+        assert not manager.has_pending_question("q1")
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_unknown_question_raises_key_error(self):
+        with pytest.raises(KeyError):
+            await QuestionManager().wait_for_answer("missing")
+
+
+class TestReaper:
+    """One heap-driven timer handles all deadlines."""
+
+    @pytest.mark.asyncio
+    async def test_unwaited_question_is_reaped(self):
+        clock = FakeClock()
+        manager = QuestionManager(default_timeout=60, clock=clock)
+        manager.create_question("q1", [])
+        manager.create_question("q2", [], timeout=120)
+
+        clock.now += 61
+        assert manager.reap_expired() == 1
+        assert not manager.has_pending_question("q1")
+        assert manager.has_pending_question("q2")
+
+        clock.now += 60
+        assert manager.reap_expired() == 1
+        assert manager.get_pending_count() == 0
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_answer_before_wait_survives_deadline(self):
+        clock = FakeClock()
+        manager = QuestionManager(default_timeout=60, clock=clock)
+        manager.create_question("q1", [])
+        assert manager.submit_answer("q1", {"?": "yes"})
+
+        clock.now += 61
+        assert manager.reap_expired() == 0
+        assert await manager.wait_for_answer("q1") == {"?": "yes"}
+        assert manager.get_pending_count() == 0
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_wait_reschedules_deadline(self):
+        clock = FakeClock()
+        manager = QuestionManager(default_timeout=10, clock=clock)
+        manager.create_question("q1", [])
+        clock.now += 8
+        waiter = asyncio.create_task(manager.wait_for_answer("q1", timeout=10))
+        await asyncio.sleep(0)
+
+        clock.now += 5  # past the creation deadline, inside the wait deadline
+        assert manager.reap_expired() == 0
+        clock.now += 6
+        assert manager.reap_expired() == 1
+        with pytest.raises(asyncio.TimeoutError):
+            await waiter
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_thousands_of_waiters_add_no_tasks(self):
+        manager = QuestionManager()
+        tasks_before = len(asyncio.all_tasks())
+        for i in range(2000):
+            manager.create_question(f"q{i}", [])
+        waiters = [asyncio.create_task(manager.wait_for_answer(f"q{i}", timeout=30)) for i in range(2000)]
+        await asyncio.sleep(0)
+
+        # Only the waiters themselves; deadlines share one loop timer.
+        assert len(asyncio.all_tasks()) == tasks_before + 2000
+        assert manager.get_pending_count() == 2000
+
+        for i in range(2000):
+            manager.submit_answer(f"q{i}", {"i": i})
+        results = await asyncio.gather(*waiters)
+
+        assert results[1999] == {"i": 1999}
+        assert manager.get_pending_count() == 0
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_earlier_deadline_rearms_timer(self):
+        manager = QuestionManager()
+        manager.create_question("slow", [], timeout=30)
+        await asyncio.sleep(0)
+        manager.create_question("fast", [], timeout=0.01)
+
+        await asyncio.sleep(0.05)
+        assert not manager.has_pending_question("fast")
+        assert manager.has_pending_question("slow")
+        await manager.shutdown()
+
+
+class TestOwnerRelease:
+    """Questions are released when their connection closes."""
+
+    @pytest.mark.asyncio
+    async def test_release_owner_expires_only_its_questions(self):
+        manager = QuestionManager()
+        manager.create_question("a1", [], owner="conn-a")
+        manager.create_question("a2", [], owner="conn-a")
+        manager.create_question("b1", [], owner="conn-b")
+        waiter = asyncio.create_task(manager.wait_for_answer("a1", timeout=30))
+        await asyncio.sleep(0)
+
+        assert manager.release_owner("conn-a") == 2
+
+        with pytest.raises(asyncio.TimeoutError):
+            await waiter
+        assert manager.get_pending_count() == 1
+        assert manager.has_pending_question("b1")
+        assert manager.release_owner("conn-a") == 0
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_answered_question_leaves_owner_index(self):
+        manager = QuestionManager()
+        manager.create_question("a1", [], owner="conn-a")
+        manager.submit_answer("a1", {})
+        await manager.wait_for_answer("a1")
+
+        assert manager.release_owner("conn-a") == 0
+        await manager.shutdown()
+
+
+class TestShutdown:
+    """shutdown() never waits on outstanding deadlines."""
+
+    @pytest.mark.asyncio
+    async def test_shutdown_right_after_answer(self):
+        manager = QuestionManager()
+        manager.create_question("q1", [])
+        waiter = asyncio.create_task(manager.wait_for_answer("q1", timeout=30))
+        await asyncio.sleep(0)
+        manager.submit_answer("q1", {})
+
+        await asyncio.wait_for(manager.shutdown(), timeout=1)
+        assert await waiter == {}
+
+    @pytest.mark.asyncio
+    async def test_answered_questions_disarm_timer(self):
+        manager = QuestionManager()
+        for i in range(3):
+            manager.create_question(f"q{i}", [], timeout=30)
+        for i in range(3):
+            manager.submit_answer(f"q{i}", {})
+            await manager.wait_for_answer(f"q{i}")
+
+        assert manager._timer is None
+        assert manager._deadlines == []
@@ -0,0 +1,215 @@
+"""Tests for multiplexed WebSocket session channels.
+
+Covers:
+- Several channels on one socket, with frames tagged and routed by channel
+- Per-channel flow control: a paused channel does not hold up the others
+- A channel paused past the replay buffer gets a replay_gap
+- Closing a channel, unknown channels and the channel cap
+- A dropped socket parks its runtimes for reattach on a new socket
+"""
+import asyncio
+import json
+
+import pytest
+
+import api.routers.websocket as websocket_module
+from api.constants import WS_MUX_MAX_CHANNELS
+from api.routers.websocket import (
+    ResumableWebSocket,
+    WebSocketState,
+    _ChatRuntime,
+    _MuxConnection,
+)
+from api.services.question_manager import QuestionManager
+from api.services.stream_replay import EventReplayBuffer
+
+
+class _FakeSocket:
+    def __init__(self):
+        self.sent: list[dict] = []
+        self._incoming: asyncio.Queue = asyncio.Queue()
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+    async def receive(self) -> dict:
+        return await self._incoming.get()
+
+    def push(self, **message) -> None:
+        self._incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(message)})
+
+    def disconnect(self, code: int = 1006) -> None:
+        self._incoming.put_nowait({"type": "websocket.disconnect", "code": code})
+
+    def on(self, channel: str) -> list[dict]:
+        return [e for e in self.sent if e.get("channel") == channel]
+
+    def texts(self, channel: str) -> list[str]:
+        return [e["text"] for e in self.on(channel) if e["type"] == "text_delta"]
+
+
+async def _echo_loop(runtime: _ChatRuntime) -> None:
+    while (data := await runtime.message_queue.get()) is not None:
+        runtime.state.is_processing = True
+        for word in data["content"].split():
+            await runtime.channel.send_json({"type": "text_delta", "text": word})
+        runtime.state.is_processing = False
+
+
+@pytest.fixture(autouse=True)
+def _echo_runtimes(monkeypatch):
+    async def _start_runtime(websocket, username, agent_id, session_id, question_manager,
+                             frame_encoding="json", channel_id=None, window=None):
+        channel = ResumableWebSocket(
+            websocket, EventReplayBuffer(8), encoding=frame_encoding, channel=channel_id, window=window
+        )
+        state = WebSocketState(session_id=session_id or f"session-{channel_id}", username=username)
+        await channel.send_json({"type": "ready", "session_id": state.session_id})
+        runtime = _ChatRuntime(state=state, channel=channel, message_queue=asyncio.Queue())
+        runtime.task = asyncio.create_task(_echo_loop(runtime))
+        return runtime
+
+    monkeypatch.setattr(websocket_module, "_start_runtime", _start_runtime)
+    monkeypatch.setattr(websocket_module, "_detached_runtimes", websocket_module.DetachedStreamRegistry())
+
+
+async def _settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def _serve(socket: _FakeSocket, username: str = "alice") -> asyncio.Task:
+    connection = _MuxConnection(socket, username, "json", QuestionManager())  # type: ignore[arg-type]
+    return asyncio.create_task(connection.serve())
+
+
+class TestChannels:
+    """Channels share one socket but keep separate streams."""
+
+    @pytest.mark.asyncio
+    async def test_frames_are_tagged_and_routed(self):
+        socket = _FakeSocket()
+        serving = _serve(socket)
+        socket.push(type="channel_open", channel="a")
+        socket.push(type="channel_open", channel="b")
+        socket.push(channel="a", content="one two")
+        socket.push(channel="b", content="three")
+        await _settle()
+
+        assert socket.on("a")[0] == {"type": "ready", "session_id": "session-a", "seq": 1, "channel": "a"}
+        assert socket.texts("a") == ["one", "two"]
+        assert socket.texts("b") == ["three"]
+        assert [e["seq"] for e in socket.on("b")] == [1, 2]
+
+        socket.disconnect(1000)
+        await serving
+
+    @pytest.mark.asyncio
+    async def test_close_channel_and_unknown_channel(self):
+        socket = _FakeSocket()
+        serving = _serve(socket)
+        socket.push(type="channel_open", channel="a")
+        socket.push(type="channel_close", channel="a")
+        socket.push(channel="a", content="late")
+        socket.push(content="untagged")
+        await _settle()
+
+        closed = [e for e in socket.on("a") if e["type"] == "channel_closed"]
+        assert [e["reason"] for e in closed] == [None, "Channel is not open"]
+        assert socket.texts("a") == []
+        assert socket.sent[-1] == {"type": "error", "error": "Missing channel"}
+
+        socket.disconnect(1000)
+        await serving
+
+    @pytest.mark.asyncio
+    async def test_channel_cap(self):
+        socket = _FakeSocket()
+        serving = _serve(socket)
+        for i in range(WS_MUX_MAX_CHANNELS + 1):
+            socket.push(type="channel_open", channel=f"c{i}")
+        await _settle()
+
+        overflow = socket.on(f"c{WS_MUX_MAX_CHANNELS}")
+        assert [e["type"] for e in overflow] == ["channel_closed"]
+
+        socket.disconnect(1000)
+        await serving
+
+
+class TestFlowControl:
+    """Unacknowledged events beyond the window wait in the replay buffer."""
+
+    @pytest.mark.asyncio
+    async def test_paused_channel_resumes_on_ack(self):
+        socket = _FakeSocket()
+        serving = _serve(socket)
+        socket.push(type="channel_open", channel="slow", window=2)
+        socket.push(type="channel_open", channel="fast")
+        socket.push(channel="slow", content="a b c d")
+        socket.push(channel="fast", content="x y z")
+        await _settle()
+
+        # ready + "a" fill the window; "fast" is unaffected.
+        assert socket.texts("slow") == ["a"]
+        assert socket.texts("fast") == ["x", "y", "z"]
+
+        socket.push(type="channel_ack", channel="slow", seq=2)
+        await _settle()
+        assert socket.texts("slow") == ["a", "b", "c"]
+
+        socket.push(type="channel_ack", channel="slow", seq=4)
+        await _settle()
+        assert socket.texts("slow") == ["a", "b", "c", "d"]
+        assert [e["seq"] for e in socket.on("slow")] == [1, 2, 3, 4, 5]
+
+        socket.disconnect(1000)
+        await serving
+
+    @pytest.mark.asyncio
+    async def test_pause_beyond_buffer_sends_replay_gap(self):
+        channel = ResumableWebSocket(_FakeSocket(), EventReplayBuffer(3), window=1)  # type: ignore[arg-type]
+        socket = channel._ws
+        for text in "abcdef":
+            await channel.send_json({"type": "text_delta", "text": text})
+        assert [e["text"] for e in socket.sent] == ["a"]
+
+        await channel.ack(1)
+        assert socket.sent[1] == {"type": "replay_gap", "first_seq": 4}
+        assert socket.sent[2]["seq"] == 4
+
+    @pytest.mark.asyncio
+    async def test_ack_is_ignored_without_window(self):
+        socket = _FakeSocket()
+        channel = ResumableWebSocket(socket, EventReplayBuffer(3))  # type: ignore[arg-type]
+        await channel.send_json({"type": "text_delta", "text": "a"})
+        await channel.ack(5)
+        assert len(socket.sent) == 1
+
+
+class TestReattach:
+    """Runtimes outlive the socket for the resume grace period."""
+
+    @pytest.mark.asyncio
+    async def test_dropped_socket_parks_channels_for_reattach(self):
+        socket = _FakeSocket()
+        serving = _serve(socket)
+        socket.push(type="channel_open", channel="a", session_id="s1")
+        socket.push(channel="a", content="one")
+        await _settle()
+        socket.disconnect(1006)
+        await serving
+
+        new_socket = _FakeSocket()
+        serving = _serve(new_socket)
+        new_socket.push(type="channel_open", channel="tab2", session_id="s1", last_seq=1)
+        new_socket.push(channel="tab2", content="two")
+        await _settle()
+
+        ready = new_socket.on("tab2")[0]
+        assert ready["reattached"] is True
+        assert ready["last_seq"] == 2
+        assert new_socket.texts("tab2") == ["one", "two"]
+
+        new_socket.disconnect(1000)
+        await serving
@@ -0,0 +1,254 @@
+"""Tests for the global turn scheduler and metrics histograms.
+
+Covers:
+- Admission under the concurrency budget and hand-off on release
+- Priority classes: interactive before API before platform
+- Round-robin fairness between users of one class, and aging
+- Cancelled waiters give their place (or slot) back
+- Idle turns (waiting on a person) hand their slot back and re-queue
+- Queue wait recorded per class; histogram percentiles
+- ConversationRunner turns share the budget (fake SDK session)
+"""
+import asyncio
+
+import pytest
+
+from api.services.conversation_runner import ConversationRunner
+from api.services.turn_scheduler import TurnPriority, TurnScheduler
+from core.metrics import Histogram, MetricsRegistry
+from conftest import FakeClock
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _queue(scheduler: TurnScheduler, order: list, priority: TurnPriority, user: str, label: str) -> asyncio.Task:
+    async def _turn():
+        await scheduler.acquire(priority, user)
+        order.append(label)
+    return asyncio.create_task(_turn())
+
+
+class TestAdmission:
+    """Turns run immediately until the budget is used up."""
+
+    @pytest.mark.asyncio
+    async def test_budget_and_release(self):
+        scheduler = TurnScheduler(2, metrics=MetricsRegistry())
+        assert await scheduler.acquire(TurnPriority.API, "a") == 0.0
+        await scheduler.acquire(TurnPriority.API, "b")
+
+        order: list[str] = []
+        waiting = _queue(scheduler, order, TurnPriority.API, "c", "c")
+        await _settle()
+        assert order == [] and scheduler.queued() == 1
+
+        scheduler.release()
+        await waiting
+        assert order == ["c"]
+        assert scheduler.running == 2
+        assert scheduler.queued() == 0
+
+    @pytest.mark.asyncio
+    async def test_slot_context_releases_on_error(self):
+        scheduler = TurnScheduler(1, metrics=MetricsRegistry())
+        with pytest.raises(RuntimeError):
+            async with scheduler.slot(TurnPriority.INTERACTIVE, "a"):
+                raise RuntimeError("boom")
+        assert scheduler.running == 0
+
+
+    @pytest.mark.asyncio
+    async def test_idle_slot_lets_others_run(self):
+        scheduler = TurnScheduler(1, metrics=MetricsRegistry())
+        answered = asyncio.Event()
+        order: list[str] = []
+
+        async def waiting_turn() -> None:
+            async with scheduler.slot(TurnPriority.INTERACTIVE, "asker") as turn_slot:
+                async with turn_slot.idle(), turn_slot.idle():  # two open questions
+                    await answered.wait()
+                order.append("asker resumed")
+
+        asker = asyncio.create_task(waiting_turn())
+        await _settle()
+        assert scheduler.running == 0
+
+        other = _queue(scheduler, order, TurnPriority.PLATFORM, "p", "platform")
+        await other
+        answered.set()
+        await _settle()
+        assert order == ["platform"] and scheduler.queued() == 1  # asker queues for its slot again
+
+        scheduler.release()
+        await asker
+        assert order == ["platform", "asker resumed"]
+        assert scheduler.running == 0
+
+
+class TestOrdering:
+    """Priority first, then round-robin by user."""
+
+    @pytest.mark.asyncio
+    async def test_priority_classes(self):
+        scheduler = TurnScheduler(1, metrics=MetricsRegistry())
+        await scheduler.acquire(TurnPriority.API, "holder")
+        order: list[str] = []
+        tasks = [
+            _queue(scheduler, order, TurnPriority.PLATFORM, "p", "platform"),
+            _queue(scheduler, order, TurnPriority.API, "a", "api"),
+            _queue(scheduler, order, TurnPriority.INTERACTIVE, "w", "web"),
+        ]
+        await _settle()
+
+        for _ in tasks:
+            scheduler.release()
+            await _settle()
+        assert order == ["web", "api", "platform"]
+
+    @pytest.mark.asyncio
+    async def test_round_robin_between_users(self):
+        scheduler = TurnScheduler(1, metrics=MetricsRegistry())
+        await scheduler.acquire(TurnPriority.PLATFORM, "holder")
+        order: list[str] = []
+        for i in range(3):
+            _queue(scheduler, order, TurnPriority.PLATFORM, "chatty", f"chatty{i}")
+        _queue(scheduler, order, TurnPriority.PLATFORM, "quiet", "quiet")
+        await _settle()
+
+        for _ in range(4):
+            scheduler.release()
+            await _settle()
+        assert order == ["chatty0", "quiet", "chatty1", "chatty2"]
+
+    @pytest.mark.asyncio
+    async def test_aged_background_turn_is_promoted(self):
+        clock = FakeClock()
+        scheduler = TurnScheduler(1, aging_seconds=10, metrics=MetricsRegistry(), clock=clock)
+        await scheduler.acquire(TurnPriority.INTERACTIVE, "holder")
+        order: list[str] = []
+        _queue(scheduler, order, TurnPriority.PLATFORM, "p", "platform")
+        await _settle()
+        clock.now += 25  # two classes of aging
+        _queue(scheduler, order, TurnPriority.INTERACTIVE, "w", "web")
+        await _settle()
+
+        scheduler.release()
+        await _settle()
+        assert order == ["platform"]
+
+
+class TestCancellation:
+    """Waiters that give up leave no trace."""
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_removed(self):
+        scheduler = TurnScheduler(1, metrics=MetricsRegistry())
+        await scheduler.acquire(TurnPriority.API, "holder")
+        order: list[str] = []
+        gone = _queue(scheduler, order, TurnPriority.API, "x", "x")
+        kept = _queue(scheduler, order, TurnPriority.API, "y", "y")
+        await _settle()
+
+        gone.cancel()
+        await _settle()
+        assert scheduler.queued() == 1
+
+        scheduler.release()
+        await kept
+        assert order == ["y"]
+        assert scheduler.running == 1
+
+    @pytest.mark.asyncio
+    async def test_cancel_after_admission_hands_slot_on(self):
+        scheduler = TurnScheduler(1, metrics=MetricsRegistry())
+        await scheduler.acquire(TurnPriority.API, "holder")
+        order: list[str] = []
+        first = _queue(scheduler, order, TurnPriority.API, "x", "x")
+        second = _queue(scheduler, order, TurnPriority.API, "y", "y")
+        await _settle()
+
+        scheduler.release()  # admits "x" ...
+        first.cancel()       # ... which is cancelled before it resumes
+        await _settle()
+        await second
+        assert order == ["y"]
+        assert scheduler.running == 1
+
+
+class TestMetrics:
+    """Queue wait lands in per-class histograms."""
+
+    @pytest.mark.asyncio
+    async def test_wait_recorded_per_class(self):
+        clock = FakeClock()
+        metrics = MetricsRegistry()
+        scheduler = TurnScheduler(1, metrics=metrics, clock=clock)
+        await scheduler.acquire(TurnPriority.INTERACTIVE, "holder")
+        waiting = asyncio.create_task(scheduler.acquire(TurnPriority.PLATFORM, "p"))
+        await _settle()
+        clock.now += 3
+        scheduler.release()
+
+        assert await waiting == 3
+        snapshot = metrics.snapshot()
+        assert snapshot["turn_queue_wait_seconds{priority=platform}"]["max"] == 3
+        assert snapshot["turn_queue_wait_seconds{priority=interactive}"]["count"] == 1
+        assert scheduler.stats()["turns_admitted_platform_total"] == 1
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+        for value in [0.05] * 90 + [0.5] * 9 + [42.0]:
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        assert snapshot["p50"] == 0.1
+        assert snapshot["p95"] == 1.0
+        assert snapshot["p99"] == 1.0
+        assert snapshot["max"] == 42.0
+        assert snapshot["buckets"] == {"0.1": 90, "1": 99, "10": 99, "+Inf": 100}
+
+
+class _FakeSession:
+    active = 0
+    max_active = 0
+
+    def __init__(self):
+        self.sdk_session_id = None
+        self.turn_count = 0
+
+    async def disconnect(self):
+        pass
+
+    async def send_query(self, content):
+        _FakeSession.active += 1
+        _FakeSession.max_active = max(_FakeSession.max_active, _FakeSession.active)
+        try:
+            await asyncio.sleep(0.01)
+            yield content
+        finally:
+            _FakeSession.active -= 1
+
+
+class TestConversationRunnerBudget:
+    """SSE conversations share the global budget."""
+
+    @pytest.mark.asyncio
+    async def test_runners_respect_budget(self):
+        _FakeSession.active = _FakeSession.max_active = 0
+        scheduler = TurnScheduler(1, metrics=MetricsRegistry())
+        runners = [
+            ConversationRunner(_FakeSession(), idle_timeout=10, owner=f"u{i}", scheduler=scheduler)
+            for i in range(3)
+        ]
+
+        async def _ask(runner, text):
+            return [m async for m in runner.send_query(text)]
+
+        results = await asyncio.gather(*(_ask(r, f"q{i}") for i, r in enumerate(runners)))
+        assert results == [["q0"], ["q1"], ["q2"]]
+        assert _FakeSession.max_active == 1
+        assert scheduler.stats()["turns_admitted_api_total"] == 3
+        for runner in runners:
+            await runner.close()
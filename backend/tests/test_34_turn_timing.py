@@ -0,0 +1,181 @@
+"""Tests for per-turn latency instrumentation.
+
+Covers:
+- Stage marks, stage totals and tool spans in the turn summary
+- Summary recorded into turn_stage_seconds / turn_tool_seconds once
+- timed() reports to the active turn only
+- History writes are attributed to the turn that made them
+- The SSE done event carries the timings into history
+"""
+import asyncio
+
+import pytest
+from claude_agent_sdk.types import ResultMessage, StreamEvent
+
+import api.routers.conversations as conversations_module
+from api.constants import EventType
+from api.routers.conversations import _stream_conversation_events
+from api.services.history_tracker import HistoryTracker
+from api.services.turn_timing import TurnTimer, current_turn_timer, timed
+from core.metrics import MetricsRegistry
+from conftest import FakeClock
+
+
+class _RecordingHistory:
+    def __init__(self, clock: FakeClock | None = None):
+        self.clock = clock
+        self.messages: list[dict] = []
+
+    def append_message(self, **kwargs):
+        if self.clock is not None:
+            self.clock.now += 0.002
+        self.messages.append(kwargs)
+
+
+class TestTurnTimer:
+    """The summary reports marks, totals and tools in milliseconds."""
+
+    def test_summary_and_histograms(self):
+        clock = FakeClock(100.0)
+        metrics = MetricsRegistry()
+        timer = TurnTimer("web", metrics=metrics, clock=clock)
+
+        clock.now += 0.5
+        timer.on_message()
+        timer.add("sdk_connect", 0.4)
+        clock.now += 0.25
+        timer.on_event(EventType.TEXT_DELTA, {"text": "hi"})
+        timer.on_event(EventType.TOOL_USE, {"id": "t1", "name": "Read"})
+        clock.now += 1.0
+        timer.on_event(EventType.TOOL_RESULT, {"tool_use_id": "t1"})
+        clock.now += 0.25
+        timer.on_message()  # later events don't move the marks
+        timer.on_event(EventType.TEXT_DELTA, {"text": "more"})
+
+        summary = timer.finish()
+        assert summary == {
+            "total_ms": 2000.0,
+            "first_event_ms": 500.0,
+            "first_token_ms": 750.0,
+            "sdk_connect_ms": 400.0,
+            "tools": [{"name": "Read", "ms": 1000.0}],
+        }
+
+        snapshot = metrics.snapshot()
+        assert snapshot["turn_stage_seconds{channel=web,stage=first_token}"]["max"] == 0.75
+        assert snapshot["turn_stage_seconds{channel=web,stage=total}"]["count"] == 1
+        assert snapshot["turn_tool_seconds{tool=Read}"]["max"] == 1.0
+
+    def test_finish_is_idempotent(self):
+        clock = FakeClock(100.0)
+        metrics = MetricsRegistry()
+        timer = TurnTimer("api", metrics=metrics, clock=clock)
+        first = timer.finish()
+        clock.now += 5
+        assert timer.finish() is first
+        assert timer.finished
+        assert metrics.snapshot()["turn_stage_seconds{channel=api,stage=total}"]["count"] == 1
+
+    def test_open_tools_close_at_finish(self):
+        clock = FakeClock(100.0)
+        timer = TurnTimer("platform", metrics=MetricsRegistry(), clock=clock)
+        timer.tool_started("t1", "Bash")
+        timer.tool_started("t1", "Bash")  # announced again by the typed message
+        clock.now += 2
+        assert timer.finish()["tools"] == [{"name": "Bash", "ms": 2000.0}]
+
+
+class TestTimedContext:
+    """timed() attributes work to the turn running in the current context."""
+
+    def test_noop_outside_a_turn(self):
+        assert current_turn_timer() is None
+        with timed("sanitize"):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_turns_do_not_share_timers(self):
+        clock = FakeClock(100.0)
+
+        async def _turn(stage_seconds: float) -> dict:
+            timer = TurnTimer("web", metrics=MetricsRegistry(), clock=clock)
+            with timer.active():
+                with timed("sanitize"):
+                    clock.now += stage_seconds
+                await asyncio.sleep(0)
+            return timer.finish()
+
+        first, second = await asyncio.gather(_turn(0.001), _turn(0.003))
+        assert first["sanitize_ms"] == 1.0
+        assert second["sanitize_ms"] == 3.0
+        assert current_turn_timer() is None
+
+    def test_history_writes_are_timed(self):
+        clock = FakeClock(100.0)
+        history = _RecordingHistory(clock)
+        tracker = HistoryTracker(session_id="s1", history=history)  # type: ignore[arg-type]
+        timer = TurnTimer("api", metrics=MetricsRegistry(), clock=clock)
+        with timer.active():
+            tracker.save_user_message("hello")
+            tracker.save_tool_use({"id": "t1", "name": "Read", "input": {}})
+        assert timer.finish()["history_write_ms"] == 4.0
+        assert len(history.messages) == 2
+
+
+class _FakeSession:
+    connect_seconds = 0.05
+
+
+class _FakeConversation:
+    def __init__(self, messages: list):
+        self._messages = messages
+        self.session = _FakeSession()
+        self.sdk_session_id = None
+        self.turn_count = 0
+
+    async def send_query(self, content):
+        for msg in self._messages:
+            yield msg
+
+
+class _FakeManager:
+    def __init__(self, messages: list):
+        self.conversation = _FakeConversation(messages)
+
+    async def get_or_create_conversation_session(self, session_id, agent_id=None, username=None):
+        return self.conversation, "pending-1", False
+
+    def register_sdk_session_id(self, pending_id, sdk_session_id):
+        pass
+
+
+class TestSseTimings:
+    """The SSE done event carries the turn's timings into history."""
+
+    @pytest.mark.asyncio
+    async def test_done_event_has_timings(self, monkeypatch):
+        history = _RecordingHistory()
+        monkeypatch.setattr(
+            conversations_module, "HistoryTracker",
+            lambda **kwargs: HistoryTracker(session_id=kwargs["session_id"], history=history),  # type: ignore[arg-type]
+        )
+        monkeypatch.setattr(conversations_module, "get_tool_result_elider", lambda username: None)
+        messages = [
+            StreamEvent(
+                uuid="u", session_id="s",
+                event={"type": "content_block_delta", "delta": {"type": "text_delta", "text": "hi"}},
+            ),
+            ResultMessage(
+                subtype="success", duration_ms=1, duration_api_ms=1,
+                is_error=False, num_turns=1, session_id="sdk-1",
+            ),
+        ]
+
+        events = [e async for e in _stream_conversation_events("new", "hi", _FakeManager(messages))]
+
+        assert events[-1]["event"] == EventType.DONE
+        result = next(m for m in history.messages if (m.get("metadata") or {}).get("event_type") == "result")
+        timings = result["metadata"]["timings"]
+        assert timings["sdk_connect_ms"] == 50.0
+        assert {"total_ms", "first_event_ms", "first_token_ms", "history_write_ms"} <= set(timings)
+        assert current_turn_timer() is None
@@ -0,0 +1,153 @@
+"""Tests for outbound platform rate limiting.
+
+Covers:
+- Token buckets allow a burst, then pace to the refill rate
+- Concurrent reservations queue behind each other
+- Per-chat buckets are independent; the platform bucket is shared
+- Retry-After pauses a bucket and rate-limited posts are retried
+- Telegram and WhatsApp rate-limit signals are recognized
+"""
+import httpx
+import pytest
+
+from platforms.adapters.telegram import TelegramAdapter
+from platforms.adapters.whatsapp import WhatsAppAdapter
+from platforms.rate_limit import (
+    MAX_RATE_LIMIT_RETRIES,
+    PlatformRateLimiter,
+    RateQuota,
+    TokenBucket,
+    retry_after_header,
+)
+from conftest import FakeClock
+
+
+class _FakeSleep:
+    """Advances the fake clock instead of sleeping."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.calls: list[float] = []
+
+    async def __call__(self, seconds: float) -> None:
+        self.calls.append(seconds)
+        self.clock.now += seconds
+
+
+def _limiter(clock: FakeClock, **quota) -> tuple[PlatformRateLimiter, _FakeSleep]:
+    values = {"global_rate": 100.0, "global_burst": 100.0, "chat_rate": 1.0, "chat_burst": 2.0, **quota}
+    sleep = _FakeSleep(clock)
+    return PlatformRateLimiter({"telegram": RateQuota(**values)}, clock=clock, sleep=sleep), sleep
+
+
+class TestTokenBucket:
+    """Reservations hand out the burst, then wait for refill."""
+
+    def test_burst_then_paced(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, capacity=3.0, clock=clock)
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+        # Queued reservations wait for successive tokens.
+        assert bucket.reserve() == pytest.approx(0.5)
+        assert bucket.reserve() == pytest.approx(1.0)
+
+        clock.now += 10
+        assert bucket.reserve() == 0.0  # refilled, capped at capacity
+
+    def test_pause_blocks_then_refills(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=5.0, clock=clock)
+        bucket.pause(3.0)
+        assert bucket.reserve() == pytest.approx(4.0)  # pause, then one token of refill
+        clock.now += 10
+        assert bucket.reserve() == 0.0
+
+
+class TestPlatformRateLimiter:
+    """Per-chat and platform-wide buckets combine."""
+
+    @pytest.mark.asyncio
+    async def test_chats_are_independent(self):
+        clock = FakeClock()
+        limiter, sleep = _limiter(clock)
+        for _ in range(2):
+            await limiter.acquire("telegram", "a")
+        await limiter.acquire("telegram", "b")
+        assert sleep.calls == []
+
+        await limiter.acquire("telegram", "a")
+        assert sleep.calls == [pytest.approx(1.0)]
+
+    @pytest.mark.asyncio
+    async def test_platform_bucket_is_shared(self):
+        clock = FakeClock()
+        limiter, sleep = _limiter(clock, global_rate=1.0, global_burst=1.0, chat_burst=10.0)
+        await limiter.acquire("telegram", "a")
+        await limiter.acquire("telegram", "b")
+        assert sleep.calls == [pytest.approx(1.0)]
+
+    @pytest.mark.asyncio
+    async def test_chat_buckets_are_bounded(self):
+        clock = FakeClock()
+        limiter = PlatformRateLimiter(max_chats=2, clock=clock, sleep=_FakeSleep(clock))
+        for chat in ("a", "b", "c"):
+            await limiter.acquire("telegram", chat)
+        assert list(limiter._chat_buckets) == [("telegram", "b"), ("telegram", "c")]
+
+
+def _transport(responses: list[httpx.Response], seen: list[httpx.Request]) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return responses.pop(0)
+    return httpx.MockTransport(handler)
+
+
+class TestRetryAfter:
+    """Rate-limited posts wait the requested time and retry."""
+
+    @pytest.mark.asyncio
+    async def test_retry_after_header_is_honored(self):
+        clock = FakeClock()
+        limiter, sleep = _limiter(clock)
+        seen: list[httpx.Request] = []
+        responses = [httpx.Response(429, headers={"Retry-After": "5"}), httpx.Response(200)]
+        async with httpx.AsyncClient(transport=_transport(responses, seen)) as client:
+            resp = await limiter.post(client, "telegram", "a", "https://x/send", retry_after_header, json={})
+
+        assert resp.status_code == 200
+        assert len(seen) == 2
+        assert sum(sleep.calls) == pytest.approx(6.0)  # pause, then one token of refill
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self):
+        clock = FakeClock()
+        limiter, _ = _limiter(clock)
+        seen: list[httpx.Request] = []
+        responses = [httpx.Response(429) for _ in range(MAX_RATE_LIMIT_RETRIES + 1)]
+        async with httpx.AsyncClient(transport=_transport(responses, seen)) as client:
+            resp = await limiter.post(client, "telegram", "a", "https://x/send", retry_after_header)
+
+        assert resp.status_code == 429
+        assert len(seen) == MAX_RATE_LIMIT_RETRIES + 1
+
+    def test_http_date_falls_back_to_default(self):
+        resp = httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        assert retry_after_header(resp) == 1.0
+        assert retry_after_header(httpx.Response(500)) is None
+
+
+class TestAdapterSignals:
+    """Adapters recognize their platform's rate-limit responses."""
+
+    def test_telegram_body_retry_after(self):
+        adapter = TelegramAdapter.__new__(TelegramAdapter)
+        resp = httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 7}})
+        assert adapter.rate_limit_delay(resp) == 7.0
+        assert adapter.rate_limit_delay(httpx.Response(400, json={"ok": False})) is None
+
+    def test_whatsapp_pair_rate_limit(self):
+        adapter = WhatsAppAdapter.__new__(WhatsAppAdapter)
+        resp = httpx.Response(400, json={"error": {"code": 131056, "message": "pair rate limit"}})
+        assert adapter.rate_limit_delay(resp) == 6.0
+        assert adapter.rate_limit_delay(httpx.Response(400, json={"error": {"code": 100}})) is None
+        assert adapter.rate_limit_delay(httpx.Response(429)) == 1.0
@@ -0,0 +1,180 @@
+"""Tests for live tool-progress messages on platforms.
+
+Covers:
+- Editable platforms keep one status message and edit it in place
+- Edits are throttled and pending lines are flushed later or on close()
+- A closed segment starts a new status message
+- Oversized status messages roll over to a new message
+- Non-editable platforms get batched summaries
+- Telegram send_status/edit_status request shapes
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import platforms.base as base_module
+import platforms.progress as progress_module
+from platforms.adapters.telegram import TelegramAdapter
+from platforms.base import NormalizedMessage, NormalizedResponse, Platform, PlatformAdapter
+from platforms.progress import PROGRESS_BATCH_SIZE, PROGRESS_MAX_CHARS, ToolProgress
+from platforms.rate_limit import PlatformRateLimiter
+from conftest import FakeClock
+
+
+class _RecordingAdapter(PlatformAdapter):
+    platform = Platform.TELEGRAM
+
+    def __init__(self, editable: bool = True, edit_ok: bool = True):
+        self.supports_message_edit = editable
+        self.edit_ok = edit_ok
+        self.calls: list[tuple] = []
+        self._next_id = 0
+
+    def parse_inbound(self, raw_payload: dict) -> NormalizedMessage | None:
+        return None
+
+    def verify_signature(self, raw_body: bytes, headers: dict[str, str]) -> bool:
+        return True
+
+    async def send_response(self, chat_id: str, response: NormalizedResponse) -> None:
+        self.calls.append(("send", response.text))
+
+    async def send_status(self, chat_id: str, text: str) -> str | None:
+        self._next_id += 1
+        self.calls.append(("status", str(self._next_id), text))
+        return str(self._next_id)
+
+    async def edit_status(self, chat_id: str, message_id: str, text: str) -> bool:
+        self.calls.append(("edit", message_id, text))
+        return self.edit_ok
+
+
+def _progress(adapter: _RecordingAdapter, clock: FakeClock) -> ToolProgress:
+    async def _send(text: str) -> None:
+        await adapter.send_response("chat", NormalizedResponse(text=text))
+    return ToolProgress(adapter, "chat", _send, lambda text: text.replace("/secret", "[redacted]"), clock=clock)
+
+
+class TestEditableStatus:
+    """One status message per segment, edited at most once per interval."""
+
+    @pytest.mark.asyncio
+    async def test_first_line_sent_then_edits_throttled(self):
+        clock = FakeClock()
+        adapter = _RecordingAdapter()
+        progress = _progress(adapter, clock)
+
+        await progress.add("🔧 Read /secret/a")
+        await progress.add("✅ Read done")  # within the interval: deferred
+        assert adapter.calls == [("status", "1", "🔧 Read [redacted]/a")]
+
+        clock.now += 2
+        await progress.add("🔧 Grep")
+        assert adapter.calls[-1] == ("edit", "1", "🔧 Read [redacted]/a\n\n✅ Read done\n\n🔧 Grep")
+        assert progress.sent_any
+        progress.cancel()
+
+    @pytest.mark.asyncio
+    async def test_deferred_edit_flushes_after_interval(self, monkeypatch):
+        monkeypatch.setattr(progress_module, "PROGRESS_EDIT_INTERVAL", 0.01)
+        adapter = _RecordingAdapter()
+        progress = ToolProgress(adapter, "chat", adapter.send_response, lambda text: text)
+
+        await progress.add("one")
+        await progress.add("two")
+        await asyncio.sleep(0.05)
+        assert adapter.calls == [("status", "1", "one"), ("edit", "1", "one\n\ntwo")]
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_and_starts_new_segment(self):
+        clock = FakeClock()
+        adapter = _RecordingAdapter()
+        progress = _progress(adapter, clock)
+
+        await progress.add("one")
+        await progress.add("two")
+        await progress.close()
+        await progress.close()  # nothing pending
+        await progress.add("three")
+
+        assert adapter.calls == [
+            ("status", "1", "one"),
+            ("edit", "1", "one\n\ntwo"),
+            ("status", "2", "three"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failed_edit_sends_new_status(self):
+        clock = FakeClock()
+        adapter = _RecordingAdapter(edit_ok=False)
+        progress = _progress(adapter, clock)
+
+        await progress.add("one")
+        clock.now += 2
+        await progress.add("two")
+        assert adapter.calls[-1] == ("status", "2", "one\n\ntwo")
+
+    @pytest.mark.asyncio
+    async def test_long_status_rolls_over(self):
+        clock = FakeClock()
+        adapter = _RecordingAdapter()
+        progress = _progress(adapter, clock)
+        line = "x" * (PROGRESS_MAX_CHARS // 3)
+
+        await progress.add(line)
+        await progress.add(line)
+        await progress.add(line)  # would exceed the limit
+
+        assert [call[0] for call in adapter.calls] == ["status", "edit", "status"]
+        assert adapter.calls[-1] == ("status", "2", line)
+        progress.cancel()
+
+
+class TestBatchedFallback:
+    """Platforms without editing get batched summaries."""
+
+    @pytest.mark.asyncio
+    async def test_batches_by_size_and_on_close(self):
+        clock = FakeClock()
+        adapter = _RecordingAdapter(editable=False)
+        progress = _progress(adapter, clock)
+
+        for i in range(PROGRESS_BATCH_SIZE + 2):
+            await progress.add(f"line {i}")
+        await progress.close()
+
+        sends = [call[1] for call in adapter.calls]
+        assert sends == [
+            "\n\n".join(f"line {i}" for i in range(PROGRESS_BATCH_SIZE)),
+            f"line {PROGRESS_BATCH_SIZE}\n\nline {PROGRESS_BATCH_SIZE + 1}",
+        ]
+        assert all(call[0] == "send" for call in adapter.calls)
+
+
+class TestTelegramStatus:
+    """Telegram status messages use sendMessage and editMessageText."""
+
+    @pytest.mark.asyncio
+    async def test_send_and_edit(self, monkeypatch):
+        seen: list[tuple[str, dict]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            seen.append((request.url.path.rsplit("/", 1)[-1], body))
+            if request.url.path.endswith("editMessageText") and len(seen) == 2:
+                return httpx.Response(400, json={"ok": False, "description": "Bad Request: message is not modified"})
+            return httpx.Response(200, json={"ok": True, "result": {"message_id": 42}})
+
+        monkeypatch.setattr(base_module, "get_platform_rate_limiter", lambda: PlatformRateLimiter())
+        adapter = TelegramAdapter.__new__(TelegramAdapter)
+        adapter._api_base = "https://api.telegram.org/botX"
+        adapter._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        assert await adapter.send_status("7", "working") == "42"
+        assert await adapter.edit_status("7", "42", "working") is True
+        assert seen[0][0] == "sendMessage"
+        assert seen[1][0] == "editMessageText"
+        assert seen[1][1]["message_id"] == 42
+        await adapter.aclose()
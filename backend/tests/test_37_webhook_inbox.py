@@ -0,0 +1,298 @@
+"""Tests for the durable webhook inbox.
+
+Covers:
+- Messages survive reopening the database (process restart)
+- Leases keep a message from being claimed twice until they lapse
+- Failures retry with backoff, then move to the dead-letter table
+- Released messages do not use up an attempt
+- The dispatcher completes, retries and hands back messages
+- Turns that fail after starting send one error reply and are dead-lettered, not retried
+- The webhook route persists before acknowledging
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import api.routers.webhooks as webhooks_module
+import api.services.whitelist_service as whitelist_module
+import platforms.worker as worker_module
+from platforms.base import NormalizedMessage, NormalizedResponse, Platform, PlatformAdapter
+from platforms.dedup import TTLDedup
+from platforms.inbox import InboxDispatcher, InboxItem, WebhookInbox
+from platforms.worker import TurnFailedError, process_platform_message
+from conftest import FakeClock
+
+
+def _message(text: str = "hi") -> NormalizedMessage:
+    return NormalizedMessage(
+        platform=Platform.TELEGRAM,
+        platform_user_id="u1",
+        platform_chat_id="c1",
+        text=text,
+        media=[{"type": "photo", "file_id": "f"}],
+        metadata={"message_id": 7},
+    )
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def inbox(tmp_path, clock):
+    inbox = WebhookInbox(tmp_path / "inbox.db", max_attempts=3, retry_base_seconds=10, clock=clock)
+    yield inbox
+    inbox.close()
+
+
+def _dead_letters(inbox: WebhookInbox) -> list[tuple]:
+    return inbox._conn.execute("SELECT id, attempts, last_error FROM dead_letter").fetchall()
+
+
+class TestWebhookInbox:
+    """Persistence, leases, retries and dead letters."""
+
+    def test_survives_reopen(self, tmp_path, clock):
+        first = WebhookInbox(tmp_path / "inbox.db", clock=clock)
+        first.enqueue(_message(), message_key="7")
+        first.close()
+
+        reopened = WebhookInbox(tmp_path / "inbox.db", clock=clock)
+        item = reopened.claim(lease_seconds=60)
+        assert item is not None
+        assert item.message == _message()
+        assert item.attempts == 1
+        reopened.close()
+
+    def test_lease_blocks_second_claim_until_it_lapses(self, inbox, clock):
+        inbox.enqueue(_message())
+        item = inbox.claim(lease_seconds=60)
+        assert inbox.claim(lease_seconds=60) is None
+
+        clock.now += 30
+        inbox.renew(item.id, 60)
+        clock.now += 45
+        assert inbox.claim(lease_seconds=60) is None
+
+        clock.now += 60  # owner died: lease lapsed
+        again = inbox.claim(lease_seconds=60)
+        assert again.id == item.id and again.attempts == 2
+
+    def test_complete_removes(self, inbox):
+        inbox.enqueue(_message())
+        item = inbox.claim(lease_seconds=60)
+        inbox.complete(item.id)
+        assert inbox.stats() == {"inbox_pending": 0, "inbox_leased": 0, "inbox_dead_letter": 0}
+
+    def test_retry_backoff_then_dead_letter(self, inbox, clock):
+        inbox.enqueue(_message())
+
+        item = inbox.claim(lease_seconds=60)
+        inbox.fail(item.id, "boom 1")
+        assert inbox.claim(lease_seconds=60) is None
+        clock.now += 10
+        item = inbox.claim(lease_seconds=60)
+        assert item.attempts == 2
+
+        inbox.fail(item.id, "boom 2")
+        clock.now += 10
+        assert inbox.claim(lease_seconds=60) is None  # backoff doubled
+        clock.now += 10
+        item = inbox.claim(lease_seconds=60)
+        assert item.attempts == 3
+
+        inbox.fail(item.id, "boom 3")
+        assert inbox.stats()["inbox_pending"] == 0
+        assert _dead_letters(inbox) == [(item.id, 3, "boom 3")]
+
+    def test_release_does_not_count_attempt(self, inbox):
+        inbox.enqueue(_message())
+        item = inbox.claim(lease_seconds=60)
+        inbox.release(item.id)
+        assert inbox.claim(lease_seconds=60).attempts == 1
+
+    def test_unreadable_payload_is_dead_lettered(self, inbox):
+        inbox._conn.execute(
+            "INSERT INTO inbox (platform, payload, available_at, created_at) VALUES ('telegram', '{', 0, 0)"
+        )
+        assert inbox.claim(lease_seconds=60) is None
+        assert len(_dead_letters(inbox)) == 1
+
+
+class TestInboxDispatcher:
+    """The dispatcher drives messages through the handler."""
+
+    @pytest.mark.asyncio
+    async def test_success_and_retry(self, tmp_path):
+        inbox = WebhookInbox(tmp_path / "inbox.db", max_attempts=3, retry_base_seconds=0.01)
+        calls: list[tuple[str, int]] = []
+        done = asyncio.Event()
+
+        async def handler(item: InboxItem) -> None:
+            calls.append((item.message.text, item.attempts))
+            if item.message.text == "flaky" and item.attempts == 1:
+                raise RuntimeError("transient")
+            if len(calls) == 3:
+                done.set()
+
+        dispatcher = InboxDispatcher(inbox, handler, concurrency=2, poll_interval=0.01)
+        inbox.enqueue(_message("ok"))
+        inbox.enqueue(_message("flaky"))
+        dispatcher.start()
+        await asyncio.wait_for(done.wait(), 2)
+        await asyncio.sleep(0.02)
+        await dispatcher.stop()
+
+        assert sorted(calls) == [("flaky", 1), ("flaky", 2), ("ok", 1)]
+        assert inbox.stats()["inbox_pending"] == 0
+        inbox.close()
+
+    @pytest.mark.asyncio
+    async def test_started_turn_failure_is_dead_lettered(self, tmp_path):
+        inbox = WebhookInbox(tmp_path / "inbox.db", max_attempts=3, retry_base_seconds=0.01)
+        calls = 0
+        done = asyncio.Event()
+
+        async def handler(item: InboxItem) -> None:
+            nonlocal calls
+            calls += 1
+            done.set()
+            raise TurnFailedError("RuntimeError: tool crashed")
+
+        dispatcher = InboxDispatcher(inbox, handler, poll_interval=0.01)
+        inbox.enqueue(_message())
+        dispatcher.start()
+        await asyncio.wait_for(done.wait(), 2)
+        await asyncio.sleep(0.05)
+        await dispatcher.stop()
+
+        assert calls == 1
+        assert inbox.stats()["inbox_pending"] == 0
+        assert _dead_letters(inbox)[0][1:] == (1, "RuntimeError: tool crashed")
+        inbox.close()
+
+    @pytest.mark.asyncio
+    async def test_stop_hands_back_in_flight(self, tmp_path):
+        inbox = WebhookInbox(tmp_path / "inbox.db")
+        started = asyncio.Event()
+
+        async def handler(item: InboxItem) -> None:
+            started.set()
+            await asyncio.sleep(60)
+
+        dispatcher = InboxDispatcher(inbox, handler, poll_interval=0.01)
+        inbox.enqueue(_message())
+        dispatcher.start()
+        await asyncio.wait_for(started.wait(), 2)
+        await dispatcher.stop()
+
+        item = inbox.claim(lease_seconds=60)
+        assert item is not None and item.attempts == 1
+        inbox.close()
+
+
+class _FakeAdapter(PlatformAdapter):
+    platform = Platform.TELEGRAM
+
+    def parse_inbound(self, raw_payload: dict) -> NormalizedMessage | None:
+        return _message(raw_payload.get("text", ""))
+
+    def verify_signature(self, raw_body: bytes, headers: dict[str, str]) -> bool:
+        return True
+
+    async def send_response(self, chat_id: str, response: NormalizedResponse) -> None:
+        pass
+
+
+class _AllowAll:
+    def is_allowed(self, platform: str, user_id: str) -> bool:
+        return True
+
+
+class _FakeDispatcher:
+    def __init__(self):
+        self.notified = 0
+
+    def notify(self) -> None:
+        self.notified += 1
+
+
+class TestWebhookRoute:
+    """The webhook is persisted before the 200 ACK."""
+
+    def test_enqueued_before_ack(self, inbox, monkeypatch):
+        dispatcher = _FakeDispatcher()
+        monkeypatch.setattr(webhooks_module, "get_adapter", lambda name: _FakeAdapter())
+        monkeypatch.setattr(webhooks_module, "get_webhook_inbox", lambda: inbox)
+        monkeypatch.setattr(webhooks_module, "get_inbox_dispatcher", lambda: dispatcher)
+        monkeypatch.setattr(whitelist_module, "get_whitelist_service", lambda: _AllowAll())
+        monkeypatch.setattr(webhooks_module, "get_webhook_dedup", lambda: TTLDedup(60))
+
+        app = FastAPI()
+        app.include_router(webhooks_module.router)
+        resp = TestClient(app).post("/webhooks/telegram", json={"text": "hello"})
+
+        assert resp.json() == {"status": "ok"}
+        assert dispatcher.notified == 1
+        item = inbox.claim(lease_seconds=60)
+        assert item.message.text == "hello"
+
+
+class _RecordingAdapter(_FakeAdapter):
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_response(self, chat_id: str, response: NormalizedResponse) -> None:
+        self.sent.append(response.text)
+
+
+class _FailingClient:
+    """SDK client stand-in whose connect or query fails."""
+
+    fail_on = "query"
+
+    def __init__(self, options):
+        pass
+
+    async def connect(self) -> None:
+        if self.fail_on == "connect":
+            raise ConnectionError("cli unavailable")
+
+    async def query(self, *args, **kwargs) -> None:
+        raise RuntimeError("turn crashed")
+
+    async def disconnect(self) -> None:
+        pass
+
+
+class TestWorkerFailures:
+    """Only failures before the turn starts are retryable."""
+
+    @pytest.fixture
+    def worker(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("DATA_DIR", str(tmp_path))
+        setup = SimpleNamespace(cwd_id="cwd", file_storage=None, session_cwd=str(tmp_path),
+                                permission_folders=[], tools_env={})
+        monkeypatch.setattr(worker_module, "resolve_session_setup", lambda *args: setup)
+        monkeypatch.setattr(worker_module, "create_agent_sdk_options", lambda **kwargs: None)
+        monkeypatch.setattr(worker_module, "get_session_id_for_chat", lambda *args: None)
+        monkeypatch.setattr(worker_module, "_get_default_agent_id", lambda: None)
+        monkeypatch.setattr(worker_module, "ClaudeSDKClient", _FailingClient)
+        return _RecordingAdapter()
+
+    @pytest.mark.asyncio
+    async def test_connect_failure_is_retryable(self, worker, monkeypatch):
+        monkeypatch.setattr(_FailingClient, "fail_on", "connect")
+        with pytest.raises(ConnectionError):
+            await process_platform_message(_message("hello"), worker, notify_errors=False)
+        assert worker.sent == []
+
+    @pytest.mark.asyncio
+    async def test_mid_turn_failure_replies_once_and_is_final(self, worker):
+        with pytest.raises(TurnFailedError):
+            await process_platform_message(_message("hello"), worker, notify_errors=False)
+        assert len(worker.sent) == 1 and worker.sent[0].startswith("Sorry")
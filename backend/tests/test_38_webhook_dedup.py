@@ -0,0 +1,138 @@
+"""Tests for TTL webhook deduplication.
+
+Covers:
+- Keys are duplicates within the TTL and forgotten after it
+- Expiry drops whole buckets without scanning live keys
+- Discarded keys can be re-added without being expired early
+- The inbox remembers message IDs across a restart
+- The webhook route reports duplicates from memory and from the inbox
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import api.routers.webhooks as webhooks_module
+import api.services.whitelist_service as whitelist_module
+from platforms.base import NormalizedMessage, NormalizedResponse, Platform, PlatformAdapter
+from platforms.dedup import TTLDedup
+from platforms.inbox import WebhookInbox
+from conftest import FakeClock
+
+
+def _message(message_id: int = 7) -> NormalizedMessage:
+    return NormalizedMessage(
+        platform=Platform.TELEGRAM,
+        platform_user_id="u1",
+        platform_chat_id="c1",
+        text="hi",
+        metadata={"message_id": message_id},
+    )
+
+
+class TestTTLDedup:
+    """Time-bucketed expiry."""
+
+    def test_duplicate_within_ttl(self):
+        clock = FakeClock()
+        dedup = TTLDedup(ttl=100, bucket_seconds=10, clock=clock)
+        assert dedup.check_and_add("a") is False
+        clock.now += 50
+        assert dedup.check_and_add("a") is True
+
+        clock.now += 70  # past TTL plus one bucket
+        assert "a" not in dedup
+        assert dedup.check_and_add("a") is False
+
+    def test_expiry_pops_whole_buckets(self):
+        clock = FakeClock()
+        dedup = TTLDedup(ttl=100, bucket_seconds=10, clock=clock)
+        for i in range(1000):
+            dedup.check_and_add(f"old{i}")
+        clock.now += 60
+        dedup.check_and_add("new")
+        assert len(dedup._buckets) == 2
+
+        clock.now += 60
+        assert "new" in dedup
+        assert len(dedup) == 1
+        assert len(dedup._buckets) == 1
+
+    def test_discard_then_readd(self):
+        clock = FakeClock()
+        dedup = TTLDedup(ttl=100, bucket_seconds=10, clock=clock)
+        dedup.check_and_add("a")
+        dedup.discard("a")
+        clock.now += 50
+        assert dedup.check_and_add("a") is False
+
+        clock.now += 70  # the first bucket expires; the re-added key must survive
+        assert "a" in dedup
+
+
+class TestPersistentDedup:
+    """The inbox catches re-deliveries after a restart."""
+
+    def test_seen_across_reopen(self, tmp_path):
+        clock = FakeClock()
+        inbox = WebhookInbox(tmp_path / "inbox.db", clock=clock)
+        assert inbox.enqueue(_message(), message_key="7", dedup_ttl=100) is not None
+        inbox.close()
+
+        inbox = WebhookInbox(tmp_path / "inbox.db", clock=clock)
+        assert inbox.enqueue(_message(), message_key="7", dedup_ttl=100) is None
+        assert inbox.stats()["inbox_pending"] == 1
+
+        clock.now += 101
+        assert inbox.enqueue(_message(), message_key="7", dedup_ttl=100) is not None
+        assert inbox.enqueue(_message(8), message_key="8") is not None  # no TTL: not deduplicated
+        inbox.close()
+
+
+class _FakeAdapter(PlatformAdapter):
+    platform = Platform.TELEGRAM
+
+    def parse_inbound(self, raw_payload: dict) -> NormalizedMessage | None:
+        return _message(raw_payload["message_id"])
+
+    def verify_signature(self, raw_body: bytes, headers: dict[str, str]) -> bool:
+        return True
+
+    async def send_response(self, chat_id: str, response: NormalizedResponse) -> None:
+        pass
+
+
+class _AllowAll:
+    def is_allowed(self, platform: str, user_id: str) -> bool:
+        return True
+
+
+class _NullDispatcher:
+    def notify(self) -> None:
+        pass
+
+
+@pytest.fixture
+def webhook_client(tmp_path, monkeypatch):
+    state = {"dedup": TTLDedup(3600), "inbox": WebhookInbox(tmp_path / "inbox.db")}
+    monkeypatch.setattr(webhooks_module, "get_adapter", lambda name: _FakeAdapter())
+    monkeypatch.setattr(webhooks_module, "get_webhook_inbox", lambda: state["inbox"])
+    monkeypatch.setattr(webhooks_module, "get_inbox_dispatcher", lambda: _NullDispatcher())
+    monkeypatch.setattr(webhooks_module, "get_webhook_dedup", lambda: state["dedup"])
+    monkeypatch.setattr(whitelist_module, "get_whitelist_service", lambda: _AllowAll())
+    app = FastAPI()
+    app.include_router(webhooks_module.router)
+    yield TestClient(app), state
+    state["inbox"].close()
+
+
+class TestWebhookRouteDedup:
+    """Re-deliveries are acknowledged as duplicates."""
+
+    def test_memory_and_restart(self, webhook_client):
+        client, state = webhook_client
+        assert client.post("/webhooks/telegram", json={"message_id": 1}).json() == {"status": "ok"}
+        assert client.post("/webhooks/telegram", json={"message_id": 1}).json() == {"status": "duplicate"}
+
+        state["dedup"] = TTLDedup(3600)  # restart: memory is empty, the inbox remembers
+        assert client.post("/webhooks/telegram", json={"message_id": 1}).json() == {"status": "duplicate"}
+        assert client.post("/webhooks/telegram", json={"message_id": 2}).json() == {"status": "ok"}
@@ -0,0 +1,142 @@
+"""Tests for the in-memory platform session bridge.
+
+Covers:
+- Mappings are read from disk once and served from memory
+- Changes are written behind, coalesced, and survive a reload
+- Writes are atomic (no temp file left behind)
+- The session max age is cached until invalidated
+- Concurrent messages in one chat are serialized and share one session
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import platforms.session_bridge as bridge_module
+from agent.core.storage import SessionData
+from platforms.session_bridge import SessionMappingStore
+
+
+@pytest.fixture
+def sessions_dir(tmp_path, monkeypatch):
+    reads: list[str] = []
+    real_read = bridge_module._read_mappings
+
+    def _counting_read(filepath):
+        reads.append(filepath.name)
+        return real_read(filepath)
+
+    monkeypatch.setattr(bridge_module, "_get_platform_sessions_file", lambda username: tmp_path / username / "platform_sessions.json")
+    monkeypatch.setattr(bridge_module, "_read_mappings", _counting_read)
+    return tmp_path, reads
+
+
+def _on_disk(tmp_path, username: str) -> dict[str, str]:
+    return json.loads((tmp_path / username / "platform_sessions.json").read_text())
+
+
+class TestSessionMappingStore:
+    """Load once, write behind."""
+
+    def test_loaded_once(self, sessions_dir):
+        tmp_path, reads = sessions_dir
+        (tmp_path / "alice").mkdir()
+        (tmp_path / "alice" / "platform_sessions.json").write_text(json.dumps({"c1": "s1"}))
+
+        store = SessionMappingStore()
+        for _ in range(100):
+            assert store.get("alice", "c1") == "s1"
+        store.set("alice", "c2", "s2")
+        assert store.get("alice", "c2") == "s2"
+        assert reads == ["platform_sessions.json"]
+
+    @pytest.mark.asyncio
+    async def test_write_behind_coalesces(self, sessions_dir, monkeypatch):
+        tmp_path, _ = sessions_dir
+        writes: list[dict] = []
+        real_write = bridge_module._write_mappings
+
+        def _counting_write(filepath, mappings):
+            writes.append(dict(mappings))
+            return real_write(filepath, mappings)
+
+        monkeypatch.setattr(bridge_module, "_write_mappings", _counting_write)
+        store = SessionMappingStore(flush_delay=0.01)
+        for i in range(10):
+            store.set("alice", f"c{i}", f"s{i}")
+        store.pop("alice", "c0")
+        assert writes == []
+
+        await asyncio.sleep(0.05)
+        assert len(writes) == 1
+        assert _on_disk(tmp_path, "alice") == {f"c{i}": f"s{i}" for i in range(1, 10)}
+        assert not (tmp_path / "alice" / "platform_sessions.json.tmp").exists()
+
+        reloaded = SessionMappingStore()
+        assert reloaded.get("alice", "c9") == "s9"
+        assert reloaded.get("alice", "c0") is None
+
+    def test_flush_without_loop_is_immediate(self, sessions_dir):
+        tmp_path, _ = sessions_dir
+        store = SessionMappingStore()
+        store.set("bob", "c1", "s1")
+        assert _on_disk(tmp_path, "bob") == {"c1": "s1"}
+
+    def test_max_age_cached_until_invalidated(self, monkeypatch):
+        calls: list[int] = []
+
+        def _max_age() -> int:
+            calls.append(1)
+            return 1 if len(calls) == 1 else 48
+
+        monkeypatch.setattr(bridge_module, "_get_session_max_age_hours", _max_age)
+        store = SessionMappingStore()
+        monkeypatch.setattr(bridge_module, "_session_mapping_store", store)
+        session = SessionData(session_id="s", created_at=(datetime.now() - timedelta(hours=2)).isoformat())
+
+        assert bridge_module.is_session_expired(session) is True
+        assert bridge_module.is_session_expired(session) is True
+        assert len(calls) == 1
+
+        store.invalidate_settings()
+        assert bridge_module.is_session_expired(session) is False
+        assert len(calls) == 2
+
+
+class TestChatLock:
+    """Concurrent messages in one chat must not each create a session."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_turns_share_one_session(self, sessions_dir):
+        tmp_path, _ = sessions_dir
+        store = SessionMappingStore(flush_delay=0.01)
+        created: list[str] = []
+
+        async def _turn(chat_id: str) -> str:
+            async with store.chat_lock("alice", chat_id):
+                session_id = store.get("alice", chat_id)
+                if session_id is None:
+                    await asyncio.sleep(0.01)  # SDK connect and first message
+                    session_id = f"s{len(created)}"
+                    created.append(session_id)
+                    store.set("alice", chat_id, session_id)
+                return session_id
+
+        results = await asyncio.gather(*(_turn("c1") for _ in range(20)), _turn("c2"))
+
+        assert set(results[:20]) == {results[0]}
+        assert results[20] != results[0]
+        assert len(created) == 2
+        await asyncio.sleep(0.05)
+        assert _on_disk(tmp_path, "alice") == {"c1": results[0], "c2": results[20]}
+
+    @pytest.mark.asyncio
+    async def test_locks_are_per_chat_and_released(self):
+        store = SessionMappingStore()
+        assert store.chat_lock("alice", "c1") is store.chat_lock("alice", "c1")
+        assert store.chat_lock("alice", "c1") is not store.chat_lock("alice", "c2")
+
+        async with store.chat_lock("alice", "c1"):
+            assert len(store._locks) == 1
+        assert len(store._locks) == 0
@@ -0,0 +1,172 @@
+"""Tests for concurrent, streaming platform media downloads.
+
+Covers:
+- Attachments download concurrently, bounded by the semaphore, in order
+- Same-named attachments never overwrite each other
+- Non-image files stream to a staging file and are moved into input/
+- Oversized downloads abort on Content-Length or mid-stream, leaving no partial file
+- Images are still inlined as base64 content blocks
+"""
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+import platforms.media as media_module
+from agent.core.file_storage import FileStorage
+from platforms.media import MEDIA_DOWNLOAD_CONCURRENCY, process_media_items
+
+
+def _storage(tmp_path) -> FileStorage:
+    return FileStorage("alice", "s1", base_path=str(tmp_path))
+
+
+def _leftovers(storage: FileStorage) -> list[str]:
+    return [p.name for p in storage.get_session_dir().glob(".download-*")]
+
+
+async def _chunks(data: bytes, size: int = 1024):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _bluebubbles(handler) -> dict:
+    return {
+        "bluebubbles_client": httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        "bluebubbles_server_url": "https://bb.example",
+        "bluebubbles_password": "pw",
+    }
+
+
+class TestConcurrentDownloads:
+    """Attachments of one message download in parallel."""
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency_keeps_order(self, tmp_path):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            guid = request.url.path.split("/")[-2]
+            return httpx.Response(200, content=guid.encode(), headers={"content-type": "text/plain"})
+
+        items = [{"type": "document", "attachment_guid": f"g{i}", "file_name": f"f{i}.txt"} for i in range(10)]
+        storage = _storage(tmp_path)
+        result = await process_media_items(items, "imessage", storage, **_bluebubbles(handler))
+
+        assert result.errors == []
+        assert 1 < peak <= MEDIA_DOWNLOAD_CONCURRENCY
+        assert [a.split("input/")[1].rstrip("]") for a in result.file_annotations] == [f"f{i}.txt" for i in range(10)]
+        assert (storage.get_input_dir() / "f3.txt").read_bytes() == b"g3"
+
+
+    @pytest.mark.asyncio
+    async def test_same_named_attachments_get_unique_names(self, tmp_path):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.01)
+            guid = request.url.path.split("/")[-2]
+            return httpx.Response(200, content=guid.encode(), headers={"content-type": "application/pdf"})
+
+        items = [{"type": "document", "attachment_guid": f"g{i}"} for i in range(4)]
+        storage = _storage(tmp_path)
+        result = await process_media_items(items, "imessage", storage, **_bluebubbles(handler))
+
+        assert result.errors == []
+        names = sorted(p.name for p in storage.get_input_dir().iterdir())
+        assert names == ["document.pdf", "document_1.pdf", "document_2.pdf", "document_3.pdf"]
+        contents = sorted((storage.get_input_dir() / name).read_bytes() for name in names)
+        assert contents == [b"g0", b"g1", b"g2", b"g3"]
+        assert len(set(result.file_annotations)) == 4
+
+
+class TestStreamingToDisk:
+    """Non-image files never sit fully in memory."""
+
+    @pytest.mark.asyncio
+    async def test_streamed_file_lands_in_input(self, tmp_path):
+        data = bytes(range(256)) * 400
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=_chunks(data), headers={"content-type": "application/pdf"})
+
+        storage = _storage(tmp_path)
+        result = await process_media_items(
+            [{"type": "document", "attachment_guid": "g"}], "imessage", storage, **_bluebubbles(handler)
+        )
+
+        assert result.errors == []
+        assert (storage.get_input_dir() / "document.pdf").read_bytes() == data
+        assert _leftovers(storage) == []
+
+    @pytest.mark.asyncio
+    async def test_aborts_mid_stream(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(media_module, "MAX_DOWNLOAD_BYTES", 4096)
+        sent = 0
+
+        async def _endless():
+            nonlocal sent
+            while True:
+                sent += 1024
+                yield b"x" * 1024
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=_endless(), headers={"content-type": "application/zip"})
+
+        storage = _storage(tmp_path)
+        result = await process_media_items(
+            [{"type": "document", "attachment_guid": "g"}], "imessage", storage, **_bluebubbles(handler)
+        )
+
+        assert "too large" in result.errors[0]
+        assert sent <= media_module.DOWNLOAD_CHUNK_BYTES + 1024  # stopped after the first chunk
+        assert _leftovers(storage) == []
+        assert not storage.get_input_dir().exists() or list(storage.get_input_dir().iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_aborts_on_content_length(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(media_module, "MAX_DOWNLOAD_BYTES", 4096)
+        read = False
+
+        async def _body():
+            nonlocal read
+            read = True
+            yield b"x"
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=_body(), headers={"content-length": "999999"})
+
+        storage = _storage(tmp_path)
+        result = await process_media_items(
+            [{"type": "document", "attachment_guid": "g"}], "imessage", storage, **_bluebubbles(handler)
+        )
+
+        assert "too large" in result.errors[0]
+        assert read is False
+
+
+class TestImages:
+    """Images stay inline content blocks."""
+
+    @pytest.mark.asyncio
+    async def test_telegram_photo_inlined(self, tmp_path):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/getFile"):
+                return httpx.Response(200, json={"ok": True, "result": {"file_path": "photos/p.jpg", "file_size": 4}})
+            return httpx.Response(200, content=b"\xff\xd8ok")
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        result = await process_media_items(
+            [{"type": "photo", "file_id": "f"}], "telegram", _storage(tmp_path),
+            bot_token="T", telegram_client=client,
+        )
+
+        assert result.content_blocks == [{
+            "type": "image",
+            "source": {"type": "base64", "media_type": "image/jpeg", "data": base64.b64encode(b"\xff\xd8ok").decode()},
+        }]
@@ -0,0 +1,169 @@
+"""Tests for image preprocessing before images reach the model.
+
+Covers:
+- Large images are downscaled to the long-edge cap and re-encoded
+- EXIF orientation is applied and metadata stripped
+- Results are cached by content hash and limits
+- Disabled limits and undecodable data pass through unchanged
+- Per-agent image_limits override the server defaults
+- WebSocket-style content lists have their base64 image blocks rewritten
+- Platform photos are preprocessed before becoming content blocks
+"""
+import base64
+import io
+
+import httpx
+import pytest
+
+import api.services.image_preprocessor as preprocessor_module
+from agent.core.file_storage import FileStorage
+from api.services.image_preprocessor import ImageLimits, ImagePreprocessor, image_limits_for_agent
+from platforms.media import process_media_items
+
+Image = pytest.importorskip("PIL.Image")
+
+LIMITS = ImageLimits(max_edge=512, format="webp", quality=80)
+
+
+def _jpeg(width: int, height: int, orientation: int | None = None) -> bytes:
+    img = Image.new("RGB", (width, height), (200, 30, 30))
+    out = io.BytesIO()
+    if orientation is None:
+        img.save(out, "JPEG", quality=95)
+    else:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        img.save(out, "JPEG", quality=95, exif=exif)
+    return out.getvalue()
+
+
+def _open(data: bytes):
+    return Image.open(io.BytesIO(data))
+
+
+class TestTranscode:
+    """Downscale, orient, strip, re-encode."""
+
+    def test_downscales_long_edge(self):
+        data, mime = ImagePreprocessor(1 << 20).process(_jpeg(2000, 1000), "image/jpeg", LIMITS)
+        assert mime == "image/webp"
+        assert _open(data).size == (512, 256)
+
+    def test_applies_orientation_and_strips_exif(self):
+        # Orientation 6: stored landscape, displayed rotated 90° clockwise.
+        data, _ = ImagePreprocessor(1 << 20).process(_jpeg(400, 200, orientation=6), "image/jpeg", LIMITS)
+        img = _open(data)
+        assert img.size == (200, 400)
+        assert not img.getexif()
+
+    def test_jpeg_output_flattens_alpha(self):
+        out = io.BytesIO()
+        Image.new("RGBA", (1000, 1000), (0, 0, 0, 0)).save(out, "PNG")
+        limits = ImageLimits(max_edge=100, format="jpeg")
+        data, mime = ImagePreprocessor(1 << 20).process(out.getvalue(), "image/png", limits)
+        assert mime == "image/jpeg"
+        assert _open(data).getpixel((50, 50)) == (255, 255, 255)
+
+
+class TestCacheAndPassThrough:
+    """Repeated images are processed once; bad input is left alone."""
+
+    def test_cached_by_hash_and_limits(self, monkeypatch):
+        calls = []
+        real = preprocessor_module._transcode
+
+        def _counting(data, mime_type, limits):
+            calls.append(limits)
+            return real(data, mime_type, limits)
+
+        monkeypatch.setattr(preprocessor_module, "_transcode", _counting)
+        preprocessor = ImagePreprocessor(1 << 20)
+        photo = _jpeg(1200, 800)
+
+        first = preprocessor.process(photo, "image/jpeg", LIMITS)
+        assert preprocessor.process(bytes(photo), "image/jpeg", LIMITS) == first
+        preprocessor.process(photo, "image/jpeg", ImageLimits(max_edge=256))
+        assert len(calls) == 2
+
+    def test_cache_is_byte_bounded(self):
+        preprocessor = ImagePreprocessor(max_cache_bytes=1)
+        preprocessor.process(_jpeg(1200, 800), "image/jpeg", LIMITS)
+        assert len(preprocessor._cache) == 0
+
+    def test_disabled_and_undecodable(self):
+        preprocessor = ImagePreprocessor(1 << 20)
+        photo = _jpeg(2000, 1000)
+        assert preprocessor.process(photo, "image/jpeg", ImageLimits(max_edge=0)) == (photo, "image/jpeg")
+        assert preprocessor.process(b"not an image", "image/png", LIMITS) == (b"not an image", "image/png")
+
+
+class TestAgentLimits:
+    """agents.yaml image_limits override settings."""
+
+    def test_override_and_invalid_format(self, monkeypatch):
+        configs = {
+            "vision": {"image_limits": {"max_edge": 2048, "quality": 90}},
+            "odd": {"image_limits": {"format": "tiff"}},
+        }
+        monkeypatch.setattr(preprocessor_module, "load_agent_config", lambda agent_id: configs[agent_id])
+        defaults = preprocessor_module.default_image_limits()
+
+        assert image_limits_for_agent("vision") == ImageLimits(2048, defaults.format, 90)
+        assert image_limits_for_agent("odd").format == "webp"
+
+    def test_invalid_numbers_fall_back_to_defaults(self, monkeypatch, caplog):
+        configs = {
+            "typo": {"image_limits": {"max_edge": "large", "quality": 90}},
+            "range": {"image_limits": {"max_edge": -1, "quality": 500}},
+            "scalar": {"image_limits": "small"},
+        }
+        monkeypatch.setattr(preprocessor_module, "load_agent_config", lambda agent_id: configs[agent_id])
+        defaults = preprocessor_module.default_image_limits()
+
+        assert image_limits_for_agent("typo") == ImageLimits(defaults.max_edge, defaults.format, 90)
+        assert image_limits_for_agent("range") == defaults
+        assert image_limits_for_agent("scalar") == defaults
+        assert "Invalid image max_edge 'large'" in caplog.text
+
+
+class TestContentBlocks:
+    """User message content is rewritten block by block."""
+
+    @pytest.mark.asyncio
+    async def test_process_content_rewrites_images_only(self):
+        photo = _jpeg(2000, 1000)
+        content = [
+            {"type": "text", "text": "what is this?"},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": base64.b64encode(photo).decode()}},
+            {"type": "image", "source": {"type": "url", "url": "https://example.com/a.png"}},
+        ]
+        processed = await ImagePreprocessor(1 << 20).process_content(content, LIMITS)
+
+        assert processed[0] == content[0]
+        assert processed[2] == content[2]
+        assert processed[1]["source"]["media_type"] == "image/webp"
+        assert _open(base64.b64decode(processed[1]["source"]["data"])).size == (512, 256)
+        assert await ImagePreprocessor(1 << 20).process_content("plain text", LIMITS) == "plain text"
+
+
+class TestPlatformPhotos:
+    """Platform photos are preprocessed before becoming content blocks."""
+
+    @pytest.mark.asyncio
+    async def test_telegram_photo_downscaled(self, tmp_path):
+        photo = _jpeg(3000, 1500)
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/getFile"):
+                return httpx.Response(200, json={"ok": True, "result": {"file_path": "photos/p.jpg", "file_size": len(photo)}})
+            return httpx.Response(200, content=photo)
+
+        result = await process_media_items(
+            [{"type": "photo", "file_id": "f"}], "telegram", FileStorage("alice", "s1", base_path=str(tmp_path)),
+            bot_token="T", telegram_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            image_limits=LIMITS,
+        )
+
+        source = result.content_blocks[0]["source"]
+        assert source["media_type"] == "image/webp"
+        assert _open(base64.b64decode(source["data"])).size == (512, 256)
@@ -0,0 +1,125 @@
+"""Tests for the platform file delivery cache.
+
+Covers:
+- References are kept per (platform, sha256, kind) and expire with retention
+- Platforms without a retention policy are not cached
+- Telegram re-sends a file by cached file_id and re-uploads if it is rejected
+- WhatsApp re-sends cached media IDs without uploading
+"""
+import hashlib
+import json
+
+import httpx
+import pytest
+
+import platforms.adapters.telegram as telegram_module
+import platforms.adapters.whatsapp as whatsapp_module
+import platforms.base as base_module
+from platforms.adapters.telegram import TelegramAdapter
+from platforms.adapters.whatsapp import WhatsAppAdapter
+from platforms.base import Platform
+from platforms.file_cache import PLATFORM_MEDIA_RETENTION, PlatformFileCache
+from platforms.rate_limit import PlatformRateLimiter
+from conftest import FakeClock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PlatformFileCache(tmp_path / "files.db", clock=FakeClock())
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def report(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.4 quarterly numbers")
+    return path
+
+
+class TestPlatformFileCache:
+    """Keying and expiry."""
+
+    def test_expires_with_platform_retention(self, cache):
+        cache.put(Platform.WHATSAPP, "abc", "document", "m1")
+        assert cache.get(Platform.WHATSAPP, "abc", "document") == "m1"
+        assert cache.get(Platform.WHATSAPP, "abc", "image") is None
+        assert cache.get(Platform.TELEGRAM, "abc", "document") is None
+
+        cache._clock.now += PLATFORM_MEDIA_RETENTION[Platform.WHATSAPP]
+        assert cache.get(Platform.WHATSAPP, "abc", "document") is None
+
+    def test_uncached_platforms_and_purge(self, cache):
+        cache.put(Platform.ZALO, "abc", "document", "z1")
+        assert cache.get(Platform.ZALO, "abc", "document") is None
+
+        cache.put(Platform.TELEGRAM, "abc", "photo", "t1")
+        cache._clock.now += PLATFORM_MEDIA_RETENTION[Platform.TELEGRAM] + 1
+        assert cache.purge_expired() == 1
+
+
+def _patch_common(monkeypatch, module, cache):
+    monkeypatch.setattr(module, "get_platform_file_cache", lambda: cache)
+    limiter = PlatformRateLimiter()
+    monkeypatch.setattr(base_module, "get_platform_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(module, "get_platform_rate_limiter", lambda: limiter, raising=False)
+
+
+class TestTelegramDelivery:
+    """sendDocument by file_id after the first upload."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_file_id_then_reuploads_on_rejection(self, monkeypatch, cache, report):
+        _patch_common(monkeypatch, telegram_module, cache)
+        calls: list[str] = []
+        reject_cached = False
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            multipart = request.headers["content-type"].startswith("multipart/")
+            calls.append("upload" if multipart else "by_id")
+            if not multipart and reject_cached:
+                return httpx.Response(400, json={"ok": False, "description": "Bad Request: wrong file identifier"})
+            if not multipart:
+                assert json.loads(request.content)["document"] == f"doc-{calls.count('upload')}"
+            file_id = f"doc-{calls.count('upload')}"
+            return httpx.Response(200, json={"ok": True, "result": {"document": {"file_id": file_id}}})
+
+        adapter = TelegramAdapter.__new__(TelegramAdapter)
+        adapter._api_base = "https://api.telegram.org/botX"
+        adapter._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        assert await adapter.send_file("7", str(report), "report.pdf", "application/pdf")
+        assert await adapter.send_file("7", str(report), "report.pdf", "application/pdf")
+        assert calls == ["upload", "by_id"]
+
+        reject_cached = True
+        assert await adapter.send_file("7", str(report), "report.pdf", "application/pdf")
+        assert calls == ["upload", "by_id", "by_id", "upload"]
+        assert cache.get(Platform.TELEGRAM, hashlib.sha256(report.read_bytes()).hexdigest(), "document") == "doc-2"
+        await adapter.aclose()
+
+
+class TestWhatsAppDelivery:
+    """Media uploads are skipped for cached content."""
+
+    @pytest.mark.asyncio
+    async def test_second_send_skips_upload(self, monkeypatch, cache, report):
+        _patch_common(monkeypatch, whatsapp_module, cache)
+        paths: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            paths.append(request.url.path.rsplit("/", 1)[-1])
+            if request.url.path.endswith("/media"):
+                return httpx.Response(200, json={"id": "media-1"})
+            assert json.loads(request.content)["document"]["id"] == "media-1"
+            return httpx.Response(200, json={"messages": [{"id": "wamid"}]})
+
+        adapter = WhatsAppAdapter.__new__(WhatsAppAdapter)
+        adapter._phone_number_id = "PN"
+        adapter._auth_headers = {"Authorization": "Bearer T"}
+        adapter._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        assert await adapter.send_file("15551234", str(report), "report.pdf", "application/pdf")
+        assert await adapter.send_file("15551234", str(report), "report.pdf", "application/pdf")
+        assert paths == ["media", "messages", "messages"]
+        await adapter.aclose()
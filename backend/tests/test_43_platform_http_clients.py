@@ -0,0 +1,93 @@
+"""Tests for the shared platform HTTP client.
+
+Covers:
+- Adapters share one client, and adapter.aclose() leaves it open
+- Closing the registry closes the client; the next use builds a new one
+- Cached adapters pick up the rebuilt client after a close
+- Platform API hosts get their own sized pools; other hosts the default
+- HTTP/2 falls back to HTTP/1.1 when h2 is missing
+"""
+import httpx
+import pytest
+
+import platforms.http_clients as http_module
+from platforms.adapters.telegram import TelegramAdapter
+from platforms.adapters.zalo import ZaloAdapter
+from platforms.http_clients import (
+    PLATFORM_HOST_POOL_SIZES,
+    close_platform_http_client,
+    get_platform_http_client,
+)
+
+
+@pytest.fixture
+async def fresh_registry(monkeypatch):
+    monkeypatch.setattr(http_module, "_platform_http_client", None)
+    yield
+    await close_platform_http_client()
+
+
+def _pool_size(client: httpx.AsyncClient, url: str) -> int:
+    transport = client._transport_for_url(httpx.URL(url))
+    return transport._pool._max_connections
+
+
+class TestSharedClient:
+    """One pooled client for every adapter."""
+
+    @pytest.mark.asyncio
+    async def test_adapters_share_client(self, fresh_registry, monkeypatch):
+        monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "T")
+        monkeypatch.setenv("ZALO_OA_ACCESS_TOKEN", "Z")
+        telegram, zalo = TelegramAdapter(), ZaloAdapter()
+
+        assert telegram._client is zalo._client is get_platform_http_client()
+        await telegram.aclose()
+        assert not zalo._client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_close_and_rebuild(self, fresh_registry):
+        client = get_platform_http_client()
+        await close_platform_http_client()
+        assert client.is_closed
+        assert get_platform_http_client() is not client
+
+    @pytest.mark.asyncio
+    async def test_cached_adapter_follows_rebuilt_client(self, fresh_registry, monkeypatch):
+        monkeypatch.setenv("ZALO_OA_ACCESS_TOKEN", "Z")
+        zalo = ZaloAdapter()
+        before = zalo._client
+        await close_platform_http_client()
+
+        assert before.is_closed
+        assert not zalo._client.is_closed
+        assert zalo._client is get_platform_http_client()
+
+    @pytest.mark.asyncio
+    async def test_own_client_is_closed_with_adapter(self, fresh_registry, monkeypatch):
+        monkeypatch.setenv("ZALO_OA_ACCESS_TOKEN", "Z")
+        zalo = ZaloAdapter()
+        zalo._client = own = httpx.AsyncClient()
+        await zalo.aclose()
+
+        assert own.is_closed
+        assert not get_platform_http_client().is_closed
+
+    @pytest.mark.asyncio
+    async def test_per_host_pools(self, fresh_registry):
+        client = get_platform_http_client()
+        default = http_module.get_settings().platform.http_max_connections
+
+        assert _pool_size(client, "https://api.telegram.org/botX/sendMessage") == PLATFORM_HOST_POOL_SIZES["api.telegram.org"]
+        assert _pool_size(client, "https://graph.facebook.com/v20.0/1/messages") == PLATFORM_HOST_POOL_SIZES["graph.facebook.com"]
+        assert _pool_size(client, "https://bluebubbles.example/api/v1/message/text") == default
+        assert client.timeout.connect == http_module.get_settings().platform.http_connect_timeout_seconds
+
+
+class TestHttp2:
+    """HTTP/2 needs the optional h2 package."""
+
+    def test_falls_back_without_h2(self, monkeypatch):
+        monkeypatch.setattr(http_module.importlib.util, "find_spec", lambda name: None)
+        assert http_module._http2_enabled(True) is False
+        assert http_module._http2_enabled(False) is False
@@ -0,0 +1,142 @@
+"""Tests for markdown-aware message splitting.
+
+Covers:
+- Short text is returned as-is; 1 MB outputs split in linear time within the limit
+- Plain text splits on paragraph, line and word boundaries without losing words
+- Code blocks are kept whole when they fit, or closed and reopened per chunk
+- Word splits skip inline code, bold and links
+- WhatsApp sends long replies as several messages, paced only by the rate limiter
+"""
+import json
+import re
+import time
+
+import httpx
+import pytest
+
+import platforms.base as base_module
+from platforms.adapters.whatsapp import WHATSAPP_MAX_MESSAGE_LENGTH, WhatsAppAdapter
+from platforms.base import NormalizedResponse, split_message
+from platforms.rate_limit import PlatformRateLimiter
+
+ONE_MB = 1024 * 1024
+LIMIT = 4096
+
+INLINE_ENTITY = re.compile(r"`[^`\n]+`|\*\*[^*\n]+\*\*|\[[^\]\n]*\]\([^)\n]*\)")
+
+
+def _prose(size: int) -> str:
+    paragraph = "\n".join(f"Line {i} of the report with a few more words." for i in range(12))
+    return ("\n\n".join([paragraph] * (size // len(paragraph) + 1)))[:size]
+
+
+class TestLimits:
+    """Chunk sizes and running time on very long outputs."""
+
+    def test_short_text_unchanged(self):
+        assert split_message("hello world", LIMIT) == ["hello world"]
+
+    @pytest.mark.parametrize("text", [
+        _prose(ONE_MB),
+        "x" * ONE_MB,
+        "word " * (ONE_MB // 5),
+        "```\n" + "y" * ONE_MB + "\n```",
+    ], ids=["prose", "one-line", "words", "one-code-block"])
+    def test_one_megabyte_splits_fast_within_limit(self, text):
+        started = time.perf_counter()
+        chunks = split_message(text, LIMIT)
+        elapsed = time.perf_counter() - started
+
+        assert all(len(chunk) <= LIMIT for chunk in chunks)
+        assert len(chunks) < 2 * len(text) // LIMIT + 2
+        assert elapsed < 1.0
+
+    def test_prose_keeps_every_word(self):
+        text = _prose(ONE_MB)
+        chunks = split_message(text, LIMIT)
+
+        assert " ".join(chunks).split() == text.split()
+        # Paragraph breaks are preferred, so every chunk ends on a full line.
+        assert all(chunk.endswith("words.") for chunk in chunks[:-1])
+
+    def test_hard_split_is_lossless(self):
+        text = "x" * ONE_MB
+        assert "".join(split_message(text, LIMIT)) == text
+
+
+class TestCodeBlocks:
+    """Fenced code blocks stay valid in every chunk."""
+
+    def test_block_that_fits_moves_to_next_chunk(self):
+        intro = "Some intro words. " * 5
+        block = "```python\n" + "\n".join(f"x = {i}" for i in range(8)) + "\n```"
+        chunks = split_message(intro + "\n" + block + "\nDone.", 100)
+
+        assert chunks == [intro, block + "\nDone."]
+
+    def test_long_block_is_closed_and_reopened(self):
+        code = "\n".join(f"print({i})  # `tick` **not bold**" for i in range(ONE_MB // 32))
+        text = "Here is the script:\n\n```python\n" + code + "\n```\n\nThat is all."
+        chunks = split_message(text, LIMIT)
+
+        assert all(len(chunk) <= LIMIT for chunk in chunks)
+        assert all(chunk.startswith("```python\n") for chunk in chunks[1:-1])
+        assert all(chunk.endswith("\n```") for chunk in chunks[:-1])
+        assert chunks[-1].endswith("That is all.")
+        body = [line for chunk in chunks for line in chunk.splitlines() if line.startswith("print(")]
+        assert body == code.splitlines()
+
+    def test_mixed_megabyte_keeps_fences_balanced(self):
+        block = "```js\n" + "\n".join(f"let v{i} = {i};" for i in range(400)) + "\n```"
+        section = _prose(6000) + "\n\n" + block + "\n\n"
+        text = section * (ONE_MB // len(section) + 1)
+        chunks = split_message(text, LIMIT)
+
+        assert all(len(chunk) <= LIMIT for chunk in chunks)
+        assert all(chunk.count("```") % 2 == 0 for chunk in chunks)
+
+
+class TestInlineEntities:
+    """Word splits do not cut formatting entities."""
+
+    def test_entities_survive_on_one_long_line(self):
+        tokens = ["plain", "**bold words here**", "`inline code span`", "[a link](https://example.com/x y)"]
+        text = " ".join(tokens[i % len(tokens)] for i in range(ONE_MB // 16))
+        chunks = split_message(text, LIMIT)
+
+        assert all(len(chunk) <= LIMIT for chunk in chunks)
+        assert sum(len(INLINE_ENTITY.findall(chunk)) for chunk in chunks) == len(INLINE_ENTITY.findall(text))
+
+
+class TestWhatsAppDelivery:
+    """Long replies are split, not truncated."""
+
+    @pytest.mark.asyncio
+    async def test_chunks_sent_within_burst_without_waiting(self, monkeypatch):
+        sleeps: list[float] = []
+
+        async def record_sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+
+        limiter = PlatformRateLimiter(clock=lambda: 0.0, sleep=record_sleep)
+        monkeypatch.setattr(base_module, "get_platform_rate_limiter", lambda: limiter)
+        bodies: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append(json.loads(request.content)["text"]["body"])
+            return httpx.Response(200, json={"messages": [{"id": "wamid"}]})
+
+        adapter = WhatsAppAdapter.__new__(WhatsAppAdapter)
+        adapter._phone_number_id = "PN"
+        adapter._auth_headers = {"Authorization": "Bearer T"}
+        adapter._last_message_id = {}
+        adapter._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        text = _prose(3 * WHATSAPP_MAX_MESSAGE_LENGTH)
+        await adapter.send_response("15551234", NormalizedResponse(text=text))
+
+        assert len(bodies) == 4
+        assert all(len(body) <= WHATSAPP_MAX_MESSAGE_LENGTH for body in bodies)
+        assert " ".join(bodies).split() == text.split()
+        assert sleeps == []
+        await adapter.aclose()
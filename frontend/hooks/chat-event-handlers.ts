@@ -6,6 +6,8 @@ import type { DoneEvent, FileUploadedEvent } from '@/types/websocket';
 import type { ChatStore } from './chat-store-types';
 import { QUERY_KEYS } from '@/lib/constants';
 import { validateMessageContent } from '@/lib/message-utils';
+import { apiClient } from '@/lib/api-client';
+import { convertHistoryToChatMessages } from '@/lib/history-utils';
 import { extractText, normalizeToolResultContent } from '@/lib/content-utils';
 import {
   createUserMessage,
@@ -51,6 +53,17 @@ export function handleReadyEvent(
     queryClient.invalidateQueries({ queryKey: [QUERY_KEYS.SESSIONS] });
   }
 
+  // Reattached to a session that kept running while we were away
+  if (event.reattached) {
+    store.setStreaming(Boolean(event.is_processing));
+  }
+
+  // Missed events were evicted server-side and will not be replayed
+  const gapSessionId = event.session_id ?? useChatStore.getState().sessionId;
+  if (event.replay_gap && gapSessionId) {
+    reloadHistory(gapSessionId, ctx);
+  }
+
   // Send pending message if there is one (from welcome page)
   if (pendingMessageRef.current) {
     sendPendingMessage(pendingMessageRef.current, ctx);
@@ -59,6 +72,18 @@ export function handleReadyEvent(
   }
 }
 
+async function reloadHistory(sessionId: string, ctx: EventHandlerContext): Promise<void> {
+  try {
+    const historyData = await apiClient.getSessionHistory(sessionId);
+    ctx.store.setMessages(convertHistoryToChatMessages(historyData.messages));
+    // Live events after the gap start a fresh assistant message
+    ctx.assistantMessageStarted.current = false;
+  } catch (error) {
+    console.error('Failed to reload history after replay gap:', error);
+    toast.error('Some messages could not be restored; reload the session to see them');
+  }
+}
+
 function sendPendingMessage(messageContent: string, ctx: EventHandlerContext): void {
   const { store, ws } = ctx;
 
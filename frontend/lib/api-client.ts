@@ -69,6 +69,11 @@ class ApiClient {
     return res.json();
   }
 
+  async getBlob(sessionId: string, hash: string): Promise<string> {
+    const res = await this.fetchWithErrorHandling(`${API_URL}/sessions/${sessionId}/blobs/${hash}`);
+    return res.text();
+  }
+
   async deleteSession(id: string): Promise<void> {
     await this.fetchWithErrorHandling(`${API_URL}/sessions/${id}`, {
       method: 'DELETE',
@@ -21,6 +21,8 @@ export class WebSocketManager {
   private pendingAgentId: string | null = null; // Track pending agent for connection
   private pendingSessionId: string | null = null; // Track pending session for connection
   private isConnecting = false; // Flag to track if connection is in progress (including async token fetch)
+  private lastSeq: number | null = null; // Sequence number of the last server event received
+  private resumeFromSeq: number | null = null; // Set on automatic reconnect so the server replays missed events
 
   connect(agentId: string | null = null, sessionId: string | null = null) {
     // If already connected/connecting to the same agent and session, ignore
@@ -111,6 +113,10 @@ export class WebSocketManager {
 
     if (agentId) wsUrl.searchParams.set('agent_id', agentId);
     if (sessionId) wsUrl.searchParams.set('session_id', sessionId);
+    if (sessionId && this.resumeFromSeq !== null) {
+      wsUrl.searchParams.set('last_seq', String(this.resumeFromSeq));
+    }
+    this.resumeFromSeq = null;
 
     const fullUrl = wsUrl.toString();
     // Don't log the token in production
@@ -161,6 +167,13 @@ export class WebSocketManager {
           return;
         }
 
+        if (typeof data.seq === 'number') {
+          this.lastSeq = data.seq;
+        } else if (data.type === 'ready' && typeof data.last_seq === 'number') {
+          // After a replay gap nothing older is replayed; resume from the server's position
+          this.lastSeq = data.last_seq;
+        }
+
         this.onMessageCallbacks.forEach(cb => cb(data));
       } catch (err) {
         console.error('Unexpected error processing WebSocket message:', err);
@@ -217,6 +230,7 @@ export class WebSocketManager {
         this.reconnectAttempts++;
         console.log(`Reconnecting... Attempt ${this.reconnectAttempts}/${MAX_RECONNECT_ATTEMPTS}`);
 
+        this.resumeFromSeq = this.lastSeq;
         this.reconnectTimeout = setTimeout(() => {
           // Use pendingAgentId/pendingSessionId for reconnection
           // These are set at connection start, while agentId/sessionId are only set on successful open
@@ -2,6 +2,7 @@ import type { ContentBlock } from './index';
 
 export interface WebSocketBaseEvent {
   type: string;
+  seq?: number; // Server-assigned sequence number, used to resume after reconnect
 }
 
 export interface QuestionOption {
@@ -95,12 +96,20 @@ export interface ToolUseEvent extends WebSocketBaseEvent {
   parent_tool_use_id?: string;
 }
 
+/** Reference to the full body of an elided tool result (see getBlob). */
+export interface ContentRef {
+  hash: string;
+  size: number;
+  truncated: boolean;
+}
+
 export interface ToolResultEvent extends WebSocketBaseEvent {
   type: 'tool_result';
   tool_use_id: string;
   content: string;
   is_error?: boolean;
   parent_tool_use_id?: string;
+  content_ref?: ContentRef;
 }
 
 export interface DoneEvent extends WebSocketBaseEvent {
@@ -131,6 +140,10 @@ export interface ReadyEvent extends WebSocketBaseEvent {
   cwd_id?: string;
   resumed?: boolean;
   turn_count?: number;
+  reattached?: boolean; // Reconnected to a session that was still running server-side
+  is_processing?: boolean;
+  last_seq?: number;
+  replay_gap?: boolean; // Missed events were evicted; reload history instead
 }
 
 export interface FileUploadedEvent extends WebSocketBaseEvent {